@@ -0,0 +1,281 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""In-process discovery of approximate functional dependencies. An approximate
+functional dependency X -> A holds if the g3 error of the dependency does not
+exceed a given threshold. The g3 error is the minimum fraction of rows that
+have to be removed from the table for the dependency to hold exactly:
+
+Jyrki Kivinen, Heikki Mannila
+Approximate inference of functional dependencies from relations
+Theoretical Computer Science 149(1), 1995
+
+Approximate dependencies are discovered level-wise, similar to TANE. Columns
+are dictionary-encoded as NumPy partitions. The partition for a left-hand-side
+is computed from the partition of its prefix at the previous level. Since the
+g3 error does not increase when columns are added to the left-hand-side, only
+left-hand-sides whose subsets all violate the threshold are considered at the
+next level. Candidates for different right-hand-side columns are validated in
+parallel.
+
+Unlike the Metanome wrappers, the algorithm runs in the Python process and
+does not require Java or Docker.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+import os
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.fd import FunctionalDependency, FunctionalDependencyFinder
+from openclean_metanome.partition import encode, Partition
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+class ApproximateFD(FunctionalDependency):
+    """Functional dependency that is annotated with its g3 error, i.e., the
+    minimum fraction of rows that have to be removed for the dependency to
+    hold. The error is zero for exact functional dependencies.
+    """
+    def __init__(self, lhs: Columns, rhs: Columns, error: float):
+        """Initialize the determinant, the dependant, and the error of the
+        functional dependency.
+
+        Parameters
+        ----------
+        lhs: list of string or Column
+            Left-hand-side of the functional dependency (determinant).
+        rhs: list of string or Column
+            Right-hand-side of the functional dependency (dependant).
+        error: float
+            Fraction of rows that violate the functional dependency.
+        """
+        super(ApproximateFD, self).__init__(lhs=lhs, rhs=rhs)
+        self.error = error
+
+
+def afd(
+    df: Union['pd.DataFrame', str, 'Document'], max_error: float = 0.01,
+    max_lhs_size: int = -1, null_equals_null: bool = True,
+    threads: Optional[int] = None
+) -> List[ApproximateFD]:
+    """Discover all minimal approximate functional dependencies in a given
+    data frame whose g3 error does not exceed the given threshold.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    max_error: float, default=0.01
+        Maximum fraction of rows that may violate a discovered dependency.
+    max_lhs_size: int, default=-1
+        Defines the maximum size of the left-hand-side for discovered FDs. Use
+        -1 to ignore size limits on FDs.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    threads: int, default=None
+        Number of threads for validating candidates for different
+        right-hand-side columns in parallel. By default, one thread per
+        available CPU core is used.
+
+    Returns
+    -------
+    list of ApproximateFD
+    """
+    return AFD(
+        max_error=max_error,
+        max_lhs_size=max_lhs_size,
+        null_equals_null=null_equals_null,
+        threads=threads
+    ).run(df)
+
+
+class AFD(FunctionalDependencyFinder):
+    """Level-wise discovery algorithm for approximate functional dependencies
+    based on the g3 error measure. The algorithm operates on dictionary-encoded
+    NumPy partitions of the input columns.
+    """
+    def __init__(
+        self, max_error: float = 0.01, max_lhs_size: int = -1,
+        null_equals_null: bool = True, threads: Optional[int] = None
+    ):
+        """Initialize the algorithm parameters.
+
+        Parameters
+        ----------
+        max_error: float, default=0.01
+            Maximum fraction of rows that may violate a discovered dependency.
+        max_lhs_size: int, default=-1
+            Defines the maximum size of the left-hand-side for discovered FDs
+            Use -1 to ignore size limits on FDs.
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+        threads: int, default=None
+            Number of threads for validating candidates for different
+            right-hand-side columns in parallel. By default, one thread per
+            available CPU core is used.
+        """
+        if not 0 <= max_error < 1:
+            raise ValueError('invalid error threshold {}'.format(max_error))
+        self.max_error = max_error
+        self.max_lhs_size = max_lhs_size
+        self.null_equals_null = null_equals_null
+        self.threads = threads if threads else os.cpu_count()
+
+    def run(self, df: Union['pd.DataFrame', str, 'Document']) -> List[ApproximateFD]:
+        """Run the discovery algorithm on the given data frame.
+
+        Returns a list of all minimal approximate functional dependencies with
+        a single column on the right-hand-side.
+
+        Parameters
+        ----------
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, or data stream.
+
+        Returns
+        -------
+        list of ApproximateFD
+        """
+        columns, partitions = encode(df, null_equals_null=self.null_equals_null)
+        return self.find(columns=columns, partitions=partitions)
+
+    def find(self, columns: List, partitions: List[Partition]) -> List[ApproximateFD]:
+        """Discover approximate functional dependencies for a table that is
+        given by the partitions of its columns.
+
+        Parameters
+        ----------
+        columns: list
+            List of columns in the table.
+        partitions: list of openclean_metanome.partition.Partition
+            Partition for each column in the table.
+
+        Returns
+        -------
+        list of ApproximateFD
+        """
+        import numpy as np
+        nrows = len(partitions[0]) if partitions else 0
+        if not nrows:
+            return list()
+        threshold = int(self.max_error * nrows)
+        # Partitions for the left-hand-sides of the current level. Start with
+        # the empty left-hand-side that puts all rows into the same class.
+        level = {(): Partition(codes=np.zeros(nrows, dtype=np.int64), size=1)}
+        # Left-hand-side candidates for each right-hand-side column.
+        candidates = {rhs: [()] for rhs in range(len(columns))}
+        lhs_size = 0
+        fds = list()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while candidates:
+                # Validate the candidates for all right-hand-sides in
+                # parallel.
+                futures = dict()
+                for rhs, lhs_list in candidates.items():
+                    futures[rhs] = executor.submit(
+                        validate, lhs_list, partitions[rhs], level, threshold
+                    )
+                invalid = dict()
+                for rhs, f in futures.items():
+                    valid, violated = f.result()
+                    fds.extend([(lhs, rhs, error) for lhs, error in valid])
+                    if violated:
+                        invalid[rhs] = violated
+                lhs_size += 1
+                if 0 <= self.max_lhs_size < lhs_size:
+                    break
+                candidates = next_level(invalid, len(columns))
+                # Compute partitions for all left-hand-sides of the next level
+                # from the partitions of their prefix.
+                lhs_sets = sorted(set([lhs for lhs_list in candidates.values() for lhs in lhs_list]))
+                refined = executor.map(lambda x: level[x[:-1]].refine(partitions[x[-1]]), lhs_sets)
+                level = dict(zip(lhs_sets, refined))
+        result = list()
+        for lhs, rhs, error in sorted(fds, key=lambda fd: (len(fd[0]), fd[0], fd[1])):
+            fd = ApproximateFD(
+                lhs=[columns[c] for c in lhs],
+                rhs=[columns[rhs]],
+                error=error / nrows
+            )
+            result.append(fd)
+        return result
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def next_level(invalid: Dict[int, List[Tuple]], columns: int) -> Dict[int, List[Tuple]]:
+    """Generate the left-hand-side candidates for the next level of the
+    search. A left-hand-side is a candidate for a right-hand-side column if
+    all of its subsets at the current level violated the error threshold.
+    Otherwise, the dependency would not be minimal.
+
+    Parameters
+    ----------
+    invalid: dict
+        Mapping of right-hand-side columns to the list of left-hand-sides at
+        the current level that violated the error threshold.
+    columns: int
+        Number of columns in the input table.
+
+    Returns
+    -------
+    dict
+    """
+    candidates = dict()
+    for rhs, lhs_list in invalid.items():
+        violated = set(lhs_list)
+        lhs_candidates = list()
+        for lhs in lhs_list:
+            for col in range(lhs[-1] + 1 if lhs else 0, columns):
+                if col == rhs:
+                    continue
+                cand = lhs + (col,)
+                if all([cand[:i] + cand[i + 1:] in violated for i in range(len(cand) - 1)]):
+                    lhs_candidates.append(cand)
+        if lhs_candidates:
+            candidates[rhs] = lhs_candidates
+    return candidates
+
+
+def validate(
+    lhs_list: List[Tuple], rhs: Partition, partitions: Dict[Tuple, Partition],
+    threshold: int
+) -> Tuple[List[Tuple[Tuple, int]], List[Tuple]]:
+    """Validate the left-hand-side candidates for a right-hand-side column.
+
+    Returns the list of valid left-hand-sides together with their error and
+    the list of left-hand-sides that violate the error threshold.
+
+    Parameters
+    ----------
+    lhs_list: list of tuple
+        Left-hand-side candidates.
+    rhs: openclean_metanome.partition.Partition
+        Partition for the right-hand-side column.
+    partitions: dict
+        Partitions for the left-hand-side candidates.
+    threshold: int
+        Maximum number of rows that may violate a valid dependency.
+
+    Returns
+    -------
+    list of (tuple, int), list of tuple
+    """
+    valid, violated = list(), list()
+    for lhs in lhs_list:
+        error = partitions[lhs].error(rhs)
+        if error <= threshold:
+            valid.append((lhs, error))
+        else:
+            violated.append(lhs)
+    return valid, violated
@@ -0,0 +1,227 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""In-process discovery of approximate unique column combinations (near-keys).
+A column combination is a near-key if the fraction of duplicate rows does not
+exceed a given threshold. The duplicate ratio is the minimum fraction of rows
+that have to be removed from the table for the combination to be unique,
+i.e., one minus the ratio of distinct value combinations over all rows.
+
+Near-keys are discovered level-wise. Columns are dictionary-encoded as NumPy
+partitions. The combined codes for a column combination are computed from the
+partition of its prefix at the previous level and the codes of the last
+column. The number of distinct value combinations is the number of classes of
+the combined partition. Since the duplicate ratio does not increase when
+columns are added, only combinations whose subsets all violate the threshold
+are considered at the next level. Partitions for the combinations of a level
+are computed in parallel.
+
+Unlike the Metanome wrappers, the algorithm runs in the Python process and
+does not require Java or Docker.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union, TYPE_CHECKING
+
+import os
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.ucc import UniqueColumnCombinationFinder
+from openclean_metanome.partition import encode, Partition
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+class ApproximateUCC(list):
+    """Unique column combination that is annotated with its uniqueness ratio,
+    i.e., the number of distinct value combinations divided by the number of
+    rows. The ratio is one for exact unique column combinations.
+    """
+    def __init__(self, columns: Columns, uniqueness: float):
+        """Initialize the columns and the uniqueness ratio.
+
+        Parameters
+        ----------
+        columns: list of string or Column
+            Columns in the combination.
+        uniqueness: float
+            Ratio of distinct value combinations over all rows.
+        """
+        super(ApproximateUCC, self).__init__(columns)
+        self.uniqueness = uniqueness
+
+    @property
+    def duplicates(self) -> float:
+        """Fraction of rows that have to be removed for the column combination
+        to be unique.
+
+        Returns
+        -------
+        float
+        """
+        return 1 - self.uniqueness
+
+
+def aucc(
+    df: Union['pd.DataFrame', str, 'Document'], max_duplicates: float = 0.01,
+    max_ucc_size: int = -1, null_equals_null: bool = True,
+    threads: Optional[int] = None
+) -> List[ApproximateUCC]:
+    """Discover all minimal approximate unique column combinations in a given
+    data frame whose duplicate ratio does not exceed the given threshold.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    max_duplicates: float, default=0.01
+        Maximum fraction of duplicate rows for a discovered column
+        combination.
+    max_ucc_size: int, default=-1
+        Maximum size of unique column combinations. Use -1 to return all
+        discovered unique column combinations.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    threads: int, default=None
+        Number of threads for computing the partitions of column combinations
+        in parallel. By default, one thread per available CPU core is used.
+
+    Returns
+    -------
+    list of ApproximateUCC
+    """
+    return AUCC(
+        max_duplicates=max_duplicates,
+        max_ucc_size=max_ucc_size,
+        null_equals_null=null_equals_null,
+        threads=threads
+    ).run(df)
+
+
+class AUCC(UniqueColumnCombinationFinder):
+    """Level-wise discovery algorithm for approximate unique column
+    combinations based on the ratio of duplicate rows. The algorithm operates
+    on dictionary-encoded NumPy partitions of the input columns.
+    """
+    def __init__(
+        self, max_duplicates: float = 0.01, max_ucc_size: int = -1,
+        null_equals_null: bool = True, threads: Optional[int] = None
+    ):
+        """Initialize the algorithm parameters.
+
+        Parameters
+        ----------
+        max_duplicates: float, default=0.01
+            Maximum fraction of duplicate rows for a discovered column
+            combination.
+        max_ucc_size: int, default=-1
+            Maximum size of unique column combinations. Use -1 to return all
+            discovered unique column combinations.
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+        threads: int, default=None
+            Number of threads for computing the partitions of column
+            combinations in parallel. By default, one thread per available
+            CPU core is used.
+        """
+        if not 0 <= max_duplicates < 1:
+            raise ValueError('invalid duplicate threshold {}'.format(max_duplicates))
+        self.max_duplicates = max_duplicates
+        self.max_ucc_size = max_ucc_size
+        self.null_equals_null = null_equals_null
+        self.threads = threads if threads else os.cpu_count()
+
+    def run(self, df: Union['pd.DataFrame', str, 'Document']) -> List[ApproximateUCC]:
+        """Run the discovery algorithm on the given data frame.
+
+        Returns a list of all minimal approximate unique column combinations.
+
+        Parameters
+        ----------
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, or data stream.
+
+        Returns
+        -------
+        list of ApproximateUCC
+        """
+        columns, partitions = encode(df, null_equals_null=self.null_equals_null)
+        return self.find(columns=columns, partitions=partitions)
+
+    def find(self, columns: List, partitions: List[Partition]) -> List[ApproximateUCC]:
+        """Discover approximate unique column combinations for a table that is
+        given by the partitions of its columns.
+
+        Parameters
+        ----------
+        columns: list
+            List of columns in the table.
+        partitions: list of openclean_metanome.partition.Partition
+            Partition for each column in the table.
+
+        Returns
+        -------
+        list of ApproximateUCC
+        """
+        nrows = len(partitions[0]) if partitions else 0
+        if not nrows or self.max_ucc_size == 0:
+            return list()
+        # Minimum number of distinct value combinations for a near-key.
+        threshold = nrows - int(self.max_duplicates * nrows)
+        level = {(c,): p for c, p in enumerate(partitions)}
+        uccs = list()
+        size = 1
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while level:
+                violated = list()
+                for cols in sorted(level):
+                    if level[cols].size >= threshold:
+                        uccs.append((cols, level[cols].size))
+                    else:
+                        violated.append(cols)
+                size += 1
+                if 0 <= self.max_ucc_size < size:
+                    break
+                # Compute the partitions for all candidates of the next level
+                # from the partitions of their prefix.
+                candidates = next_level(violated, len(columns))
+                refined = executor.map(lambda x: level[x[:-1]].refine(partitions[x[-1]]), candidates)
+                level = dict(zip(candidates, refined))
+        return [ApproximateUCC(columns=[columns[c] for c in cols], uniqueness=n / nrows) for cols, n in uccs]
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def next_level(violated: List[tuple], columns: int) -> List[tuple]:
+    """Generate the candidates for the next level of the search. A column
+    combination is a candidate if all of its subsets at the current level
+    violated the duplicate threshold. Otherwise, the combination would not be
+    minimal.
+
+    Parameters
+    ----------
+    violated: list of tuple
+        Sorted column combinations at the current level that violated the
+        duplicate threshold.
+    columns: int
+        Number of columns in the input table.
+
+    Returns
+    -------
+    list of tuple
+    """
+    invalid = set(violated)
+    candidates = list()
+    for cols in violated:
+        for c in range(cols[-1] + 1, columns):
+            cand = cols + (c,)
+            if all([cand[:i] + cand[i + 1:] in invalid for i in range(len(cand) - 1)]):
+                candidates.append(cand)
+    return candidates
@@ -0,0 +1,622 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Automatic selection of the Metanome algorithm for functional dependency
+and unique column combination discovery.
+
+Each discovery algorithm performs best for a different shape of the input
+table. Lattice traversal algorithms (TANE, DFD, DUCC) scale well with the
+number of rows but poorly with the number of columns. Algorithms that are
+based on record comparisons (FDep) scale well with the number of columns
+but poorly with the number of rows. The hybrid algorithms (HyFD, HyUCC)
+perform well for most tables.
+
+The selection is based on a cost model that estimates the runtime of each
+algorithm from the number of rows, the number of columns, and the average
+cardinality of the columns in the input table. The model is a linear model
+for the logarithm of the runtime. It starts from a set of default
+coefficients that reflect the known behavior of the algorithms and is
+calibrated from recorded runs. Runs are recorded in a file that is defined by
+the environment variable *METANOME_COSTMODEL*.
+"""
+
+from collections import defaultdict, namedtuple
+from typing import Callable, Dict, List, Optional, Sequence, Union, TYPE_CHECKING
+
+import csv
+import gzip
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.fd import FunctionalDependency
+from openclean_metanome.algorithm.dfd import DFD
+from openclean_metanome.algorithm.ducc import DUCC
+from openclean_metanome.algorithm.fdep import FDep
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.algorithm.hyucc import HyUCC
+from openclean_metanome.algorithm.tane import TANE
+from openclean_metanome.converter import write_input, PARQUET_SUFFIXES
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.config as config
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+"""Identifier for the automatic algorithm selection mode."""
+AUTO = 'auto'
+
+"""Wrapper classes for the discovery algorithms. Only the algorithms whose
+subcommands are provided by the configured Metanome.jar file are available
+(see :func:`fd_algorithms` and :func:`ucc_algorithms`).
+"""
+FD_WRAPPERS = {'dfd': DFD, 'fdep': FDep, 'hyfd': HyFD, 'tane': TANE}
+UCC_WRAPPERS = {'ducc': DUCC, 'hyucc': HyUCC}
+
+"""Default coefficients of the cost model. The coefficients are weights for
+the features (intercept, log(rows), columns, log(columns), cardinality) in a
+linear model for the logarithm of the algorithm runtime in seconds.
+"""
+DEFAULT_WEIGHTS = {
+    'dfd': [-9.5, 1.0, 0.25, 0.0, -1.0],
+    'fdep': [-11.0, 2.0, 0.02, 0.0, 0.0],
+    'hyfd': [-8.5, 1.0, 0.1, 0.0, 0.0],
+    'tane': [-10.0, 1.0, 0.35, 0.0, -1.0],
+    'ducc': [-10.0, 1.0, 0.3, 0.0, -1.0],
+    'hyucc': [-8.5, 1.0, 0.1, 0.0, 0.0]
+}
+
+"""Weight of the default coefficients relative to a single recorded run when
+calibrating the cost model.
+"""
+PRIOR_WEIGHT = 1.0
+
+"""Number of rows that are used to estimate the cardinality of columns."""
+SAMPLE_SIZE = 10000
+
+
+"""Shape of an input table. The cardinality is the average ratio of distinct
+values to rows for the columns in the table (or in a sample of its rows).
+"""
+TableShape = namedtuple('TableShape', ['rows', 'columns', 'cardinality'])
+
+
+def discover_fds(
+    df: Union['pd.DataFrame', str, 'Document'], algorithm: Optional[str] = AUTO,
+    max_lhs_size: int = -1, null_equals_null: bool = True,
+    env: Optional[Dict] = None, verbose: Optional[bool] = True,
+    session: Optional[MetanomeSession] = None, model: Optional['CostModel'] = None
+) -> List[FunctionalDependency]:
+    """Discover functional dependencies in the given data frame using one of
+    the supported Metanome algorithms (dfd, fdep, hyfd, tane). If the algorithm
+    is 'auto' the algorithm with the lowest estimated runtime for the shape of
+    the input table is used. Only the algorithms that are provided by the
+    configured Metanome.jar file are supported.
+
+    The runtime of the algorithm is recorded in the cost model.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    algorithm: string, default='auto'
+        Name of the discovery algorithm or 'auto'.
+    max_lhs_size: int, default=-1
+        Defines the maximum size of the left-hand-side for discovered FDs. Use
+        -1 to ignore size limits on FDs.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=True
+        Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+    model: openclean_metanome.algorithm.auto.CostModel, default=None
+        Cost model for algorithm selection. By default, the model is
+        calibrated from the runs that are recorded in the file that is
+        referenced by *METANOME_COSTMODEL*.
+
+    Returns
+    -------
+    list of FunctionalDependency
+    """
+    def create(name: str, session: MetanomeSession):
+        args = {'max_lhs_size': max_lhs_size} if name in ('hyfd', 'tane') else {}
+        return FD_WRAPPERS[name](
+            null_equals_null=null_equals_null,
+            env=env,
+            verbose=verbose,
+            session=session,
+            **args
+        )
+
+    def remap(fds: List[FunctionalDependency], colmap: Dict) -> List[FunctionalDependency]:
+        result = list()
+        for fd in fds:
+            # Algorithms without a parameter for the maximum size of the
+            # left-hand-side discover all FDs. Those with a larger left-hand
+            # side are removed from the result.
+            if max_lhs_size > 0 and len(fd.lhs) > max_lhs_size:
+                continue
+            if colmap is not None:
+                fd = FunctionalDependency(
+                    lhs=[colmap[c] for c in fd.lhs],
+                    rhs=[colmap[c] for c in fd.rhs]
+                )
+            result.append(fd)
+        return result
+
+    return run_algorithm(
+        df=df,
+        algorithms=fd_algorithms(env=env),
+        algorithm=algorithm,
+        create=create,
+        remap=remap,
+        env=env,
+        session=session,
+        model=model
+    )
+
+
+def discover_uccs(
+    df: Union['pd.DataFrame', str, 'Document'], algorithm: Optional[str] = AUTO,
+    max_ucc_size: int = -1, null_equals_null: bool = True,
+    env: Optional[Dict] = None, verbose: Optional[bool] = True,
+    session: Optional[MetanomeSession] = None, model: Optional['CostModel'] = None
+) -> List[Columns]:
+    """Discover unique column combinations in the given data frame using one
+    of the supported Metanome algorithms (ducc, hyucc). If the algorithm is
+    'auto' the algorithm with the lowest estimated runtime for the shape of
+    the input table is used. Only the algorithms that are provided by the
+    configured Metanome.jar file are supported.
+
+    The runtime of the algorithm is recorded in the cost model.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    algorithm: string, default='auto'
+        Name of the discovery algorithm or 'auto'.
+    max_ucc_size: int, default=-1
+        Defines the maximum size of discovered column sets. Use -1 to
+        return all discovered unique column combinations.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=True
+        Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+    model: openclean_metanome.algorithm.auto.CostModel, default=None
+        Cost model for algorithm selection. By default, the model is
+        calibrated from the runs that are recorded in the file that is
+        referenced by *METANOME_COSTMODEL*.
+
+    Returns
+    -------
+    list of columns
+    """
+    def create(name: str, session: MetanomeSession):
+        args = {'max_ucc_size': max_ucc_size} if name == 'hyucc' else {}
+        return UCC_WRAPPERS[name](
+            null_equals_null=null_equals_null,
+            env=env,
+            verbose=verbose,
+            session=session,
+            **args
+        )
+
+    def remap(uccs: List[Columns], colmap: Dict) -> List[Columns]:
+        result = list()
+        for ucc in uccs:
+            if max_ucc_size > 0 and len(ucc) > max_ucc_size:
+                continue
+            result.append([colmap[c] for c in ucc] if colmap is not None else ucc)
+        return result
+
+    return run_algorithm(
+        df=df,
+        algorithms=ucc_algorithms(env=env),
+        algorithm=algorithm,
+        create=create,
+        remap=remap,
+        env=env,
+        session=session,
+        model=model
+    )
+
+
+def fd_algorithms(env: Optional[Dict] = None) -> Dict:
+    """Get the wrapper classes for the functional dependency discovery
+    algorithms that are provided by the configured Metanome.jar file.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    dict
+    """
+    commands = config.COMMANDS(env=env)
+    return {name: cls for name, cls in FD_WRAPPERS.items() if name in commands}
+
+
+def ucc_algorithms(env: Optional[Dict] = None) -> Dict:
+    """Get the wrapper classes for the unique column combination discovery
+    algorithms that are provided by the configured Metanome.jar file.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    dict
+    """
+    commands = config.COMMANDS(env=env)
+    return {name: cls for name, cls in UCC_WRAPPERS.items() if name in commands}
+
+
+# -- Cost model ---------------------------------------------------------------
+
+class CostModel(object):
+    """Model for estimating the runtime of the discovery algorithms for a
+    given table shape. The logarithm of the runtime is estimated as a linear
+    function of the features (intercept, log(rows), columns, log(columns),
+    cardinality).
+
+    The model is calibrated from recorded runs using ridge regression towards
+    the default coefficients. With few recorded runs the estimates stay close
+    to the defaults. Recorded runs are appended to the model file (if given)
+    as Json objects, one per line.
+    """
+    def __init__(
+        self, filename: Optional[str] = None, weights: Optional[Dict[str, List[float]]] = None,
+        prior_weight: Optional[float] = PRIOR_WEIGHT
+    ):
+        """Initialize the default coefficients and load recorded runs from
+        the model file.
+
+        Parameters
+        ----------
+        filename: string, default=None
+            Path to the file with recorded runs.
+        weights: dict, default=None
+            Default coefficients for the algorithms. Uses the package defaults
+            if not given.
+        prior_weight: float, default=1.0
+            Weight of the default coefficients relative to a single recorded
+            run when calibrating the model.
+        """
+        weights = weights if weights is not None else DEFAULT_WEIGHTS
+        self.filename = filename
+        self.prior_weight = prior_weight
+        self.priors = {key: list(w) for key, w in weights.items()}
+        self.weights = {key: list(w) for key, w in weights.items()}
+        # Recorded runs for each algorithm as lists of feature vectors and
+        # the logarithm of the runtime.
+        self.runs = defaultdict(list)
+        if filename and os.path.isfile(filename):
+            with open(filename, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    doc = json.loads(line)
+                    shape = TableShape(doc['rows'], doc['columns'], doc['cardinality'])
+                    self.runs[doc['algorithm']].append((features(shape), log_time(doc['time'])))
+            for algorithm in self.runs:
+                self.calibrate(algorithm)
+
+    def calibrate(self, algorithm: str):
+        """Update the coefficients for the given algorithm from the recorded
+        runs.
+
+        Parameters
+        ----------
+        algorithm: string
+            Unique algorithm name.
+        """
+        import numpy as np
+        runs = self.runs.get(algorithm)
+        prior = self.priors.get(algorithm)
+        if not runs or prior is None:
+            return
+        X = np.array([x for x, _ in runs])
+        y = np.array([t for _, t in runs])
+        w0 = np.array(prior)
+        A = X.T @ X + self.prior_weight * np.eye(len(w0))
+        b = X.T @ y + self.prior_weight * w0
+        self.weights[algorithm] = np.linalg.solve(A, b).tolist()
+
+    def estimate(self, algorithm: str, shape: TableShape) -> float:
+        """Estimate the runtime (in seconds) for the given algorithm on a table
+        with the given shape.
+
+        Parameters
+        ----------
+        algorithm: string
+            Unique algorithm name.
+        shape: openclean_metanome.algorithm.auto.TableShape
+            Shape of the input table.
+
+        Returns
+        -------
+        float
+        """
+        weights = self.weights[algorithm]
+        return math.exp(sum(w * x for w, x in zip(weights, features(shape))))
+
+    def record(self, algorithm: str, shape: TableShape, seconds: float):
+        """Record the runtime of an algorithm run and re-calibrate the
+        coefficients for the algorithm.
+
+        Parameters
+        ----------
+        algorithm: string
+            Unique algorithm name.
+        shape: openclean_metanome.algorithm.auto.TableShape
+            Shape of the input table.
+        seconds: float
+            Runtime of the algorithm in seconds.
+        """
+        self.runs[algorithm].append((features(shape), log_time(seconds)))
+        self.calibrate(algorithm)
+        if self.filename:
+            dirname = os.path.dirname(self.filename)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            doc = dict(shape._asdict())
+            doc['algorithm'] = algorithm
+            doc['time'] = seconds
+            with open(self.filename, 'a') as f:
+                f.write(json.dumps(doc) + '\n')
+
+    def select(self, algorithms: Sequence[str], shape: TableShape) -> str:
+        """Select the algorithm with the lowest estimated runtime for a table
+        with the given shape.
+
+        Parameters
+        ----------
+        algorithms: list of string
+            Names of the candidate algorithms.
+        shape: openclean_metanome.algorithm.auto.TableShape
+            Shape of the input table.
+
+        Returns
+        -------
+        string
+        """
+        return min(sorted(algorithms), key=lambda a: self.estimate(a, shape))
+
+
+def table_shape(
+    df: Union['pd.DataFrame', str], sample_size: Optional[int] = SAMPLE_SIZE
+) -> TableShape:
+    """Get the shape of a data frame or of the table in a CSV or Parquet file.
+    The cardinality of the columns is estimated from the first rows of the
+    table. The number of rows in a Parquet file is read from the file metadata.
+    For CSV files that contain more rows than the sample, the number of rows
+    is estimated from the average size of the sampled rows and the size of the
+    file.
+
+    Parameters
+    ----------
+    df: pd.DataFrame or string
+        Input data frame or path to a CSV or Parquet file.
+    sample_size: int, default=10000
+        Number of rows that are used to estimate the column cardinality.
+
+    Returns
+    -------
+    openclean_metanome.algorithm.auto.TableShape
+    """
+    if isinstance(df, (str, os.PathLike)):
+        source = os.fspath(df)
+        if source.lower().endswith(PARQUET_SUFFIXES):
+            from pyarrow.parquet import ParquetFile
+            pf = ParquetFile(source)
+            rows = pf.metadata.num_rows
+            columns = pf.metadata.num_columns
+            if pf.num_row_groups == 0:
+                return TableShape(rows, columns, 0.0)
+            sample = pf.read_row_group(0).to_pandas().head(sample_size)
+            return TableShape(rows, columns, cardinality(sample))
+        compressed = source.lower().endswith('.gz')
+        with (gzip.open(source, 'rb') if compressed else open(source, 'rb')) as f:
+            # Count the number of (uncompressed) bytes that are read for the
+            # header and the sampled rows.
+            consumed = [0]
+
+            def lines():
+                for line in f:
+                    consumed[0] += len(line)
+                    yield line.decode('utf-8')
+
+            reader = csv.reader(lines())
+            header = next(reader, [])
+            offset = consumed[0]
+            values = [set() for _ in header]
+            sampled = 0
+            for row in reader:
+                for i, val in enumerate(row[:len(values)]):
+                    values[i].add(val)
+                sampled += 1
+                if sampled >= sample_size:
+                    break
+            rows = sampled
+            sample_bytes = consumed[0] - offset
+            if sampled >= sample_size and next(reader, None) is not None:
+                # Estimate the number of rows from the average number of bytes
+                # per row in the sample instead of reading the whole file.
+                total = uncompressed_size(source, consumed[0]) if compressed else os.path.getsize(source)
+                rows = max(sampled + 1, round(sampled * (total - offset) / sample_bytes))
+        card = sum(len(v) for v in values) / (sampled * len(values)) if sampled and values else 0.0
+        return TableShape(rows, len(header), card)
+    return TableShape(len(df.index), len(df.columns), cardinality(df.head(sample_size)))
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def uncompressed_size(filename: str, minsize: Optional[int] = 0) -> int:
+    """Get the size of the uncompressed content of a gzip file. The size is
+    read from the trailer of the file which stores the size modulo 2^32.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the gzip file.
+    minsize: int, default=0
+        Number of uncompressed bytes that are known to be in the file.
+
+    Returns
+    -------
+    int
+    """
+    with open(filename, 'rb') as f:
+        f.seek(-4, os.SEEK_END)
+        size = int.from_bytes(f.read(4), 'little')
+    # Account for files that are larger than 4GB.
+    while size < minsize:
+        size += 2 ** 32
+    return size
+
+
+def cardinality(df: 'pd.DataFrame') -> float:
+    """Get the average ratio of distinct values to rows for the columns in a
+    data frame.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Input data frame.
+
+    Returns
+    -------
+    float
+    """
+    if df.empty:
+        return 0.0
+    return float(df.nunique(dropna=False).mean()) / len(df.index)
+
+
+def features(shape: TableShape) -> List[float]:
+    """Get the feature vector for the cost model from a table shape.
+
+    Parameters
+    ----------
+    shape: openclean_metanome.algorithm.auto.TableShape
+        Shape of the input table.
+
+    Returns
+    -------
+    list of float
+    """
+    return [
+        1.0,
+        math.log(shape.rows + 1),
+        float(shape.columns),
+        math.log(shape.columns + 1),
+        float(shape.cardinality)
+    ]
+
+
+def log_time(seconds: float) -> float:
+    """Get the logarithm of an algorithm runtime. Runtimes are truncated at a
+    millisecond.
+
+    Parameters
+    ----------
+    seconds: float
+        Runtime in seconds.
+
+    Returns
+    -------
+    float
+    """
+    return math.log(max(seconds, 0.001))
+
+
+def run_algorithm(
+    df: Union['pd.DataFrame', str, 'Document'], algorithms: Dict, algorithm: str,
+    create: Callable, remap: Callable, env: Optional[Dict] = None,
+    session: Optional[MetanomeSession] = None, model: Optional[CostModel] = None
+) -> List:
+    """Run the given (or automatically selected) algorithm on the input table
+    and record the algorithm runtime in the cost model.
+
+    Data streams are written to a temporary CSV file first since the input
+    table is read twice (once to get its shape and once by the algorithm).
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    algorithms: dict
+        Candidate algorithms.
+    algorithm: string
+        Name of the discovery algorithm or 'auto'.
+    create: callable
+        Function that creates an instance of the algorithm with a given name
+        for a given session.
+    remap: callable
+        Function that filters the algorithm results and maps column names
+        using a given column mapping (if not None).
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+    model: openclean_metanome.algorithm.auto.CostModel, default=None
+        Cost model for algorithm selection.
+
+    Returns
+    -------
+    list
+    """
+    if algorithm != AUTO and algorithm not in algorithms:
+        raise ValueError("algorithm '{}' is unknown or not provided by the Metanome.jar".format(algorithm))
+    import pandas as pd
+    model = model if model is not None else CostModel(filename=config.COSTMODEL(env=env))
+    session = session if session is not None else MetanomeSession(env=env)
+    tmpdir, colmap = None, None
+    try:
+        if not isinstance(df, (pd.DataFrame, str, os.PathLike)):
+            tmpdir = tempfile.mkdtemp()
+            filename = os.path.join(tmpdir, 'input.csv')
+            colmap = write_input(df=df, filename=filename)
+            df = filename
+        shape = table_shape(df)
+        if algorithm == AUTO:
+            algorithm = model.select(list(algorithms), shape)
+        start = time.perf_counter()
+        result = create(algorithm, session).run(df)
+        model.record(algorithm, shape, time.perf_counter() - start)
+        return remap(result, colmap)
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir)
@@ -5,40 +5,221 @@
 # openclean is released under the Revised BSD License. See file LICENSE for
 # full license details.
 
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Union, TYPE_CHECKING
 
 import os
-import pandas as pd
 import shutil
 import tempfile
 
-from flowserv.controller.serial.workflow.base import SerialWorkflow
-from flowserv.controller.serial.workflow.result import RunResult
-from flowserv.controller.worker.manager import WorkerPool
-from flowserv.volume.fs import FStore
-from flowserv.volume.manager import VolumeManager, DEFAULT_STORE
+from openclean_metanome.converter import write_input
+from openclean_metanome.resources import read_usage, USAGE
+from openclean_metanome.retry import out_of_memory, OutOfMemoryError, DEGRADATIONS, JVM_OPTIONS
+
+import openclean_metanome.config as config
+
+# Import pandas, openclean and flowserv for type checking only. The packages
+# are imported when a workflow is run to keep the import time low.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from flowserv.controller.serial.workflow.base import SerialWorkflow
+    from flowserv.controller.serial.workflow.result import RunResult
+    from openclean.data.stream.base import Document
+    from openclean_metanome.session import MetanomeSession
+    from openclean_metanome.worker.manager import WorkerPool
 
 
 """Names for input and output files for the Metanome algorithms."""
 DATA_FILE = os.path.join('data', 'table.csv')
+DATA_DIR = os.path.join('data', 'tables', '')
 RESULT_FILE = os.path.join('data', 'results.json')
 
+"""Identifiers of the workflow steps that materialize the input, run the
+Metanome algorithm, and parse the algorithm results.
+"""
+INPUT_STEP = '__s1__'
+CONTAINER_STEP = '__s2__'
+PARSER_STEP = '__s3__'
+
+
+class MetanomeAlgorithm(object):
+    """Wrapper for a Metanome algorithm that is run using a subcommand of the
+    Metanome.jar file. The workflow for the algorithm materializes the input
+    as a CSV file, runs the subcommand in a container step, and parses the
+    algorithm result from the result file.
+
+    Wrappers for individual algorithms define the name of the subcommand, the
+    template for its command line options, the name of the result variable,
+    and the parser for the result file. The subcommand has to be provided by
+    the configured Metanome.jar file (see
+    :func:`openclean_metanome.config.COMMANDS`).
+    """
+    """Name of the subcommand of the Metanome.jar file."""
+    command = None
+    """Template for the command line options of the subcommand. The template
+    references the algorithm arguments.
+    """
+    options = ''
+    """Name of the context variable for the parsed algorithm result."""
+    result = None
+    """Function that parses the algorithm result file."""
+    parser = None
+
+    def __init__(
+        self, arguments: Dict, env: Optional[Dict] = None, verbose: Optional[bool] = True,
+        session: Optional['MetanomeSession'] = None
+    ):
+        """Initialize the algorithm arguments.
+
+        Raises a ValueError if the algorithm is not supported by the
+        configured Metanome.jar file.
+
+        Parameters
+        ----------
+        arguments: dict
+            Algorithm-specific arguments that are referenced by the template
+            for the command line options.
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None.
+        verbose: bool, default=True
+            Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
+        """
+        if self.command not in config.COMMANDS(env=env):
+            raise ValueError("algorithm '{}' is not supported by the configured Metanome.jar".format(self.command))
+        # Arguments for running the workflow. In addition to the algorithm
+        # arguments the workflow expects the path to the Metanome.jar file.
+        self.args = dict(arguments)
+        self.args['jar'] = config.JARFILE(env=env)
+        self.env = env
+        self.verbose = verbose
+        self.session = session
+        # Degradations that were applied to the arguments of the last run
+        # after the Metanome process ran out of memory.
+        self.degradations = list()
+        # Resource usage of the last run.
+        self.usage = None
+
+    def create_workflow(self, image: str) -> 'SerialWorkflow':
+        """Create the serial workflow for running the algorithm.
+
+        Parameters
+        ----------
+        image: string
+            Identifier of the container image for the algorithm step.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.base.SerialWorkflow
+        """
+        command = (
+            '${java} ${jvm_options} -jar "${jar}" ' + self.command + ' '
+            '--input "${inputfile}" --output "${outputfile}" ' + self.options
+        )
+        return create_workflow(image=image, command=command, arg=self.result, parser=self.parser)
+
+    def run(self, df: Union['pd.DataFrame', str, 'Document']) -> List:
+        """Run the algorithm on the given data frame.
+
+        If execution of the Metanome algorithm fails a RuntimeError will be
+        raised.
+
+        Parameters
+        ----------
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, or data stream.
+
+        Returns
+        -------
+        list
+        """
+        from openclean_metanome.session import MetanomeSession
+        session = self.session if self.session is not None else MetanomeSession(env=self.env)
+        r = session.run(
+            workflow=session.workflow(self.command, self.create_workflow),
+            arguments=self.args,
+            df=df,
+            verbose=self.verbose
+        )
+        self.degradations = r.context[DEGRADATIONS]
+        self.usage = r.context[USAGE]
+        return r.context[self.result]
+
 
 # -- Helper Methods -----------------------------------------------------------
 
+def create_workflow(image: str, command: str, arg: str, parser: Callable) -> 'SerialWorkflow':
+    """Create the serial workflow for running a Metanome algorithm. The
+    workflow materializes the input as a CSV file, runs the given command in a
+    container step, and parses the algorithm results from the result file
+    using the given parser function.
+
+    The parsed result is stored in the workflow context under the given
+    argument name.
+
+    Parameters
+    ----------
+    image: string
+        Identifier of the container image for the algorithm step.
+    command: string
+        Command line template for running the algorithm.
+    arg: string
+        Name of the context variable for the parsed algorithm result.
+    parser: callable
+        Function that parses the algorithm result. The function is called
+        with the arguments *outputfile* and *colmap*.
+
+    Returns
+    -------
+    flowserv.controller.serial.workflow.base.SerialWorkflow
+    """
+    from flowserv.controller.serial.workflow.base import SerialWorkflow
+    workflow = SerialWorkflow()
+    workflow.add_code_step(
+        identifier=INPUT_STEP,
+        func=write_input,
+        arg='colmap',
+        varnames={'filename': 'inputfile'},
+        outputs=[DATA_FILE]
+    )
+    workflow.add_container_step(
+        identifier=CONTAINER_STEP,
+        image=image,
+        commands=[command],
+        inputs=[DATA_FILE],
+        outputs=[RESULT_FILE]
+    )
+    workflow.add_code_step(
+        identifier=PARSER_STEP,
+        func=parser,
+        arg=arg,
+        inputs=[RESULT_FILE]
+    )
+    return workflow
+
+
 def run_workflow(
-    workflow: SerialWorkflow, arguments: Dict, df: pd.DataFrame,
+    workflow: 'SerialWorkflow', arguments: Dict, df: Union['pd.DataFrame', str, 'Document', Dict],
     worker: Optional[Dict] = None, volume: Optional[Dict] = None,
-    managers: Optional[Dict] = None, verbose: Optional[bool] = True
-) -> RunResult:
+    managers: Optional[Dict] = None, verbose: Optional[bool] = True,
+    workers: Optional['WorkerPool'] = None
+) -> 'RunResult':
     """Run a given workflow representing a Metanome profiling algorithm on the
-    given data frame.
+    given data frame or data file.
 
-    Returns the run result. If execution of the Metanome algorithm fails a
-    RuntimeError will be raised.
+    Returns the run result. The resource usage of the run is added to the
+    result context. If execution of the Metanome algorithm fails a
+    RuntimeError will be raised. If the Metanome process ran out of memory an
+    :class:`openclean_metanome.retry.OutOfMemoryError` is raised.
 
-    This implementation assumes that all algorithms operate on a single input
-    file that contains a serialization of the data frame and that they all
+    Algorithms either operate on a single input table or on multiple input
+    tables. Multiple input tables are given as a dictionary that maps table
+    names to data frames, data files, or data streams. The workflow receives
+    the path for a single input file (*inputfile*) and the path to a directory
+    for multiple input files (*inputdir*). All algorithms are expected to
     produce a single output file in Json format.
 
     Parameters
@@ -48,8 +229,9 @@ def run_workflow(
         frame.
     arguments: dict
         Dictionary of algorithm-specific input arguments.
-    df: pd.DataFrame
-        Input data frame.
+    df: pd.DataFrame, string, openclean.data.stream.base.Document, or dict
+        Input data frame, path to a CSV or Parquet file, or data stream. For
+        multiple input tables, a dictionary that maps table names to inputs.
     worker: dict, default=None
         Optional configuration for the main worker.
     volume: dict, default=None
@@ -60,13 +242,25 @@ def run_workflow(
         execute them.
     verbose: bool, default=True
         Output run logs if True.
+    workers: openclean_metanome.worker.manager.WorkerPool, default=None
+        Existing worker pool for the workflow run. If given, the worker
+        specification and the managers mapping are not used to create a new
+        pool.
 
     Returns
     -------
     flowserv.controller.serial.workflow.result.RunResult
     """
-    # Create a temporary run directory for input and output files.
-    rundir = tempfile.mkdtemp()
+    from flowserv.volume.fs import FStore
+    from flowserv.volume.manager import VolumeManager, DEFAULT_STORE
+    from openclean_metanome.worker.manager import WorkerPool, WORKDIR
+    # Create a temporary run directory for input and output files. Workers
+    # that share a work directory with their execution environment (e.g.,
+    # the Docker pool worker) require the run directory to be inside of it.
+    basedir = worker.get(WORKDIR) if worker else None
+    if basedir:
+        os.makedirs(basedir, exist_ok=True)
+    rundir = tempfile.mkdtemp(dir=basedir)
     # Create a subfolder for input and output files. This is important when
     # running the workflow in a Docker container since these folders will
     # be mounted automatically as volumes into the container to provide
@@ -75,9 +269,19 @@ def run_workflow(
     # Create a copy of the workflow-specific arguments and add the data frame
     # and the input and output files.
     args = dict(arguments)
+    # File paths are made absolute since the workflow steps are executed
+    # within the run directory.
+    if isinstance(df, dict):
+        df = {key: abspath(source) for key, source in df.items()}
+    else:
+        df = abspath(df)
     args['df'] = df
     args['inputfile'] = DATA_FILE
+    args['inputdir'] = DATA_DIR
     args['outputfile'] = RESULT_FILE
+    # Options for the Java process (e.g., the maximum heap size) are empty
+    # unless they are set by a retry policy.
+    args.setdefault(JVM_OPTIONS, '')
     # Create factory objects for storage volumes.
     stores = [FStore(basedir=rundir, identifier=DEFAULT_STORE)]
     if volume:
@@ -85,19 +289,48 @@ def run_workflow(
     volumes = VolumeManager(stores=stores, files=[])
     # Create factory for workers. Include mapping of workflow steps to
     # the worker that are responsible for their execution.
-    workers = WorkerPool(workers=[worker] if worker else [], managers=managers)
+    if workers is None:
+        workers = WorkerPool(
+            workers=[worker] if worker else [],
+            managers=managers,
+            trace_memory=config.TRACEMEMORY()
+        )
     # Run the workflow and return the result. Make sure to cleanup the temporary
     # run filder. This assumes that the workflow steps have read any output
     # file into main memory or copied it to a target destination.
     try:
         r = workflow.run(arguments=args, workers=workers, volumes=volumes)
+        # Add the resource usage that was recorded by the workers to the
+        # run result.
+        r.context[USAGE] = read_usage(rundir)
         # Output STDOUT and STDERR before raising a potential error.
         if verbose:
             for line in r.log:
                 print(line)
-        # Raise error if run execution was not successful.
+        # Raise error if run execution was not successful. Distinguish runs
+        # that failed because the Metanome process ran out of memory.
+        if r.returncode and r.exception is None and out_of_memory(r.returncode, r.log):
+            raise OutOfMemoryError('\n'.join(r.stderr), returncode=r.returncode)
         r.raise_for_status()
         return r
     finally:
         # Remove the created run directory.
         shutil.rmtree(rundir)
+
+
+def abspath(source: Union['pd.DataFrame', str, 'Document']) -> Union['pd.DataFrame', str, 'Document']:
+    """Get the absolute path for inputs that reference data files. All other
+    inputs are returned as they are.
+
+    Parameters
+    ----------
+    source: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+
+    Returns
+    -------
+    pd.DataFrame, string, or openclean.data.stream.base.Document
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.abspath(source)
+    return source
@@ -0,0 +1,304 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Wrapper to run the BINDER algorithm from the Metanome data profiling
+library. BINDER is an inclusion dependency discovery algorithm that discovers
+all inclusion dependencies between the columns of multiple tables in a single
+run.
+
+Thorsten Papenbrock, Sebastian Kruse, Jorge-Arnulfo Quiané-Ruiz, Felix
+Naumann
+Divide & Conquer-based Inclusion Dependency Discovery
+Proceedings of the VLDB Endowment 8(7), 2015
+
+All input tables are materialized in the same run directory. Values are
+encoded using a dictionary that is shared across all tables. The encoding
+preserves the inclusion dependencies between columns but reduces the size of
+the input files and the cost of value comparisons.
+"""
+
+from typing import Dict, List, Optional, Sequence, Union, TYPE_CHECKING
+
+import os
+
+from openclean.data.types import Columns
+from openclean_metanome.algorithm.base import (
+    CONTAINER_STEP, DATA_DIR, INPUT_STEP, PARSER_STEP, RESULT_FILE, MetanomeAlgorithm
+)
+from openclean_metanome.converter import read_json, write_tables
+from openclean_metanome.session import MetanomeSession
+
+# Workflow components from flowserv are imported when the algorithm is run.
+if TYPE_CHECKING:  # pragma: no cover
+    from flowserv.controller.serial.workflow.base import SerialWorkflow
+
+
+class InclusionDependency(object):
+    """Inclusion dependencies describe a relationship between two lists of
+    columns of equal length that may belong to different tables. All value
+    combinations in the columns of the dependant table are contained in the
+    value combinations of the columns of the referenced table.
+    """
+    def __init__(
+        self, dependant_table, dependant: Columns, referenced_table, referenced: Columns
+    ):
+        """Initialize the tables and columns on both sides of the inclusion
+        dependency.
+
+        Parameters
+        ----------
+        dependant_table: scalar
+            Name of the table that contains the dependant columns.
+        dependant: list of string or Column
+            Dependant (included) columns.
+        referenced_table: scalar
+            Name of the table that contains the referenced columns.
+        referenced: list of string or Column
+            Referenced (including) columns.
+        """
+        self.dependant_table = dependant_table
+        self.dependant = dependant
+        self.referenced_table = referenced_table
+        self.referenced = referenced
+
+    def __str__(self):
+        """String representation for the inclusion dependency."""
+        return '{}[{}] <= {}[{}]'.format(
+            self.dependant_table,
+            ','.join([str(c) for c in self.dependant]),
+            self.referenced_table,
+            ','.join([str(c) for c in self.referenced])
+        )
+
+
+def binder(
+    tables: Union[Dict, Sequence], max_nary_level: int = 1,
+    input_row_limit: int = -1, env: Optional[Dict] = None,
+    verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
+) -> List[InclusionDependency]:
+    """Run the BINDER algorithm on a given set of tables. BINDER discovers the
+    inclusion dependencies between all columns of the given tables.
+
+    Parameters
+    ----------
+    tables: dict or list
+        Mapping of table names to data frames, paths to CSV or Parquet files,
+        or data streams. If a list is given, tables are identified by their
+        position in the list.
+    max_nary_level: int, default=1
+        Maximum number of columns on each side of discovered inclusion
+        dependencies. Use -1 to discover n-ary inclusion dependencies of all
+        sizes.
+    input_row_limit: int, default=-1
+        Limit the number of rows from each input table that are being used
+        for inclusion dependency discovery. Use -1 for all rows.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=True
+        Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+
+    Returns
+    -------
+    list of InclusionDependency
+    """
+    return BINDER(
+        max_nary_level=max_nary_level,
+        input_row_limit=input_row_limit,
+        env=env,
+        verbose=verbose,
+        session=session
+    ).run(tables)
+
+
+class BINDER(MetanomeAlgorithm):
+    """BINDER is a divide & conquer-based discovery algorithm for unary and
+    n-ary inclusion dependencies:
+
+    Thorsten Papenbrock, Sebastian Kruse, Jorge-Arnulfo Quiané-Ruiz, Felix
+    Naumann
+    Divide & Conquer-based Inclusion Dependency Discovery
+    Proceedings of the VLDB Endowment 8(7), 2015
+
+    The algorithm is not provided by the Metanome.jar file that is downloaded
+    by the package. It requires a custom jar file with a ``binder``
+    subcommand (see :func:`openclean_metanome.config.COMMANDS`).
+    """
+    command = 'binder'
+    result = 'inds'
+
+    def __init__(
+        self, max_nary_level: int = 1, input_row_limit: int = -1,
+        env: Optional[Dict] = None, verbose: Optional[bool] = True,
+        session: Optional[MetanomeSession] = None
+    ):
+        """Initialize the algorithm parameters.
+
+        Parameters
+        ----------
+        max_nary_level: int, default=1
+            Maximum number of columns on each side of discovered inclusion
+            dependencies. Use -1 to discover n-ary inclusion dependencies of
+            all sizes.
+        input_row_limit: int, default=-1
+            Limit the number of rows from each input table that are being used
+            for inclusion dependency discovery. Use -1 for all rows.
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None.
+        verbose: bool, default=True
+            Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
+        """
+        # Create argument dictionary for running the BINDER workflow. The
+        # workflow expects the following arguments in addition to the path
+        # to the Metanome.jar file:
+        #
+        # - df: Dictionary of input tables
+        # - inputdir: Path (relative to run directory) to materialize the tables
+        # - outputfile: Path (relative to run directory) for the algorithm results
+        # - max_nary_level: Max. number of columns in discovered INDs
+        # - input_row_limit: Limit number of input rows that are used for IND discovery
+        super(BINDER, self).__init__(
+            arguments={
+                'max_nary_level': max_nary_level,
+                'input_row_limit': input_row_limit
+            },
+            env=env,
+            verbose=verbose,
+            session=session
+        )
+
+    def create_workflow(self, image: str) -> 'SerialWorkflow':
+        """Create the serial workflow for running the BINDER algorithm on
+        multiple input tables.
+
+        Parameters
+        ----------
+        image: string
+            Identifier of the container image for the algorithm step.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.base.SerialWorkflow
+        """
+        return create_workflow(image=image)
+
+    def run(self, tables: Union[Dict, Sequence]) -> List[InclusionDependency]:
+        """Run the BINDER algorithm on the given tables.
+
+        Returns a list of all discovered inclusion dependencies. If execution
+        of the Metanome algorithm fails a RuntimeError will be raised.
+
+        Parameters
+        ----------
+        tables: dict or list
+            Mapping of table names to data frames, paths to CSV or Parquet
+            files, or data streams. If a list is given, tables are identified
+            by their position in the list.
+
+        Returns
+        -------
+        list of InclusionDependency
+        """
+        if not isinstance(tables, dict):
+            tables = {i: source for i, source in enumerate(tables)}
+        return super(BINDER, self).run(tables)
+
+
+# -- Workflow -----------------------------------------------------------------
+
+def create_workflow(image: str) -> 'SerialWorkflow':
+    """Create the serial workflow for running the BINDER algorithm. The
+    workflow materializes all input tables as dictionary-encoded CSV files in
+    the same directory, runs the algorithm in a container step, and parses
+    the discovered inclusion dependencies from the result file.
+
+    The workflow expects the arguments that are created by the constructor of
+    the :class:`openclean_metanome.algorithm.binder.BINDER` class.
+
+    Parameters
+    ----------
+    image: string
+        Identifier of the container image for the algorithm step.
+
+    Returns
+    -------
+    flowserv.controller.serial.workflow.base.SerialWorkflow
+    """
+    from flowserv.controller.serial.workflow.base import SerialWorkflow
+    command = (
+        '${java} ${jvm_options} -jar "${jar}" binder '
+        '--input-dir "${inputdir}" --output "${outputfile}" '
+        '--max-nary-level ${max_nary_level} --input-row-limit ${input_row_limit}'
+    )
+    workflow = SerialWorkflow()
+    workflow.add_code_step(
+        identifier=INPUT_STEP,
+        func=write_tables,
+        arg='colmap',
+        varnames={'tables': 'df', 'dirname': 'inputdir'},
+        outputs=[DATA_DIR]
+    )
+    workflow.add_container_step(
+        identifier=CONTAINER_STEP,
+        image=image,
+        commands=[command],
+        inputs=[DATA_DIR],
+        outputs=[RESULT_FILE]
+    )
+    workflow.add_code_step(
+        identifier=PARSER_STEP,
+        func=parse_result,
+        arg='inds',
+        inputs=[RESULT_FILE]
+    )
+    return workflow
+
+
+# -- Result Function ----------------------------------------------------------
+
+def parse_result(outputfile: str, colmap: Dict) -> List[InclusionDependency]:
+    """Parse the result file of the IND discovery run to generate a list of
+    discovered inclusion dependencies.
+
+    Parameters
+    ----------
+    outputfile: string
+        Path to the output file containing the discovered INDs.
+    colmap: dict
+        Mapping of input file names to pairs of the original table name and
+        the mapping of column names from surrogate names to column names in
+        the schema of the table.
+
+    Returns
+    -------
+    list of InclusionDependency
+    """
+    def resolve(obj: Dict):
+        # Table names in the result may include the file suffix.
+        table, columns = colmap[os.path.splitext(obj['table'])[0]]
+        return table, [columns[c] for c in obj['columns']]
+
+    result = list()
+    for obj in read_json(filename=outputfile)['inclusionDependencies']:
+        dependant_table, dependant = resolve(obj['dependant'])
+        referenced_table, referenced = resolve(obj['referenced'])
+        ind = InclusionDependency(
+            dependant_table=dependant_table,
+            dependant=dependant,
+            referenced_table=referenced_table,
+            referenced=referenced
+        )
+        result.append(ind)
+    return result
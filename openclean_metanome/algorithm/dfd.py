@@ -0,0 +1,111 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Wrapper to run the DFD algorithm from the Metanome data profiling library.
+DFD is a functional dependency discovery algorithm that traverses the lattice
+of attribute sets depth-first using a random walk.
+
+Ziawasch Abedjan, Patrick Schulze, Felix Naumann
+DFD: Efficient Functional Dependency Discovery
+ACM International Conference on Information and Knowledge Management
+(CIKM '14)
+
+Like TANE, DFD scales well with the number of rows. Its depth-first traversal
+handles a moderate number of columns better than the level-wise traversal
+of TANE.
+"""
+
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
+
+from openclean.profiling.constraints.fd import FunctionalDependency, FunctionalDependencyFinder
+from openclean_metanome.algorithm.hyfd import parse_result
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.algorithm.base as base
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+def dfd(
+    df: Union['pd.DataFrame', str, 'Document'], null_equals_null: bool = True,
+    env: Optional[Dict] = None, verbose: Optional[bool] = True,
+    session: Optional[MetanomeSession] = None
+) -> List[FunctionalDependency]:
+    """Run the DFD algorithm on a given data frame. DFD is a depth-first
+    discovery algorithm for functional dependencies.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=True
+        Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+
+    Returns
+    -------
+    list of FunctionalDependency
+    """
+    return DFD(
+        null_equals_null=null_equals_null,
+        env=env,
+        verbose=verbose,
+        session=session
+    ).run(df)
+
+
+class DFD(base.MetanomeAlgorithm, FunctionalDependencyFinder):
+    """DFD is a depth-first discovery algorithm for functional dependencies:
+
+    Ziawasch Abedjan, Patrick Schulze, Felix Naumann
+    DFD: Efficient Functional Dependency Discovery
+    ACM International Conference on Information and Knowledge Management
+    (CIKM '14)
+    """
+    command = 'dfd'
+    options = '${null_equals_null}'
+    result = 'fds'
+    parser = staticmethod(parse_result)
+
+    def __init__(
+        self, null_equals_null: bool = True, env: Optional[Dict] = None,
+        verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
+    ):
+        """Initialize the algorithm parameters.
+
+        Parameters
+        ----------
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None.
+        verbose: bool, default=True
+            Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
+        """
+        super(DFD, self).__init__(
+            arguments={
+                'null_equals_null': '--null-equals-null' if null_equals_null else ''
+            },
+            env=env,
+            verbose=verbose,
+            session=session
+        )
@@ -0,0 +1,113 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Wrapper to run the DUCC algorithm from the Metanome data profiling library.
+DUCC is a unique column combination discovery algorithm that traverses the
+lattice of column combinations using a random walk.
+
+Arvid Heise, Jorge-Arnulfo Quiané-Ruiz, Ziawasch Abedjan, Anja Jentzsch,
+Felix Naumann
+Scalable Discovery of Unique Column Combinations
+Proceedings of the VLDB Endowment 7(4), 2013
+
+DUCC scales well with the number of rows. It is a good choice for long tables
+with a moderate number of columns.
+"""
+
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.ucc import UniqueColumnCombinationFinder
+from openclean_metanome.algorithm.hyucc import parse_result
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.algorithm.base as base
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+def ducc(
+    df: Union['pd.DataFrame', str, 'Document'], null_equals_null: bool = True,
+    env: Optional[Dict] = None, verbose: Optional[bool] = True,
+    session: Optional[MetanomeSession] = None
+) -> List[Columns]:
+    """Run the DUCC algorithm on a given data frame. DUCC is a random walk
+    discovery algorithm for unique column combinations. The algorithm returns
+    a list of discovered column combinations.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=True
+        Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+
+    Returns
+    -------
+    list of columns
+    """
+    return DUCC(
+        null_equals_null=null_equals_null,
+        env=env,
+        verbose=verbose,
+        session=session
+    ).run(df)
+
+
+class DUCC(base.MetanomeAlgorithm, UniqueColumnCombinationFinder):
+    """DUCC is a random walk discovery algorithm for unique column
+    combinations:
+
+    Arvid Heise, Jorge-Arnulfo Quiané-Ruiz, Ziawasch Abedjan, Anja Jentzsch,
+    Felix Naumann
+    Scalable Discovery of Unique Column Combinations
+    Proceedings of the VLDB Endowment 7(4), 2013
+    """
+    command = 'ducc'
+    options = '${null_equals_null}'
+    result = 'uccs'
+    parser = staticmethod(parse_result)
+
+    def __init__(
+        self, null_equals_null: bool = True, env: Optional[Dict] = None,
+        verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
+    ):
+        """Initialize the algorithm parameters.
+
+        Parameters
+        ----------
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None
+        verbose: bool, default=True
+            Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
+        """
+        super(DUCC, self).__init__(
+            arguments={
+                'null_equals_null': '--null-equals-null' if null_equals_null else ''
+            },
+            env=env,
+            verbose=verbose,
+            session=session
+        )
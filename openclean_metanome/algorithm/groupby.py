@@ -0,0 +1,462 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Conditional discovery of functional dependencies and unique column
+combinations. Dependencies are discovered separately for each group of rows
+that have the same values in a set of grouping columns (e.g., for each tenant
+or region).
+
+The input table is partitioned into groups once and the columns are
+dictionary-encoded once. Groups are processed in parallel. Running a separate
+Metanome process for a group with only a few rows is dominated by the process
+startup time. Small groups are therefore batched together and processed by an
+in-process engine that operates on the encoded columns (the AFD algorithm
+with an error threshold of zero for functional dependencies and a level-wise
+search for unique column combinations). Larger groups are processed by the
+HyFD and HyUCC wrappers. All Metanome runs share the same session.
+
+The result contains the dependencies for each group and the minimal
+dependencies that hold in all groups. A dependency holds in all groups if in
+each group it is implied by one of the discovered minimal dependencies, i.e.,
+if its left-hand-side (or column set) contains a minimal left-hand-side (or
+unique column combination) of each group.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import os
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.fd import FunctionalDependency
+from openclean_metanome.algorithm.afd import AFD
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.algorithm.hyucc import HyUCC
+from openclean_metanome.partition import encode, factorize, read_frame, Partition
+from openclean_metanome.session import MetanomeSession
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+"""Result of a conditional discovery run. Contains a dictionary with the
+discovered dependencies for each group and the list of dependencies that hold
+in all groups. Groups are identified by the value of the grouping column (or
+by a tuple of values for multiple grouping columns).
+"""
+GroupedResult = namedtuple('GroupedResult', ['groups', 'common'])
+
+
+"""Maximum number of rows in groups that are processed by the in-process
+engine instead of a Metanome algorithm.
+"""
+SMALL_GROUP = 10000
+
+"""Maximum number of rows in a batch of small groups."""
+BATCH_ROWS = 100000
+
+
+def fds_by_group(
+    df: Union['pd.DataFrame', str, 'Document'], group_by: Union[str, Sequence[str]],
+    max_lhs_size: int = -1, null_equals_null: bool = True,
+    small_group: int = SMALL_GROUP, threads: Optional[int] = None,
+    env: Optional[Dict] = None, verbose: Optional[bool] = False,
+    session: Optional[MetanomeSession] = None
+) -> GroupedResult:
+    """Discover the minimal functional dependencies for each group of rows
+    with the same values in the grouping columns. The grouping columns are
+    not included in the discovered dependencies.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    group_by: string or list of string
+        Name(s) of the grouping column(s).
+    max_lhs_size: int, default=-1
+        Defines the maximum size of the left-hand-side for discovered FDs. Use
+        -1 to ignore size limits on FDs.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_group: int, default=10000
+        Maximum number of rows in groups that are processed in-process.
+    threads: int, default=None
+        Number of groups (or batches of small groups) that are processed in
+        parallel. By default, one thread per available CPU core is used.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=False
+        Output run logs of the Metanome algorithms if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm runs.
+
+    Returns
+    -------
+    openclean_metanome.algorithm.groupby.GroupedResult
+    """
+    session = session if session is not None else MetanomeSession(env=env)
+
+    def large(df: 'pd.DataFrame') -> List[FunctionalDependency]:
+        algo = HyFD(
+            max_lhs_size=max_lhs_size,
+            null_equals_null=null_equals_null,
+            verbose=verbose,
+            session=session
+        )
+        return algo.run(df)
+
+    def small(columns: List, partitions: List[Partition]) -> List[FunctionalDependency]:
+        algo = AFD(max_error=0, max_lhs_size=max_lhs_size, null_equals_null=null_equals_null, threads=1)
+        return [FunctionalDependency(lhs=fd.lhs, rhs=fd.rhs) for fd in algo.find(columns, partitions)]
+
+    columns, groups = run_groups(
+        df=df,
+        group_by=group_by,
+        large=large,
+        small=small,
+        null_equals_null=null_equals_null,
+        small_group=small_group,
+        threads=threads
+    )
+    # Compute the dependencies that hold in all groups separately for each
+    # right-hand-side column.
+    positions = index(columns)
+    common = list()
+    for rhs in range(len(columns)):
+        lhs_sets = list()
+        for fds in groups.values():
+            lhs_sets.append([
+                frozenset(positions[key(c)] for c in fd.lhs) for fd in fds
+                if positions[key(fd.rhs[0])] == rhs
+            ])
+        for lhs in common_sets(lhs_sets, max_size=max_lhs_size):
+            common.append((sorted(lhs), rhs))
+    common = [
+        FunctionalDependency(lhs=[columns[c] for c in lhs], rhs=[columns[rhs]])
+        for lhs, rhs in sorted(common, key=lambda fd: (len(fd[0]), fd[0], fd[1]))
+    ]
+    return GroupedResult(groups=groups, common=common)
+
+
+def uccs_by_group(
+    df: Union['pd.DataFrame', str, 'Document'], group_by: Union[str, Sequence[str]],
+    max_ucc_size: int = -1, null_equals_null: bool = True,
+    small_group: int = SMALL_GROUP, threads: Optional[int] = None,
+    env: Optional[Dict] = None, verbose: Optional[bool] = False,
+    session: Optional[MetanomeSession] = None
+) -> GroupedResult:
+    """Discover the minimal unique column combinations for each group of rows
+    with the same values in the grouping columns. The grouping columns are
+    not included in the discovered column combinations.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    group_by: string or list of string
+        Name(s) of the grouping column(s).
+    max_ucc_size: int, default=-1
+        Maximum size of unique column combinations. Use -1 to return all
+        discovered unique column combinations.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_group: int, default=10000
+        Maximum number of rows in groups that are processed in-process.
+    threads: int, default=None
+        Number of groups (or batches of small groups) that are processed in
+        parallel. By default, one thread per available CPU core is used.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=False
+        Output run logs of the Metanome algorithms if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm runs.
+
+    Returns
+    -------
+    openclean_metanome.algorithm.groupby.GroupedResult
+    """
+    session = session if session is not None else MetanomeSession(env=env)
+
+    def large(df: 'pd.DataFrame') -> List[Columns]:
+        algo = HyUCC(
+            max_ucc_size=max_ucc_size,
+            null_equals_null=null_equals_null,
+            verbose=verbose,
+            session=session
+        )
+        return algo.run(df)
+
+    def small(columns: List, partitions: List[Partition]) -> List[Columns]:
+        return find_uccs(columns=columns, partitions=partitions, max_size=max_ucc_size)
+
+    columns, groups = run_groups(
+        df=df,
+        group_by=group_by,
+        large=large,
+        small=small,
+        null_equals_null=null_equals_null,
+        small_group=small_group,
+        threads=threads
+    )
+    positions = index(columns)
+    column_sets = [[frozenset(positions[key(c)] for c in ucc) for ucc in uccs] for uccs in groups.values()]
+    common = sorted([sorted(ucc) for ucc in common_sets(column_sets, max_size=max_ucc_size)], key=lambda u: (len(u), u))
+    return GroupedResult(groups=groups, common=[[columns[c] for c in ucc] for ucc in common])
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def batches(groups: Dict, small_group: int) -> List[List[Tuple]]:
+    """Create batches of small groups. Each batch is a list of pairs of group
+    identifier and row positions. The total number of rows in a batch does
+    not exceed the maximum batch size (unless the batch contains a single
+    group).
+
+    Parameters
+    ----------
+    groups: dict
+        Mapping of group identifiers to row positions.
+    small_group: int
+        Maximum number of rows in small groups.
+
+    Returns
+    -------
+    list of list of tuple
+    """
+    result, batch, batch_rows = list(), list(), 0
+    for group, rows in groups.items():
+        if len(rows) <= small_group:
+            if batch and batch_rows + len(rows) > BATCH_ROWS:
+                result.append(batch)
+                batch, batch_rows = list(), 0
+            batch.append((group, rows))
+            batch_rows += len(rows)
+    if batch:
+        result.append(batch)
+    return result
+
+
+def column_positions(columns: List, names: List[str]) -> List[int]:
+    """Get the positions of the columns with the given names. Raises a
+    ValueError if a column does not exist.
+
+    Parameters
+    ----------
+    columns: list
+        List of columns in a table.
+    names: list of string
+        Names of columns.
+
+    Returns
+    -------
+    list of int
+    """
+    result = list()
+    for name in names:
+        pos = [i for i, c in enumerate(columns) if c == name]
+        if not pos:
+            raise ValueError("unknown column '{}'".format(name))
+        result.extend(pos)
+    return result
+
+
+def common_sets(groups: List[List[FrozenSet]], max_size: int = -1) -> List[FrozenSet]:
+    """Get the minimal sets that contain at least one set from each group.
+    The result is empty if one of the groups is empty.
+
+    Parameters
+    ----------
+    groups: list of list of frozenset
+        List of sets for each group.
+    max_size: int, default=-1
+        Maximum size of sets in the result. Use -1 for no size limit.
+
+    Returns
+    -------
+    list of frozenset
+    """
+    result = None
+    for sets in groups:
+        if result is None:
+            result = minimize(sets)
+        else:
+            result = minimize([a | b for a in result for b in sets])
+        if max_size > 0:
+            result = [s for s in result if len(s) <= max_size]
+        if not result:
+            return list()
+    return result if result is not None else list()
+
+
+def find_uccs(columns: List, partitions: List[Partition], max_size: int = -1) -> List[Columns]:
+    """Discover the minimal unique column combinations for a table that is
+    given by the partitions of its columns. Column combinations are
+    enumerated level-wise. A combination is only considered if none of its
+    subsets is unique.
+
+    Parameters
+    ----------
+    columns: list
+        List of columns in the table.
+    partitions: list of openclean_metanome.partition.Partition
+        Partition for each column in the table.
+    max_size: int, default=-1
+        Maximum size of unique column combinations. Use -1 for no size limit.
+
+    Returns
+    -------
+    list of list
+    """
+    level = {(c,): p for c, p in enumerate(partitions)}
+    uccs = list()
+    size = 1
+    while level:
+        nonunique = list()
+        for cols in sorted(level):
+            if level[cols].is_unique():
+                uccs.append(cols)
+            else:
+                nonunique.append(cols)
+        if 0 < max_size <= size:
+            break
+        violated = set(nonunique)
+        candidates = dict()
+        for cols in nonunique:
+            for c in range(cols[-1] + 1, len(columns)):
+                cand = cols + (c,)
+                if all([cand[:i] + cand[i + 1:] in violated for i in range(len(cand) - 1)]):
+                    candidates[cand] = level[cols].refine(partitions[c])
+        level = candidates
+        size += 1
+    return [[columns[c] for c in ucc] for ucc in uccs]
+
+
+def index(columns: List) -> Dict:
+    """Get a mapping from column keys to column positions.
+
+    Parameters
+    ----------
+    columns: list
+        List of columns.
+
+    Returns
+    -------
+    dict
+    """
+    return {key(c): i for i, c in enumerate(columns)}
+
+
+def key(column) -> Tuple:
+    """Get a key for a column. Columns are identified by their name and their
+    identifier (for openclean columns).
+
+    Parameters
+    ----------
+    column: string or openclean.data.types.Column
+        Column name or object.
+
+    Returns
+    -------
+    tuple
+    """
+    return (getattr(column, 'colid', None), column)
+
+
+def minimize(sets: List[FrozenSet]) -> List[FrozenSet]:
+    """Remove all sets that are supersets of another set in the list.
+
+    Parameters
+    ----------
+    sets: list of frozenset
+        List of sets.
+
+    Returns
+    -------
+    list of frozenset
+    """
+    result = list()
+    for s in sorted(set(sets), key=lambda s: (len(s), sorted(s))):
+        if not any(r <= s for r in result):
+            result.append(s)
+    return result
+
+
+def run_groups(
+    df: Union['pd.DataFrame', str, 'Document'], group_by: Union[str, Sequence[str]],
+    large: Callable, small: Callable, null_equals_null: bool = True,
+    small_group: int = SMALL_GROUP, threads: Optional[int] = None
+) -> Tuple[List, Dict]:
+    """Partition the input table by the grouping columns and run a discovery
+    function for each group in parallel.
+
+    Groups with more than *small_group* rows are passed as data frames to the
+    *large* function. Smaller groups are processed in batches. For each small
+    group the *small* function is called with the list of columns and the
+    partitions of the columns for the rows in the group.
+
+    Returns the list of (non-grouping) columns and a dictionary with the
+    discovery result for each group.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    group_by: string or list of string
+        Name(s) of the grouping column(s).
+    large: callable
+        Discovery function for large groups.
+    small: callable
+        Discovery function for small groups.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_group: int, default=10000
+        Maximum number of rows in groups that are processed by the *small*
+        function.
+    threads: int, default=None
+        Number of groups (or batches of small groups) that are processed in
+        parallel.
+
+    Returns
+    -------
+    list, dict
+    """
+    df = read_frame(df)
+    columns = [df.columns[i] for i in range(len(df.columns))]
+    grouping = column_positions(columns, [group_by] if isinstance(group_by, str) else list(group_by))
+    valuepos = [i for i in range(len(columns)) if i not in grouping]
+    values = [columns[i] for i in valuepos]
+    groups = df.groupby([df.iloc[:, i] for i in grouping], sort=True, dropna=False).indices
+    # Encode the non-grouping columns once. The partitions for small groups
+    # are derived from the codes of the encoded columns.
+    _, partitions = encode(df.iloc[:, valuepos], null_equals_null=null_equals_null)
+
+    def run_batch(batch: List[Tuple]) -> Dict:
+        result = dict()
+        for group, rows in batch:
+            result[group] = small(values, [factorize(p.codes[rows]) for p in partitions])
+        return result
+
+    results = dict()
+    with ThreadPoolExecutor(max_workers=threads if threads else os.cpu_count()) as executor:
+        futures = dict()
+        for group, rows in groups.items():
+            if len(rows) > small_group:
+                futures[group] = executor.submit(large, df.iloc[rows, valuepos])
+        batch_futures = [executor.submit(run_batch, batch) for batch in batches(groups, small_group)]
+        for group, f in futures.items():
+            results[group] = f.result()
+        for f in batch_futures:
+            results.update(f.result())
+    return values, {group: results[group] for group in groups}
@@ -20,32 +20,73 @@ HyFD not only outperforms all existing approaches, it also scales to much
 larger datasets.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 
-import pandas as pd
-
-from flowserv.controller.serial.workflow.base import SerialWorkflow
-from flowserv.controller.worker.manager import WORKER_ID
 from openclean.profiling.constraints.fd import FunctionalDependency, FunctionalDependencyFinder
-from openclean_metanome.algorithm.base import run_workflow, DATA_FILE, RESULT_FILE
-from openclean_metanome.converter import read_json, write_dataframe
+from openclean_metanome.converter import read_json
+from openclean_metanome.partition import duplicate_rows
+from openclean_metanome.retry import reusable, HEAP
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.algorithm.base as base
+import openclean_metanome.cover as cover
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+# -- Result Function ----------------------------------------------------------
+#
+# The parser is defined before the algorithm class that references it.
+
+def parse_result(outputfile: str, colmap: Dict) -> List[FunctionalDependency]:
+    """Parse the result file of the FD discovery run to generate a list of
+    discovered functional dependencies.
+
+    Parameters
+    ----------
+    outputfile: string
+        Path to the output file containing the discovered FDs.
+    colmap: dict
+        Mapping of column names from surrogate names to column names in the
+        input data frame schema.
+
+    Returns
+    -------
+    list of FunctionalDependency
+    """
+    result = list()
+    for obj in read_json(filename=outputfile)['functionalDependencies']:
+        fd = FunctionalDependency(
+            lhs=[colmap[c] for c in obj['lhs']],
+            rhs=[colmap[obj['rhs']]]
+        )
+        result.append(fd)
+    return result
 
-import openclean_metanome.config as config
 
+# -- Algorithm ----------------------------------------------------------------
 
 def hyfd(
-    df: pd.DataFrame, max_lhs_size: int = -1, input_row_limit: int = -1,
-    validate_parallel: bool = False, memory_guardian: bool = True,
-    null_equals_null: bool = True, env: Optional[Dict] = None,
-    verbose: Optional[bool] = True
-) -> List[FunctionalDependency]:
+    df: Union['pd.DataFrame', str, 'Document'], max_lhs_size: int = -1, input_row_limit: int = -1,
+    validate_parallel: bool = False, memory_guardian: Optional[bool] = None,
+    null_equals_null: bool = True, canonical_cover: bool = False,
+    derive_uccs: bool = False, env: Optional[Dict] = None,
+    verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
+) -> Union[List[FunctionalDependency], Tuple[List[FunctionalDependency], Optional[List[List]]]]:
     """Run the HyFD algorithm on a given data frame. HyFD is a hybrid
     discovery algorithm for functional dependencies.
 
+    If the unique column combinations are derived, the result is a tuple of
+    the discovered functional dependencies and the derived unique column
+    combinations (see :class:`openclean_metanome.algorithm.hyfd.HyFD`).
+
     Parameters
     ----------
-    df: pd.DataFrame
-        Input data frame.
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
     max_lhs_size: int, default=-1
         Defines the maximum size of the left-hand-side for discovered FDs. Use
         -1 to ignore size limits on FDs.
@@ -55,32 +96,52 @@ def hyfd(
     validate_parallel: bool, default=False
         If true the algorithm will use multiple threads (one thread per
         available CPU core).
-    memory_guardian: bool, default=True
-        Activate the memory guarding to prevent out of memory errors,
+    memory_guardian: bool, default=None
+        Activate the memory guarding to prevent out of memory errors. By
+        default, the memory guardian is active unless the unique column
+        combinations are derived.
     null_equals_null: bool, default=True
         Result value when comparing two NULL values.
+    canonical_cover: bool, default=False
+        Return the canonical cover of the discovered functional dependencies
+        instead of all minimal functional dependencies.
+    derive_uccs: bool, default=False
+        Derive the minimal unique column combinations from the discovered
+        functional dependencies. Requires that the sizes of the
+        left-hand-sides and the number of input rows are not limited. The
+        memory guardian is deactivated by default.
     env: dict, default=None
         Optional environment variables that override the system-wide
         settings, default=None
     verbose: bool, default=True
         Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
 
     Returns
     -------
-    list of FunctionalDependency
+    list of FunctionalDependency, or tuple of list of FunctionalDependency and list of list
     """
-    return HyFD(
+    algo = HyFD(
         max_lhs_size=max_lhs_size,
         input_row_limit=input_row_limit,
         validate_parallel=validate_parallel,
         memory_guardian=memory_guardian,
         null_equals_null=null_equals_null,
+        canonical_cover=canonical_cover,
+        derive_uccs=derive_uccs,
         env=env,
-        verbose=verbose
-    ).run(df)
+        verbose=verbose,
+        session=session
+    )
+    fds = algo.run(df)
+    if derive_uccs:
+        return fds, algo.uccs
+    return fds
 
 
-class HyFD(FunctionalDependencyFinder):
+class HyFD(base.MetanomeAlgorithm, FunctionalDependencyFinder):
     """HyFD is a hybrid discovery algorithm for functional dependencies.
     HyFD combines fast approximation techniques with efficient validation
     techniques in order to findall minimal functional dependencies in a given
@@ -90,11 +151,20 @@ class HyFD(FunctionalDependencyFinder):
     A Hybrid Approach to Functional Dependency Discovery
     ACM International Conference on Management of Data (SIGMOD '16)
     """
+    command = 'hyfd'
+    options = (
+        '--max-lhs-size ${max_lhs_size} --input-row-limit ${input_row_limit} '
+        '${validate_parallel} ${memory_guardian} ${null_equals_null}'
+    )
+    result = 'fds'
+    parser = staticmethod(parse_result)
+
     def __init__(
         self, max_lhs_size: int = -1, input_row_limit: int = -1,
-        validate_parallel: bool = False, memory_guardian: bool = True,
-        null_equals_null: bool = True, env: Optional[Dict] = None,
-        verbose: Optional[bool] = True
+        validate_parallel: bool = False, memory_guardian: Optional[bool] = None,
+        null_equals_null: bool = True, canonical_cover: bool = False,
+        derive_uccs: bool = False, env: Optional[Dict] = None,
+        verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
     ):
         """Initialize the algorithm parameters.
 
@@ -109,120 +179,103 @@ class HyFD(FunctionalDependencyFinder):
         validate_parallel: bool, default=False
             If true the algorithm will use multiple threads (one thread per
             available CPU core).
-        memory_guardian: bool, default=True
-            Activate the memory guarding to prevent out of memory errors,
+        memory_guardian: bool, default=None
+            Activate the memory guarding to prevent out of memory errors. By
+            default, the memory guardian is active unless the unique column
+            combinations are derived.
         null_equals_null: bool, default=True
             Result value when comparing two NULL values.
+        canonical_cover: bool, default=False
+            Return the canonical cover of the discovered functional
+            dependencies instead of all minimal functional dependencies.
+        derive_uccs: bool, default=False
+            Derive the minimal unique column combinations from the discovered
+            functional dependencies after each run. The result is available
+            in the ``uccs`` property. Requires that the sizes of the
+            left-hand-sides and the number of input rows are not limited and
+            that the memory guardian, which may prune left-hand-sides, is not
+            activated explicitly. The memory guardian is deactivated by
+            default if the unique column combinations are derived.
         env: dict, default=None
             Optional environment variables that override the system-wide
             settings, default=None.
         verbose: bool, default=True
             Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
         """
-        # Create argument dictionary for running the HyFD workflow. The workflow
-        # expects the following arguments:
+        if derive_uccs and (max_lhs_size > 0 or input_row_limit > 0):
+            raise ValueError('deriving UCCs requires unlimited max_lhs_size and input_row_limit')
+        if memory_guardian is None:
+            memory_guardian = not derive_uccs
+        elif derive_uccs and memory_guardian:
+            raise ValueError('deriving UCCs requires memory_guardian=False')
+        # Arguments that are referenced by the command line options of the
+        # HyFD subcommand:
         #
-        # - df: Input data frame
-        # - jar: Path to the Metanome.jar file
-        # - inputfile: Path (relative to run directory) to materialize the data frame
-        # - outputfile: Path (relative to run directory) for the algorithm results
         # - max_lhs_size: Max. number of attributes in LHS for discovered FDs
         # - input_row_limit: Limit number of input rows that are used for FD discovery
         # - validate_parallel: Switch on/off parallel execution
         # - memory_guardian: Swith on/off memory guardian
         # - null_equals_null: Control interpretation of null values
-        self.args = {
-            'jar': config.JARFILE(env=env),
-            'max_lhs_size': max_lhs_size,
-            'input_row_limit': input_row_limit,
-            'validate_parallel': '--validate-parallel' if validate_parallel else '',
-            'memory_guardian': '--memory-guardian' if memory_guardian else '',
-            'null_equals_null': '--null-equals-null' if null_equals_null else ''
-        }
-        self.env = env
-        self.verbose = verbose
-
-    def run(self, df: pd.DataFrame) -> List[FunctionalDependency]:
+        super(HyFD, self).__init__(
+            arguments={
+                'max_lhs_size': max_lhs_size,
+                'input_row_limit': input_row_limit,
+                'validate_parallel': '--validate-parallel' if validate_parallel else '',
+                'memory_guardian': '--memory-guardian' if memory_guardian else '',
+                'null_equals_null': '--null-equals-null' if null_equals_null else ''
+            },
+            env=env,
+            verbose=verbose,
+            session=session
+        )
+        self.canonical_cover = canonical_cover
+        self.derive_uccs = derive_uccs
+        self.null_equals_null = null_equals_null
+        # Minimal unique column combinations that were derived from the
+        # functional dependencies of the last run.
+        self.uccs = None
+
+    def run(self, df: Union['pd.DataFrame', str, 'Document']) -> List[FunctionalDependency]:
         """Run the HyFD algorithm on the given data frame.
 
-        Returns a list of all discovered functional dependencies. If execution
-        of the Metanome algorithm fails a RuntimeError will be raised.
+        Returns a list of all discovered functional dependencies (or their
+        canonical cover). If execution of the Metanome algorithm fails a
+        RuntimeError will be raised.
+
+        If the unique column combinations are derived, they are computed from
+        all minimal functional dependencies (before computing the canonical
+        cover). The input is read a second time to check for duplicate rows,
+        i.e., streams that can only be read once are rejected. Inputs other
+        than data frames are read in a single pass that keeps the distinct
+        rows in memory. If the run had to be degraded beyond increasing the
+        heap size, the discovered dependencies are incomplete and ``uccs`` is
+        set to None.
 
         Parameters
         ----------
-        df: pd.DataFrame
-            Input data frame.
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, or data stream.
 
         Returns
         -------
         list of FunctionalDependency
         """
-        # Get values for specific worker and volume from the environment.
-        volume = config.VOLUME(env=self.env)
-        worker = config.WORKER(env=self.env)
-        # Define the serial workflow for running the HyFD algorithm.
-        command = (
-            '${java} -jar "${jar}" hyfd '
-            '--input "${inputfile}" --output "${outputfile}" '
-            '--max-lhs-size ${max_lhs_size} --input-row-limit ${input_row_limit} '
-            '${validate_parallel} ${memory_guardian} ${null_equals_null}'
-        )
-        workflow = SerialWorkflow()
-        workflow.add_code_step(
-            identifier='__s1__',
-            func=write_dataframe,
-            arg='colmap',
-            varnames={'filename': 'inputfile'},
-            outputs=[DATA_FILE]
-        )
-        workflow.add_container_step(
-            identifier='__s2__',
-            image=config.CONTAINER(env=self.env),
-            commands=[command],
-            inputs=[DATA_FILE],
-            outputs=[RESULT_FILE]
-        )
-        workflow.add_code_step(
-            identifier='__s3__',
-            func=parse_result,
-            arg='fds',
-            inputs=[RESULT_FILE]
-        )
-        r = run_workflow(
-            workflow=workflow,
-            arguments=self.args,
-            df=df,
-            worker=worker,
-            volume=volume,
-            managers={'__s2__': worker[WORKER_ID]} if worker else None,
-            verbose=self.verbose
-        )
-        return r.context['fds']
-
-
-# -- Result Function ----------------------------------------------------------
-
-def parse_result(outputfile: str, colmap: Dict) -> List[FunctionalDependency]:
-    """Parse the result file of the FD discovery run to generate a list of
-    discovered functional dependencies.
-
-    Parameters
-    ----------
-    outputfile: string
-        Path to the output file containing the discovered FDs.
-    colmap: dict
-        Mapping of column names from surrogate names to column names in the
-        input data frame schema.
-
-    Returns
-    -------
-    list of FunctionalDependency
-    """
-    result = list()
-    for obj in read_json(filename=outputfile)['functionalDependencies']:
-        fd = FunctionalDependency(
-            lhs=[colmap[c] for c in obj['lhs']],
-            rhs=[colmap[obj['rhs']]]
-        )
-        result.append(fd)
-    return result
+        if self.derive_uccs and not reusable(df):
+            raise ValueError('deriving UCCs requires an input that can be read twice')
+        fds = super(HyFD, self).run(df)
+        self.uccs = None
+        if self.derive_uccs and all([d.parameter == HEAP for d in self.degradations]):
+            columns, duplicates = duplicate_rows(df, null_equals_null=self.null_equals_null)
+            if duplicates:
+                self.uccs = list()
+            else:
+                self.uccs = cover.minimal_keys(fds, columns)
+        if self.canonical_cover:
+            # HyFD returns minimal functional dependencies that do not need
+            # to be left-reduced.
+            fds = cover.canonical_cover(fds, minimal=True)
+        return fds
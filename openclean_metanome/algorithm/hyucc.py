@@ -10,26 +10,56 @@ Column Combination Discovery) from the Metanome data profiling library. HyUCC
 is a unique column combination doscovery algorithm.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
 
-import pandas as pd
-
-from flowserv.controller.serial.workflow.base import SerialWorkflow
-from flowserv.controller.worker.manager import WORKER_ID
 from openclean.data.types import Columns
 from openclean.profiling.constraints.ucc import UniqueColumnCombinationFinder
 
-from openclean_metanome.algorithm.base import run_workflow, DATA_FILE, RESULT_FILE
-from openclean_metanome.converter import read_json, write_dataframe
+from openclean_metanome.converter import read_json
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.algorithm.base as base
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+# -- Result Function ----------------------------------------------------------
+#
+# The parser is defined before the algorithm class that references it.
+
+def parse_result(outputfile: str, colmap: Dict) -> List[Columns]:
+    """Parse the result file of the UCC discovery run to generate a list of
+    discovered unique column sets.
+
+    Parameters
+    ----------
+    outputfile: string
+        Path to the output file containing the discovered UCCs.
+    colmap: dict
+        Mapping of column names from surrogate names to column names in the
+        input data frame schema.
+
+    Returns
+    -------
+    list of columns
+    """
+    result = list()
+    for columns in read_json(outputfile)['columnCombinations']:
+        ucc = [colmap[c] for c in columns]
+        result.append(ucc)
+    return result
 
-import openclean_metanome.config as config
 
+# -- Algorithm ----------------------------------------------------------------
 
 def hyucc(
-    df: pd.DataFrame, max_ucc_size: int = -1, input_row_limit: int = -1,
+    df: Union['pd.DataFrame', str, 'Document'], max_ucc_size: int = -1, input_row_limit: int = -1,
     validate_parallel: bool = False, memory_guardian: bool = True,
     null_equals_null: bool = True, env: Optional[Dict] = None,
-    verbose: Optional[bool] = True
+    verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
 ) -> List[Columns]:
     """Run the HyUCC algorithm on a given data frame. HyUCC is a hybrid
     discovery algorithm for unique column combinations. The algorithm returns a
@@ -37,8 +67,8 @@ def hyucc(
 
     Parameters
     ----------
-    df: pd.DataFrame
-        Input data frame.
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
     max_ucc_size: int, default=-1
         Defines the maximum size of discovered column sets. Use -1 to
         return all discovered unique column combinations.
@@ -57,6 +87,9 @@ def hyucc(
         settings, default=None
     verbose: bool, default=True
         Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
 
     Returns
     -------
@@ -69,11 +102,12 @@ def hyucc(
         memory_guardian=memory_guardian,
         null_equals_null=null_equals_null,
         env=env,
-        verbose=verbose
+        verbose=verbose,
+        session=session
     ).run(df)
 
 
-class HyUCC(UniqueColumnCombinationFinder):
+class HyUCC(base.MetanomeAlgorithm, UniqueColumnCombinationFinder):
     """HyUCC is a hybrid discovery algorithm for unique column combinations.
     The HyUCC algorithm uses the same discovery techniques as the hybrid
     functional dependency discovery algorithm HyFD. HyUCC discovers all
@@ -83,11 +117,19 @@ class HyUCC(UniqueColumnCombinationFinder):
     A Hybrid Approach for Efficient Unique Column Combination Discovery,
     Datenbanksysteme fuer Business, Technologie und Web (BTW 2017),
     """
+    command = 'hyucc'
+    options = (
+        '--max-ucc-size ${max_ucc_size} --input-row-limit ${input_row_limit} '
+        '${validate_parallel} ${memory_guardian} ${null_equals_null}'
+    )
+    result = 'uccs'
+    parser = staticmethod(parse_result)
+
     def __init__(
         self, max_ucc_size: int = -1, input_row_limit: int = -1,
         validate_parallel: bool = False, memory_guardian: bool = True,
         null_equals_null: bool = True, env: Optional[Dict] = None,
-        verbose: Optional[bool] = True
+        verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
     ):
         """Initialize the algorithm parameters.
 
@@ -111,109 +153,28 @@ class HyUCC(UniqueColumnCombinationFinder):
             settings, default=None
         verbose: bool, default=True
             Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
         """
-        # Create argument dictionary for running the HyUCC workflow. The workflow
-        # expects the following arguments:
+        # Arguments that are referenced by the command line options of the
+        # HyUCC subcommand:
         #
-        # - df: Input data frame
-        # - jar: Path to the Metanome.jar file
-        # - inputfile: Path (relative to run directory) to materialize the data frame
-        # - outputfile: Path (relative to run directory) for the algorithm results
         # - max_ucc_size: Max. size of discovered column sets
         # - input_row_limit: Limit number of input rows that are used for FD discovery
         # - validate_parallel: Switch on/off parallel execution
         # - memory_guardian: Swith on/off memory guardian
         # - null_equals_null: Control interpretation of null values
-        self.args = {
-            'jar': config.JARFILE(env=env),
-            'max_ucc_size': max_ucc_size,
-            'input_row_limit': input_row_limit,
-            'validate_parallel': '--validate-parallel' if validate_parallel else '',
-            'memory_guardian': '--memory-guardian' if memory_guardian else '',
-            'null_equals_null': '--null-equals-null' if null_equals_null else ''
-        }
-        self.env = env
-        self.verbose = verbose
-
-    def run(self, df: pd.DataFrame) -> List[Columns]:
-        """Run the HyUCC algorithm on the given data frame. Returns a list of
-        all discovered unique column sets.
-
-        If execution of the Metanome algorithm fails a RuntimeError will be
-        raised.
-
-        Parameters
-        ----------
-        df: pd.DataFrame
-            Input data frame.
-
-        Returns
-        -------
-        list of columns
-        """
-        # Get values for specific worker and volume from the environment.
-        volume = config.VOLUME(env=self.env)
-        worker = config.WORKER(env=self.env)
-        # Define the serial workflow for running the HyUCC algorithm.
-        command = (
-            '${java} -jar "${jar}" hyucc '
-            '--input "${inputfile}" --output "${outputfile}" '
-            '--max-ucc-size ${max_ucc_size} --input-row-limit ${input_row_limit} '
-            '${validate_parallel} ${memory_guardian} ${null_equals_null}'
-        )
-        workflow = SerialWorkflow()
-        workflow.add_code_step(
-            identifier='__s1__',
-            func=write_dataframe,
-            arg='colmap',
-            varnames={'filename': 'inputfile'},
-            outputs=[DATA_FILE]
+        super(HyUCC, self).__init__(
+            arguments={
+                'max_ucc_size': max_ucc_size,
+                'input_row_limit': input_row_limit,
+                'validate_parallel': '--validate-parallel' if validate_parallel else '',
+                'memory_guardian': '--memory-guardian' if memory_guardian else '',
+                'null_equals_null': '--null-equals-null' if null_equals_null else ''
+            },
+            env=env,
+            verbose=verbose,
+            session=session
         )
-        workflow.add_container_step(
-            identifier='__s2__',
-            image=config.CONTAINER(env=self.env),
-            commands=[command],
-            inputs=[DATA_FILE],
-            outputs=[RESULT_FILE]
-        )
-        workflow.add_code_step(
-            identifier='__s3__',
-            func=parse_result,
-            arg='uccs',
-            inputs=[RESULT_FILE]
-        )
-        r = run_workflow(
-            workflow=workflow,
-            arguments=self.args,
-            df=df,
-            worker=worker,
-            volume=volume,
-            managers={'__s2__': worker[WORKER_ID]} if worker else None,
-            verbose=self.verbose
-        )
-        return r.context['uccs']
-
-
-# -- Result Function ----------------------------------------------------------
-
-def parse_result(outputfile: str, colmap: Dict) -> List[Columns]:
-    """Parse the result file of the UCC discovery run to generate a list of
-    discovered unique column sets.
-
-    Parameters
-    ----------
-    outputfile: string
-        Path to the output file containing the discovered UCCs.
-    colmap: dict
-        Mapping of column names from surrogate names to column names in the
-        input data frame schema.
-
-    Returns
-    -------
-    list of columns
-    """
-    result = list()
-    for columns in read_json(outputfile)['columnCombinations']:
-        ucc = [colmap[c] for c in columns]
-        result.append(ucc)
-    return result
@@ -0,0 +1,655 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Sharded discovery of functional dependencies and unique column
+combinations for tables that do not fit into the memory of a single node.
+
+The rows of the input table are read in shards of a fixed number of rows.
+Dependencies are discovered for each shard in parallel (using HyFD and HyUCC
+for large shards and the in-process engines for small shards, see
+:mod:`openclean_metanome.algorithm.groupby`). A dependency that does not hold
+on one of the shards does not hold on the whole table. Every dependency of the
+table is therefore implied by a discovered minimal dependency of each shard,
+i.e., the minimal column sets that contain a minimal left-hand-side (or unique
+column combination) of every shard are the candidates for the dependencies of
+the whole table.
+
+The candidates hold within each shard. They are validated for pairs of rows
+in different shards by a cross-shard validation pass. Two rows that violate a
+candidate agree on all of its (left-hand-side) columns. The rows of all shards
+are therefore hash-partitioned on one of the candidate columns into buckets of
+roughly the size of a shard. Only the projection on the columns that are
+needed for validation is written to the buckets. Each bucket is validated
+independently. Candidates that are violated are extended by one column and
+validated again in the next round. The result is the exact set of minimal
+dependencies of the whole table, while no step holds more than a shard (or a
+bucket) of rows in memory.
+
+Shards of inputs that can only be read once (e.g., data streams over
+iterators) are spilled to a temporary directory during the discovery pass.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Union, TYPE_CHECKING
+
+import math
+import os
+import pickle
+import shutil
+import tempfile
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.fd import FunctionalDependency
+from openclean_metanome.algorithm.afd import AFD
+from openclean_metanome.algorithm.groupby import common_sets, find_uccs, index, key, minimize
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.algorithm.hyucc import HyUCC
+from openclean_metanome.converter import is_arrow, record_batches, PARQUET_SUFFIXES
+from openclean_metanome.partition import encode, Partition
+from openclean_metanome.retry import reusable
+from openclean_metanome.session import MetanomeSession
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+"""Default number of rows in each shard."""
+SHARD_SIZE = 1000000
+
+"""Maximum number of rows in shards that are processed by the in-process
+engine instead of a Metanome algorithm.
+"""
+SMALL_SHARD = 10000
+
+
+"""Candidates are pairs of a column set and the right-hand-side column (None
+for unique column combinations).
+"""
+Candidate = Tuple[FrozenSet[int], Optional[int]]
+
+
+class ShardedTable(object):
+    """Input table that is read in shards of a fixed number of rows. The table
+    can be iterated over multiple times. Shards of inputs that can only be read
+    once are written to a temporary directory during the first iteration.
+
+    The sharded table is a context manager that removes the temporary
+    directory on exit.
+    """
+    def __init__(
+        self, df: Union['pd.DataFrame', str, 'Document'], shard_size: int = SHARD_SIZE,
+        tmpdir: Optional[str] = None
+    ):
+        """Initialize the input table and the shard size.
+
+        Parameters
+        ----------
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, data stream, or
+            Arrow data.
+        shard_size: int, default=1000000
+            Number of rows in each shard.
+        tmpdir: string, default=None
+            Parent directory for temporary files.
+        """
+        self.df = df
+        self.shard_size = shard_size
+        self.basedir = tempfile.mkdtemp(dir=tmpdir)
+        self.spilled = None if reusable(df) else list()
+        # Total number of rows and the estimated number of distinct values
+        # for each column. Set after the first iteration.
+        self.rows = None
+        self.cardinality = None
+
+    def __enter__(self) -> 'ShardedTable':
+        """Enter the runtime context for the table."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Remove all temporary files."""
+        self.close()
+
+    def __iter__(self) -> Iterator['pd.DataFrame']:
+        """Iterate over the shards of the table.
+
+        Returns
+        -------
+        iterator of pd.DataFrame
+        """
+        if self.spilled is not None and self.rows is not None:
+            for filename in self.spilled:
+                with open(filename, 'rb') as f:
+                    yield pickle.load(f)
+            return
+        rows = 0
+        for shard in read_shards(self.df, self.shard_size):
+            if self.spilled is not None:
+                filename = os.path.join(self.basedir, 'shard{}.pkl'.format(len(self.spilled)))
+                with open(filename, 'wb') as f:
+                    pickle.dump(shard, f)
+                self.spilled.append(filename)
+            rows += len(shard.index)
+            yield shard
+        self.rows = rows
+
+    def close(self):
+        """Remove the temporary directory of the table."""
+        shutil.rmtree(self.basedir, ignore_errors=True)
+
+
+def fds_sharded(
+    df: Union['pd.DataFrame', str, 'Document'], shard_size: int = SHARD_SIZE,
+    max_lhs_size: int = -1, null_equals_null: bool = True,
+    small_shard: int = SMALL_SHARD, threads: Optional[int] = None,
+    tmpdir: Optional[str] = None, env: Optional[Dict] = None,
+    verbose: Optional[bool] = False, session: Optional[MetanomeSession] = None
+) -> List[FunctionalDependency]:
+    """Discover the minimal functional dependencies of a table by discovering
+    dependencies on shards of the table and validating the candidates across
+    shards.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow data.
+    shard_size: int, default=1000000
+        Number of rows in each shard (and the approximate number of rows in
+        each validation bucket).
+    max_lhs_size: int, default=-1
+        Defines the maximum size of the left-hand-side for discovered FDs. Use
+        -1 to ignore size limits on FDs.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_shard: int, default=10000
+        Maximum number of rows in shards that are processed in-process.
+    threads: int, default=None
+        Number of shards (or buckets) that are processed in parallel. By
+        default, one thread per available CPU core is used.
+    tmpdir: string, default=None
+        Parent directory for temporary files.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=False
+        Output run logs of the Metanome algorithms if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm runs.
+
+    Returns
+    -------
+    list of FunctionalDependency
+    """
+    session = session if session is not None else MetanomeSession(env=env)
+
+    def large(df: 'pd.DataFrame') -> List[FunctionalDependency]:
+        algo = HyFD(
+            max_lhs_size=max_lhs_size,
+            null_equals_null=null_equals_null,
+            verbose=verbose,
+            session=session
+        )
+        return algo.run(df)
+
+    def small(columns: List, partitions: List[Partition]) -> List[FunctionalDependency]:
+        algo = AFD(max_error=0, max_lhs_size=max_lhs_size, null_equals_null=null_equals_null, threads=1)
+        return [FunctionalDependency(lhs=fd.lhs, rhs=fd.rhs) for fd in algo.find(columns, partitions)]
+
+    with ShardedTable(df, shard_size=shard_size, tmpdir=tmpdir) as table:
+        columns, shards = run_shards(
+            table=table,
+            large=large,
+            small=small,
+            null_equals_null=null_equals_null,
+            small_shard=small_shard,
+            threads=threads
+        )
+        positions = index(columns)
+        candidates = list()
+        for rhs in range(len(columns)):
+            lhs_sets = list()
+            for fds in shards:
+                lhs_sets.append([
+                    frozenset(positions[key(c)] for c in fd.lhs) for fd in fds
+                    if positions[key(fd.rhs[0])] == rhs
+                ])
+            candidates.extend([(lhs, rhs) for lhs in common_sets(lhs_sets, max_size=max_lhs_size)])
+        result = validate(
+            table=table,
+            candidates=candidates,
+            ncolumns=len(columns),
+            max_size=max_lhs_size,
+            null_equals_null=null_equals_null,
+            threads=threads
+        )
+    return [
+        FunctionalDependency(lhs=[columns[c] for c in lhs], rhs=[columns[rhs]])
+        for lhs, rhs in sorted([(sorted(lhs), rhs) for lhs, rhs in result], key=lambda fd: (len(fd[0]), fd[0], fd[1]))
+    ]
+
+
+def uccs_sharded(
+    df: Union['pd.DataFrame', str, 'Document'], shard_size: int = SHARD_SIZE,
+    max_ucc_size: int = -1, null_equals_null: bool = True,
+    small_shard: int = SMALL_SHARD, threads: Optional[int] = None,
+    tmpdir: Optional[str] = None, env: Optional[Dict] = None,
+    verbose: Optional[bool] = False, session: Optional[MetanomeSession] = None
+) -> List[Columns]:
+    """Discover the minimal unique column combinations of a table by
+    discovering unique column combinations on shards of the table and
+    validating the candidates across shards.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow data.
+    shard_size: int, default=1000000
+        Number of rows in each shard (and the approximate number of rows in
+        each validation bucket).
+    max_ucc_size: int, default=-1
+        Maximum size of unique column combinations. Use -1 to return all
+        discovered unique column combinations.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_shard: int, default=10000
+        Maximum number of rows in shards that are processed in-process.
+    threads: int, default=None
+        Number of shards (or buckets) that are processed in parallel. By
+        default, one thread per available CPU core is used.
+    tmpdir: string, default=None
+        Parent directory for temporary files.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=False
+        Output run logs of the Metanome algorithms if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm runs.
+
+    Returns
+    -------
+    list of list
+    """
+    session = session if session is not None else MetanomeSession(env=env)
+
+    def large(df: 'pd.DataFrame') -> List[Columns]:
+        algo = HyUCC(
+            max_ucc_size=max_ucc_size,
+            null_equals_null=null_equals_null,
+            verbose=verbose,
+            session=session
+        )
+        return algo.run(df)
+
+    def small(columns: List, partitions: List[Partition]) -> List[Columns]:
+        return find_uccs(columns=columns, partitions=partitions, max_size=max_ucc_size)
+
+    with ShardedTable(df, shard_size=shard_size, tmpdir=tmpdir) as table:
+        columns, shards = run_shards(
+            table=table,
+            large=large,
+            small=small,
+            null_equals_null=null_equals_null,
+            small_shard=small_shard,
+            threads=threads
+        )
+        positions = index(columns)
+        column_sets = [[frozenset(positions[key(c)] for c in ucc) for ucc in uccs] for uccs in shards]
+        candidates = [(ucc, None) for ucc in common_sets(column_sets, max_size=max_ucc_size)]
+        result = validate(
+            table=table,
+            candidates=candidates,
+            ncolumns=len(columns),
+            max_size=max_ucc_size,
+            null_equals_null=null_equals_null,
+            threads=threads
+        )
+    uccs = sorted([sorted(ucc) for ucc, _ in result], key=lambda u: (len(u), u))
+    return [[columns[c] for c in ucc] for ucc in uccs]
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def check_bucket(
+    filename: str, candidates: List[Candidate], columns: List[int],
+    null_equals_null: bool
+) -> Set[Candidate]:
+    """Get the candidates that are violated by the rows in a bucket file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the bucket file. The file contains a sequence of pickled data
+        frames with the projection of the rows on the given columns.
+    candidates: list of tuple
+        Candidates that are validated.
+    columns: list of int
+        Positions of the columns in the bucket file.
+    null_equals_null: bool
+        Result value when comparing two NULL values.
+
+    Returns
+    -------
+    set of tuple
+    """
+    import pandas as pd
+    frames = list()
+    with open(filename, 'rb') as f:
+        while True:
+            try:
+                frames.append(pickle.load(f))
+            except EOFError:
+                break
+    _, partitions = encode(pd.concat(frames, ignore_index=True), null_equals_null=null_equals_null)
+    partitions = dict(zip(columns, partitions))
+    violated = set()
+    for cols, rhs in candidates:
+        p = None
+        for c in sorted(cols):
+            p = partitions[c] if p is None else p.refine(partitions[c])
+        if rhs is None:
+            if not p.is_unique():
+                violated.add((cols, rhs))
+        elif p.refine(partitions[rhs]).size != p.size:
+            violated.add((cols, rhs))
+    return violated
+
+
+def check_constants(
+    table: ShardedTable, candidates: List[Candidate], null_equals_null: bool
+) -> Set[Candidate]:
+    """Get the candidates with an empty column set that are violated. Each
+    candidate holds on every shard, i.e., the dependant column has a single
+    value in each shard (and unique column combinations with an empty column
+    set only hold for tables with at most one row).
+
+    Parameters
+    ----------
+    table: openclean_metanome.algorithm.sharded.ShardedTable
+        Sharded input table.
+    candidates: list of tuple
+        Candidates with an empty column set.
+    null_equals_null: bool
+        Result value when comparing two NULL values.
+
+    Returns
+    -------
+    set of tuple
+    """
+    import pandas as pd
+    violated = set()
+    rhs_columns = sorted(set([rhs for _, rhs in candidates if rhs is not None]))
+    values = {rhs: list() for rhs in rhs_columns}
+    if rhs_columns:
+        for shard in table:
+            for rhs in rhs_columns:
+                values[rhs].append(shard.iloc[:, [rhs]].drop_duplicates())
+    for cols, rhs in candidates:
+        if rhs is None:
+            if table.rows > 1:
+                violated.add((cols, rhs))
+            continue
+        _, partitions = encode(pd.concat(values[rhs], ignore_index=True), null_equals_null=null_equals_null)
+        if partitions and partitions[0].size > 1:
+            violated.add((cols, rhs))
+    return violated
+
+
+def read_shards(df: Union['pd.DataFrame', str, 'Document'], shard_size: int) -> Iterator['pd.DataFrame']:
+    """Read an input table in shards of a given number of rows. CSV files are
+    read with all values as strings and empty values as missing values, i.e.,
+    in the same way as they are read by the Metanome algorithms. Arrow inputs
+    are read one record batch at a time.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow data.
+    shard_size: int
+        Number of rows in each shard.
+
+    Returns
+    -------
+    iterator of pd.DataFrame
+    """
+    import pandas as pd
+    if isinstance(df, pd.DataFrame):
+        for start in range(0, len(df.index), shard_size):
+            yield df.iloc[start:start + shard_size]
+    elif is_arrow(df):
+        for batch in record_batches(df)[1]:
+            yield batch.to_pandas(integer_object_nulls=True)
+    elif isinstance(df, (str, os.PathLike)):
+        source = os.fspath(df)
+        if source.lower().endswith(PARQUET_SUFFIXES):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=shard_size):
+                yield batch.to_pandas(integer_object_nulls=True)
+        else:
+            reader = pd.read_csv(source, dtype=str, keep_default_na=False, na_values=[''], chunksize=shard_size)
+            with reader:
+                for chunk in reader:
+                    yield chunk
+    else:
+        columns, rows = list(df.columns), list()
+        for _, row in df.iterrows():
+            rows.append(row)
+            if len(rows) >= shard_size:
+                yield pd.DataFrame(data=rows, columns=columns)
+                rows = list()
+        if rows:
+            yield pd.DataFrame(data=rows, columns=columns)
+
+
+def route(cols: FrozenSet[int], cardinality: List[int]) -> int:
+    """Get the column that is used to hash-partition the rows for validating
+    a candidate. Rows that violate the candidate agree on all of its columns.
+    The column with the largest (estimated) number of distinct values is used
+    to get buckets of similar size.
+
+    Parameters
+    ----------
+    cols: frozenset of int
+        Column set of the candidate.
+    cardinality: list of int
+        Estimated number of distinct values for each column.
+
+    Returns
+    -------
+    int
+    """
+    return max(sorted(cols), key=lambda c: cardinality[c])
+
+
+def run_shards(
+    table: ShardedTable, large: Callable, small: Callable,
+    null_equals_null: bool = True, small_shard: int = SMALL_SHARD,
+    threads: Optional[int] = None
+) -> Tuple[List, List]:
+    """Run a discovery function for each shard of a table in parallel. Shards
+    with more than *small_shard* rows are passed as data frames to the *large*
+    function. For smaller shards the *small* function is called with the list
+    of columns and the partitions of the columns.
+
+    The number of shards that are read but not yet processed is bounded by
+    the number of threads. Returns the list of columns and the list of
+    discovery results for all shards. The estimated number of distinct values
+    for each column (the sum of the number of distinct values over all shards)
+    is stored in the ``cardinality`` property of the table.
+
+    Parameters
+    ----------
+    table: openclean_metanome.algorithm.sharded.ShardedTable
+        Sharded input table.
+    large: callable
+        Discovery function for large shards.
+    small: callable
+        Discovery function for small shards.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_shard: int, default=10000
+        Maximum number of rows in shards that are processed by the *small*
+        function.
+    threads: int, default=None
+        Number of shards that are processed in parallel.
+
+    Returns
+    -------
+    list, list
+    """
+    threads = threads if threads else os.cpu_count()
+    columns = None
+    cardinality = None
+
+    def discover(shard: 'pd.DataFrame') -> List:
+        values, partitions = encode(shard, null_equals_null=null_equals_null)
+        if len(shard.index) > small_shard:
+            return [p.size for p in partitions], large(shard)
+        return [p.size for p in partitions], small(values, partitions)
+
+    results, pending = list(), list()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for shard in table:
+            if columns is None:
+                columns = [shard.columns[i] for i in range(len(shard.columns))]
+            pending.append(executor.submit(discover, shard))
+            if len(pending) >= threads:
+                results.append(pending.pop(0).result())
+        results.extend([f.result() for f in pending])
+    if columns is None:
+        raise ValueError('empty input table')
+    cardinality = [0] * len(columns)
+    for sizes, _ in results:
+        cardinality = [a + b for a, b in zip(cardinality, sizes)]
+    table.cardinality = cardinality
+    return columns, [r for _, r in results]
+
+
+def spill_buckets(
+    table: ShardedTable, routes: Dict[int, List[int]], buckets: int, dirname: str
+) -> Dict[Tuple[int, int], str]:
+    """Hash-partition the rows of all shards on the routing columns. For each
+    routing column the projection of the rows on the given columns is written
+    to one file per bucket. Returns the paths to the created files for each
+    pair of routing column and bucket.
+
+    Parameters
+    ----------
+    table: openclean_metanome.algorithm.sharded.ShardedTable
+        Sharded input table.
+    routes: dict
+        Mapping of routing columns to the list of columns in the projection.
+    buckets: int
+        Number of buckets.
+    dirname: string
+        Directory for the bucket files.
+
+    Returns
+    -------
+    dict
+    """
+    import numpy as np
+    import pandas as pd
+    files = dict()
+    for shard in table:
+        for r, cols in routes.items():
+            hashes = pd.util.hash_array(shard.iloc[:, r].to_numpy(dtype=object))
+            bucket_ids = (hashes % np.uint64(buckets)).astype(np.int64)
+            projection = shard.iloc[:, cols]
+            for b in np.unique(bucket_ids):
+                filename = files.setdefault((r, int(b)), os.path.join(dirname, 'r{}_b{}.pkl'.format(r, b)))
+                with open(filename, 'ab') as f:
+                    pickle.dump(projection[bucket_ids == b], f)
+    return files
+
+
+def validate(
+    table: ShardedTable, candidates: List[Candidate], ncolumns: int,
+    max_size: int = -1, null_equals_null: bool = True,
+    threads: Optional[int] = None
+) -> List[Candidate]:
+    """Validate candidate dependencies that hold on every shard across all
+    shards. Candidates that are violated are extended by one column and
+    validated in the next round until no candidates are left. Returns the
+    minimal candidates that hold on the whole table.
+
+    Parameters
+    ----------
+    table: openclean_metanome.algorithm.sharded.ShardedTable
+        Sharded input table.
+    candidates: list of tuple
+        Pairs of column sets and right-hand-side columns (None for unique
+        column combinations).
+    ncolumns: int
+        Number of columns in the table.
+    max_size: int, default=-1
+        Maximum size of column sets. Use -1 for no size limit.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    threads: int, default=None
+        Number of buckets that are validated in parallel.
+
+    Returns
+    -------
+    list of tuple
+    """
+    buckets = max(1, math.ceil(table.rows / table.shard_size))
+    found = list()
+    level = set(candidates)
+    rnd = 0
+    while level:
+        violated = check_constants(
+            table=table,
+            candidates=[c for c in level if not c[0]],
+            null_equals_null=null_equals_null
+        )
+        # Group the candidates by their routing column.
+        routes, routed = dict(), dict()
+        for cols, rhs in level:
+            if cols:
+                r = route(cols, table.cardinality)
+                routed.setdefault(r, list()).append((cols, rhs))
+                needed = routes.setdefault(r, set())
+                needed.update(cols)
+                if rhs is not None:
+                    needed.add(rhs)
+        routes = {r: sorted(cols) for r, cols in routes.items()}
+        dirname = os.path.join(table.basedir, 'round{}'.format(rnd))
+        os.makedirs(dirname)
+        files = spill_buckets(table, routes=routes, buckets=buckets, dirname=dirname)
+        with ThreadPoolExecutor(max_workers=threads if threads else os.cpu_count()) as executor:
+            futures = [
+                executor.submit(check_bucket, filename, routed[r], routes[r], null_equals_null)
+                for (r, _), filename in files.items()
+            ]
+            for f in futures:
+                violated.update(f.result())
+        shutil.rmtree(dirname)
+        found.extend([c for c in level if c not in violated])
+        # Extend violated candidates by one column. Extensions of a
+        # candidate hold on every shard. Extensions that are implied by a
+        # valid candidate are pruned.
+        level = set()
+        for cols, rhs in violated:
+            if 0 < max_size <= len(cols):
+                continue
+            for c in range(ncolumns):
+                if c not in cols and c != rhs:
+                    ext = (cols | {c}, rhs)
+                    if not any(f[1] == rhs and f[0] <= ext[0] for f in found):
+                        level.add(ext)
+        rnd += 1
+    result = list()
+    for rhs in set([rhs for _, rhs in found]):
+        result.extend([(cols, rhs) for cols in minimize([cols for cols, r in found if r == rhs])])
+    return result
@@ -0,0 +1,120 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Wrapper to run the TANE algorithm from the Metanome data profiling library.
+TANE is a functional dependency discovery algorithm that traverses the
+lattice of attribute sets level-wise using stripped partitions.
+
+Yka Huhtala, Juha Kärkkäinen, Pasi Porkka, Hannu Toivonen
+TANE: An Efficient Algorithm for Discovering Functional and Approximate
+Dependencies
+The Computer Journal 42(2), 1999
+
+TANE scales well with the number of rows but its runtime grows exponentially
+with the number of columns. It is a good choice for long and narrow tables.
+"""
+
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
+
+from openclean.profiling.constraints.fd import FunctionalDependency, FunctionalDependencyFinder
+from openclean_metanome.algorithm.hyfd import parse_result
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.algorithm.base as base
+
+# Import pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+def tane(
+    df: Union['pd.DataFrame', str, 'Document'], max_lhs_size: int = -1,
+    null_equals_null: bool = True, env: Optional[Dict] = None,
+    verbose: Optional[bool] = True, session: Optional[MetanomeSession] = None
+) -> List[FunctionalDependency]:
+    """Run the TANE algorithm on a given data frame. TANE is a level-wise
+    discovery algorithm for functional dependencies.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, or data stream.
+    max_lhs_size: int, default=-1
+        Defines the maximum size of the left-hand-side for discovered FDs. Use
+        -1 to ignore size limits on FDs.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=True
+        Output run logs if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm run.
+
+    Returns
+    -------
+    list of FunctionalDependency
+    """
+    return TANE(
+        max_lhs_size=max_lhs_size,
+        null_equals_null=null_equals_null,
+        env=env,
+        verbose=verbose,
+        session=session
+    ).run(df)
+
+
+class TANE(base.MetanomeAlgorithm, FunctionalDependencyFinder):
+    """TANE is a level-wise discovery algorithm for functional dependencies
+    that is based on stripped partitions:
+
+    Yka Huhtala, Juha Kärkkäinen, Pasi Porkka, Hannu Toivonen
+    TANE: An Efficient Algorithm for Discovering Functional and Approximate
+    Dependencies
+    The Computer Journal 42(2), 1999
+    """
+    command = 'tane'
+    options = '--max-lhs-size ${max_lhs_size} ${null_equals_null}'
+    result = 'fds'
+    parser = staticmethod(parse_result)
+
+    def __init__(
+        self, max_lhs_size: int = -1, null_equals_null: bool = True,
+        env: Optional[Dict] = None, verbose: Optional[bool] = True,
+        session: Optional[MetanomeSession] = None
+    ):
+        """Initialize the algorithm parameters.
+
+        Parameters
+        ----------
+        max_lhs_size: int, default=-1
+            Defines the maximum size of the left-hand-side for discovered FDs
+             Use -1 to ignore size limits on FDs.
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None.
+        verbose: bool, default=True
+            Output run logs if True.
+        session: openclean_metanome.session.MetanomeSession, default=None
+            Session that provides the configuration, workflow, and workers for
+            the algorithm run. If no session is given, a new session is created
+            for each run using the given environment.
+        """
+        super(TANE, self).__init__(
+            arguments={
+                'max_lhs_size': max_lhs_size,
+                'null_equals_null': '--null-equals-null' if null_equals_null else ''
+            },
+            env=env,
+            verbose=verbose,
+            session=session
+        )
@@ -0,0 +1,461 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Discovery of functional dependencies for wide tables (i.e., tables with
+hundreds of columns) on overlapping clusters of correlated columns.
+
+The search lattice of HyFD grows exponentially with the number of columns. For
+wide tables the columns are therefore clustered by the strength of their
+pairwise dependencies, and the dependencies within each cluster are discovered
+independently. The strength of the dependency between two columns is computed
+from the column partitions on a sample of rows. For columns A and B it is the
+fraction of rows that repeat a value of A (i.e., that are in a non-singleton
+class of A) and agree with the most frequent value of B in their class. The
+pairwise strength is the maximum of both directions. Constant columns and
+columns that are unique on the sample provide no evidence and have strength
+zero.
+
+Clusters are grown greedily. Each cluster starts with the unassigned column
+that has the strongest links to all other unassigned columns and is extended
+by the unassigned column with the strongest link to any of its members until
+it contains ``max_cluster_size - overlap`` columns. The cluster is then
+extended by the ``overlap`` strongest linked columns of other clusters.
+Discovery runs for the clusters in parallel (HyFD for large tables and the
+in-process AFD algorithm with an error threshold of zero for small tables).
+
+Dependencies that cross clusters are found by a separate level-wise search
+over left-hand-sides with at most ``cross_lhs_size`` columns. Candidates are
+first checked on the sample. Candidates that hold on the sample are validated
+on the full table.
+
+Completeness guarantee: Whether a functional dependency X -> A holds (and
+whether it is minimal) only depends on the columns in X and A. Every returned
+dependency is therefore a minimal functional dependency of the whole table.
+A minimal functional dependency X -> A of the table is returned if X and A are
+contained in a common cluster or if X has at most ``cross_lhs_size`` columns
+(and in both cases at most ``max_lhs_size`` columns). Minimal dependencies
+with larger left-hand-sides across clusters are not discovered. The
+``covers()`` method of the result tests if a dependency is within the
+guaranteed search space. Tables with at most ``max_cluster_size`` columns are
+processed as a single cluster, i.e., the result is complete.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union, TYPE_CHECKING
+
+import os
+
+from openclean.data.types import Column, Columns
+from openclean.profiling.constraints.fd import FunctionalDependency
+from openclean_metanome.algorithm.afd import AFD
+from openclean_metanome.algorithm.groupby import index, key, minimize
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.algorithm.sharded import SMALL_SHARD
+from openclean_metanome.partition import encode, factorize, read_frame, Partition
+from openclean_metanome.session import MetanomeSession
+
+# Import numpy, pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+"""Default maximum number of columns in each cluster."""
+CLUSTER_SIZE = 24
+
+"""Default number of columns in each cluster that are added from other
+clusters.
+"""
+OVERLAP = 8
+
+"""Default number of rows in the sample that is used for clustering and for
+checking cross-cluster candidates.
+"""
+SAMPLE_SIZE = 10000
+
+
+class ClusteredFDs(list):
+    """List of minimal functional dependencies that were discovered on
+    overlapping column clusters. The result contains all minimal dependencies
+    whose columns are in a common cluster and all minimal dependencies with at
+    most ``cross_lhs_size`` columns in the left-hand-side (up to the maximum
+    left-hand-side size).
+    """
+    def __init__(
+        self, fds: List[FunctionalDependency], clusters: List[Columns],
+        cross_lhs_size: int, max_lhs_size: int = -1
+    ):
+        """Initialize the discovered dependencies and the parameters of the
+        search space.
+
+        Parameters
+        ----------
+        fds: list of FunctionalDependency
+            Discovered minimal functional dependencies.
+        clusters: list of list
+            Columns in each cluster.
+        cross_lhs_size: int
+            Maximum size of left-hand-sides for dependencies across clusters.
+        max_lhs_size: int, default=-1
+            Maximum size of left-hand-sides for all dependencies. Use -1 for
+            no size limit.
+        """
+        super(ClusteredFDs, self).__init__(fds)
+        self.clusters = clusters
+        self.cross_lhs_size = cross_lhs_size
+        self.max_lhs_size = max_lhs_size
+
+    @property
+    def complete(self) -> bool:
+        """True if the result is guaranteed to contain all minimal functional
+        dependencies (with at most ``max_lhs_size`` columns in the
+        left-hand-side) of the table.
+
+        Returns
+        -------
+        bool
+        """
+        return len(self.clusters) <= 1 or 0 < self.max_lhs_size <= self.cross_lhs_size
+
+    def covers(self, lhs: Columns, rhs: Union[str, Column]) -> bool:
+        """Test if a functional dependency is within the search space, i.e.,
+        if the dependency is guaranteed to be in the result if it is a minimal
+        dependency of the table.
+
+        Parameters
+        ----------
+        lhs: list of string or Column
+            Columns in the left-hand-side of the dependency.
+        rhs: string or Column
+            Dependant column.
+
+        Returns
+        -------
+        bool
+        """
+        if 0 < self.max_lhs_size < len(lhs):
+            return False
+        if len(lhs) <= self.cross_lhs_size:
+            return True
+        columns = set([key(c) for c in lhs]) | {key(rhs)}
+        return any([columns <= set([key(c) for c in cluster]) for cluster in self.clusters])
+
+
+def fds_wide(
+    df: Union['pd.DataFrame', str, 'Document'], max_cluster_size: int = CLUSTER_SIZE,
+    overlap: int = OVERLAP, cross_lhs_size: int = 1, max_lhs_size: int = -1,
+    sample_size: int = SAMPLE_SIZE, null_equals_null: bool = True,
+    small_table: int = SMALL_SHARD, threads: Optional[int] = None,
+    seed: Optional[int] = None, env: Optional[Dict] = None,
+    verbose: Optional[bool] = False, session: Optional[MetanomeSession] = None
+) -> ClusteredFDs:
+    """Discover the minimal functional dependencies of a wide table on
+    overlapping clusters of correlated columns. Dependencies across clusters
+    are discovered up to a given left-hand-side size.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow data.
+    max_cluster_size: int, default=24
+        Maximum number of columns in each cluster.
+    overlap: int, default=8
+        Number of columns in each cluster that are added from other clusters.
+    cross_lhs_size: int, default=1
+        Maximum size of left-hand-sides for dependencies across clusters. The
+        number of candidates grows with the number of columns to the power of
+        this size plus one.
+    max_lhs_size: int, default=-1
+        Defines the maximum size of the left-hand-side for discovered FDs. Use
+        -1 to ignore size limits on FDs.
+    sample_size: int, default=10000
+        Number of rows in the sample that is used for clustering and for
+        checking cross-cluster candidates.
+    null_equals_null: bool, default=True
+        Result value when comparing two NULL values.
+    small_table: int, default=10000
+        Maximum number of rows in tables whose clusters are processed
+        in-process instead of by HyFD.
+    threads: int, default=None
+        Number of clusters (or candidates) that are processed in parallel. By
+        default, one thread per available CPU core is used.
+    seed: int, default=None
+        Seed for the random number generator that draws the sample.
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+    verbose: bool, default=False
+        Output run logs of the Metanome algorithms if True.
+    session: openclean_metanome.session.MetanomeSession, default=None
+        Session that provides the configuration, workflow, and workers for
+        the algorithm runs.
+
+    Returns
+    -------
+    openclean_metanome.algorithm.wide.ClusteredFDs
+    """
+    if max_cluster_size < 2:
+        raise ValueError('invalid cluster size {}'.format(max_cluster_size))
+    if not 0 <= overlap < max_cluster_size:
+        raise ValueError('invalid overlap {}'.format(overlap))
+    if cross_lhs_size < 0:
+        raise ValueError('invalid cross-cluster lhs size {}'.format(cross_lhs_size))
+    if max_lhs_size > 0:
+        cross_lhs_size = min(cross_lhs_size, max_lhs_size)
+    threads = threads if threads else os.cpu_count()
+    session = session if session is not None else MetanomeSession(env=env)
+    df = read_frame(df)
+    columns, partitions = encode(df, null_equals_null=null_equals_null)
+    sample = sample_partitions(partitions, sample_size=sample_size, seed=seed)
+    strength, holds = dependency_strength(sample, threads=threads)
+    clusters = cluster_columns(strength, max_size=max_cluster_size, overlap=overlap)
+
+    def discover(cluster: List[int]) -> List[FunctionalDependency]:
+        if len(df.index) > small_table:
+            algo = HyFD(
+                max_lhs_size=max_lhs_size,
+                null_equals_null=null_equals_null,
+                verbose=verbose,
+                session=session
+            )
+            return algo.run(df.iloc[:, cluster])
+        algo = AFD(max_error=0, max_lhs_size=max_lhs_size, null_equals_null=null_equals_null, threads=1)
+        return algo.find([columns[c] for c in cluster], [partitions[c] for c in cluster])
+
+    # Minimal left-hand-sides for each dependant column.
+    positions = index(columns)
+    found = {rhs: set() for rhs in range(len(columns))}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for fds in executor.map(discover, clusters):
+            for fd in fds:
+                found[positions[key(fd.rhs[0])]].add(frozenset(positions[key(c)] for c in fd.lhs))
+    for lhs, rhs in cross_fds(
+        partitions=partitions,
+        sample=sample,
+        holds=holds,
+        clusters=clusters,
+        found=found,
+        max_size=cross_lhs_size,
+        threads=threads
+    ):
+        found[rhs].add(lhs)
+    result = list()
+    for rhs, lhs_sets in found.items():
+        result.extend([(sorted(lhs), rhs) for lhs in minimize(list(lhs_sets))])
+    return ClusteredFDs(
+        fds=[
+            FunctionalDependency(lhs=[columns[c] for c in lhs], rhs=[columns[rhs]])
+            for lhs, rhs in sorted(result, key=lambda fd: (len(fd[0]), fd[0], fd[1]))
+        ],
+        clusters=[[columns[c] for c in cluster] for cluster in clusters],
+        cross_lhs_size=cross_lhs_size,
+        max_lhs_size=max_lhs_size
+    )
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def cluster_columns(strength: 'np.ndarray', max_size: int, overlap: int) -> List[List[int]]:
+    """Group columns into overlapping clusters of strongly dependent columns.
+    Each column is in the core of exactly one cluster. Cores are grown
+    greedily from the column with the strongest links to all unassigned
+    columns by adding the unassigned column with the strongest link to any
+    member. Each cluster is then extended by the *overlap* columns outside of
+    its core with the strongest links to any member.
+
+    Parameters
+    ----------
+    strength: np.ndarray
+        Symmetric matrix of pairwise dependency strengths.
+    max_size: int
+        Maximum number of columns in each cluster.
+    overlap: int
+        Number of columns that are added to each cluster from other clusters.
+
+    Returns
+    -------
+    list of list of int
+    """
+    import numpy as np
+    ncolumns = len(strength)
+    if ncolumns <= max_size:
+        return [list(range(ncolumns))] if ncolumns else list()
+    unassigned = set(range(ncolumns))
+    clusters = list()
+    while unassigned:
+        free = sorted(unassigned)
+        seed = max(free, key=lambda c: strength[c, free].sum())
+        core, link = [seed], strength[seed].copy()
+        unassigned.remove(seed)
+        while len(core) < max_size - overlap and unassigned:
+            c = max(sorted(unassigned), key=lambda x: link[x])
+            core.append(c)
+            unassigned.remove(c)
+            link = np.maximum(link, strength[c])
+        outside = [c for c in range(ncolumns) if c not in core and link[c] > 0]
+        extension = sorted(outside, key=lambda c: -link[c])[:overlap]
+        clusters.append(sorted(core + extension))
+    return clusters
+
+
+def cross_fds(
+    partitions: List[Partition], sample: List[Partition], holds: 'np.ndarray',
+    clusters: List[List[int]], found: Dict[int, Set[FrozenSet[int]]],
+    max_size: int, threads: Optional[int] = None
+) -> List[Tuple[FrozenSet[int], int]]:
+    """Discover the minimal functional dependencies with at most *max_size*
+    columns in the left-hand-side whose columns are not contained in a common
+    cluster. Left-hand-sides are enumerated level-wise. Candidates that are
+    implied by a dependency in the cluster results or at a previous level are
+    pruned. The remaining candidates are checked on the sample first and
+    validated on the full table if they hold on the sample.
+
+    Parameters
+    ----------
+    partitions: list of openclean_metanome.partition.Partition
+        Partition for each column of the full table.
+    sample: list of openclean_metanome.partition.Partition
+        Partition for each column of the sample.
+    holds: np.ndarray
+        Matrix that indicates for each pair of columns whether the dependency
+        from the first to the second column holds on the sample.
+    clusters: list of list of int
+        Columns in each cluster.
+    found: dict
+        Minimal left-hand-sides for each dependant column that were found in
+        the cluster results.
+    max_size: int
+        Maximum size of left-hand-sides.
+    threads: int, default=None
+        Number of left-hand-sides that are validated in parallel.
+
+    Returns
+    -------
+    list of tuple
+    """
+    clusters = [frozenset(cluster) for cluster in clusters]
+    found = {rhs: set(lhs_sets) for rhs, lhs_sets in found.items()}
+    result = list()
+
+    def validate(lhs: Tuple[int]) -> List[int]:
+        cols = frozenset(lhs)
+        candidates = list()
+        for rhs in range(len(partitions)):
+            if rhs in cols or any([cols | {rhs} <= cluster for cluster in clusters]):
+                continue
+            if not any([x <= cols for x in found[rhs]]):
+                candidates.append(rhs)
+        if len(lhs) == 1:
+            candidates = [rhs for rhs in candidates if holds[lhs[0], rhs]]
+        elif candidates:
+            p = combined(sample, lhs)
+            candidates = [rhs for rhs in candidates if p.refine(sample[rhs]).size == p.size]
+        if not candidates:
+            return candidates
+        p = combined(partitions, lhs)
+        return [rhs for rhs in candidates if p.refine(partitions[rhs]).size == p.size]
+
+    with ThreadPoolExecutor(max_workers=threads if threads else os.cpu_count()) as executor:
+        for size in range(1, max_size + 1):
+            level = list(combinations(range(len(partitions)), size))
+            valid = [(frozenset(lhs), rhs) for lhs, rhs_list in zip(level, executor.map(validate, level)) for rhs in rhs_list]
+            for lhs, rhs in valid:
+                found[rhs].add(lhs)
+            result.extend(valid)
+    return result
+
+
+def combined(partitions: List[Partition], columns: Tuple[int]) -> Partition:
+    """Get the partition for a combination of columns.
+
+    Parameters
+    ----------
+    partitions: list of openclean_metanome.partition.Partition
+        Partition for each column.
+    columns: tuple of int
+        Positions of the combined columns.
+
+    Returns
+    -------
+    openclean_metanome.partition.Partition
+    """
+    p = partitions[columns[0]]
+    for c in columns[1:]:
+        p = p.refine(partitions[c])
+    return p
+
+
+def dependency_strength(
+    sample: List[Partition], threads: Optional[int] = None
+) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Compute the pairwise dependency strength of all columns on a sample.
+    The strength of the dependency from column A to column B is the fraction
+    of rows in non-singleton classes of A that do not have to be removed for
+    the dependency to hold. The strength is zero for constant columns and for
+    columns that are unique on the sample.
+
+    Returns the symmetric matrix of the maximum strength of both directions
+    and the matrix that indicates whether the dependency from the column in
+    each row to the column in each column holds on the sample.
+
+    Parameters
+    ----------
+    sample: list of openclean_metanome.partition.Partition
+        Partition for each column of the sample.
+    threads: int, default=None
+        Number of columns that are processed in parallel.
+
+    Returns
+    -------
+    np.ndarray, np.ndarray
+    """
+    import numpy as np
+    ncolumns = len(sample)
+
+    def errors(a: int) -> List[int]:
+        return [sample[a].error(sample[b]) if a != b else 0 for b in range(ncolumns)]
+
+    with ThreadPoolExecutor(max_workers=threads if threads else os.cpu_count()) as executor:
+        error = np.array(list(executor.map(errors, range(ncolumns))), dtype=np.float64).reshape(ncolumns, ncolumns)
+    # Number of rows in non-singleton classes that repeat a value of each
+    # column.
+    repeated = np.array([len(p) - p.size for p in sample], dtype=np.float64)
+    informative = np.array([p.size > 1 and not p.is_unique() for p in sample])
+    strength = np.zeros((ncolumns, ncolumns))
+    rows = np.flatnonzero(informative)
+    strength[np.ix_(rows, rows)] = 1 - error[np.ix_(rows, rows)] / repeated[rows, None]
+    np.fill_diagonal(strength, 0)
+    return np.maximum(strength, strength.T), error == 0
+
+
+def sample_partitions(
+    partitions: List[Partition], sample_size: int, seed: Optional[int] = None
+) -> List[Partition]:
+    """Get the column partitions for a uniform random sample of rows.
+
+    Parameters
+    ----------
+    partitions: list of openclean_metanome.partition.Partition
+        Partition for each column of the full table.
+    sample_size: int
+        Number of rows in the sample.
+    seed: int, default=None
+        Seed for the random number generator.
+
+    Returns
+    -------
+    list of openclean_metanome.partition.Partition
+    """
+    import numpy as np
+    nrows = len(partitions[0]) if partitions else 0
+    if nrows <= sample_size:
+        return partitions
+    rows = np.sort(np.random.default_rng(seed).choice(nrows, size=sample_size, replace=False))
+    return [factorize(p.codes[rows]) for p in partitions]
@@ -0,0 +1,364 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Command-line interface for profiling collections of data files.
+
+The ``openclean-metanome`` command runs one or more discovery algorithms on
+each of the given CSV and Parquet files (or all data files that match the
+given glob patterns or that are contained in the given directories). Files
+are profiled in parallel by a pool of threads that share a single
+:class:`openclean_metanome.session.MetanomeSession`.
+
+The results are written as JSON Lines, one object per file:
+
+.. code-block:: json
+
+    {
+        "file": "/data/drop/table.csv",
+        "status": "ok",
+        "seconds": 1.52,
+        "results": {
+            "hyfd": {
+                "fds": [{"lhs": ["A"], "rhs": ["B"]}],
+                "seconds": 0.81,
+                "cached": false,
+                "usage": {"peak_rss": 104857600, "user_time": 1.2, ...}
+            }
+        }
+    }
+
+The status is either ``ok``, ``error``, or ``timeout``. Results of individual
+algorithm runs are cached in a directory (if given). The cache key is the
+checksum of the file content together with the algorithm name and its
+parameters. With ``--resume`` the command appends to an existing output file
+and skips all files that were profiled successfully before.
+
+Timeouts are enforced by cancelling the Metanome process via the progress
+listener (see :mod:`openclean_metanome.progress`). This requires a worker
+that supports progress events (i.e., the subprocess worker or the Docker pool
+worker). The timeout is checked whenever the process produces output and
+with every heartbeat.
+"""
+
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+import click
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+from openclean_metanome.algorithm.auto import fd_algorithms, ucc_algorithms, FD_WRAPPERS, UCC_WRAPPERS
+from openclean_metanome.converter import PARQUET_SUFFIXES
+from openclean_metanome.progress import listen
+from openclean_metanome.session import MetanomeSession
+from openclean_metanome.version import __version__
+
+
+"""Names of the algorithms that are provided by the configured Metanome.jar
+file.
+"""
+ALGORITHMS = sorted(list(fd_algorithms()) + list(ucc_algorithms()))
+
+"""Algorithms that are run by default."""
+DEFAULT_ALGORITHMS = ['hyfd', 'hyucc']
+
+"""Names of the arguments that limit the size of discovered column sets for
+the algorithms that support such a limit.
+"""
+MAX_SIZE_ARGS = {'hyfd': 'max_lhs_size', 'tane': 'max_lhs_size', 'hyucc': 'max_ucc_size'}
+
+"""Status values for profiled files."""
+STATUS_ERROR = 'error'
+STATUS_OK = 'ok'
+STATUS_TIMEOUT = 'timeout'
+
+"""Suffixes of the data files that are profiled when a directory is given."""
+DATA_SUFFIXES = ('.csv', '.csv.gz') + PARQUET_SUFFIXES
+
+"""Size of the chunks (in bytes) that are read when computing the checksum of
+a data file.
+"""
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileTimeout(TimeoutError):
+    """Error that is raised by the progress listener to stop the Metanome
+    process when the timeout for a file has been reached.
+    """
+    pass
+
+
+@click.command(name='openclean-metanome')
+@click.option(
+    '-a', '--algorithm', 'algorithms', type=click.Choice(ALGORITHMS), multiple=True,
+    help='Discovery algorithm (can be given multiple times, default: hyfd and hyucc).'
+)
+@click.option('-o', '--output', default='-', help='Output file for JSON Lines results (default: stdout).')
+@click.option('-j', '--jobs', type=int, default=1, show_default=True, help='Number of files profiled in parallel.')
+@click.option('-c', '--cache', type=click.Path(file_okay=False), help='Directory for cached algorithm results.')
+@click.option('-t', '--timeout', type=float, help='Timeout in seconds for profiling a single file.')
+@click.option('--max-size', type=int, default=-1, help='Maximum size of discovered column sets.')
+@click.option('--resume', is_flag=True, help='Skip files that were profiled successfully before.')
+@click.argument('files', nargs=-1, required=True)
+def cli(
+    algorithms: List[str], output: str, jobs: int, cache: Optional[str],
+    timeout: Optional[float], max_size: int, resume: bool, files: List[str]
+):
+    """Profile CSV and Parquet files with Metanome algorithms.
+
+    FILES are paths to data files, directories, or glob patterns.
+    """
+    algorithms = list(algorithms) if algorithms else DEFAULT_ALGORITHMS
+    if resume and output == '-':
+        raise click.UsageError('--resume requires an output file')
+    filenames = expand(files)
+    done = read_done(output) if resume else set()
+    pending = [f for f in filenames if f not in done]
+    if cache:
+        os.makedirs(cache, exist_ok=True)
+    if resume:
+        terminate(output)
+    session = MetanomeSession()
+    failed = 0
+    out = open(output, 'a' if resume else 'w') if output != '-' else sys.stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            futures = [
+                executor.submit(
+                    profile,
+                    filename=f,
+                    algorithms=algorithms,
+                    session=session,
+                    cache=cache,
+                    timeout=timeout,
+                    max_size=max_size
+                ) for f in pending
+            ]
+            for future in as_completed(futures):
+                doc = future.result()
+                if doc['status'] != STATUS_OK:
+                    failed += 1
+                out.write(json.dumps(doc) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    click.echo(
+        '{} files profiled ({} failed), {} skipped'.format(len(pending), failed, len(filenames) - len(pending)),
+        err=True
+    )
+    if failed:
+        sys.exit(1)
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def cache_key(checksum: str, algorithm: str, arguments: Dict) -> str:
+    """Get the key for a cached algorithm result.
+
+    Parameters
+    ----------
+    checksum: string
+        Checksum of the profiled file.
+    algorithm: string
+        Algorithm name.
+    arguments: dict
+        Algorithm arguments.
+
+    Returns
+    -------
+    string
+    """
+    doc = {'file': checksum, 'algorithm': algorithm, 'args': arguments, 'version': __version__}
+    return hashlib.sha256(json.dumps(doc, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def checksum(filename: str) -> str:
+    """Get the SHA-256 checksum for the content of a file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the file.
+
+    Returns
+    -------
+    string
+    """
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def expand(patterns: Iterable[str]) -> List[str]:
+    """Get the list of data files for a list of file paths, directories, and
+    glob patterns. Directories are expanded (recursively) to the data files
+    that they contain. The result contains absolute paths without duplicates
+    in the order of the given patterns.
+
+    Parameters
+    ----------
+    patterns: list of string
+        File paths, directories, or glob patterns.
+
+    Returns
+    -------
+    list of string
+    """
+    result = dict()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                for dirpath, _, names in sorted(os.walk(path)):
+                    for name in sorted(names):
+                        if name.lower().endswith(DATA_SUFFIXES):
+                            result[os.path.abspath(os.path.join(dirpath, name))] = True
+            elif os.path.isfile(path):
+                result[os.path.abspath(path)] = True
+            else:
+                raise click.BadParameter("no such file '{}'".format(path))
+    return list(result)
+
+
+def profile(
+    filename: str, algorithms: List[str], session: MetanomeSession,
+    cache: Optional[str] = None, timeout: Optional[float] = None,
+    max_size: int = -1
+) -> Dict:
+    """Run the given algorithms on a data file. Returns the result object for
+    the output file. Errors are reported in the result object.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the data file.
+    algorithms: list of string
+        Names of the algorithms that are run.
+    session: openclean_metanome.session.MetanomeSession
+        Session that is shared by all algorithm runs.
+    cache: string, default=None
+        Directory for cached algorithm results.
+    timeout: float, default=None
+        Timeout in seconds for profiling the file.
+    max_size: int, default=-1
+        Maximum size of discovered column sets.
+
+    Returns
+    -------
+    dict
+    """
+    start = time.monotonic()
+    deadline = start + timeout if timeout else None
+
+    def check(event=None):
+        if deadline is not None and time.monotonic() > deadline:
+            raise FileTimeout('timeout after {} seconds'.format(timeout))
+
+    doc = {'file': filename, 'status': STATUS_OK, 'results': dict()}
+    try:
+        digest = checksum(filename) if cache else None
+        for name in algorithms:
+            arguments = {'null_equals_null': True}
+            if name in MAX_SIZE_ARGS:
+                arguments[MAX_SIZE_ARGS[name]] = max_size
+            cachefile = None
+            if cache:
+                cachefile = os.path.join(cache, '{}.json'.format(cache_key(digest, name, arguments)))
+                if os.path.isfile(cachefile):
+                    with open(cachefile, 'r') as f:
+                        doc['results'][name] = dict(json.load(f), cached=True)
+                    continue
+            check()
+            t = time.monotonic()
+            algo = dict(FD_WRAPPERS, **UCC_WRAPPERS)[name](verbose=False, session=session, **arguments)
+            with listen(check):
+                result = serialize(name, algo.run(filename))
+            result['seconds'] = time.monotonic() - t
+            result['usage'] = algo.usage._asdict() if algo.usage is not None else None
+            if cachefile is not None:
+                with open(cachefile, 'w') as f:
+                    json.dump(result, f)
+            doc['results'][name] = dict(result, cached=False)
+    except FileTimeout as ex:
+        doc['status'] = STATUS_TIMEOUT
+        doc['error'] = str(ex)
+    except Exception as ex:
+        doc['status'] = STATUS_ERROR
+        doc['error'] = '{}: {}'.format(type(ex).__name__, ex)
+    doc['seconds'] = time.monotonic() - start
+    return doc
+
+
+def read_done(filename: str) -> Set[str]:
+    """Get the set of files that were profiled successfully according to an
+    existing output file. Incomplete lines (e.g., from an interrupted run) are
+    ignored.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the output file.
+
+    Returns
+    -------
+    set of string
+    """
+    done = set()
+    if not os.path.isfile(filename):
+        return done
+    with open(filename, 'r') as f:
+        for line in f:
+            try:
+                doc = json.loads(line)
+            except ValueError:
+                continue
+            if doc.get('status') == STATUS_OK:
+                done.add(doc['file'])
+    return done
+
+
+def serialize(name: str, result: List) -> Dict:
+    """Get a serialization of the result of an algorithm run.
+
+    Parameters
+    ----------
+    name: string
+        Algorithm name.
+    result: list
+        List of functional dependencies or unique column combinations.
+
+    Returns
+    -------
+    dict
+    """
+    if name in FD_WRAPPERS:
+        return {'fds': [{'lhs': [str(c) for c in fd.lhs], 'rhs': [str(c) for c in fd.rhs]} for fd in result]}
+    return {'uccs': [[str(c) for c in ucc] for ucc in result]}
+
+
+def terminate(filename: str):
+    """Ensure that an existing output file ends with a line break. The last
+    line of the output of an interrupted run may be incomplete.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the output file.
+    """
+    if not os.path.isfile(filename) or os.path.getsize(filename) == 0:
+        return
+    with open(filename, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
@@ -10,23 +10,66 @@ openclean.
 """
 
 from appdirs import user_cache_dir
-from flowserv.controller.worker.manager import Docker  # noqa: F401
-from flowserv.util import read_object
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 
 import os
 
 
 """Environment variables to configure the Metanome package."""
+# Comma-separated list of additional algorithm subcommands that are provided
+# by a custom Metanome.jar file.
+METANOME_COMMANDS = 'METANOME_COMMANDS'
 # Identifier of the Metanome container image.
 METANOME_CONTAINER = 'METANOME_CONTAINER'
+# Path to the file with recorded algorithm runs for the cost model.
+METANOME_COSTMODEL = 'METANOME_COSTMODEL'
+# Number of processes for formatting large data frames as CSV.
+METANOME_CSV_PROCESSES = 'METANOME_CSV_PROCESSES'
 # Path to the Metanome.jar file
 METANOME_JARPATH = 'METANOME_JARPATH'
+# Path to a shared directory containing a copy of the Metanome.jar file.
+METANOME_JARMIRROR = 'METANOME_JARMIRROR'
+# Retry policy for algorithm runs that run out of memory.
+METANOME_RETRY = 'METANOME_RETRY'
+# Trace the memory that is allocated by Python while writing the algorithm
+# input and parsing the algorithm results.
+METANOME_TRACEMEMORY = 'METANOME_TRACEMEMORY'
 # Path to worker-specific storage volume.
 METANOME_VOLUME = 'METANOME_VOLUME'
 # Path to the package specific worker configuration.
 METANOME_WORKER = 'METANOME_WORKER'
 
+"""Algorithm subcommands that are provided by the Metanome.jar file that is
+downloaded by the package.
+"""
+DEFAULT_COMMANDS = ['hyfd', 'hyucc']
+
+
+def COMMANDS(env: Optional[Dict] = None) -> List[str]:
+    """Get the list of algorithm subcommands that are provided by the
+    configured Metanome.jar file. The published jar file only provides the
+    HyFD and HyUCC algorithms. Additional subcommands of a custom jar file
+    are listed in the environment variable as a comma-separated list.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    list of string
+    """
+    default = os.environ.get(METANOME_COMMANDS, '')
+    value = env.get(METANOME_COMMANDS, default) if env else default
+    commands = list(DEFAULT_COMMANDS)
+    for cmd in value.split(','):
+        cmd = cmd.strip().lower()
+        if cmd and cmd not in commands:
+            commands.append(cmd)
+    return commands
+
 
 def CONTAINER(env: Optional[Dict] = None) -> str:
     """Get the identifier of the Metanome container image from the environment
@@ -46,6 +89,45 @@ def CONTAINER(env: Optional[Dict] = None) -> str:
     return env.get(METANOME_CONTAINER, default) if env else default
 
 
+def COSTMODEL(env: Optional[Dict] = None) -> str:
+    """Get path to the file that contains the recorded algorithm runs that are
+    used to calibrate the cost model for automatic algorithm selection. The
+    result is None if no file is defined.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    string
+    """
+    default = os.environ.get(METANOME_COSTMODEL)
+    return env.get(METANOME_COSTMODEL, default) if env else default
+
+
+def CSV_PROCESSES(env: Optional[Dict] = None) -> int:
+    """Get the number of processes that format large data frames as CSV in
+    parallel. By default, data frames are formatted by the current process.
+    A value of 0 uses one process per available CPU core.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    int
+    """
+    default = os.environ.get(METANOME_CSV_PROCESSES, '1')
+    processes = int(env.get(METANOME_CSV_PROCESSES, default) if env else default)
+    return processes if processes > 0 else os.cpu_count()
+
+
 def JARFILE(env: Optional[Dict] = None) -> str:
     """Get path to the Metanome.jar file from the environment.
 
@@ -67,6 +149,62 @@ def JARFILE(env: Optional[Dict] = None) -> str:
     return env.get(METANOME_JARPATH, default) if env else default
 
 
+def JARMIRROR(env: Optional[Dict] = None) -> str:
+    """Get path to a shared mirror directory for the Metanome.jar file from
+    the environment. The result is None if no mirror directory is defined.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    string
+    """
+    default = os.environ.get(METANOME_JARMIRROR)
+    return env.get(METANOME_JARMIRROR, default) if env else default
+
+
+def RETRY(env: Optional[Dict] = None) -> Dict:
+    """Get the parameters of the retry policy for algorithm runs that run out
+    of memory. The result is None if no retry policy is configured.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    dict
+    """
+    return read_config_obj(var=METANOME_RETRY, env=env if env is not None else os.environ)
+
+
+def TRACEMEMORY(env: Optional[Dict] = None) -> bool:
+    """Get the flag that enables tracing of the memory that is allocated by
+    Python while writing the algorithm input and parsing the algorithm
+    results. Tracing slows down memory allocations and is therefore disabled
+    by default.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    bool
+    """
+    default = os.environ.get(METANOME_TRACEMEMORY, '')
+    value = env.get(METANOME_TRACEMEMORY, default) if env else default
+    return str(value).strip().lower() in ['1', 'true', 'yes']
+
+
 def VOLUME(env: Optional[Dict] = None) -> Dict:
     """Get specification for the volume that is associated with the worker that
     is used to execute the main algorithm step.
@@ -88,6 +226,9 @@ def WORKER(env: Optional[Dict] = None) -> Dict:
     """Get specification for the worker that is used to execute the main
     algorithm step using the metanome wrapper Jar-file.
 
+    If the configuration contains a list of workers the first worker in the
+    list is returned.
+
     Parameters
     ----------
     env: dict, default=None
@@ -98,16 +239,50 @@ def WORKER(env: Optional[Dict] = None) -> Dict:
     -------
     dict
     """
-    return read_config_obj(var=METANOME_WORKER, env=env if env is not None else os.environ)
+    workers = WORKERS(env=env)
+    return workers[0] if workers else None
+
+
+def WORKERS(env: Optional[Dict] = None) -> List[Dict]:
+    """Get specifications for all workers that can be used to execute the
+    main algorithm step. The worker configuration either contains a single
+    worker specification or a list of specifications. The result is an empty
+    list if no worker is configured.
+
+    Parameters
+    ----------
+    env: dict, default=None
+        Optional environment variables that override the system-wide
+        settings, default=None
+
+    Returns
+    -------
+    list of dict
+    """
+    obj = read_config_obj(var=METANOME_WORKER, env=env if env is not None else os.environ)
+    if not obj:
+        return list()
+    return list(obj) if isinstance(obj, list) else [obj]
 
 
 # -- Helper Methods -----------------------------------------------------------
 
-def read_config_obj(var: str, env: Dict) -> Dict:
+def __getattr__(name: str):
+    """Import the flowserv Docker worker specification helper on first access.
+    The helper is made available by this module for convenience but importing
+    the flowserv worker manager is expensive.
+    """
+    if name == 'Docker':
+        from flowserv.controller.worker.manager import Docker
+        return Docker
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def read_config_obj(var: str, env: Dict) -> Union[Dict, List]:
     """Read configuration object from a given environment variables.
 
-    If the variable is set and contains a dictionary as value that value is
-    returned. Otherwise, it is assumed that the variable references a Json or
+    If the variable is set and contains a dictionary (or a list) as value
+    that value is returned. Otherwise, it is assumed that the variable references a Json or
     Yaml file that contains the configuration object.
 
     Parameters
@@ -119,11 +294,12 @@ def read_config_obj(var: str, env: Dict) -> Dict:
 
     Returns
     -------
-    dict
+    dict or list
     """
     obj = env.get(var)
     if not obj:
         return None
-    if isinstance(obj, dict):
+    if isinstance(obj, (dict, list)):
         return obj
+    from flowserv.util import read_object
     return read_object(filename=obj)
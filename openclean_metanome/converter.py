@@ -7,13 +7,49 @@
 
 """Helper functions to prepare inputs and read outputs when running Metanome
 algorithms on the contents of pandas data frames.
+
+Inputs may also be given as Apache Arrow tables, record batches, or record
+batch readers (e.g., from a Parquet reader or an Arrow Flight stream). Arrow
+inputs are written directly from the Arrow buffers without converting them
+into a pandas data frame. Dictionary-encoded columns are written as their
+integer codes (see :class:`ArrowCodes`).
 """
 
+import csv
+import gzip
 import json
 import os
-import pandas as pd
+import shutil
+import sys
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import openclean_metanome.config as config
+
+# Import pandas and openclean for type checking only. Both packages are
+# imported when they are needed to keep the import time of the package low.
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    from openclean.data.stream.base import Document
+    from openclean_metanome.transport import SharedFrame
 
-from typing import Dict, List, Union
+
+"""Default number of rows that are buffered when writing a data stream."""
+BUFFER_SIZE = 10000
+
+
+"""File suffixes that identify input files in Parquet format."""
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+
+"""Number of rows in the row ranges of a data frame that are formatted in
+parallel. Data frames with at most this number of rows are formatted by a
+single process.
+"""
+CHUNK_SIZE = 100000
 
 
 def read_json(filename: str) -> Union[Dict, List]:
@@ -34,7 +70,10 @@ def read_json(filename: str) -> Union[Dict, List]:
         return json.load(f)
 
 
-def write_dataframe(df: pd.DataFrame, filename: str) -> Dict:
+def write_dataframe(
+    df: 'pd.DataFrame', filename: str, processes: Optional[int] = None,
+    chunksize: int = CHUNK_SIZE
+) -> Dict:
     """Write the given data frame to a CSV file. The column names in the
     resulting CSV file are replaced by unique names (to account for possible
     duplicate columns in the input data frame).
@@ -42,6 +81,12 @@ def write_dataframe(df: pd.DataFrame, filename: str) -> Dict:
     The created file is a standard CSV file with the default settings for
     delimiter, quote char and escape char.
 
+    If more than one process is used, large data frames are split into
+    ranges of rows that are formatted in parallel by a pool of processes. The
+    formatted ranges are written to the output file in order. The created
+    file is identical to the file that is created by formatting the whole
+    data frame at once.
+
     Returns the pmapping of unique column names to the original columns in the
     given data frame.
 
@@ -49,6 +94,14 @@ def write_dataframe(df: pd.DataFrame, filename: str) -> Dict:
     ----------
     df: pd.DataFrame
         Data frame that is written to disk.
+    filename: string
+        Path to the created CSV file.
+    processes: int, default=None
+        Number of processes for formatting row ranges in parallel. By default,
+        the number of processes is taken from the environment variable
+        METANOME_CSV_PROCESSES (one process unless the variable is set).
+    chunksize: int, default=100000
+        Number of rows in each range that is formatted in parallel.
 
     Returns
     -------
@@ -60,12 +113,17 @@ def write_dataframe(df: pd.DataFrame, filename: str) -> Dict:
         os.makedirs(dirname, exist_ok=True)
     # Create a unique list of column names and a mapping from the new uniqye
     # names to the original columns in the given data frame.
-    columns = list()
-    column_mapping = dict()
-    for colidx in range(len(df.columns)):
-        colname = 'COL{}'.format(colidx)
-        columns.append(colname)
-        column_mapping[colname] = df.columns[colidx]
+    columns, column_mapping = unique_names(df.columns)
+    processes = processes if processes else config.CSV_PROCESSES()
+    if processes > 1 and len(df) > chunksize and not has_datetimes(df):
+        write_ranges(
+            df=df,
+            filename=filename,
+            columns=columns,
+            processes=processes,
+            chunksize=chunksize
+        )
+        return column_mapping
     # Write data frame to temporary CSV file.
     df.to_csv(
         filename,
@@ -75,3 +133,759 @@ def write_dataframe(df: pd.DataFrame, filename: str) -> Dict:
     )
     # Return the created column mapping..
     return column_mapping
+
+
+def write_ranges(
+    df: 'pd.DataFrame', filename: str, columns: List[str], processes: int,
+    chunksize: int
+):
+    """Write the given data frame to a CSV file by formatting ranges of rows
+    in parallel using a pool of processes.
+
+    Ranges are formatted using the same settings as for the whole data frame.
+    The number of ranges that are submitted to the pool at any time is limited
+    to bound the memory that is used by the formatted ranges that wait to be
+    written to the output file.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Data frame that is written to disk.
+    filename: string
+        Path to the created CSV file.
+    columns: list of string
+        Column names for the file header.
+    processes: int
+        Number of processes in the pool.
+    chunksize: int
+        Number of rows in each range.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    ranges = iter(range(0, len(df), chunksize))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            pending = deque()
+            for start in ranges:
+                # Replace the column names with the unique names. Original
+                # column objects may not be serializable.
+                rows = df.iloc[start:start + chunksize].set_axis(columns, axis=1)
+                pending.append(executor.submit(format_rows, rows, start == 0))
+                if len(pending) >= 2 * processes:
+                    f.write(pending.popleft().result())
+            while pending:
+                f.write(pending.popleft().result())
+
+
+def format_rows(df: 'pd.DataFrame', header: bool) -> str:
+    """Format the rows of a data frame as CSV. This is the task that is
+    executed by the processes that format row ranges in parallel.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Range of rows in the data frame that is written to disk.
+    header: bool
+        Include the file header for the range that starts the file.
+
+    Returns
+    -------
+    string
+    """
+    return df.to_csv(None, header=header, index=False)
+
+
+def has_datetimes(df: 'pd.DataFrame') -> bool:
+    """Test if the data frame contains columns with date and time values. The
+    format for these values depends on all the values in a column (e.g., the
+    time is omitted if all values are dates). Data frames with such columns
+    cannot be formatted in independent ranges of rows.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Data frame that is written to disk.
+
+    Returns
+    -------
+    bool
+    """
+    import pandas as pd
+    for dtype in df.dtypes:
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtype = dtype.categories.dtype
+        if dtype.kind in 'mM':
+            return True
+    return False
+
+
+def write_file(source: str, filename: str) -> Dict:
+    """Prepare the input file for a Metanome algorithm from a data file on
+    disk.
+
+    Parquet files (identified by their suffix) are transcoded to CSV. All other
+    files are expected to be CSV files that contain a header row. If the header
+    of a CSV file can be used by Metanome directly (i.e., all column names are
+    unique and non-empty) the file is linked into the run directory without
+    copying the data. Otherwise, the file is rewritten with a header of unique
+    column names.
+
+    Returns the mapping of column names in the created file to the column names
+    in the schema of the source file.
+
+    Parameters
+    ----------
+    source: string
+        Path to the data file on disk.
+    filename: string
+        Path to the input file for the Metanome algorithm.
+
+    Returns
+    -------
+    dict
+    """
+    # Ensure that the parent directory for the output file exists.
+    dirname = os.path.dirname(filename)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    if source.lower().endswith(PARQUET_SUFFIXES):
+        return write_parquet(source=source, filename=filename)
+    return write_csv(source=source, filename=filename)
+
+
+def write_csv(source: str, filename: str) -> Dict:
+    """Prepare the input file for a Metanome algorithm from a CSV file.
+
+    The source file is linked into the run directory if its header can be
+    used by Metanome as is. Hard links are used since they remain valid when
+    the run directory is mounted as a volume into a container. If the file
+    cannot be linked (e.g., because the run directory is on a different file
+    system) a copy of the file is created instead. Files with duplicate or
+    empty column names and gzip-compressed files are rewritten in a streaming
+    fashion.
+
+    Parameters
+    ----------
+    source: string
+        Path to the CSV file on disk.
+    filename: string
+        Path to the input file for the Metanome algorithm.
+
+    Returns
+    -------
+    dict
+    """
+    compressed = source.lower().endswith('.gz')
+    with open_csv(source, compressed=compressed) as f:
+        header = next(csv.reader(f), [])
+    if not compressed and len(set(header)) == len(header) and all(header):
+        # The header can be used by Metanome directly. The column mapping is
+        # the identity mapping for all columns in the file.
+        try:
+            os.link(source, filename)
+        except OSError:
+            shutil.copyfile(source, filename)
+        return {name: name for name in header}
+    # Rewrite the file with unique column names.
+    columns, column_mapping = unique_names(header)
+    with open_csv(source, compressed=compressed) as fin:
+        reader = csv.reader(fin)
+        next(reader, None)
+        with open(filename, 'w', newline='', encoding='utf-8') as fout:
+            writer = csv.writer(fout, lineterminator=os.linesep)
+            writer.writerow(columns)
+            writer.writerows(reader)
+    return column_mapping
+
+
+def write_parquet(source: str, filename: str) -> Dict:
+    """Transcode a Parquet file into the CSV input file for a Metanome
+    algorithm.
+
+    The file is read one row group at a time to avoid loading the full
+    dataset into main memory. Requires the ``pyarrow`` package.
+
+    Parameters
+    ----------
+    source: string
+        Path to the Parquet file on disk.
+    filename: string
+        Path to the input file for the Metanome algorithm.
+
+    Returns
+    -------
+    dict
+    """
+    # Import pyarrow here to avoid errors for installations that do not
+    # intend to read Parquet files and therefore did not install the package.
+    import pyarrow.parquet as pq
+    pqfile = pq.ParquetFile(source)
+    columns, column_mapping = unique_names(pqfile.schema_arrow.names)
+    # The rows are terminated by os.linesep (the default for to_csv in all
+    # pandas versions). Use the same terminator for the header.
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        f.write(','.join(columns) + os.linesep)
+        for rg in range(pqfile.num_row_groups):
+            pqfile.read_row_group(rg).to_pandas().to_csv(
+                f,
+                header=False,
+                index=False,
+                compression=None
+            )
+    return column_mapping
+
+
+class RowStream(object):
+    """Data stream for an iterable of rows with a given schema. Row streams
+    allow to use any row iterator (e.g., a generator or a database cursor) as
+    the input for a Metanome algorithm.
+
+    The row stream follows the interface of openclean data streams, i.e., it
+    has a list of columns and an ``iterrows()`` method that yields pairs of
+    row index and row values.
+    """
+    def __init__(self, columns: Sequence, rows: Iterable[Sequence]):
+        """Initialize the stream schema and the row iterable.
+
+        Parameters
+        ----------
+        columns: list
+            List of column names (or openclean Column objects).
+        rows: iterable of list
+            Iterable over the data rows. Each row is a list of values, one for
+            each column in the schema.
+        """
+        self.columns = list(columns)
+        self.rows = rows
+
+    def iterrows(self) -> Iterator[Tuple[int, Sequence]]:
+        """Get an iterator over the rows in the stream. Row indexes are the
+        positions of the rows in the stream.
+
+        Returns
+        -------
+        iterator of (int, list)
+        """
+        for rowidx, row in enumerate(self.rows):
+            yield rowidx, row
+
+
+def write_stream(
+    stream: Union['Document', RowStream], filename: str, buffersize: int = BUFFER_SIZE
+) -> Dict:
+    """Write the rows from a data stream to a CSV file.
+
+    Rows are written in batches of at most ``buffersize`` rows. The stream is
+    never materialized as a whole. Missing values (None and NaN) are written
+    as empty strings, in the same way as they are written for data frames.
+
+    Returns the mapping of unique column names in the created file to the
+    columns in the stream schema.
+
+    Parameters
+    ----------
+    stream: openclean.data.stream.base.Document or RowStream
+        Data stream with a list of columns and an ``iterrows()`` method, e.g.,
+        an openclean data pipeline.
+    filename: string
+        Path to the input file for the Metanome algorithm.
+    buffersize: int, default=10000
+        Maximum number of rows that are buffered before they are written.
+
+    Returns
+    -------
+    dict
+    """
+    # Ensure that the parent directory for the output file exists.
+    dirname = os.path.dirname(filename)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    from pandas import NA
+    columns, column_mapping = unique_names(stream.columns)
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(columns)
+        buffer = list()
+        for _, row in stream.iterrows():
+            buffer.append(['' if v is None or v is NA or (isinstance(v, float) and v != v) else v for v in row])
+            if len(buffer) >= buffersize:
+                writer.writerows(buffer)
+                buffer = list()
+        writer.writerows(buffer)
+    return column_mapping
+
+
+def write_input(
+    df: Union['pd.DataFrame', str, 'Document', RowStream, 'pa.Table', 'SharedFrame'], filename: str
+) -> Dict:
+    """Materialize the input for a Metanome algorithm as a CSV file.
+
+    The input is either a pandas data frame, the path to a data file on
+    disk, a data stream (e.g., an openclean data pipeline), an Arrow table,
+    record batch, or record batch reader, a data frame in a shared segment
+    (see :mod:`openclean_metanome.transport`), or a database source (see
+    :mod:`openclean_metanome.sql`).
+
+    Returns the mapping of unique column names in the created CSV file to the
+    original columns of the input.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, openclean.data.stream.base.Document, RowStream, pa.Table, or SharedFrame
+        Input data frame, path to a CSV or Parquet file, data stream, Arrow
+        data, or shared data frame.
+    filename: string
+        Path to the created input file.
+
+    Returns
+    -------
+    dict
+    """
+    if is_arrow(df):
+        return write_arrow(source=df, filename=filename)
+    import pandas as pd
+    from openclean_metanome.sql import SQLSource, write_sql
+    from openclean_metanome.transport import SharedFrame, write_shared
+    if isinstance(df, SharedFrame):
+        return write_shared(frame=df, filename=filename)
+    elif isinstance(df, SQLSource):
+        return write_sql(source=df, filename=filename)
+    elif isinstance(df, pd.DataFrame):
+        return write_dataframe(df=df, filename=filename)
+    elif isinstance(df, (str, os.PathLike)):
+        return write_file(source=os.fspath(df), filename=filename)
+    return write_stream(stream=df, filename=filename)
+
+
+# -- Apache Arrow input -------------------------------------------------------
+
+class ArrowCodes(object):
+    """Integer codes for the values of a dictionary-encoded Arrow column.
+
+    The indices of a dictionary-encoded array are codes for the values of
+    the array. They are used as-is as long as all arrays of a column share
+    the same dictionary. Record batches of a stream (or the chunks of a
+    table) may have different dictionaries, though. The dictionary values of
+    each new dictionary are therefore mapped to the codes that were assigned
+    to them before. Only the (small) dictionaries are looked up, the indices
+    are translated using vectorized array operations.
+
+    Missing values have the code -1.
+    """
+    def __init__(self):
+        """Initialize the empty mapping of values to codes."""
+        self.codes = dict()
+        self._dictionary = None
+        self._lookup = None
+
+    def __len__(self) -> int:
+        """Get the number of distinct (non-missing) values that have been
+        assigned a code.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.codes)
+
+    def encode(self, array: 'pa.DictionaryArray') -> 'pa.Array':
+        """Get the array of codes for a dictionary-encoded array. The result
+        is the array of dictionary indices if the dictionary of the array is
+        consistent with the codes that have been assigned before. Missing
+        values are null in the returned array.
+
+        Parameters
+        ----------
+        array: pa.DictionaryArray
+            Dictionary-encoded array.
+
+        Returns
+        -------
+        pa.Array
+        """
+        import numpy as np
+        import pyarrow as pa
+        dictionary = array.dictionary
+        if self._dictionary is None or not (
+            self._dictionary is dictionary or self._dictionary.equals(dictionary)
+        ):
+            lookup = list()
+            for value in dictionary.to_pylist():
+                if value is None:
+                    lookup.append(-1)
+                else:
+                    lookup.append(self.codes.setdefault(value, len(self.codes)))
+            self._dictionary = dictionary
+            self._lookup = np.array(lookup, dtype=np.int64)
+        if np.array_equal(self._lookup, np.arange(len(self._lookup))):
+            # The dictionary indices are the codes.
+            return array.indices
+        indices = array.indices.fill_null(0).to_numpy(zero_copy_only=False)
+        codes = self._lookup[indices]
+        return pa.array(codes, mask=np.asarray(array.is_null()) | (codes < 0))
+
+    def to_numpy(self, array: 'pa.DictionaryArray') -> 'np.ndarray':
+        """Get the codes for a dictionary-encoded array as a NumPy array of
+        integers. Missing values are -1.
+
+        Parameters
+        ----------
+        array: pa.DictionaryArray
+            Dictionary-encoded array.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        import numpy as np
+        codes = self.encode(array)
+        return codes.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+
+
+def is_arrow(source) -> bool:
+    """Test if an input is an Arrow table, record batch, or record batch
+    reader. Does not import pyarrow, i.e., the result is False if pyarrow has
+    not been imported by the caller.
+
+    Parameters
+    ----------
+    source: any
+        Algorithm input.
+
+    Returns
+    -------
+    bool
+    """
+    pa = sys.modules.get('pyarrow')
+    if pa is None:
+        return False
+    return isinstance(source, (pa.Table, pa.RecordBatch, pa.RecordBatchReader))
+
+
+def record_batches(source: Union['pa.Table', 'pa.RecordBatch', 'pa.RecordBatchReader']) -> Tuple[List[str], Iterator]:
+    """Get the column names and an iterator over the record batches for an
+    Arrow input. Record batch readers are consumed by the iterator.
+
+    Parameters
+    ----------
+    source: pa.Table, pa.RecordBatch, or pa.RecordBatchReader
+        Arrow input.
+
+    Returns
+    -------
+    list of string, iterator of pa.RecordBatch
+    """
+    import pyarrow as pa
+    if isinstance(source, pa.RecordBatch):
+        return source.schema.names, iter([source])
+    elif isinstance(source, pa.Table):
+        return source.schema.names, iter(source.to_batches())
+    return source.schema.names, iter(source)
+
+
+def write_arrow(
+    source: Union['pa.Table', 'pa.RecordBatch', 'pa.RecordBatchReader'], filename: str
+) -> Dict:
+    """Write an Arrow input to a CSV file using the Arrow CSV writer. The
+    input is written one record batch at a time.
+
+    Dictionary-encoded columns are written as integer codes. The codes
+    preserve the equality of values within each column, which is all that
+    the single-table algorithms (functional dependencies and unique column
+    combinations) depend on. Missing values are written as empty strings.
+
+    Returns the mapping of unique column names in the created file to the
+    columns of the input.
+
+    Parameters
+    ----------
+    source: pa.Table, pa.RecordBatch, or pa.RecordBatchReader
+        Arrow input.
+    filename: string
+        Path to the input file for the Metanome algorithm.
+
+    Returns
+    -------
+    dict
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    # Ensure that the parent directory for the output file exists.
+    dirname = os.path.dirname(filename)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    columns, batches = record_batches(source)
+    names, column_mapping = unique_names(columns)
+    encoders = [ArrowCodes() for _ in names]
+    options = pacsv.WriteOptions(include_header=False)
+    with open(filename, 'wb') as f:
+        f.write((','.join(names) + '\n').encode('utf-8'))
+        for batch in batches:
+            arrays = list()
+            for colidx, array in enumerate(batch.columns):
+                if pa.types.is_dictionary(array.type):
+                    array = encoders[colidx].encode(array)
+                arrays.append(array)
+            batch = pa.RecordBatch.from_arrays(arrays, names=names)
+            pacsv.write_csv(batch, f, write_options=options)
+    return column_mapping
+
+
+# -- Multiple input tables ----------------------------------------------------
+
+class DictionaryEncoder(object):
+    """Encoder that replaces values by integer codes from a dictionary that is
+    shared across multiple tables. Equal values in different tables receive
+    the same code. Encoding preserves the equality of values and therefore
+    all inclusion dependencies between columns in the encoded tables. Codes
+    are usually much shorter than the encoded values which reduces the size
+    of the materialized input files and the cost of value comparisons.
+
+    Values are compared by their string representation, i.e., in the same way
+    that Metanome compares values that it reads from CSV files. Missing values
+    (None, NaN, and empty strings) are encoded as empty strings.
+    """
+    def __init__(self):
+        """Initialize the empty dictionary."""
+        self.codes = dict()
+
+    def encode(self, value) -> str:
+        """Get the code for a given value. Adds the value to the dictionary if
+        it has not been seen before.
+
+        Parameters
+        ----------
+        value: scalar
+            Value that is being encoded.
+
+        Returns
+        -------
+        string
+        """
+        from pandas import NA
+        if value is None or value is NA or (isinstance(value, float) and value != value):
+            return ''
+        key = str(value)
+        if key == '':
+            return ''
+        code = self.codes.get(key)
+        if code is None:
+            code = str(len(self.codes))
+            self.codes[key] = code
+        return code
+
+    def encode_frame(self, df: 'pd.DataFrame') -> 'pd.DataFrame':
+        """Encode all values in a given data frame. Each column is factorized
+        first so that only the distinct values of the column are looked up in
+        the dictionary.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            Data frame that is being encoded.
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        import numpy as np
+        import pandas as pd
+        data = dict()
+        for colidx in range(len(df.columns)):
+            codes, uniques = pd.factorize(df.iloc[:, colidx])
+            # Missing values have the code -1 which references the last
+            # element (the empty string) in the lookup array.
+            lookup = np.array([self.encode(v) for v in uniques] + [''], dtype=object)
+            data[colidx] = lookup[codes]
+        return pd.DataFrame(data=data)
+
+    def write_batch(self, batch: 'pa.RecordBatch', names: List[str], f):
+        """Encode all values in an Arrow record batch and write the encoded
+        batch to a CSV file (without header). Columns that are not dictionary
+        encoded are dictionary encoded first so that only the distinct values
+        of each column are looked up in the dictionary.
+
+        Parameters
+        ----------
+        batch: pa.RecordBatch
+            Record batch that is being encoded.
+        names: list of string
+            Column names for the encoded batch.
+        f: file object
+            Output file (opened in binary mode).
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pacsv
+        arrays = list()
+        for array in batch.columns:
+            if not pa.types.is_dictionary(array.type):
+                array = pc.dictionary_encode(array)
+            # Missing values reference the last element (the empty string)
+            # in the lookup array.
+            lookup = np.array([self.encode(v) for v in array.dictionary.to_pylist()] + [''], dtype=object)
+            indices = array.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            arrays.append(pa.array(lookup[indices], type=pa.string()))
+        batch = pa.RecordBatch.from_arrays(arrays, names=names)
+        pacsv.write_csv(batch, f, write_options=pacsv.WriteOptions(include_header=False))
+
+
+def write_tables(tables: Dict, dirname: str, buffersize: int = BUFFER_SIZE) -> Dict:
+    """Materialize multiple input tables for a Metanome algorithm as CSV files
+    in the given directory. All values are encoded using a dictionary that is
+    shared across all tables (see :class:`DictionaryEncoder`).
+
+    The tables are given as a dictionary that maps table names to data frames,
+    paths to CSV or Parquet files, or data streams. The created files are named
+    ``table0.csv``, ``table1.csv``, and so on.
+
+    Returns a mapping from the names of the created files (without suffix) to
+    pairs of the original table name and the mapping of unique column names
+    in the created file to the original columns of the table.
+
+    Parameters
+    ----------
+    tables: dict
+        Mapping of table names to input data frames, data files, or data
+        streams.
+    dirname: string
+        Path to the directory for the created input files.
+    buffersize: int, default=10000
+        Maximum number of rows that are buffered before they are written.
+
+    Returns
+    -------
+    dict
+    """
+    os.makedirs(dirname, exist_ok=True)
+    encoder = DictionaryEncoder()
+    result = dict()
+    for tableidx, (key, source) in enumerate(tables.items()):
+        name = 'table{}'.format(tableidx)
+        filename = os.path.join(dirname, '{}.csv'.format(name))
+        result[name] = (key, write_encoded(source, filename, encoder, buffersize))
+    return result
+
+
+def write_encoded(
+    source: Union['pd.DataFrame', str, 'Document', RowStream, 'pa.Table'], filename: str,
+    encoder: DictionaryEncoder, buffersize: int = BUFFER_SIZE
+) -> Dict:
+    """Write a dictionary-encoded copy of an input table to a CSV file.
+
+    Data frames, Parquet row groups, and Arrow record batches are encoded
+    column by column. CSV files and data streams are encoded row by row and
+    written in batches of at most ``buffersize`` rows.
+
+    Returns the mapping of unique column names in the created file to the
+    original columns of the input.
+
+    Parameters
+    ----------
+    source: pd.DataFrame, string, openclean.data.stream.base.Document, RowStream, or pa.Table
+        Input data frame, path to a CSV or Parquet file, data stream, or Arrow
+        data.
+    filename: string
+        Path to the created input file.
+    encoder: openclean_metanome.converter.DictionaryEncoder
+        Encoder for the values in the input table.
+    buffersize: int, default=10000
+        Maximum number of rows that are buffered before they are written.
+
+    Returns
+    -------
+    dict
+    """
+    import pandas as pd
+
+    def write_frames(columns, frames):
+        names, column_mapping = unique_names(columns)
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(names) + os.linesep)
+            for df in frames:
+                encoder.encode_frame(df).to_csv(f, header=False, index=False)
+        return column_mapping
+
+    def write_rows(columns, rows):
+        names, column_mapping = unique_names(columns)
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(names)
+            buffer = list()
+            for row in rows:
+                buffer.append([encoder.encode(v) for v in row])
+                if len(buffer) >= buffersize:
+                    writer.writerows(buffer)
+                    buffer = list()
+            writer.writerows(buffer)
+        return column_mapping
+
+    if is_arrow(source):
+        columns, batches = record_batches(source)
+        names, column_mapping = unique_names(columns)
+        with open(filename, 'wb') as f:
+            f.write((','.join(names) + '\n').encode('utf-8'))
+            for batch in batches:
+                encoder.write_batch(batch, names, f)
+        return column_mapping
+    elif isinstance(source, pd.DataFrame):
+        chunks = (source.iloc[i:i + buffersize] for i in range(0, len(source.index), buffersize))
+        return write_frames(source.columns, chunks)
+    elif isinstance(source, (str, os.PathLike)):
+        source = os.fspath(source)
+        if source.lower().endswith(PARQUET_SUFFIXES):
+            import pyarrow.parquet as pq
+            pqfile = pq.ParquetFile(source)
+            chunks = (pqfile.read_row_group(rg).to_pandas() for rg in range(pqfile.num_row_groups))
+            return write_frames(pqfile.schema_arrow.names, chunks)
+        with open_csv(source, compressed=source.lower().endswith('.gz')) as f:
+            reader = csv.reader(f)
+            return write_rows(next(reader, []), reader)
+    return write_rows(source.columns, (row for _, row in source.iterrows()))
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def open_csv(filename: str, compressed: bool):
+    """Open a (compressed) CSV file for reading.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the CSV file.
+    compressed: bool
+        Flag indicating whether the file is gzip-compressed.
+
+    Returns
+    -------
+    file object
+    """
+    if compressed:
+        return gzip.open(filename, 'rt', newline='', encoding='utf-8')
+    return open(filename, 'r', newline='', encoding='utf-8')
+
+
+def unique_names(columns: List) -> Tuple[List[str], Dict]:
+    """Create a list of unique column names for a given list of columns.
+
+    Returns the list of unique names and the mapping from the unique names to
+    the original columns.
+
+    Parameters
+    ----------
+    columns: list
+        List of column names in the input schema.
+
+    Returns
+    -------
+    list of string, dict
+    """
+    names = list()
+    column_mapping = dict()
+    # Access columns by index. Iterating over a pandas index may convert
+    # the column objects (e.g., openclean Column instances) into strings.
+    for colidx in range(len(columns)):
+        colname = 'COL{}'.format(colidx)
+        names.append(colname)
+        column_mapping[colname] = columns[colidx]
+    return names, column_mapping
@@ -0,0 +1,583 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Canonical cover for sets of functional dependencies.
+
+Discovery algorithms like HyFD return all minimal functional dependencies with
+a single column on the right-hand-side. For wide tables the result can contain
+a large number of dependencies, many of which are implied by the others. The
+canonical cover is an equivalent set of dependencies that is left-reduced
+(no column can be removed from a left-hand-side), non-redundant (no dependency
+is implied by the other dependencies), and in which all dependencies with the
+same left-hand-side are merged.
+
+Sets of columns are represented as bitsets. The bitsets for all left-hand-sides
+and right-hand-sides are kept in NumPy arrays of 64-bit words such that the
+closure of a set of columns is computed using vectorized operations over all
+dependencies. Most redundant dependencies are detected without computing the
+closure of their left-hand-side, by looking up the right-hand-sides of the
+subsets of the left-hand-side.
+
+The same bitset closure is used to derive the minimal unique column
+combinations (keys) from the set of all minimal functional dependencies of a
+table. A set of columns is a key if its closure contains all columns (and the
+table has no duplicate rows). Columns that are not the right-hand-side of any
+dependency are contained in every key. The minimal keys are found by a
+level-wise search over the supersets of these columns.
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, TYPE_CHECKING
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.fd import FunctionalDependency
+
+# Import numpy for type checking only. The package is imported when it is
+# needed to keep the import time of the package low.
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+
+
+"""Bit mask for a 64-bit word."""
+WORD = (1 << 64) - 1
+
+"""Maximum size of a left-hand-side for which the right-hand-sides of all its
+subsets are used to test whether a dependency is redundant.
+"""
+MAX_SUBSETS = 10
+
+
+def canonical_cover(
+    fds: List[FunctionalDependency], minimal: bool = False
+) -> List[FunctionalDependency]:
+    """Compute the canonical cover for a given set of functional dependencies.
+
+    The result contains one functional dependency for each left-hand-side.
+    Dependencies are sorted by the size of their left-hand-side and the
+    position of the columns in the order in which they first occur in the
+    given dependencies.
+
+    Parameters
+    ----------
+    fds: list of FunctionalDependency
+        Functional dependencies, e.g., the result of a discovery algorithm.
+    minimal: bool, default=False
+        Skip left-reduction of the dependencies if True. Use for dependencies
+        that are known to be minimal (e.g., the result of HyFD).
+
+    Returns
+    -------
+    list of FunctionalDependency
+    """
+    # Assign a bit position to each column.
+    columns, positions = list(), dict()
+    deps = set()
+    for fd in fds:
+        lhs = 0
+        for col in fd.lhs:
+            lhs |= 1 << position(col, columns, positions)
+        for col in fd.rhs:
+            rhs = position(col, columns, positions)
+            # Ignore trivial dependencies.
+            if not (lhs >> rhs) & 1:
+                deps.add((lhs, rhs))
+    if not deps:
+        return list()
+    if not minimal:
+        depset = DependencySet(deps=deps, width=len(columns))
+        deps = set([(left_reduce(lhs, rhs, depset), rhs) for lhs, rhs in deps])
+    depset = DependencySet(deps=deps, width=len(columns))
+    # Try to remove dependencies with large left-hand-sides first.
+    for lhs, rhs in sorted(deps, key=lambda fd: (-popcount(fd[0]), fd[0], fd[1])):
+        if depset.is_redundant(lhs, rhs):
+            depset.remove(lhs, rhs)
+    result = list()
+    for lhs, rhs in sorted(depset.merged(), key=lambda fd: (popcount(fd[0]), bits(fd[0]))):
+        fd = FunctionalDependency(
+            lhs=[columns[c] for c in bits(lhs)],
+            rhs=[columns[c] for c in bits(rhs)]
+        )
+        result.append(fd)
+    return result
+
+
+def minimal_keys(
+    fds: List[FunctionalDependency], columns: List, max_size: int = -1
+) -> List[Columns]:
+    """Derive the minimal unique column combinations of a table from the set
+    of all minimal functional dependencies of the table (e.g., the result of
+    HyFD without limits on the size of left-hand-sides).
+
+    The result is only correct if the table does not contain duplicate rows.
+    Tables with duplicate rows have no unique column combinations. Empty
+    column combinations are never returned, i.e., for tables with at most one
+    row each column is a unique column combination.
+
+    Parameters
+    ----------
+    fds: list of FunctionalDependency
+        All minimal functional dependencies of the table.
+    columns: list
+        All columns of the table.
+    max_size: int, default=-1
+        Maximum size of unique column combinations. Use -1 for no size limit.
+
+    Returns
+    -------
+    list of list
+    """
+    # Assign a bit position to each column.
+    cols, positions = list(), dict()
+    for col in columns:
+        position(col, cols, positions)
+    deps = set()
+    derived = 0
+    for fd in fds:
+        lhs = 0
+        for col in fd.lhs:
+            lhs |= 1 << position(col, cols, positions)
+        for col in fd.rhs:
+            rhs = position(col, cols, positions)
+            # Ignore trivial dependencies.
+            if not (lhs >> rhs) & 1:
+                deps.add((lhs, rhs))
+                derived |= 1 << rhs
+    full = (1 << len(cols)) - 1
+    depset = DependencySet(deps=deps, width=len(cols)) if deps else None
+
+    def is_key(value: int) -> bool:
+        return value == full or (depset is not None and depset.closure(value) == full)
+
+    # Columns that are not derived from other columns are in every key.
+    core = full & ~derived
+    if core and is_key(core):
+        keys = [core] if max_size <= 0 or popcount(core) <= max_size else list()
+    else:
+        keys = key_lattice(
+            core=core,
+            candidates=[c for c in range(len(cols)) if (derived >> c) & 1],
+            is_key=is_key,
+            max_size=max_size
+        )
+    return [[cols[c] for c in bits(key)] for key in sorted(keys, key=lambda k: (popcount(k), bits(k)))]
+
+
+class DependencySet(object):
+    """Set of functional dependencies that supports testing whether a column
+    is contained in the closure of a set of columns.
+
+    Dependencies with the same left-hand-side are merged into a single entry.
+    The left-hand-sides and right-hand-sides of all entries are maintained as
+    bitsets in NumPy arrays with one row for each 64-bit word and one column
+    for each entry. In addition, the left-hand-sides of the dependencies for
+    each right-hand-side column are maintained in separate arrays.
+
+    Dependencies can be removed from the set. Entries whose right-hand-side
+    becomes empty are removed from the arrays once they make up a larger
+    fraction of all entries.
+    """
+    def __init__(self, deps: Iterable[Tuple[int, int]], width: int):
+        """Initialize the arrays for the given dependencies.
+
+        Parameters
+        ----------
+        deps: iterable of (int, int)
+            Pairs of left-hand-side bitset and right-hand-side column.
+        width: int
+            Number of columns.
+        """
+        import numpy as np
+        self.words = (width + 63) // 64
+        # Merged right-hand-sides for all left-hand-sides.
+        self.deps = dict()
+        # Left-hand-sides for each right-hand-side column.
+        by_rhs = dict()
+        for lhs, rhs in deps:
+            self.deps[lhs] = self.deps.get(lhs, 0) | (1 << rhs)
+            by_rhs.setdefault(rhs, list()).append(lhs)
+        self.by_rhs = dict()
+        for rhs, lhs_list in by_rhs.items():
+            self.by_rhs[rhs] = (
+                {lhs: i for i, lhs in enumerate(lhs_list)},
+                to_array(lhs_list, self.words),
+                np.ones(len(lhs_list), dtype=bool)
+            )
+        self._arrays()
+
+    def closure(self, columns: int) -> int:
+        """Get the closure of a set of columns. In each iteration the
+        right-hand-sides of all dependencies whose left-hand-side is contained
+        in the current closure are added to the closure until the closure
+        does not change.
+
+        Parameters
+        ----------
+        columns: int
+            Bitset for the set of columns.
+
+        Returns
+        -------
+        int
+        """
+        import numpy as np
+        c = to_words(columns | self.deps.get(columns, 0), self.words)
+        while True:
+            fire = subsets(self.lhs, c)
+            closure = [
+                c[i] | int(np.bitwise_or.reduce(self.rhs[i][fire], initial=0))
+                for i in range(self.words)
+            ]
+            if closure == c:
+                return sum([word << (64 * i) for i, word in enumerate(c)])
+            c = closure
+
+    def derives(self, columns: int, target: int) -> bool:
+        """Test if the target column is contained in the closure of the
+        given set of columns.
+
+        The test first checks whether the target column can be derived in
+        two steps: (i) adding the right-hand-sides of the set of columns and
+        all its subsets, and (ii) applying a dependency for the target column.
+        The empty set is a subset of every set of columns, i.e., dependencies
+        with an empty left-hand-side (constant columns) are always applied.
+        Only if this fails the closure is computed iteratively. In each
+        iteration the right-hand-sides of all dependencies whose
+        left-hand-side is contained in the current closure are added to the
+        closure. The computation stops as soon as the target column is
+        contained in the closure or the closure does not change.
+
+        Parameters
+        ----------
+        columns: int
+            Bitset for the set of columns.
+        target: int
+            Target column.
+
+        Returns
+        -------
+        bool
+        """
+        import numpy as np
+        if target not in self.by_rhs:
+            return False
+        c = columns | self.deps.get(columns, 0) | self.deps.get(0, 0)
+        if popcount(columns) <= MAX_SUBSETS:
+            for sub in proper_subsets(columns):
+                c |= self.deps.get(sub, 0)
+        if (c >> target) & 1:
+            return True
+        _, lhs_arr, alive = self.by_rhs[target]
+        if (subsets(lhs_arr, to_words(c, self.words)) & alive).any():
+            return True
+        c = to_words(columns, self.words)
+        while True:
+            fire = subsets(self.lhs, c)
+            closure = [
+                c[i] | int(np.bitwise_or.reduce(self.rhs[i][fire], initial=0))
+                for i in range(self.words)
+            ]
+            if (closure[target // 64] >> (target % 64)) & 1:
+                return True
+            if closure == c:
+                return False
+            c = closure
+
+    def is_redundant(self, lhs: int, rhs: int) -> bool:
+        """Test if a dependency is implied by the other dependencies in the
+        set.
+
+        Parameters
+        ----------
+        lhs: int
+            Bitset for the left-hand-side of the dependency.
+        rhs: int
+            Right-hand-side column of the dependency.
+
+        Returns
+        -------
+        bool
+        """
+        # Remove the dependency temporarily and test whether the right-hand
+        # side column is still derived from the left-hand-side.
+        self._set(lhs, rhs, False)
+        try:
+            return self.derives(lhs, rhs)
+        finally:
+            self._set(lhs, rhs, True)
+
+    def merged(self) -> List[Tuple[int, int]]:
+        """Get the list of remaining dependencies with merged right-hand
+        sides.
+
+        Returns
+        -------
+        list of (int, int)
+        """
+        return [(lhs, rhs) for lhs, rhs in self.deps.items() if rhs]
+
+    def remove(self, lhs: int, rhs: int):
+        """Remove a dependency from the set.
+
+        Parameters
+        ----------
+        lhs: int
+            Bitset for the left-hand-side of the dependency.
+        rhs: int
+            Right-hand-side column of the dependency.
+        """
+        self._set(lhs, rhs, False)
+        if not self.deps[lhs]:
+            del self.deps[lhs]
+            self._empty += 1
+            if self._empty * 4 > len(self.index):
+                self._arrays()
+
+    def _arrays(self):
+        """Create the arrays for the left-hand-sides and right-hand-sides of
+        all entries with a non-empty right-hand-side.
+        """
+        self.index = {lhs: i for i, lhs in enumerate(self.deps)}
+        self.lhs = to_array(list(self.deps.keys()), self.words)
+        self.rhs = to_array(list(self.deps.values()), self.words)
+        self._empty = 0
+
+    def _set(self, lhs: int, rhs: int, value: bool):
+        """Add or remove the right-hand-side column for an entry in the set.
+
+        Parameters
+        ----------
+        lhs: int
+            Bitset for the left-hand-side of the dependency.
+        rhs: int
+            Right-hand-side column of the dependency.
+        value: bool
+            Add the column if True and remove it otherwise.
+        """
+        import numpy as np
+        index, _, alive = self.by_rhs[rhs]
+        alive[index[lhs]] = value
+        word, row = self.rhs[rhs // 64], self.index[lhs]
+        if value:
+            self.deps[lhs] |= 1 << rhs
+            word[row] |= np.uint64(1 << (rhs % 64))
+        else:
+            self.deps[lhs] &= ~(1 << rhs)
+            word[row] &= np.uint64(~(1 << (rhs % 64)) & WORD)
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def bits(value: int) -> List[int]:
+    """Get the positions of the bits that are set in a bitset.
+
+    Parameters
+    ----------
+    value: int
+        Bitset.
+
+    Returns
+    -------
+    list of int
+    """
+    result = list()
+    pos = 0
+    while value:
+        if value & 1:
+            result.append(pos)
+        value >>= 1
+        pos += 1
+    return result
+
+
+def key_lattice(
+    core: int, candidates: List[int], is_key: Callable, max_size: int = -1
+) -> List[int]:
+    """Find the minimal keys that contain a given set of columns by a
+    level-wise search over the sets of candidate columns that are added to
+    the given set. A set of candidate columns is only considered if none of
+    its subsets yields a key.
+
+    Parameters
+    ----------
+    core: int
+        Bitset for the columns that are contained in every key.
+    candidates: list of int
+        Positions of the columns that are added to the core columns.
+    is_key: callable
+        Test whether a bitset is a key.
+    max_size: int, default=-1
+        Maximum size of keys. Use -1 for no size limit.
+
+    Returns
+    -------
+    list of int
+    """
+    keys = list()
+    level = [(c,) for c in candidates]
+    size = popcount(core) + 1
+    while level and (max_size <= 0 or size <= max_size):
+        nonkeys = list()
+        for cols in level:
+            value = core
+            for c in cols:
+                value |= 1 << c
+            if is_key(value):
+                keys.append(value)
+            else:
+                nonkeys.append(cols)
+        violated = set(nonkeys)
+        level = list()
+        for cols in nonkeys:
+            for c in candidates[candidates.index(cols[-1]) + 1:]:
+                cand = cols + (c,)
+                if all([cand[:i] + cand[i + 1:] in violated for i in range(len(cand) - 1)]):
+                    level.append(cand)
+        size += 1
+    return keys
+
+
+def left_reduce(lhs: int, rhs: int, deps: DependencySet) -> int:
+    """Remove extraneous columns from the left-hand-side of a dependency.
+    The left-hand-side may be reduced to the empty set if the right-hand-side
+    column is constant.
+
+    Parameters
+    ----------
+    lhs: int
+        Bitset for the left-hand-side of the dependency.
+    rhs: int
+        Right-hand-side column of the dependency.
+    deps: openclean_metanome.cover.DependencySet
+        Set of functional dependencies.
+
+    Returns
+    -------
+    int
+    """
+    for col in bits(lhs):
+        reduced = lhs & ~(1 << col)
+        if deps.derives(reduced, rhs):
+            lhs = reduced
+    return lhs
+
+
+def popcount(value: int) -> int:
+    """Get the number of bits that are set in a bitset.
+
+    Parameters
+    ----------
+    value: int
+        Bitset.
+
+    Returns
+    -------
+    int
+    """
+    return bin(value).count('1')
+
+
+def position(column, columns: List, positions: Dict) -> int:
+    """Get the bit position for a column. Columns are identified by their
+    name and their identifier (for openclean columns). New columns are
+    appended to the list of columns.
+
+    Parameters
+    ----------
+    column: string or openclean.data.types.Column
+        Column in a functional dependency.
+    columns: list
+        List of columns in the order of their bit positions.
+    positions: dict
+        Mapping of column keys to bit positions.
+
+    Returns
+    -------
+    int
+    """
+    key = (getattr(column, 'colid', None), column)
+    pos = positions.get(key)
+    if pos is None:
+        pos = len(columns)
+        positions[key] = pos
+        columns.append(column)
+    return pos
+
+
+def proper_subsets(value: int) -> Iterator[int]:
+    """Generate all non-empty proper subsets of a bitset.
+
+    Parameters
+    ----------
+    value: int
+        Bitset.
+
+    Returns
+    -------
+    iterator of int
+    """
+    sub = (value - 1) & value
+    while sub:
+        yield sub
+        sub = (sub - 1) & value
+
+
+def subsets(arr: 'np.ndarray', c: List[int]) -> 'np.ndarray':
+    """Get a boolean mask for the bitsets in an array that are subsets of
+    the given bitset.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+        Array of bitsets with one row for each word.
+    c: list of int
+        Words of the bitset.
+
+    Returns
+    -------
+    np.ndarray
+    """
+    import numpy as np
+    missing = arr[0] & np.uint64(~c[0] & WORD)
+    for i in range(1, len(c)):
+        missing |= arr[i] & np.uint64(~c[i] & WORD)
+    return missing == 0
+
+
+def to_array(values: List[int], words: int) -> 'np.ndarray':
+    """Convert a list of bitsets into an array of 64-bit words. The array has
+    one row for each word and one column for each bitset.
+
+    Parameters
+    ----------
+    values: list of int
+        Bitsets.
+    words: int
+        Number of words for each bitset.
+
+    Returns
+    -------
+    np.ndarray
+    """
+    import numpy as np
+    arr = np.array([to_words(value, words) for value in values], dtype=np.uint64)
+    return np.ascontiguousarray(arr.reshape(len(values), words).T)
+
+
+def to_words(value: int, words: int) -> List[int]:
+    """Split a bitset into a list of 64-bit words.
+
+    Parameters
+    ----------
+    value: int
+        Bitset.
+    words: int
+        Number of words.
+
+    Returns
+    -------
+    list of int
+    """
+    return [(value >> (64 * i)) & WORD for i in range(words)]
@@ -5,13 +5,23 @@
 # openclean is released under the Revised BSD License. See file LICENSE for
 # full license details.
 
-"""Helper function to download the Metanome.jar file tha is hosted on Zenodo."""
+"""Helper function to download the Metanome.jar file tha is hosted on Zenodo.
+
+Downloads are written to a temporary file that is renamed to the destination
+file only after the checksum of the downloaded content has been verified. An
+interrupted download is resumed using HTTP range requests. A lock file
+ensures that concurrent processes that download to the same destination
+fetch the file only once.
+"""
 
 from refdata.base import DatasetDescriptor
-from refdata.store.base import download_file
-from typing import Optional
+from typing import Optional, Tuple
 
+import hashlib
 import os
+import tempfile
+import threading
+import time
 
 import openclean_metanome.config as config
 
@@ -24,7 +34,26 @@ JARFILE = DatasetDescriptor({
 })
 
 
-def download_jar(dst: Optional[str] = None, verbose: Optional[bool] = True):
+"""Default values for download parameters."""
+# Size of downloaded chunks in bytes.
+CHUNK_SIZE = 1024 * 1024
+# Number of attempts to resume an interrupted download.
+RETRIES = 3
+# Number of seconds to wait before the first retry. The wait time doubles
+# with every further attempt.
+BACKOFF = 1
+# Connect and read timeout for download requests in seconds. The read timeout
+# is the maximum time between two bytes that are received from the server.
+TIMEOUT = (10, 60)
+# Number of seconds without a refresh after which a lock file is considered
+# stale.
+LOCK_TIMEOUT = 600
+
+
+def download_jar(
+    dst: Optional[str] = None, verbose: Optional[bool] = True,
+    mirror: Optional[str] = None
+):
     """Download the Metanome.jar file.
 
     The file will be stored at the given destination. If no destination is
@@ -32,6 +61,14 @@ def download_jar(dst: Optional[str] = None, verbose: Optional[bool] = True):
     the ``config.JARFILE()`` method.
 
     The file will only be downloaded if the destination file does not exist.
+    Since the destination file is only created after the checksum of the
+    downloaded file was verified, an existing file is always complete.
+
+    If a mirror directory is given (or defined via the environment variable
+    *METANOME_JARMIRROR*) the file is downloaded into the mirror directory
+    first (if it is not there yet) and then copied to the destination. This
+    allows a set of machines that share a file system to download the file
+    only once.
 
     Parameters
     ----------
@@ -39,12 +76,259 @@ def download_jar(dst: Optional[str] = None, verbose: Optional[bool] = True):
         Target pathname for the downloaded file.
     verbose: bool, default=True
         Print downloaded file target path if True.
+    mirror: str, default=None
+        Path to a shared directory that contains a copy of the jar file.
     """
     dst = dst if dst else config.JARFILE()
+    mirror = mirror if mirror else config.JARMIRROR()
     if verbose:
         print('download jar file as {}'.format(dst))
     if os.path.exists(dst):
         if verbose:
             print('file exists')
         return
-    download_file(dataset=JARFILE, dst=dst)
+    if mirror:
+        # Download the file into the mirror directory (unless it exists) and
+        # create a copy at the destination.
+        mirror_file = os.path.join(mirror, JARFILE.identifier)
+        fetch_file(url=JARFILE.url, dst=mirror_file, checksum=JARFILE.checksum)
+        copy_file(src=mirror_file, dst=dst, checksum=JARFILE.checksum)
+    else:
+        fetch_file(url=JARFILE.url, dst=dst, checksum=JARFILE.checksum)
+
+
+def fetch_file(
+    url: str, dst: str, checksum: str, chunk_size: Optional[int] = CHUNK_SIZE,
+    retries: Optional[int] = RETRIES, lock_timeout: Optional[float] = LOCK_TIMEOUT,
+    timeout: Optional[Tuple[float, float]] = TIMEOUT, backoff: Optional[float] = BACKOFF
+):
+    """Download the file at the given Url to the destination path.
+
+    The file is downloaded to a temporary file ``<dst>.part``. If the temporary
+    file exists from a previous interrupted download, the download is resumed
+    using a HTTP range request. The SHA-256 checksum of the file is computed
+    during download. The temporary file is renamed to the destination file
+    only if the checksum matches the expected value. Otherwise, the temporary
+    file is removed and a ValueError is raised. Partial downloads are kept
+    if the download fails with a connection error (or times out) so that they
+    can be resumed later. Failed attempts are retried after an exponentially
+    increasing wait time.
+
+    Concurrent downloads to the same destination are synchronized using a
+    lock file. If the destination file exists after the lock was acquired the
+    file is not downloaded again.
+
+    Parameters
+    ----------
+    url: string
+        Url of the downloaded file.
+    dst: string
+        Path to the destination file.
+    checksum: string
+        Expected SHA-256 checksum for the downloaded file.
+    chunk_size: int, default=1048576
+        Number of bytes that are read at a time.
+    retries: int, default=3
+        Number of attempts to resume the download if the connection fails.
+    lock_timeout: float, default=600
+        Number of seconds after which a lock file is considered stale.
+    timeout: tuple of float, default=(10, 60)
+        Connect and read timeout for download requests in seconds.
+    backoff: float, default=1
+        Number of seconds to wait before the first retry.
+
+    Raises
+    ------
+    ValueError
+    """
+    # Import requests here to keep the import time of the module low.
+    import requests
+    dirname = os.path.dirname(dst)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    tmpfile = '{}.part'.format(dst)
+    with FileLock(filename='{}.lock'.format(dst), timeout=lock_timeout):
+        # Another process may have downloaded the file while we were waiting
+        # for the lock.
+        if os.path.exists(dst):
+            return
+        attempt = 0
+        while True:
+            try:
+                digest = download_part(url=url, filename=tmpfile, chunk_size=chunk_size, timeout=timeout)
+                break
+            except requests.exceptions.RequestException:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                time.sleep(backoff * 2 ** (attempt - 1))
+        if digest != checksum:
+            os.remove(tmpfile)
+            raise ValueError("checksum mismatch for '{}'".format(url))
+        os.replace(tmpfile, dst)
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+class FileLock(object):
+    """Lock that is implemented as a file that is created exclusively. The
+    lock is used as a context manager. Lock files that are older than the
+    given timeout are considered stale and are removed.
+
+    While the lock is held, a background thread refreshes the modification
+    time of the lock file several times per timeout period. A lock only
+    becomes stale if its holder stops refreshing it (e.g., because the
+    process died), and not because the download takes longer than the
+    timeout.
+    """
+    def __init__(self, filename: str, timeout: float, interval: Optional[float] = 0.1):
+        """Initialize the lock file path and the timeout parameters.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the lock file.
+        timeout: float
+            Number of seconds after which the lock is considered stale.
+        interval: float, default=0.1
+            Number of seconds to wait between attempts to acquire the lock.
+        """
+        self.filename = filename
+        self.timeout = timeout
+        self.interval = interval
+        # Thread that refreshes the lock file while the lock is held.
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def __enter__(self):
+        """Create the lock file. Waits until the lock file can be created."""
+        while True:
+            try:
+                os.close(os.open(self.filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                if self.timeout > 0:
+                    self._stop.clear()
+                    self._heartbeat = threading.Thread(target=self.refresh, daemon=True)
+                    self._heartbeat.start()
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.filename) > self.timeout:
+                        os.remove(self.filename)
+                        continue
+                except OSError:
+                    # The lock was released in the meantime.
+                    continue
+                time.sleep(self.interval)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop refreshing the lock file and remove it."""
+        if self._heartbeat is not None:
+            self._stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+    def refresh(self):
+        """Update the modification time of the lock file until the lock is
+        released.
+        """
+        while not self._stop.wait(self.timeout / 4):
+            try:
+                os.utime(self.filename)
+            except OSError:
+                pass
+
+
+def copy_file(src: str, dst: str, checksum: Optional[str] = None, chunk_size: Optional[int] = CHUNK_SIZE):
+    """Copy a file from the mirror directory to its destination. The copy is
+    written to a unique temporary file first that is then renamed to the
+    destination file. If a checksum is given, the copy is only renamed if the
+    SHA-256 checksum of the copied content matches. Otherwise, a ValueError
+    is raised.
+
+    Parameters
+    ----------
+    src: string
+        Path to the source file.
+    dst: string
+        Path to the destination file.
+    checksum: string, default=None
+        Expected SHA-256 checksum for the copied file.
+    chunk_size: int, default=1048576
+        Number of bytes that are copied at a time.
+
+    Raises
+    ------
+    ValueError
+    """
+    dirname = os.path.dirname(os.path.abspath(dst))
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmpfile = tempfile.mkstemp(dir=dirname, suffix='.part')
+    os.close(fd)
+    try:
+        sha256 = hashlib.sha256()
+        with open(src, 'rb') as fin, open(tmpfile, 'wb') as fout:
+            for chunk in iter(lambda: fin.read(chunk_size), b''):
+                fout.write(chunk)
+                sha256.update(chunk)
+        if checksum is not None and sha256.hexdigest() != checksum:
+            raise ValueError("checksum mismatch for '{}'".format(src))
+        os.replace(tmpfile, dst)
+    except Exception:
+        os.remove(tmpfile)
+        raise
+
+
+def download_part(
+    url: str, filename: str, chunk_size: int, timeout: Optional[Tuple[float, float]] = TIMEOUT
+) -> str:
+    """Download the file at the given Url. Appends to the given file if it
+    exists using a HTTP range request. Truncates the file if the server does
+    not support range requests.
+
+    Returns the SHA-256 checksum of the file. The checksum is computed while
+    the data is downloaded.
+
+    Parameters
+    ----------
+    url: string
+        Url of the downloaded file.
+    filename: string
+        Path to the (partially) downloaded file.
+    chunk_size: int
+        Number of bytes that are read at a time.
+    timeout: tuple of float, default=(10, 60)
+        Connect and read timeout for the request in seconds.
+
+    Returns
+    -------
+    string
+    """
+    import requests
+    # Compute the checksum for the previously downloaded part of the file.
+    sha256 = hashlib.sha256()
+    offset = 0
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha256.update(chunk)
+                offset += len(chunk)
+    headers = {'Range': 'bytes={}-'.format(offset)} if offset else None
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416:
+            # The requested range is not satisfiable. This is the case if the
+            # file has been downloaded completely before.
+            return sha256.hexdigest()
+        r.raise_for_status()
+        if offset and r.status_code != 206:
+            # The server ignored the range request and sends the full file.
+            sha256 = hashlib.sha256()
+            offset = 0
+        with open(filename, 'ab' if offset else 'wb') as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                sha256.update(chunk)
+    return sha256.hexdigest()
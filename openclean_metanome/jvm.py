@@ -0,0 +1,433 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""In-process engine that runs the Metanome algorithms in a Java virtual
+machine that is embedded into the Python process.
+
+The engine uses the JPype bridge (``pip install openclean-metanome[jvm]``) to
+start a JVM with ``Metanome.jar`` on its class path. The JVM is started once
+and is shared by all engines in the process (JPype does not support
+restarting the JVM). Algorithms are run by calling the Metanome algorithm
+interface of HyFD and HyUCC directly:
+
+- The input table is dictionary-encoded into a NumPy matrix of integer codes
+  (with -1 for missing values). The algorithms read the codes through a
+  Python implementation of the Metanome ``RelationalInput`` interface. Both
+  algorithms only compare values for equality, i.e., the codes are passed as
+  (cached) Java strings instead of the original values.
+- Discovered dependencies are passed to Python implementations of the
+  Metanome result receiver interfaces that convert them into tuples of column
+  indexes.
+
+The engine does not write the input to a CSV file and does not parse a JSON
+result file. There is no subprocess and no run directory. The engine is
+intended for interactive use on tables that fit into memory. Resource
+accounting, progress events, and retries are not available for the engine.
+
+.. code-block:: python
+
+    from openclean_metanome.jvm import JVMEngine
+
+    engine = JVMEngine(jvm_options=['-Xmx4g'])
+    fds = engine.hyfd(df, max_lhs_size=3)
+    uccs = engine.hyucc(df)
+"""
+
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+import threading
+
+from openclean.data.types import Columns
+from openclean.profiling.constraints.fd import FunctionalDependency
+from openclean_metanome.partition import factorize, read_frame
+
+import openclean_metanome.config as config
+
+# Import numpy, pandas and openclean data streams for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    import pandas as pd
+    from openclean.data.stream.base import Document
+
+
+"""Java classes of the Metanome algorithms and interfaces."""
+HYFD_CLASS = 'de.metanome.algorithms.hyfd.HyFD'
+HYUCC_CLASS = 'de.metanome.algorithms.hyucc.HyUCC'
+FD_RECEIVER = 'de.metanome.algorithm_integration.result_receiver.FunctionalDependencyResultReceiver'
+INPUT = 'de.metanome.algorithm_integration.input.RelationalInput'
+INPUT_GENERATOR = 'de.metanome.algorithm_integration.input.RelationalInputGenerator'
+UCC_RECEIVER = 'de.metanome.algorithm_integration.result_receiver.UniqueColumnCombinationResultReceiver'
+
+"""Name of the relation that is passed to the algorithms."""
+RELATION_NAME = 'table'
+
+
+"""Lock for starting the JVM and for creating the interface implementations.
+The implementations are created once after the JVM was started.
+"""
+_lock = threading.Lock()
+_proxies = None
+
+
+class JVMEngine(object):
+    """Engine for running HyFD and HyUCC in a JVM that is embedded into the
+    Python process. The JVM is started when the first algorithm is run.
+    """
+    def __init__(
+        self, jar: Optional[str] = None, jvm_options: Optional[List[str]] = None,
+        env: Optional[Dict] = None
+    ):
+        """Initialize the path to the Metanome.jar file and the options for
+        the JVM. The options are ignored if the JVM has already been started.
+
+        Parameters
+        ----------
+        jar: string, default=None
+            Path to the Metanome.jar file. By default, the jar file from the
+            configuration is used.
+        jvm_options: list of string, default=None
+            Options for starting the JVM (e.g., ``['-Xmx4g']``).
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None.
+        """
+        self.jar = jar if jar is not None else config.JARFILE(env=env)
+        self.jvm_options = jvm_options if jvm_options is not None else list()
+
+    def hyfd(
+        self, df: Union['pd.DataFrame', str, 'Document'], max_lhs_size: int = -1,
+        input_row_limit: int = -1, validate_parallel: bool = False,
+        memory_guardian: bool = True, null_equals_null: bool = True
+    ) -> List[FunctionalDependency]:
+        """Run the HyFD algorithm on the given data frame.
+
+        Parameters
+        ----------
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, data stream, or
+            Arrow data.
+        max_lhs_size: int, default=-1
+            Defines the maximum size of the left-hand-side for discovered FDs.
+            Use -1 to ignore size limits on FDs.
+        input_row_limit: int, default=-1
+            Limit the number of rows from the input that are being used for
+            functional dependency discovery. Use -1 for all rows.
+        validate_parallel: bool, default=False
+            If true the algorithm will use multiple threads.
+        memory_guardian: bool, default=True
+            Activate the memory guarding to prevent out of memory errors.
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+
+        Returns
+        -------
+        list of FunctionalDependency
+        """
+        columns, codes = encode_codes(df)
+        fds = self.discover(
+            algorithm=HYFD_CLASS,
+            codes=codes,
+            booleans={
+                'NULL_EQUALS_NULL': null_equals_null,
+                'VALIDATE_PARALLEL': validate_parallel,
+                'ENABLE_MEMORY_GUARDIAN': memory_guardian
+            },
+            integers={'MAX_DETERMINANT_SIZE': max_lhs_size, 'INPUT_ROW_LIMIT': input_row_limit}
+        )
+        return [
+            FunctionalDependency(lhs=[columns[c] for c in lhs], rhs=[columns[rhs]])
+            for lhs, rhs in sorted(fds, key=lambda fd: (len(fd[0]), fd[0], fd[1]))
+        ]
+
+    def hyucc(
+        self, df: Union['pd.DataFrame', str, 'Document'], max_ucc_size: int = -1,
+        input_row_limit: int = -1, validate_parallel: bool = False,
+        memory_guardian: bool = True, null_equals_null: bool = True
+    ) -> List[Columns]:
+        """Run the HyUCC algorithm on the given data frame.
+
+        Parameters
+        ----------
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, data stream, or
+            Arrow data.
+        max_ucc_size: int, default=-1
+            Maximum size of unique column combinations. Use -1 to return all
+            discovered unique column combinations.
+        input_row_limit: int, default=-1
+            Limit the number of rows from the input that are being used for
+            unique column combination discovery. Use -1 for all rows.
+        validate_parallel: bool, default=False
+            If true the algorithm will use multiple threads.
+        memory_guardian: bool, default=True
+            Activate the memory guarding to prevent out of memory errors.
+        null_equals_null: bool, default=True
+            Result value when comparing two NULL values.
+
+        Returns
+        -------
+        list of list
+        """
+        columns, codes = encode_codes(df)
+        uccs = self.discover(
+            algorithm=HYUCC_CLASS,
+            codes=codes,
+            booleans={
+                'NULL_EQUALS_NULL': null_equals_null,
+                'VALIDATE_PARALLEL': validate_parallel,
+                'ENABLE_MEMORY_GUARDIAN': memory_guardian
+            },
+            integers={'MAX_UCC_SIZE': max_ucc_size, 'INPUT_ROW_LIMIT': input_row_limit}
+        )
+        return [[columns[c] for c in ucc] for ucc in sorted(uccs, key=lambda u: (len(u), u))]
+
+    def discover(
+        self, algorithm: str, codes: 'np.ndarray', booleans: Dict[str, bool],
+        integers: Dict[str, int]
+    ) -> List:
+        """Run a Metanome algorithm on a matrix of dictionary codes. Returns
+        the discovered dependencies as tuples of column indexes, i.e., pairs
+        of a left-hand-side tuple and a right-hand-side index for functional
+        dependencies and tuples of column indexes for unique column
+        combinations.
+
+        Parameters
+        ----------
+        algorithm: string
+            Name of the Java class of the algorithm.
+        codes: np.ndarray
+            Matrix with the codes for each row and column (-1 for missing
+            values).
+        booleans: dict
+            Boolean configuration values by identifier.
+        integers: dict
+            Integer configuration values by identifier.
+
+        Returns
+        -------
+        list
+        """
+        import jpype
+        proxies = start(jar=self.jar, jvm_options=self.jvm_options)
+        algo_class = jpype.JClass(algorithm)
+        algo = algo_class()
+        generator = proxies.InputGenerator(codes)
+        algo.setRelationalInputConfigurationValue(algo_class.Identifier.INPUT_GENERATOR.name(), generator)
+        for key, value in booleans.items():
+            algo.setBooleanConfigurationValue(getattr(algo_class.Identifier, key).name(), jpype.JBoolean(value))
+        for key, value in integers.items():
+            algo.setIntegerConfigurationValue(getattr(algo_class.Identifier, key).name(), jpype.JInt(value))
+        receiver = proxies.FDReceiver() if algorithm == HYFD_CLASS else proxies.UCCReceiver()
+        algo.setResultReceiver(receiver)
+        algo.execute()
+        return receiver.result
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def column_index(identifier) -> int:
+    """Get the index of a column from a Metanome column identifier. Columns
+    are passed to the algorithms with their index as the column name.
+
+    Parameters
+    ----------
+    identifier: de.metanome.algorithm_integration.ColumnIdentifier
+        Column identifier in a discovered dependency.
+
+    Returns
+    -------
+    int
+    """
+    return int(str(identifier.getColumnIdentifier()))
+
+
+def encode_codes(df: Union['pd.DataFrame', str, 'Document']) -> Tuple[List, 'np.ndarray']:
+    """Get the list of columns and the matrix of dictionary codes for a given
+    table. The matrix has one row for each row in the table. Missing values
+    are encoded as -1.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, or openclean.data.stream.base.Document
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow data.
+
+    Returns
+    -------
+    list, np.ndarray
+    """
+    import numpy as np
+    df = read_frame(df)
+    # Access columns by index. Iterating over a pandas index may convert
+    # the column objects (e.g., openclean Column instances) into strings.
+    columns = [df.columns[i] for i in range(len(df.columns))]
+    codes = np.full((len(df.index), len(columns)), -1, dtype=np.int64)
+    for colidx in range(len(columns)):
+        codes[:, colidx] = factorize(df.iloc[:, colidx].to_numpy()).codes
+    return columns, codes
+
+
+def input_proxies() -> type:
+    """Create the Python implementations of the Metanome input interfaces.
+    Returns the class that implements the input generator. Requires a
+    running JVM.
+
+    Returns
+    -------
+    type
+    """
+    import jpype
+
+    JString = jpype.JClass('java.lang.String')
+    Arrays = jpype.JClass('java.util.Arrays')
+
+    @jpype.JImplements(INPUT)
+    class Input(object):
+        """Iterator over the rows of a code matrix. Each row is returned as a
+        list of Java strings (or null for missing values).
+        """
+        def __init__(self, codes, vocabulary):
+            self.codes = codes
+            self.vocabulary = vocabulary
+            self.names = jpype.JClass('java.util.ArrayList')()
+            for i in range(codes.shape[1]):
+                self.names.add(JString(str(i)))
+            self.pos = 0
+
+        @jpype.JOverride
+        def hasNext(self):
+            return self.pos < self.codes.shape[0]
+
+        @jpype.JOverride
+        def next(self):
+            row = self.codes[self.pos].tolist()
+            self.pos += 1
+            return Arrays.asList(jpype.JArray(JString)([self.vocabulary[c] if c >= 0 else None for c in row]))
+
+        @jpype.JOverride
+        def numberOfColumns(self):
+            return self.codes.shape[1]
+
+        @jpype.JOverride
+        def relationName(self):
+            return RELATION_NAME
+
+        @jpype.JOverride
+        def columnNames(self):
+            return self.names
+
+        @jpype.JOverride
+        def close(self):
+            pass
+
+    @jpype.JImplements(INPUT_GENERATOR)
+    class InputGenerator(object):
+        """Generator for iterators over a code matrix. The Java strings for
+        the codes are created once and shared by all iterators.
+        """
+        def __init__(self, codes):
+            self.codes = codes
+            size = int(codes.max()) + 1 if codes.size else 0
+            self.vocabulary = [JString(str(i)) for i in range(size)]
+
+        @jpype.JOverride
+        def generateNewCopy(self):
+            return Input(self.codes, self.vocabulary)
+
+        @jpype.JOverride
+        def close(self):
+            pass
+
+    return InputGenerator
+
+
+def receiver_proxies() -> Tuple[type, type]:
+    """Create the Python implementations of the Metanome result receiver
+    interfaces for functional dependencies and for unique column
+    combinations. Requires a running JVM.
+
+    Returns
+    -------
+    type, type
+    """
+    import jpype
+
+    @jpype.JImplements(FD_RECEIVER)
+    class FDReceiver(object):
+        """Collect discovered functional dependencies as pairs of a tuple of
+        left-hand-side column indexes and a right-hand-side column index.
+        """
+        def __init__(self):
+            self.result = list()
+
+        @jpype.JOverride
+        def receiveResult(self, fd):
+            lhs = sorted(column_index(c) for c in fd.getDeterminant().getColumnIdentifiers())
+            self.result.append((tuple(lhs), column_index(fd.getDependant())))
+
+        @jpype.JOverride
+        def acceptedResult(self, fd):
+            return True
+
+    @jpype.JImplements(UCC_RECEIVER)
+    class UCCReceiver(object):
+        """Collect discovered unique column combinations as tuples of column
+        indexes.
+        """
+        def __init__(self):
+            self.result = list()
+
+        @jpype.JOverride
+        def receiveResult(self, ucc):
+            cols = sorted(column_index(c) for c in ucc.getColumnCombination().getColumnIdentifiers())
+            self.result.append(tuple(cols))
+
+        @jpype.JOverride
+        def acceptedResult(self, ucc):
+            return True
+
+    return FDReceiver, UCCReceiver
+
+
+def start(jar: str, jvm_options: List[str]) -> SimpleNamespace:
+    """Start the JVM with the given jar file on its class path (unless the
+    JVM is already running) and get the Python implementations of the
+    Metanome interfaces. The implementations are classes ``InputGenerator``,
+    ``FDReceiver``, and ``UCCReceiver``.
+
+    Raises a RuntimeError if the JVM was started without the Metanome
+    algorithms on its class path.
+
+    Parameters
+    ----------
+    jar: string
+        Path to the Metanome.jar file.
+    jvm_options: list of string
+        Options for starting the JVM.
+
+    Returns
+    -------
+    types.SimpleNamespace
+    """
+    import jpype
+    global _proxies
+    with _lock:
+        if not jpype.isJVMStarted():
+            jpype.startJVM(*jvm_options, classpath=[jar], convertStrings=False)
+        if _proxies is None:
+            try:
+                jpype.JClass(HYFD_CLASS)
+            except Exception:
+                raise RuntimeError('Metanome algorithms not on JVM class path')
+            fd_receiver, ucc_receiver = receiver_proxies()
+            _proxies = SimpleNamespace(
+                InputGenerator=input_proxies(),
+                FDReceiver=fd_receiver,
+                UCCReceiver=ucc_receiver
+            )
+    return _proxies
@@ -0,0 +1,506 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Dictionary-encoded column partitions for profiling data in-process using
+NumPy.
+
+Each column of a table is encoded as an array of integer codes, one for each
+row, such that two rows have the same code if and only if they have the same
+value in the column. The codes represent the partition of the rows into
+equivalence classes. The partition for a set of columns is computed by
+combining the codes of the individual columns. Dependencies between columns
+(e.g., functional dependencies and unique column combinations) only depend
+on these partitions and not on the actual values.
+
+For Arrow inputs, the partitions are computed from the dictionary indices of
+dictionary-encoded columns (other columns are dictionary encoded by Arrow)
+without converting the input into a pandas data frame. For data frames in
+shared segments (see :mod:`openclean_metanome.transport`), the partitions are
+computed from the shared codes.
+"""
+
+from typing import Iterable, List, Tuple, Union, TYPE_CHECKING
+
+import os
+
+# Import pandas, numpy and openclean for type checking only. The packages are
+# imported when they are needed to keep the import time of the package low.
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    from openclean.data.stream.base import Document
+    from openclean_metanome.transport import SharedFrame
+
+
+"""Thresholds for the number of possible keys up to which combinations of
+classes are counted in a dense array. The threshold is the maximum of a
+multiple of the number of rows and a minimum number of keys.
+"""
+DENSE_FACTOR = 16
+DENSE_MIN = 1 << 16
+
+
+class Partition(object):
+    """Partition of the rows of a table into equivalence classes. Rows are
+    represented by their position in the table. Each row is assigned the
+    (zero-based) index of its equivalence class.
+    """
+    def __init__(self, codes: 'np.ndarray', size: int):
+        """Initialize the class index for each row and the number of classes.
+
+        Parameters
+        ----------
+        codes: np.ndarray
+            Array of class indexes, one for each row.
+        size: int
+            Number of equivalence classes.
+        """
+        self.codes = codes
+        self.size = size
+        # Stripped partition is computed when it is first accessed.
+        self._stripped = None
+
+    def __len__(self) -> int:
+        """Get the number of rows in the partitioned table.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.codes)
+
+    def is_unique(self) -> bool:
+        """Test if every row is in its own equivalence class, i.e., if the
+        partitioned columns form a key.
+
+        Returns
+        -------
+        bool
+        """
+        return self.size == len(self.codes)
+
+    def refine(self, other: 'Partition') -> 'Partition':
+        """Get the partition for the union of the columns of this partition
+        and the given partition. Two rows are in the same class of the result
+        if they are in the same class in both partitions.
+
+        Parameters
+        ----------
+        other: openclean_metanome.partition.Partition
+            Partition that is combined with this partition.
+
+        Returns
+        -------
+        openclean_metanome.partition.Partition
+        """
+        import numpy as np
+        keys = self.codes * other.size + other.codes
+        if not is_dense(self.size * other.size, len(keys)):
+            return factorize(keys)
+        # Number the combinations of classes that occur in the data in the
+        # order of their keys.
+        occurs = np.zeros(self.size * other.size, dtype=np.int64)
+        occurs[keys] = 1
+        index = np.cumsum(occurs) - 1
+        return Partition(codes=index[keys], size=int(index[-1]) + 1 if len(index) else 0)
+
+    def error(self, other: 'Partition') -> int:
+        """Get the minimum number of rows that have to be removed from the
+        table for the functional dependency from the columns of this partition
+        to the columns of the other partition to hold (the g3 error).
+
+        For each class of this partition only the rows with the most frequent
+        class of the other partition are kept.
+
+        Parameters
+        ----------
+        other: openclean_metanome.partition.Partition
+            Partition for the dependant columns.
+
+        Returns
+        -------
+        int
+        """
+        import numpy as np
+        import pandas as pd
+        # Rows in singleton classes never violate the dependency. The error
+        # is computed for the rows in the stripped partition only.
+        rows, codes, size = self.stripped()
+        if not len(rows):
+            return 0
+        keys = codes * other.size + other.codes[rows]
+        if is_dense(size * other.size, len(keys)):
+            # Count the rows for each combination of classes in a matrix with
+            # one row for each class of this partition.
+            counts = np.bincount(keys, minlength=size * other.size)
+            maxcounts = counts.reshape(size, other.size).max(axis=1)
+            return int(len(keys) - maxcounts.sum())
+        pairs, uniques = pd.factorize(keys)
+        if len(uniques) == size:
+            # Each class contains a single value of the dependant columns.
+            return 0
+        counts = np.bincount(pairs)
+        maxcounts = np.zeros(size, dtype=np.int64)
+        np.maximum.at(maxcounts, uniques // other.size, counts)
+        return int(len(keys) - maxcounts.sum())
+
+    def stripped(self) -> Tuple['np.ndarray', 'np.ndarray', int]:
+        """Get the stripped partition that only contains the rows that are in
+        classes with more than one row. The classes of the stripped partition
+        are numbered consecutively.
+
+        Returns the positions of the rows in the stripped partition, their
+        class indexes, and the number of classes.
+
+        Returns
+        -------
+        np.ndarray, np.ndarray, int
+        """
+        import numpy as np
+        if self._stripped is None:
+            counts = np.bincount(self.codes, minlength=self.size)
+            keep = counts > 1
+            index = np.cumsum(keep) - 1
+            rows = np.flatnonzero(keep[self.codes])
+            self._stripped = (rows, index[self.codes[rows]], int(keep.sum()))
+        return self._stripped
+
+
+def assign_nulls(codes: 'np.ndarray', size: int, null_equals_null: bool) -> Partition:
+    """Get the partition for an array of codes where missing values have the
+    code -1. Missing values are either assigned to a single new class or each
+    missing value is assigned to a class of its own.
+
+    Parameters
+    ----------
+    codes: np.ndarray
+        Array of codes with -1 for missing values.
+    size: int
+        Number of classes for non-missing values.
+    null_equals_null: bool
+        If True, all missing values are in the same class.
+
+    Returns
+    -------
+    openclean_metanome.partition.Partition
+    """
+    import numpy as np
+    nulls = np.flatnonzero(codes < 0)
+    if len(nulls) == 0:
+        return Partition(codes=codes, size=size)
+    if null_equals_null:
+        codes[nulls] = size
+        return Partition(codes=codes, size=size + 1)
+    # Assign a new class to each missing value.
+    codes[nulls] = np.arange(size, size + len(nulls))
+    return Partition(codes=codes, size=size + len(nulls))
+
+
+def encode(
+    df: Union['pd.DataFrame', str, 'Document', 'pa.Table'], null_equals_null: bool = True
+) -> Tuple[List, List[Partition]]:
+    """Get the list of columns and the partition for each column of a given
+    table.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, openclean.data.stream.base.Document, or pa.Table
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow table, record batch, or record batch reader.
+    null_equals_null: bool, default=True
+        If True, all missing values in a column are in the same class.
+        Otherwise, each missing value is in a class of its own.
+
+    Returns
+    -------
+    list, list of openclean_metanome.partition.Partition
+    """
+    from openclean_metanome.converter import is_arrow
+    from openclean_metanome.transport import SharedFrame
+    if is_arrow(df):
+        return encode_arrow(df, null_equals_null=null_equals_null)
+    elif isinstance(df, SharedFrame):
+        return encode_shared(df, null_equals_null=null_equals_null)
+    df = read_frame(df)
+    # Access columns by index. Iterating over a pandas index may convert
+    # the column objects (e.g., openclean Column instances) into strings.
+    columns = [df.columns[i] for i in range(len(df.columns))]
+    partitions = list()
+    for colidx in range(len(columns)):
+        values = df.iloc[:, colidx].to_numpy()
+        if null_equals_null:
+            partitions.append(factorize(values, na_sentinel=False))
+        else:
+            p = factorize(values)
+            partitions.append(assign_nulls(p.codes, p.size, null_equals_null=False))
+    return columns, partitions
+
+
+def encode_arrow(
+    source: Union['pa.Table', 'pa.RecordBatch', 'pa.RecordBatchReader'],
+    null_equals_null: bool = True
+) -> Tuple[List, List[Partition]]:
+    """Get the list of columns and the partition for each column of an Arrow
+    input. The codes of dictionary-encoded columns are used as-is (see
+    :class:`openclean_metanome.converter.ArrowCodes`).
+
+    Parameters
+    ----------
+    source: pa.Table, pa.RecordBatch, or pa.RecordBatchReader
+        Arrow input.
+    null_equals_null: bool, default=True
+        If True, all missing values in a column are in the same class.
+        Otherwise, each missing value is in a class of its own.
+
+    Returns
+    -------
+    list, list of openclean_metanome.partition.Partition
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from openclean_metanome.converter import ArrowCodes, record_batches
+    columns, batches = record_batches(source)
+    encoders = [ArrowCodes() for _ in columns]
+    chunks = [list() for _ in columns]
+    for batch in batches:
+        for colidx, array in enumerate(batch.columns):
+            if not pa.types.is_dictionary(array.type):
+                array = pc.dictionary_encode(array)
+            chunks[colidx].append(encoders[colidx].to_numpy(array))
+    partitions = list()
+    for colidx in range(len(columns)):
+        codes = np.concatenate(chunks[colidx]) if chunks[colidx] else np.zeros(0, dtype=np.int64)
+        partitions.append(assign_nulls(codes, len(encoders[colidx]), null_equals_null=null_equals_null))
+    return columns, partitions
+
+
+def encode_shared(frame: 'SharedFrame', null_equals_null: bool = True) -> Tuple[List, List[Partition]]:
+    """Get the list of columns and the partition for each column of a data
+    frame in a shared segment. The shared codes are used as-is.
+
+    Parameters
+    ----------
+    frame: openclean_metanome.transport.SharedFrame
+        Handle for the encoded frame.
+    null_equals_null: bool, default=True
+        If True, all missing values in a column are in the same class.
+        Otherwise, each missing value is in a class of its own.
+
+    Returns
+    -------
+    list, list of openclean_metanome.partition.Partition
+    """
+    import numpy as np
+    partitions = list()
+    with frame.attach() as codes:
+        for colidx in range(len(frame.columns)):
+            values = codes[colidx].astype(np.int64)
+            size = int(values.max()) + 1 if len(values) else 0
+            partitions.append(assign_nulls(values, size, null_equals_null=null_equals_null))
+        del codes
+    return list(frame.columns), partitions
+
+
+def factorize(values: Iterable, na_sentinel: bool = True) -> Partition:
+    """Get the partition for an array of values.
+
+    Parameters
+    ----------
+    values: np.ndarray
+        Array of values.
+    na_sentinel: bool, default=True
+        Assign -1 to missing values if True. Otherwise, all missing values are
+        assigned the same class.
+
+    Returns
+    -------
+    openclean_metanome.partition.Partition
+    """
+    import numpy as np
+    import pandas as pd
+    # Use the default sentinel (-1) for missing values. The arguments that
+    # control the sentinel differ between pandas versions (`use_na_sentinel`
+    # was added in pandas 1.5), so missing values are assigned to their own
+    # class afterwards instead.
+    codes, uniques = pd.factorize(values)
+    codes = codes.astype(np.int64, copy=False)
+    if na_sentinel:
+        return Partition(codes=codes, size=len(uniques))
+    return assign_nulls(codes, len(uniques), null_equals_null=True)
+
+
+def has_duplicates(partitions: List[Partition]) -> bool:
+    """Test if a table that is given by the partitions of its columns contains
+    duplicate rows. The partitions are refined one after the other. The test
+    stops as soon as the refined partition is unique.
+
+    Parameters
+    ----------
+    partitions: list of openclean_metanome.partition.Partition
+        Partition for each column in the table.
+
+    Returns
+    -------
+    bool
+    """
+    if not partitions:
+        return False
+    p = partitions[0]
+    for other in partitions[1:]:
+        if p.is_unique():
+            return False
+        p = p.refine(other)
+    return not p.is_unique()
+
+
+def duplicate_rows(
+    df: Union['pd.DataFrame', str, 'Document', 'pa.Table', 'SharedFrame'], null_equals_null: bool = True
+) -> Tuple[List, bool]:
+    """Get the list of columns of a table and test if the table contains
+    duplicate rows.
+
+    Unlike :func:`has_duplicates` the columns are not encoded. Data frames are
+    tested using pandas' row hashing. All other inputs are read in a single
+    streaming pass that keeps the distinct rows in a hash set and stops at the
+    first duplicate row. For tables without duplicates the set contains all
+    rows of the table.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, openclean.data.stream.base.Document, pa.Table, or SharedFrame
+        Input data frame, path to a CSV or Parquet file, data stream, Arrow
+        table, record batch, or record batch reader, or shared data frame.
+    null_equals_null: bool, default=True
+        If True, missing values are equal to each other. Otherwise, rows with
+        missing values are never duplicates.
+
+    Returns
+    -------
+    list, bool
+    """
+    import pandas as pd
+    from openclean_metanome.transport import SharedFrame
+    if isinstance(df, SharedFrame):
+        # The shared segment only contains the integer codes of the values.
+        df = read_frame(df)
+    if isinstance(df, pd.DataFrame):
+        columns = [df.columns[i] for i in range(len(df.columns))]
+        if not null_equals_null:
+            df = df.dropna()
+        return columns, bool(df.duplicated().any())
+    columns, rows = iterrows(df)
+    seen = set()
+    for row in rows:
+        key = tuple(None if v is None or v is pd.NA or (isinstance(v, float) and v != v) else v for v in row)
+        if not null_equals_null and None in key:
+            continue
+        if key in seen:
+            return columns, True
+        seen.add(key)
+    return columns, False
+
+
+def iterrows(df: Union[str, 'Document', 'pa.Table']) -> Tuple[List, Iterable]:
+    """Get the list of columns and an iterator over the rows of an input table
+    that is not a data frame. Empty values in CSV files are missing values.
+
+    Parameters
+    ----------
+    df: string, openclean.data.stream.base.Document, or pa.Table
+        Path to a CSV or Parquet file, data stream, or Arrow table, record
+        batch, or record batch reader.
+
+    Returns
+    -------
+    list, iterable
+    """
+    import csv
+    from openclean_metanome.converter import is_arrow, open_csv, record_batches, PARQUET_SUFFIXES
+
+    def arrow_rows(batches):
+        for batch in batches:
+            yield from zip(*[array.to_pylist() for array in batch.columns])
+
+    def csv_rows(source, compressed):
+        with open_csv(source, compressed=compressed) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                yield [v if v != '' else None for v in row]
+
+    if is_arrow(df):
+        columns, batches = record_batches(df)
+        return columns, arrow_rows(batches)
+    elif isinstance(df, (str, os.PathLike)):
+        source = os.fspath(df)
+        if source.lower().endswith(PARQUET_SUFFIXES):
+            import pyarrow.parquet as pq
+            pqfile = pq.ParquetFile(source)
+            return list(pqfile.schema_arrow.names), arrow_rows(pqfile.iter_batches())
+        compressed = source.lower().endswith('.gz')
+        with open_csv(source, compressed=compressed) as f:
+            header = next(csv.reader(f), [])
+        return header, csv_rows(source, compressed)
+    return list(df.columns), (row for _, row in df.iterrows())
+
+
+def is_dense(keys: int, rows: int) -> bool:
+    """Test if the number of possible keys for combinations of classes is
+    small enough to count the combinations in a dense array instead of using
+    a hash table.
+
+    Parameters
+    ----------
+    keys: int
+        Number of possible keys.
+    rows: int
+        Number of rows in the partitioned table.
+
+    Returns
+    -------
+    bool
+    """
+    return keys <= max(DENSE_FACTOR * rows, DENSE_MIN)
+
+
+def read_frame(df: Union['pd.DataFrame', str, 'Document', 'pa.Table']) -> 'pd.DataFrame':
+    """Load an input table into a data frame. CSV files are read with all
+    values as strings and empty values as missing values, i.e., in the same
+    way as they are read by the Metanome algorithms.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, openclean.data.stream.base.Document, or pa.Table
+        Input data frame, path to a CSV or Parquet file, data stream, or
+        Arrow table, record batch, or record batch reader.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    import pandas as pd
+    from openclean_metanome.converter import is_arrow, record_batches, PARQUET_SUFFIXES
+    from openclean_metanome.transport import codes_frame, SharedFrame
+    if isinstance(df, pd.DataFrame):
+        return df
+    elif isinstance(df, SharedFrame):
+        with df.attach() as codes:
+            frame = codes_frame(codes, df.columns, 0, df.rows)
+            del codes
+        return frame
+    elif is_arrow(df):
+        import pyarrow as pa
+        _, batches = record_batches(df)
+        return pa.Table.from_batches(list(batches), schema=df.schema).to_pandas()
+    elif isinstance(df, (str, os.PathLike)):
+        source = os.fspath(df)
+        if source.lower().endswith(PARQUET_SUFFIXES):
+            return pd.read_parquet(source)
+        return pd.read_csv(source, dtype=str, keep_default_na=False, na_values=[''])
+    return pd.DataFrame(data=[row for _, row in df.iterrows()], columns=list(df.columns))
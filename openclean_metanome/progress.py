@@ -0,0 +1,431 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Progress events for running Metanome algorithms.
+
+The output of the Metanome process is streamed while the algorithm is running.
+Each output line is parsed for phase transitions (e.g., from sampling to
+validation in HyFD) and counters (e.g., the current lattice level or the
+number of validated candidates). The resulting progress events are passed to
+a callback function. If no output is produced for a while, a heartbeat event
+is emitted for the current phase.
+
+Callbacks are registered for all algorithm runs in the current thread using
+the :func:`openclean_metanome.progress.listen` context manager:
+
+.. code-block:: python
+
+    from openclean_metanome.algorithm.hyfd import hyfd
+    from openclean_metanome.progress import listen
+
+    with listen(print):
+        fds = hyfd(df)
+
+Alternatively, a :class:`openclean_metanome.progress.ProgressRun` runs an
+algorithm in a background thread and allows to iterate over the progress
+events while the algorithm is running.
+
+A callback can stop the run of the algorithm by raising an exception. The
+Metanome process is killed and the exception is raised by the algorithm
+wrapper. Progress events are only emitted by workers that support streaming
+(i.e., the subprocess worker and the Docker pool worker).
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from queue import Empty, Queue
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import codecs
+import re
+import threading
+import time
+
+
+"""Progress event that is emitted for each output line of the Metanome process
+and as a heartbeat if no output is produced. The event contains the current
+phase of the algorithm, the output line (None for heartbeat events), the
+counters that were parsed from the line, the number of seconds since the
+algorithm process was started, and the output stream of the line (stdout or
+stderr).
+"""
+ProgressEvent = namedtuple(
+    'ProgressEvent',
+    ['phase', 'line', 'counters', 'elapsed', 'stream']
+)
+
+
+"""Labels for output streams."""
+STDERR = 'stderr'
+STDOUT = 'stdout'
+
+"""Number of seconds without output after which a heartbeat event is
+emitted.
+"""
+HEARTBEAT = 10
+
+"""Phase of the algorithm before the first phase transition is observed."""
+START = 'start'
+
+"""Default phase names and patterns for output lines that indicate the start
+of a phase. The patterns cover the log messages of the HyFD and HyUCC
+implementations and the common phases of the other algorithms. Patterns are
+tested in order, i.e., the first matching pattern determines the phase.
+"""
+PHASES = [
+    ('reading', r'\b(reading|loading|initializ)'),
+    ('validation', r'\bvalidat'),
+    ('induction', r'\b(induct|induc(e|ing))'),
+    ('sampling', r'\b(sampling|comparison suggestions|investigat)'),
+    ('preprocessing', r'\b(plis?\b|sorting|inverting|extracting|compress)'),
+    ('output', r'\b(translating|writing)')
+]
+
+
+"""Patterns for counters in output lines. Counters are either given as a
+fraction of done and total items (e.g., '120 / 400' or '120 of 400'), as the
+level in the search lattice, or as named values (e.g., 'candidates: 120').
+"""
+FRACTION = re.compile(r'(\d+)\s*(?:/|of)\s*(\d+)')
+LEVEL = re.compile(r'\blevel\s*:?\s*(\d+)', re.IGNORECASE)
+NAMED = re.compile(r'([A-Za-z][A-Za-z ]*?)\s*[:=]\s*(\d+(?:\.\d+)?)\b')
+
+
+"""Listener for the progress events of algorithm runs in the current
+context.
+"""
+_listener = ContextVar('listener', default=None)
+
+
+class RunCancelled(Exception):
+    """Exception that is raised by the listener of a cancelled progress run
+    to stop the Metanome process.
+    """
+    pass
+
+
+class ProgressParser(object):
+    """Parser for the output lines of a Metanome process. Maintains the current
+    phase of the algorithm. The phase changes whenever an output line matches
+    the pattern for a phase.
+    """
+    def __init__(self, phases: Optional[List[Tuple[str, str]]] = None):
+        """Initialize the patterns for the algorithm phases.
+
+        Parameters
+        ----------
+        phases: list of (string, string), default=None
+            List of phase names and regular expressions for output lines
+            that indicate the start of the phase. Patterns are tested in the
+            order of the list. By default, the patterns for the Metanome
+            algorithms are used.
+        """
+        phases = phases if phases is not None else PHASES
+        self.phases = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in phases]
+        self.phase = START
+
+    def heartbeat(self, elapsed: float) -> ProgressEvent:
+        """Get a heartbeat event for the current phase.
+
+        Parameters
+        ----------
+        elapsed: float
+            Number of seconds since the process was started.
+
+        Returns
+        -------
+        openclean_metanome.progress.ProgressEvent
+        """
+        return ProgressEvent(phase=self.phase, line=None, counters=dict(), elapsed=elapsed, stream=None)
+
+    def parse(self, line: str, elapsed: float, stream: str = STDOUT) -> ProgressEvent:
+        """Get the progress event for an output line.
+
+        Parameters
+        ----------
+        line: string
+            Output line of the Metanome process.
+        elapsed: float
+            Number of seconds since the process was started.
+        stream: string, default='stdout'
+            Output stream of the line.
+
+        Returns
+        -------
+        openclean_metanome.progress.ProgressEvent
+        """
+        line = line.rstrip('\r\n')
+        for name, pattern in self.phases:
+            if pattern.search(line):
+                self.phase = name
+                break
+        return ProgressEvent(
+            phase=self.phase,
+            line=line,
+            counters=counters(line),
+            elapsed=elapsed,
+            stream=stream
+        )
+
+
+class ProgressRun(object):
+    """Run an algorithm in a background thread and iterate over the progress
+    events while the algorithm is running. The iterator ends when the
+    algorithm run is finished. The result of the algorithm run is returned by
+    the :meth:`result` method:
+
+    .. code-block:: python
+
+        run = ProgressRun(hyfd, df)
+        for event in run:
+            if event.phase == 'validation' and event.elapsed > 3600:
+                run.cancel()
+        fds = run.result()
+    """
+    def __init__(self, func: Callable, *args, **kwargs):
+        """Start running the given algorithm function in a background thread.
+
+        Parameters
+        ----------
+        func: callable
+            Algorithm function, e.g., :func:`openclean_metanome.algorithm.hyfd.hyfd`.
+        args: list
+            Positional arguments for the algorithm function.
+        kwargs: dict
+            Keyword arguments for the algorithm function.
+        """
+        self._events = Queue()
+        self._cancelled = threading.Event()
+        self._result = None
+        self._exception = None
+        self._thread = threading.Thread(target=self._run, args=(func, args, kwargs), daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> Iterator[ProgressEvent]:
+        """Iterate over the progress events of the algorithm run.
+
+        Returns
+        -------
+        iterator of openclean_metanome.progress.ProgressEvent
+        """
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            yield event
+
+    def cancel(self):
+        """Cancel the algorithm run. The Metanome process is stopped with the
+        next progress event.
+        """
+        self._cancelled.set()
+
+    def result(self, timeout: Optional[float] = None):
+        """Get the result of the algorithm run. Waits for the run to finish.
+        Raises the exception of the run if it failed (or
+        :class:`openclean_metanome.progress.RunCancelled` if it was
+        cancelled).
+
+        Parameters
+        ----------
+        timeout: float, default=None
+            Maximum number of seconds to wait for the run to finish.
+
+        Returns
+        -------
+        any
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise TimeoutError('run did not finish within {} seconds'.format(timeout))
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def _notify(self, event: ProgressEvent):
+        """Add a progress event to the queue. Raises an error if the run was
+        cancelled.
+
+        Parameters
+        ----------
+        event: openclean_metanome.progress.ProgressEvent
+            Progress event of the algorithm run.
+        """
+        if self._cancelled.is_set():
+            raise RunCancelled('run cancelled')
+        self._events.put(event)
+
+    def _run(self, func: Callable, args: List, kwargs: Dict):
+        """Run the algorithm function with the progress listener of this
+        object.
+        """
+        try:
+            with listen(self._notify):
+                self._result = func(*args, **kwargs)
+        except Exception as ex:
+            self._exception = ex
+        finally:
+            self._events.put(None)
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def counters(line: str) -> Dict:
+    """Get the counters from an output line.
+
+    Parameters
+    ----------
+    line: string
+        Output line of the Metanome process.
+
+    Returns
+    -------
+    dict
+    """
+    result = dict()
+    m = FRACTION.search(line)
+    if m:
+        result['done'], result['total'] = int(m.group(1)), int(m.group(2))
+    m = LEVEL.search(line)
+    if m:
+        result['level'] = int(m.group(1))
+    for name, value in NAMED.findall(line):
+        key = name.strip().lower().replace(' ', '_')
+        if key not in result:
+            result[key] = float(value) if '.' in value else int(value)
+    return result
+
+
+def demux(chunks: Iterable[Tuple[bytes, bytes]]) -> Dict[str, Iterable[bytes]]:
+    """Split an iterable of pairs of stdout and stderr chunks (e.g., the
+    demultiplexed output of a Docker exec) into separate streams that can be
+    passed to :func:`openclean_metanome.progress.monitor`.
+
+    The given iterable is consumed in a separate thread.
+
+    Parameters
+    ----------
+    chunks: iterable of (bytes, bytes)
+        Pairs of output chunks for stdout and stderr. Either element may be
+        None.
+
+    Returns
+    -------
+    dict
+    """
+    queues = {STDOUT: Queue(), STDERR: Queue()}
+
+    def read():
+        try:
+            for stdout, stderr in chunks:
+                if stdout:
+                    queues[STDOUT].put(stdout)
+                if stderr:
+                    queues[STDERR].put(stderr)
+        finally:
+            for q in queues.values():
+                q.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+    return {label: iter(q.get, None) for label, q in queues.items()}
+
+
+@contextmanager
+def listen(callback: Callable):
+    """Context manager that registers a callback for the progress events of
+    all algorithm runs in the current thread.
+
+    Parameters
+    ----------
+    callback: callable
+        Function that is called with each
+        :class:`openclean_metanome.progress.ProgressEvent`.
+    """
+    token = _listener.set(callback)
+    try:
+        yield callback
+    finally:
+        _listener.reset(token)
+
+
+def listener() -> Optional[Callable]:
+    """Get the callback for progress events in the current context. The result
+    is None if no callback is registered.
+
+    Returns
+    -------
+    callable
+    """
+    return _listener.get()
+
+
+def monitor(
+    streams: Dict[str, Iterable[bytes]], callback: Callable,
+    parser: Optional[ProgressParser] = None, heartbeat: Optional[float] = None
+) -> Dict[str, str]:
+    """Read the output streams of a running process and pass a progress event
+    for each output line to the given callback. A heartbeat event is passed to
+    the callback if no output line was read for the given number of seconds.
+
+    Each stream is read in a separate thread. Returns the complete output for
+    each stream once all streams are exhausted. Exceptions that are raised by
+    the callback are re-raised. The caller is responsible for stopping the
+    process in this case.
+
+    Parameters
+    ----------
+    streams: dict
+        Mapping of stream labels to iterables of output chunks.
+    callback: callable
+        Function that is called with each progress event.
+    parser: openclean_metanome.progress.ProgressParser, default=None
+        Parser for output lines.
+    heartbeat: float, default=None
+        Number of seconds without output after which a heartbeat event is
+        passed to the callback. Uses the default heartbeat interval if None.
+
+    Returns
+    -------
+    dict
+    """
+    parser = parser if parser is not None else ProgressParser()
+    heartbeat = heartbeat if heartbeat is not None else HEARTBEAT
+    lines = Queue()
+    output = {label: list() for label in streams}
+
+    def read(label, chunks):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = ''
+        try:
+            for chunk in chunks:
+                buffer += decoder.decode(chunk)
+                *complete, buffer = buffer.split('\n')
+                for line in complete:
+                    lines.put((label, line + '\n'))
+            buffer += decoder.decode(b'', final=True)
+            if buffer:
+                lines.put((label, buffer))
+        finally:
+            lines.put((label, None))
+
+    start = time.monotonic()
+    for label, chunks in streams.items():
+        threading.Thread(target=read, args=(label, chunks), daemon=True).start()
+    running = len(streams)
+    while running:
+        try:
+            label, line = lines.get(timeout=heartbeat)
+        except Empty:
+            callback(parser.heartbeat(elapsed=time.monotonic() - start))
+            continue
+        if line is None:
+            running -= 1
+            continue
+        output[label].append(line)
+        callback(parser.parse(line, elapsed=time.monotonic() - start, stream=label))
+    return {label: ''.join(text) for label, text in output.items()}
@@ -0,0 +1,248 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Resource accounting for algorithm runs.
+
+For each run the resources that were used by the Metanome process are
+recorded together with the peak memory that was allocated by Python while
+the input was materialized and while the results were parsed:
+
+- ``peak_rss``: Peak resident set size of the Metanome process (in bytes).
+- ``user_time``, ``system_time``: CPU time of the Metanome process in user
+  and in system mode (in seconds).
+- ``read_bytes``, ``write_bytes``: Number of bytes read and written by the
+  Metanome process (including reads that are served from the page cache).
+- ``input_peak``, ``parse_peak``: Peak memory (in bytes) that was allocated
+  by Python while materializing the input files and while parsing the result
+  file. These values are only recorded if memory tracing is enabled (see
+  :func:`openclean_metanome.config.TRACEMEMORY`) since tracing slows down
+  memory allocations.
+
+The subprocess worker runs each command via this module (``python -m
+openclean_metanome.resources <file> <command>``). The command is executed in
+a child process whose resource usage is taken from ``wait4`` and (on Linux)
+from the I/O counters in procfs. The Docker pool worker records the
+difference of the container statistics before and after the command. The
+values are written to a file in the run directory and are read by the
+workflow runner before the run directory is removed. Values that are not
+available for a worker (e.g., for the default Docker worker) are None.
+"""
+
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+
+
+"""Resource usage of an algorithm run."""
+ResourceUsage = namedtuple(
+    'ResourceUsage',
+    [
+        'peak_rss', 'user_time', 'system_time', 'read_bytes', 'write_bytes',
+        'input_peak', 'parse_peak'
+    ]
+)
+
+
+"""Name of the file in the run directory that contains the recorded resource
+usage.
+"""
+USAGE_FILE = '.usage.json'
+
+"""Key for the resource usage in the run result context."""
+USAGE = 'usage'
+
+"""Fields whose values are added up for multiple commands. The maximum is
+recorded for all other fields.
+"""
+CUMULATIVE = {'user_time', 'system_time', 'read_bytes', 'write_bytes'}
+
+
+# -- Command line -------------------------------------------------------------
+
+def main(args: Optional[List[str]] = None):
+    """Run a shell command and record its resource usage. Expects the path to
+    the usage file and the command as arguments. Exits with the exit code of
+    the command.
+
+    Parameters
+    ----------
+    args: list of string, default=None
+        Command line arguments. By default, the arguments of the current
+        process are used.
+    """
+    args = args if args is not None else sys.argv[1:]
+    filename, cmd = args
+    usage = run(cmd)
+    returncode = usage.pop('returncode')
+    record(filename, **usage)
+    sys.exit(returncode if returncode >= 0 else 128 - returncode)
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def command(cmd: str, filename: Optional[str] = USAGE_FILE) -> str:
+    """Get the command that executes the given command and records its
+    resource usage in the given file.
+
+    Parameters
+    ----------
+    cmd: string
+        Shell command.
+    filename: string, default='.usage.json'
+        Path to the file for the recorded resource usage (relative to the
+        working directory of the command).
+
+    Returns
+    -------
+    string
+    """
+    return '"{}" -m openclean_metanome.resources "{}" {}'.format(sys.executable, filename, shlex.quote(cmd))
+
+
+def exit_code(status: int) -> int:
+    """Convert a wait status into an exit code. The exit code is negative if
+    the process was terminated by a signal (like the return code of
+    ``subprocess.Popen``). Equivalent to ``os.waitstatus_to_exitcode`` which
+    is only available for Python 3.9 or later.
+
+    Parameters
+    ----------
+    status: int
+        Wait status of a terminated process.
+
+    Returns
+    -------
+    int
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def read_procio(pid: int) -> Dict:
+    """Read the I/O counters for a process from procfs. The counters of a
+    process include the counters of all its children that have terminated.
+    The result is None if the counters are not available.
+
+    Parameters
+    ----------
+    pid: int
+        Process identifier.
+
+    Returns
+    -------
+    dict
+    """
+    try:
+        with open('/proc/{}/io'.format(pid)) as f:
+            return {key: int(value) for key, value in [line.split(':') for line in f if ':' in line]}
+    except (OSError, ValueError):
+        return None
+
+
+def read_usage(rundir: str) -> ResourceUsage:
+    """Read the resource usage that was recorded for the run with the given
+    run directory.
+
+    Parameters
+    ----------
+    rundir: string
+        Path to the run directory.
+
+    Returns
+    -------
+    openclean_metanome.resources.ResourceUsage
+    """
+    doc = dict()
+    filename = os.path.join(rundir, USAGE_FILE)
+    if os.path.isfile(filename):
+        with open(filename) as f:
+            doc = json.load(f)
+    return ResourceUsage(**{key: doc.get(key) for key in ResourceUsage._fields})
+
+
+def record(filename: str, **values):
+    """Add resource usage values to a usage file. Values for cumulative
+    fields are added to the existing values. For all other fields the maximum
+    value is kept. Values that are None are ignored.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the usage file.
+    values: dict
+        Resource usage values.
+    """
+    doc = dict()
+    if os.path.isfile(filename):
+        with open(filename) as f:
+            doc = json.load(f)
+    for key, value in values.items():
+        if value is None:
+            continue
+        if key not in doc:
+            doc[key] = value
+        elif key in CUMULATIVE:
+            doc[key] += value
+        else:
+            doc[key] = max(doc[key], value)
+    with open(filename, 'w') as f:
+        json.dump(doc, f)
+
+
+def run(cmd: str) -> Dict:
+    """Run a shell command and get its resource usage. The output streams of
+    the command are inherited from the current process.
+
+    Returns a dictionary with the exit code of the command and the resource
+    usage values. Resource usage is only available on POSIX systems.
+
+    Parameters
+    ----------
+    cmd: string
+        Shell command.
+
+    Returns
+    -------
+    dict
+    """
+    proc = subprocess.Popen(cmd, shell=True)
+    if not hasattr(os, 'wait4'):  # pragma: no cover
+        return {'returncode': proc.wait()}
+    # Wait for the process to terminate without reaping it to read the I/O
+    # counters of the terminated process.
+    procio = None
+    if hasattr(os, 'waitid'):
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        procio = read_procio(proc.pid)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = exit_code(status)
+    # The maximum resident set size is given in kilobytes on Linux and in
+    # bytes on macOS.
+    factor = 1 if sys.platform == 'darwin' else 1024
+    usage = {
+        'returncode': proc.returncode,
+        'peak_rss': rusage.ru_maxrss * factor,
+        'user_time': rusage.ru_utime,
+        'system_time': rusage.ru_stime
+    }
+    if procio is not None:
+        usage['read_bytes'] = procio.get('rchar')
+        usage['write_bytes'] = procio.get('wchar')
+    else:  # pragma: no cover
+        usage['read_bytes'] = rusage.ru_inblock * 512
+        usage['write_bytes'] = rusage.ru_oublock * 512
+    return usage
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
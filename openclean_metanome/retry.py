@@ -0,0 +1,236 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Adaptive retries for algorithm runs that run out of memory.
+
+Runs of the Metanome algorithms fail if the Java process runs out of heap
+space, if the memory guardian of the algorithm gives up, or if the process
+is killed by the operating system (or the container runtime) for exceeding
+its memory limit. The retry policy defines a sequence of degradations that
+are applied one after the other until the run succeeds:
+
+1. Increase the maximum heap size of the Java process.
+2. Lower the maximum size of the discovered column sets (i.e., the
+   ``max_lhs_size`` of functional dependencies or the ``max_ucc_size`` of
+   unique column combinations).
+3. Limit the number of input rows that are used for discovery
+   (``input_row_limit``).
+
+Degradations are cumulative, i.e., a lower maximum size is tried with the
+largest heap size. Only parameters that are supported by an algorithm are
+degraded. The degradations that were applied for a successful run are
+recorded in the ``degradations`` property of the algorithm wrapper. Note that
+the results of degraded runs are incomplete (for reduced column set sizes) or
+may contain constraints that do not hold on the full input (for row limits).
+
+Retry policies are given to a :class:`openclean_metanome.session.MetanomeSession`
+or configured using the environment variable *METANOME_RETRY*. The variable
+either contains a dictionary with the policy parameters or references a Json
+or Yaml file containing the parameters:
+
+.. code-block:: yaml
+
+    heap: [8192, 16384]
+    max_size: [3, 2]
+    input_row_limit: [100000]
+"""
+
+from collections import namedtuple
+from collections.abc import Iterator as IteratorABC
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import re
+
+from openclean_metanome.converter import is_arrow, RowStream
+
+
+"""Degradation that was applied to the arguments of an algorithm run. The
+parameter is one of 'heap', 'max_lhs_size', 'max_ucc_size', or
+'input_row_limit'. The heap size is given in MB.
+"""
+Degradation = namedtuple('Degradation', ['parameter', 'value'])
+
+
+"""Names of degraded parameters."""
+HEAP = 'heap'
+INPUT_ROW_LIMIT = 'input_row_limit'
+MAX_SIZE = ['max_lhs_size', 'max_ucc_size']
+
+"""Argument for options of the Java process in the algorithm commands."""
+JVM_OPTIONS = 'jvm_options'
+
+"""Key for the list of applied degradations in the run result context."""
+DEGRADATIONS = 'degradations'
+
+"""Default degradation steps."""
+# Maximum heap sizes (in MB).
+DEFAULT_HEAP = [4096, 8192, 16384]
+# Maximum sizes of discovered column sets.
+DEFAULT_MAX_SIZE = [4, 3, 2]
+# Limits for the number of input rows.
+DEFAULT_ROW_LIMIT = [100000, 10000]
+
+"""Exit codes of processes that were killed by the out-of-memory killer (of
+the operating system or Docker).
+"""
+OOM_EXIT_CODES = {137, -9}
+
+"""Pattern for output lines that indicate that the Java process ran out of
+memory.
+"""
+OOM_PATTERN = re.compile(
+    r'OutOfMemoryError|Java heap space|GC overhead limit exceeded|'
+    r'Requested array size exceeds VM limit|memory guardian',
+    re.IGNORECASE
+)
+
+
+class OutOfMemoryError(RuntimeError):
+    """Error that is raised if the Metanome process ran out of memory."""
+    def __init__(self, message: str, returncode: Optional[int] = None):
+        """Initialize the error message and the exit code of the process.
+
+        Parameters
+        ----------
+        message: string
+            Error message (i.e., the error output of the process).
+        returncode: int, default=None
+            Exit code of the failed process.
+        """
+        super(OutOfMemoryError, self).__init__(message)
+        self.returncode = returncode
+
+
+class RetryPolicy(object):
+    """Policy for retrying algorithm runs that ran out of memory. The policy
+    defines the values for each degraded parameter in the order in which they
+    are tried.
+    """
+    def __init__(
+        self, heap: Optional[List[int]] = None, max_size: Optional[List[int]] = None,
+        input_row_limit: Optional[List[int]] = None
+    ):
+        """Initialize the degradation steps. Use an empty list to skip the
+        degradation of a parameter.
+
+        Parameters
+        ----------
+        heap: list of int, default=None
+            Maximum heap sizes (in MB) for the Java process.
+        max_size: list of int, default=None
+            Maximum sizes for discovered column sets (i.e., the left-hand-side
+            of functional dependencies or unique column combinations).
+        input_row_limit: list of int, default=None
+            Limits for the number of input rows that are used for discovery.
+        """
+        self.heap = sorted(heap if heap is not None else DEFAULT_HEAP)
+        self.max_size = sorted(max_size if max_size is not None else DEFAULT_MAX_SIZE, reverse=True)
+        self.input_row_limit = sorted(
+            input_row_limit if input_row_limit is not None else DEFAULT_ROW_LIMIT,
+            reverse=True
+        )
+
+    def plan(self, arguments: Dict, memory: Optional[int] = None) -> Iterator[Tuple[Dict, Degradation]]:
+        """Generate the sequence of degraded arguments for an algorithm run.
+        Each step yields the modified arguments together with the degradation
+        that was applied in the step.
+
+        Parameters
+        ----------
+        arguments: dict
+            Arguments of the algorithm run.
+        memory: int, default=None
+            Memory (in MB) of the worker that executes the run. Larger heap
+            sizes are skipped.
+
+        Returns
+        -------
+        iterator of (dict, openclean_metanome.retry.Degradation)
+        """
+        args = dict(arguments)
+        for heap in self.heap:
+            if memory and heap > memory:
+                break
+            args = dict(args)
+            args[JVM_OPTIONS] = '-Xmx{}m'.format(heap)
+            yield args, Degradation(parameter=HEAP, value=heap)
+        for key in MAX_SIZE:
+            if key in args:
+                for size in self.max_size:
+                    if reduces(args[key], size):
+                        args = dict(args)
+                        args[key] = size
+                        yield args, Degradation(parameter=key, value=size)
+        if INPUT_ROW_LIMIT in args:
+            for limit in self.input_row_limit:
+                if reduces(args[INPUT_ROW_LIMIT], limit):
+                    args = dict(args)
+                    args[INPUT_ROW_LIMIT] = limit
+                    yield args, Degradation(parameter=INPUT_ROW_LIMIT, value=limit)
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def out_of_memory(returncode: int, log: List[str]) -> bool:
+    """Test if the output and exit code of a failed process indicate that
+    the process ran out of memory.
+
+    Parameters
+    ----------
+    returncode: int
+        Exit code of the process.
+    log: list of string
+        Output of the process.
+
+    Returns
+    -------
+    bool
+    """
+    if returncode in OOM_EXIT_CODES:
+        return True
+    return any(OOM_PATTERN.search(line) for line in log)
+
+
+def reduces(current: int, value: int) -> bool:
+    """Test if a limit value reduces the current value of a parameter. A
+    current value that is not positive means that there is no limit.
+
+    Parameters
+    ----------
+    current: int
+        Current value of the parameter.
+    value: int
+        New value of the parameter.
+
+    Returns
+    -------
+    bool
+    """
+    return current <= 0 or value < current
+
+
+def reusable(source: Any) -> bool:
+    """Test if an algorithm input can be read more than once. Retries are not
+    possible for row streams over iterators (e.g., generators of rows or
+    database cursors) and for Arrow record batch readers.
+
+    Parameters
+    ----------
+    source: any
+        Algorithm input or dictionary of algorithm inputs.
+
+    Returns
+    -------
+    bool
+    """
+    if isinstance(source, dict):
+        return all(reusable(s) for s in source.values())
+    elif isinstance(source, RowStream):
+        return not isinstance(source.rows, IteratorABC)
+    elif is_arrow(source):
+        return not hasattr(source, 'read_next_batch')
+    return not isinstance(source, IteratorABC)
@@ -0,0 +1,250 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Session object for running Metanome algorithms repeatedly with the same
+configuration.
+
+Each run of an algorithm wrapper needs the worker and volume configuration,
+the serial workflow for the algorithm, and a pool of workers. Without a session
+these are created from scratch for every run. The session resolves the
+configuration once and keeps the workflows and the worker pool for subsequent
+runs. Configuration files are re-read only if they were modified since they
+were last read.
+
+Runs that fail because the Metanome process ran out of memory are retried
+with degraded arguments if the session has a retry policy (see
+:mod:`openclean_metanome.retry`).
+"""
+
+from typing import Callable, Dict, Optional, Union, TYPE_CHECKING
+
+import logging
+import os
+import threading
+
+from openclean_metanome.algorithm.base import run_workflow, CONTAINER_STEP
+from openclean_metanome.retry import OutOfMemoryError, RetryPolicy, reusable, DEGRADATIONS
+
+import openclean_metanome.config as config
+
+# Import pandas, openclean and flowserv for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from flowserv.controller.serial.workflow.base import SerialWorkflow
+    from flowserv.controller.serial.workflow.result import RunResult
+    from openclean.data.stream.base import Document
+
+
+class MetanomeSession(object):
+    """Session that maintains the resolved configuration, the workflows for
+    the different algorithms, and the pool of workers across algorithm runs.
+
+    Configuration objects that are read from files are cached together with
+    the modification time of the file. The file is read again if its
+    modification time changes. The worker pool is re-created if the worker
+    configuration changes.
+
+    Sessions are thread-safe. The same session can be used by all algorithm
+    wrappers and for concurrent runs.
+    """
+    def __init__(self, env: Optional[Dict] = None, retry: Optional[RetryPolicy] = None):
+        """Initialize the environment that defines the session configuration.
+
+        Parameters
+        ----------
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None. The system-wide settings are used if no
+            environment is given.
+        retry: openclean_metanome.retry.RetryPolicy, default=None
+            Policy for retrying runs that run out of memory. Overrides the
+            policy that is configured in the environment.
+        """
+        self.env = env
+        self._retry = retry
+        self.image = config.CONTAINER(env=self.env)
+        # Cache for configuration objects that were read from files. Maps the
+        # environment variable name to a tuple of (filename, mtime, object).
+        self._config = dict()
+        # Cache for workflows. Maps the algorithm name to the workflow.
+        self._workflows = dict()
+        # Worker pool for the current worker configuration.
+        self._workers = None
+        self._workerspec = None
+        self._lock = threading.RLock()
+
+    def retry(self) -> Optional[RetryPolicy]:
+        """Get the policy for retrying runs that run out of memory. The result
+        is None if no policy is given or configured.
+
+        Returns
+        -------
+        openclean_metanome.retry.RetryPolicy
+        """
+        if self._retry is not None:
+            return self._retry
+        doc = self._read_config(config.METANOME_RETRY)
+        return RetryPolicy(**doc) if doc else None
+
+    def run(
+        self, workflow: 'SerialWorkflow', arguments: Dict,
+        df: Union['pd.DataFrame', str, 'Document'], verbose: Optional[bool] = True
+    ) -> 'RunResult':
+        """Run a workflow for a Metanome algorithm on the given input using the
+        worker and volume configuration of the session.
+
+        If the Metanome process runs out of memory, the run is retried with
+        degraded arguments according to the retry policy of the session. The
+        list of applied degradations is added to the context of the run
+        result.
+
+        Parameters
+        ----------
+        workflow: flowserv.controller.serial.workflow.base.SerialWorkflow
+            Serial workflow to run a Metanome profiling algorithm.
+        arguments: dict
+            Dictionary of algorithm-specific input arguments.
+        df: pd.DataFrame, string, or openclean.data.stream.base.Document
+            Input data frame, path to a CSV or Parquet file, or data stream.
+        verbose: bool, default=True
+            Output run logs if True.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.result.RunResult
+        """
+        from openclean_metanome.worker.scheduler import MEMORY
+        with self._lock:
+            worker = self.worker()
+            volume = self.volume()
+            workers = self.workers()
+            policy = self.retry()
+        # Sequence of degraded arguments for retries. Inputs that can only be
+        # read once are not retried.
+        plan = iter(())
+        if policy is not None and reusable(df):
+            plan = policy.plan(arguments, memory=worker.get(MEMORY) if worker else None)
+        degradations = list()
+        while True:
+            try:
+                r = run_workflow(
+                    workflow=workflow,
+                    arguments=arguments,
+                    df=df,
+                    worker=worker,
+                    volume=volume,
+                    workers=workers,
+                    verbose=verbose
+                )
+            except OutOfMemoryError:
+                step = next(plan, None)
+                if step is None:
+                    raise
+                arguments, degradation = step
+                logging.warning('out of memory; retry with {} = {}'.format(*degradation))
+                degradations.append(degradation)
+                continue
+            r.context[DEGRADATIONS] = degradations
+            return r
+
+    def volume(self) -> Dict:
+        """Get the specification for the volume that is associated with the
+        worker that executes the main algorithm step.
+
+        Returns
+        -------
+        dict
+        """
+        return self._read_config(config.METANOME_VOLUME)
+
+    def worker(self) -> Dict:
+        """Get the specification for the worker that executes the main
+        algorithm step. If a list of workers is configured, the first worker
+        in the list is used. Use the
+        :class:`openclean_metanome.worker.scheduler.Scheduler` to distribute
+        algorithm runs across multiple workers.
+
+        Returns
+        -------
+        dict
+        """
+        worker = self._read_config(config.METANOME_WORKER)
+        return worker[0] if isinstance(worker, list) else worker
+
+    def workers(self):
+        """Get the pool of workers for the current worker configuration. The
+        pool is created when it is first accessed and whenever the worker
+        specification changes.
+
+        Returns
+        -------
+        openclean_metanome.worker.manager.WorkerPool
+        """
+        from flowserv.controller.worker.manager import WORKER_ID
+        from openclean_metanome.worker.manager import WorkerPool
+        with self._lock:
+            worker = self.worker()
+            if self._workers is None or worker != self._workerspec:
+                self._workers = WorkerPool(
+                    workers=[worker] if worker else [],
+                    managers={CONTAINER_STEP: worker[WORKER_ID]} if worker else None,
+                    trace_memory=config.TRACEMEMORY(env=self.env)
+                )
+                self._workerspec = worker
+            return self._workers
+
+    def workflow(self, name: str, factory: Callable) -> 'SerialWorkflow':
+        """Get the workflow for the algorithm with the given name. The workflow
+        is created using the given factory when it is first accessed. The
+        factory is called with the identifier of the container image for the
+        algorithm step as its only argument.
+
+        Parameters
+        ----------
+        name: string
+            Unique algorithm name.
+        factory: callable
+            Function that creates the workflow for the algorithm.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.base.SerialWorkflow
+        """
+        with self._lock:
+            workflow = self._workflows.get(name)
+            if workflow is None:
+                workflow = factory(self.image)
+                self._workflows[name] = workflow
+            return workflow
+
+    def _read_config(self, var: str) -> Dict:
+        """Read the configuration object for the given environment variable.
+
+        Objects that are read from files are cached. The cached object is
+        returned as long as the modification time of the file does not change.
+
+        Parameters
+        ----------
+        var: string
+            Name of the environment variable.
+
+        Returns
+        -------
+        dict
+        """
+        env = self.env if self.env is not None else os.environ
+        filename = env.get(var)
+        if not filename or isinstance(filename, (dict, list)):
+            return config.read_config_obj(var=var, env=env)
+        mtime = os.stat(filename).st_mtime_ns
+        with self._lock:
+            cached = self._config.get(var)
+            if cached is not None and cached[0] == filename and cached[1] == mtime:
+                return cached[2]
+            obj = config.read_config_obj(var=var, env=env)
+            self._config[var] = (filename, mtime, obj)
+            return obj
@@ -0,0 +1,398 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Algorithm inputs that are read from relational databases.
+
+A :class:`SQLSource` represents a table or the result of a query in a
+database that is accessed either via a DB-API connection or via a SQLAlchemy
+engine (or connection). The source follows the interface of openclean data
+streams (i.e., it has a list of columns and an ``iterrows()`` method). It can
+be given as the input to all algorithms. The Metanome input file is written
+from batches of rows as they are fetched from the database. The query result
+is never materialized as a whole.
+
+Projection and sampling are pushed down into the SQL query:
+
+- ``columns``: Only the given columns are selected.
+- ``sample``: Each row is selected with the given probability (Bernoulli
+  sampling in the ``WHERE`` clause using the random function of the database
+  dialect).
+- ``limit``: At most the given number of rows are selected.
+
+Connections are reused across runs. For a SQLAlchemy engine, each run checks
+out a connection from the connection pool of the engine and executes the query
+with a server-side cursor (``stream_results``) if supported by the driver. A
+DB-API connection is used as-is and is not closed by the source. Rows are
+fetched in batches of ``batch_size`` rows using ``fetchmany()``.
+
+The default cursors of some DB-API drivers (psycopg, psycopg2, PyMySQL,
+mysqlclient) fetch the complete query result into client memory when the
+statement is executed. For these drivers, the source uses a server-side
+cursor instead (a named cursor for psycopg and psycopg2, an ``SSCursor`` for
+the MySQL drivers). For other drivers with client-side cursors, a function that
+creates a server-side cursor for the connection can be given as the
+``cursor_factory``.
+
+.. code-block:: python
+
+    from sqlalchemy import create_engine
+    from openclean_metanome.algorithm.hyfd import hyfd
+    from openclean_metanome.sql import SQLSource
+
+    engine = create_engine('postgresql://localhost/db')
+    fds = hyfd(SQLSource(engine, table='trips', columns=['vendor', 'zone'], sample=0.01))
+"""
+
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import csv
+import importlib
+import os
+import uuid
+
+from openclean_metanome.converter import unique_names, BUFFER_SIZE
+
+
+"""Boolean SQL expressions that select each row with a given probability for
+the supported database dialects. The probability is inserted into the
+expression by string formatting.
+"""
+SAMPLE_CONDITIONS = {
+    'duckdb': 'RANDOM() < {}',
+    'mysql': 'RAND() < {}',
+    'postgresql': 'RANDOM() < {}',
+    'sqlite': '(ABS(RANDOM()) % 1000000) < {} * 1000000'
+}
+
+"""Dialect names for the modules of DB-API drivers."""
+DRIVER_DIALECTS = {
+    'duckdb': 'duckdb',
+    'MySQLdb': 'mysql',
+    'mysql': 'mysql',
+    'psycopg': 'postgresql',
+    'psycopg2': 'postgresql',
+    'pymysql': 'mysql',
+    'sqlite3': 'sqlite'
+}
+
+
+class SQLSource(object):
+    """Table or query result in a relational database that is used as the
+    input for a Metanome algorithm. Rows are streamed from the database in
+    batches every time the source is read.
+    """
+    def __init__(
+        self, con: Any, table: Optional[str] = None, query: Optional[str] = None,
+        params: Optional[Union[Sequence, Dict]] = None,
+        columns: Optional[List[str]] = None, sample: Optional[float] = None,
+        limit: Optional[int] = None, batch_size: int = BUFFER_SIZE,
+        cursor_factory: Optional[Callable] = None
+    ):
+        """Initialize the database connection and the query for the source.
+        Either a table name or a query has to be given.
+
+        Parameters
+        ----------
+        con: any
+            DB-API connection, SQLAlchemy engine, or SQLAlchemy connection.
+        table: string, default=None
+            Name of the database table.
+        query: string, default=None
+            SQL query whose result is the input table.
+        params: list or dict, default=None
+            Parameters for the query (in the parameter style of the driver).
+        columns: list of string, default=None
+            Names of the columns that are selected. By default, all columns
+            are selected.
+        sample: float, default=None
+            Probability for selecting a row. By default, all rows are
+            selected.
+        limit: int, default=None
+            Maximum number of selected rows.
+        batch_size: int, default=10000
+            Number of rows that are fetched from the database at a time.
+        cursor_factory: callable, default=None
+            Function that creates the cursor for a DB-API connection. The
+            function is called with the connection as its only argument. By
+            default, server-side cursors are used for the drivers that are
+            known to fetch the complete result with their default cursor.
+        """
+        if (table is None) == (query is None):
+            raise ValueError('either table or query is required')
+        if sample is not None and not 0 <= sample <= 1:
+            raise ValueError('invalid sample probability {}'.format(sample))
+        self.con = con
+        self.table = table
+        self.query = query
+        self.params = params
+        self.projection = columns
+        self.sample = sample
+        self.limit = limit
+        self.batch_size = batch_size
+        self.cursor_factory = cursor_factory
+        self.dialect = dialect(con)
+        self._columns = list(columns) if columns is not None else None
+
+    @property
+    def columns(self) -> List[str]:
+        """Get the names of the columns in the source. If no projection is
+        given, the names are read from the description of an empty query
+        result.
+
+        Returns
+        -------
+        list of string
+        """
+        if self._columns is None:
+            sql = 'SELECT * FROM ({}) AS q WHERE 1 = 0'.format(self.sql())
+            with self.execute(sql) as (names, _):
+                self._columns = names
+        return self._columns
+
+    def batches(self) -> Iterator[List[Sequence]]:
+        """Get an iterator over batches of rows in the source.
+
+        Returns
+        -------
+        iterator of list
+        """
+        with self.execute(self.sql()) as (names, batches):
+            if self._columns is None:
+                self._columns = names
+            for batch in batches:
+                yield batch
+
+    def execute(self, sql: str) -> 'QueryResult':
+        """Execute a SQL statement. Returns a context manager for the column
+        names and the batches of rows in the query result.
+
+        Parameters
+        ----------
+        sql: string
+            SQL statement.
+
+        Returns
+        -------
+        openclean_metanome.sql.QueryResult
+        """
+        return QueryResult(source=self, sql=sql)
+
+    def iterrows(self) -> Iterator[Tuple[int, Sequence]]:
+        """Get an iterator over the rows in the source. Row indexes are the
+        positions of the rows in the query result.
+
+        Returns
+        -------
+        iterator of (int, list)
+        """
+        rowidx = 0
+        for batch in self.batches():
+            for row in batch:
+                yield rowidx, row
+                rowidx += 1
+
+    def quote(self, name: str) -> str:
+        """Quote an identifier for the database dialect.
+
+        Parameters
+        ----------
+        name: string
+            Identifier.
+
+        Returns
+        -------
+        string
+        """
+        preparer = getattr(getattr(self.con, 'dialect', None), 'identifier_preparer', None)
+        if preparer is not None:
+            return preparer.quote(name)
+        if self.dialect == 'mysql':
+            return '`{}`'.format(name.replace('`', '``'))
+        return '"{}"'.format(name.replace('"', '""'))
+
+    def sql(self) -> str:
+        """Get the SQL query for the source with the projection and the
+        sampling pushed down.
+
+        Returns
+        -------
+        string
+        """
+        if self.projection is not None:
+            select = ', '.join([self.quote(c) for c in self.projection])
+        else:
+            select = '*'
+        if self.table is not None:
+            source = '.'.join([self.quote(name) for name in self.table.split('.')])
+        else:
+            source = '({}) AS q'.format(self.query)
+        sql = 'SELECT {} FROM {}'.format(select, source)
+        if self.sample is not None:
+            if self.dialect not in SAMPLE_CONDITIONS:
+                raise ValueError("sampling not supported for dialect '{}'".format(self.dialect))
+            sql += ' WHERE ' + SAMPLE_CONDITIONS[self.dialect].format(float(self.sample))
+        if self.limit is not None:
+            sql += ' LIMIT {}'.format(int(self.limit))
+        return sql
+
+
+class QueryResult(object):
+    """Context manager for the result of a SQL statement. Yields the list of
+    column names and an iterator over batches of rows. The cursor (and the
+    pooled connection for SQLAlchemy engines) are released on exit.
+    """
+    def __init__(self, source: SQLSource, sql: str):
+        """Initialize the source and the SQL statement.
+
+        Parameters
+        ----------
+        source: openclean_metanome.sql.SQLSource
+            Database source.
+        sql: string
+            SQL statement.
+        """
+        self.source = source
+        self.sql = sql
+        self._close = list()
+
+    def __enter__(self) -> Tuple[List[str], Iterator[List[Sequence]]]:
+        """Execute the statement."""
+        con, params = self.source.con, self.source.params
+        if hasattr(con, 'exec_driver_sql') or hasattr(con, 'raw_connection'):
+            # SQLAlchemy engine or connection. Engines check out a connection
+            # from their pool that is returned on exit.
+            if not hasattr(con, 'exec_driver_sql'):
+                con = con.connect()
+                self._close.append(con)
+            con = con.execution_options(stream_results=True, yield_per=self.source.batch_size)
+            result = con.exec_driver_sql(self.sql, params) if params is not None else con.exec_driver_sql(self.sql)
+            self._close.append(result)
+            names = list(result.keys())
+            batches = (list(batch) for batch in result.partitions(self.source.batch_size))
+            return names, batches
+        factory = self.source.cursor_factory
+        cursor = factory(con) if factory is not None else server_cursor(con)
+        self._close.append(cursor)
+        cursor.arraysize = self.source.batch_size
+        if params is not None:
+            cursor.execute(self.sql, params)
+        else:
+            cursor.execute(self.sql)
+        # The description of named cursors in psycopg2 is only available
+        # after the first rows were fetched.
+        batch = cursor.fetchmany(self.source.batch_size)
+        names = [d[0] for d in cursor.description]
+        if not batch:
+            return names, iter([])
+        return names, chain([batch], fetch(cursor, self.source.batch_size))
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the cursor and the connection."""
+        while self._close:
+            self._close.pop().close()
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def dialect(con: Any) -> str:
+    """Get the name of the database dialect for a connection. For DB-API
+    connections, the dialect is derived from the module of the driver.
+
+    Parameters
+    ----------
+    con: any
+        DB-API connection, SQLAlchemy engine, or SQLAlchemy connection.
+
+    Returns
+    -------
+    string
+    """
+    if hasattr(con, 'dialect'):
+        return con.dialect.name
+    module = type(con).__module__.split('.')[0]
+    return DRIVER_DIALECTS.get(module, module)
+
+
+def fetch(cursor: Any, batch_size: int) -> Iterator[List[Sequence]]:
+    """Get an iterator over batches of rows from a DB-API cursor.
+
+    Parameters
+    ----------
+    cursor: any
+        DB-API cursor.
+    batch_size: int
+        Number of rows that are fetched at a time.
+
+    Returns
+    -------
+    iterator of list
+    """
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        yield batch
+
+
+def server_cursor(con: Any) -> Any:
+    """Create a cursor for a DB-API connection. For drivers whose default
+    cursor fetches the complete query result into client memory, a server-side
+    cursor is created. All other drivers use their default cursor.
+
+    Parameters
+    ----------
+    con: any
+        DB-API connection.
+
+    Returns
+    -------
+    any
+    """
+    module = type(con).__module__.split('.')[0]
+    if module in ('psycopg', 'psycopg2'):
+        # Named cursors are server-side cursors. Outside of a transaction
+        # (i.e., in autocommit mode) they have to be declared WITH HOLD.
+        name = 'openclean_metanome_{}'.format(uuid.uuid4().hex)
+        return con.cursor(name=name, withhold=bool(getattr(con, 'autocommit', False)))
+    if module in ('pymysql', 'MySQLdb'):
+        cursors = importlib.import_module('{}.cursors'.format(module))
+        return con.cursor(cursors.SSCursor)
+    return con.cursor()
+
+
+def write_sql(source: SQLSource, filename: str) -> Dict:
+    """Write the rows of a database source to a CSV file. Each batch of rows
+    is written as it is fetched from the database. NULL values are written as
+    empty strings.
+
+    Returns the mapping of unique column names in the created file to the
+    columns of the source.
+
+    Parameters
+    ----------
+    source: openclean_metanome.sql.SQLSource
+        Database source.
+    filename: string
+        Path to the input file for the Metanome algorithm.
+
+    Returns
+    -------
+    dict
+    """
+    # Ensure that the parent directory for the output file exists.
+    dirname = os.path.dirname(filename)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with source.execute(source.sql()) as (names, batches):
+        columns, column_mapping = unique_names(names)
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(columns)
+            for batch in batches:
+                writer.writerows(batch)
+    return column_mapping
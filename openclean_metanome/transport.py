@@ -0,0 +1,378 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Shared-memory transport of data frames to worker processes.
+
+When algorithms are run for many data frames in a process pool, each frame is
+pickled to the worker process. The frame store avoids these copies. It
+dictionary-encodes each frame once into a shared segment, i.e., a matrix of
+integer codes with one contiguous array per column (-1 for missing values).
+The segment is either a ``multiprocessing.shared_memory`` block or a
+memory-mapped file (e.g., for frames that exceed the size of ``/dev/shm``).
+Only a small handle (:class:`SharedFrame`) is passed to the worker processes.
+
+Handles can be given as inputs to all algorithms that discover dependencies
+within a single table. Workers attach to the segment without copying it and
+write the Metanome input file directly from the codes. The algorithms only
+compare values for equality, i.e., the results are the same as for the
+original values (see also the dictionary-encoded Arrow inputs in
+:mod:`openclean_metanome.converter`). The in-process algorithms (e.g.,
+:mod:`openclean_metanome.algorithm.afd`) use the codes as column partitions.
+
+The segments are owned by the frame store in the parent process. They are
+removed when the store is closed, when a frame is released, or when the store
+is garbage collected. Worker processes only attach to and detach from the
+segments.
+
+.. code-block:: python
+
+    from concurrent.futures import ProcessPoolExecutor
+    from openclean_metanome.algorithm.hyfd import hyfd
+    from openclean_metanome.transport import FrameStore
+
+    with FrameStore() as store:
+        frames = [store.share(df) for df in frames]
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(hyfd, frames))
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TYPE_CHECKING
+
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import weakref
+
+from openclean_metanome.converter import write_dataframe, CHUNK_SIZE
+from openclean_metanome.partition import factorize
+
+# Import numpy and pandas for type checking only.
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    import pandas as pd
+
+
+"""Types of shared segments."""
+MMAP = 'mmap'
+SHM = 'shm'
+
+"""Default type of shared segments. Shared memory blocks require Python 3.8
+or later (``multiprocessing.shared_memory``). Memory-mapped files are used
+for older versions.
+"""
+DEFAULT_BACKEND = SHM if sys.version_info >= (3, 8) else MMAP
+
+
+class SharedFrame(object):
+    """Handle for a dictionary-encoded data frame in a shared segment. The
+    handle is small and can be pickled to other processes. The segment is a
+    shared memory block (if no path is given) or a memory-mapped file.
+    """
+    def __init__(
+        self, name: str, columns: List, rows: int, dtype: str,
+        path: Optional[str] = None
+    ):
+        """Initialize the segment and the shape of the encoded frame.
+
+        Parameters
+        ----------
+        name: string
+            Name of the shared memory block or of the memory-mapped file.
+        columns: list
+            Columns of the encoded frame.
+        rows: int
+            Number of rows in the encoded frame.
+        dtype: string
+            Data type of the codes.
+        path: string, default=None
+            Path to the memory-mapped file.
+        """
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+        self.dtype = dtype
+        self.path = path
+
+    def __len__(self) -> int:
+        """Get the number of rows in the encoded frame.
+
+        Returns
+        -------
+        int
+        """
+        return self.rows
+
+    @contextmanager
+    def attach(self) -> Iterator['np.ndarray']:
+        """Attach to the shared segment. Yields a read-only matrix of codes
+        with one row for each column of the encoded frame. The segment is
+        detached on exit. References to the matrix (or views of it) have to
+        be deleted before exit. Otherwise, the shared memory block remains
+        mapped until the process terminates.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        import numpy as np
+        shape = (len(self.columns), self.rows)
+        if not self.nbytes:
+            yield np.zeros(shape, dtype=self.dtype)
+        elif self.path is not None:
+            # The file is unmapped when the last view of the matrix is
+            # garbage collected.
+            yield np.memmap(self.path, dtype=self.dtype, mode='r', shape=shape)
+        else:
+            shm = open_shm(self.name)
+            codes = np.ndarray(shape, dtype=self.dtype, buffer=shm.buf)
+            codes.flags.writeable = False
+            try:
+                yield codes
+            finally:
+                del codes
+                try:
+                    shm.close()
+                except BufferError:  # pragma: no cover
+                    pass
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the encoded frame in bytes.
+
+        Returns
+        -------
+        int
+        """
+        import numpy as np
+        return len(self.columns) * self.rows * np.dtype(self.dtype).itemsize
+
+
+class FrameStore(object):
+    """Owner of the shared segments for encoded data frames. The store is a
+    context manager that removes all segments on exit. Segments are also
+    removed when the store is garbage collected.
+    """
+    def __init__(self, backend: Optional[str] = None, dirname: Optional[str] = None):
+        """Initialize the type of segments and the directory for
+        memory-mapped files.
+
+        Parameters
+        ----------
+        backend: string, default=None
+            Type of shared segments, either 'shm' (shared memory blocks) or
+            'mmap' (memory-mapped files). By default, shared memory blocks
+            are used if they are supported by the Python version.
+        dirname: string, default=None
+            Parent directory for memory-mapped files. By default, the system
+            directory for temporary files is used.
+        """
+        backend = backend if backend is not None else DEFAULT_BACKEND
+        if backend not in [SHM, MMAP]:
+            raise ValueError("unknown backend '{}'".format(backend))
+        if backend == SHM and sys.version_info < (3, 8):
+            raise ValueError('shared memory blocks require Python 3.8 or later')
+        self.backend = backend
+        self.basedir = tempfile.mkdtemp(dir=dirname) if backend == MMAP else None
+        # Shared memory blocks by name. The blocks are kept open by the store
+        # until they are released.
+        self._segments = dict()
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, release_all, self._segments, self.basedir)
+
+    def __enter__(self) -> 'FrameStore':
+        """Enter the runtime context for the store."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Remove all shared segments."""
+        self.close()
+
+    def close(self):
+        """Remove all shared segments of the store."""
+        self._finalizer()
+
+    def release(self, frame: SharedFrame):
+        """Remove the shared segment for an encoded frame. Handles for the
+        frame become invalid.
+
+        Parameters
+        ----------
+        frame: openclean_metanome.transport.SharedFrame
+            Handle for the encoded frame.
+        """
+        if frame.path is not None:
+            if os.path.isfile(frame.path):
+                os.remove(frame.path)
+            return
+        with self._lock:
+            shm = self._segments.pop(frame.name, None)
+        if shm is not None:
+            unlink(shm)
+
+    def share(self, df: 'pd.DataFrame') -> SharedFrame:
+        """Encode a data frame into a new shared segment. Returns the handle
+        for the encoded frame.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            Data frame that is shared.
+
+        Returns
+        -------
+        openclean_metanome.transport.SharedFrame
+        """
+        import numpy as np
+        # Access columns by index. Iterating over a pandas index may convert
+        # the column objects (e.g., openclean Column instances) into strings.
+        columns = [df.columns[i] for i in range(len(df.columns))]
+        dtype = 'int32' if len(df.index) < 2 ** 31 else 'int64'
+        name = 'ocm_{}'.format(secrets.token_hex(8))
+        frame = SharedFrame(name=name, columns=columns, rows=len(df.index), dtype=dtype)
+        if not frame.nbytes:
+            return frame
+        shape = (len(columns), frame.rows)
+        if self.backend == MMAP:
+            frame.path = os.path.join(self.basedir, '{}.codes'.format(name))
+            codes = np.memmap(frame.path, dtype=dtype, mode='w+', shape=shape)
+        else:
+            from multiprocessing import shared_memory
+            shm = shared_memory.SharedMemory(name=name, create=True, size=frame.nbytes)
+            with self._lock:
+                self._segments[name] = shm
+            codes = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        for colidx in range(len(columns)):
+            codes[colidx] = factorize(df.iloc[:, colidx].to_numpy()).codes
+        if self.backend == MMAP:
+            codes.flush()
+        del codes
+        return frame
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def codes_frame(codes: 'np.ndarray', columns: List, start: int, end: int) -> 'pd.DataFrame':
+    """Get a data frame for a range of rows of a code matrix. Missing values
+    (-1) are represented as missing values of nullable integer columns.
+
+    Parameters
+    ----------
+    codes: np.ndarray
+        Matrix of codes with one row for each column.
+    columns: list
+        Columns of the data frame.
+    start: int
+        Index of the first row in the range.
+    end: int
+        Index after the last row in the range.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    import pandas as pd
+    data = dict()
+    for colidx in range(len(columns)):
+        values = codes[colidx, start:end]
+        data[colidx] = pd.arrays.IntegerArray(values.copy(), values < 0)
+    return pd.DataFrame(data).set_axis(columns, axis=1)
+
+
+def open_shm(name: str):
+    """Attach to an existing shared memory block without taking ownership.
+
+    Before Python 3.13, attaching registers the block with the resource
+    tracker. Worker processes of a pool share the tracker of the process that
+    created the block, i.e., the registration is a no-op and the block is
+    only removed by its frame store. The registration must not be undone by
+    the worker. Otherwise, the tracker would lose the registration of the
+    frame store.
+
+    Parameters
+    ----------
+    name: string
+        Name of the shared memory block.
+
+    Returns
+    -------
+    multiprocessing.shared_memory.SharedMemory
+    """
+    from multiprocessing import shared_memory
+    if sys.version_info >= (3, 13):  # pragma: no cover
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def release_all(segments: Dict, basedir: Optional[str]):
+    """Remove all shared memory blocks and the directory for memory-mapped
+    files of a frame store.
+
+    Parameters
+    ----------
+    segments: dict
+        Shared memory blocks by name.
+    basedir: string
+        Directory for memory-mapped files.
+    """
+    while segments:
+        _, shm = segments.popitem()
+        unlink(shm)
+    if basedir is not None:
+        shutil.rmtree(basedir, ignore_errors=True)
+
+
+def unlink(shm):
+    """Close and remove a shared memory block.
+
+    Parameters
+    ----------
+    shm: multiprocessing.shared_memory.SharedMemory
+        Shared memory block.
+    """
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:  # pragma: no cover
+        pass
+
+
+def write_shared(frame: SharedFrame, filename: str, chunksize: int = CHUNK_SIZE) -> Dict:
+    """Write the codes of an encoded frame to a CSV file. Missing values are
+    written as empty values. The file is written in ranges of rows. Only the
+    formatted range is held in memory in addition to the shared segment.
+
+    Returns the mapping of unique column names in the created CSV file to the
+    columns of the encoded frame.
+
+    Parameters
+    ----------
+    frame: openclean_metanome.transport.SharedFrame
+        Handle for the encoded frame.
+    filename: string
+        Path to the created CSV file.
+    chunksize: int, default=100000
+        Number of rows in each range.
+
+    Returns
+    -------
+    dict
+    """
+    with frame.attach() as codes:
+        column_mapping = write_dataframe(
+            df=codes_frame(codes, frame.columns, 0, chunksize),
+            filename=filename,
+            processes=1
+        )
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            for start in range(chunksize, frame.rows, chunksize):
+                codes_frame(codes, frame.columns, start, start + chunksize).to_csv(f, header=False, index=False)
+        del codes
+    return column_mapping
@@ -0,0 +1,652 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Worker that executes container steps in a pool of warm, long-running Docker
+containers.
+
+Starting a new container for every algorithm run adds several seconds of
+overhead. The container pool keeps a number of containers running that all
+have a shared work directory mounted as a volume. Run directories are created
+inside the shared work directory and workflow commands are dispatched into the
+running containers via ``docker exec``.
+
+The resource usage of the executed commands is taken from the difference of
+the container statistics before and after the commands are executed. Note
+that the peak memory usage is reported for the container and not for the
+individual command.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from flowserv.controller.serial.workflow.result import ExecResult
+from flowserv.controller.worker.base import ContainerWorker
+from flowserv.model.workflow.step import ContainerStep
+
+import flowserv.util as util
+
+from openclean_metanome.resources import record, USAGE_FILE
+
+import openclean_metanome.progress as progress
+
+
+"""Unique type identifier for DockerPoolWorker serializations."""
+DOCKER_POOL_WORKER = 'docker_pool'
+
+"""Default values for container pool parameters."""
+# Path at which the shared work directory is mounted inside the containers.
+DEFAULT_MOUNT = '/work'
+# Maximum number of containers in a pool.
+DEFAULT_POOL_SIZE = 1
+# Number of seconds after which idle containers are stopped.
+DEFAULT_IDLE_TIMEOUT = 300
+# Number of seconds after which an idle container is probed before it is
+# used again.
+DEFAULT_HEALTH_INTERVAL = 30
+# Minimal number of seconds between two runs of the background reaper that
+# removes idle containers.
+MIN_REAP_INTERVAL = 0.1
+
+"""Command that keeps the pooled containers running."""
+KEEP_ALIVE = ['tail', '-f', '/dev/null']
+
+
+def docker_client():
+    """Get a client for the local Docker daemon.
+
+    Import the docker package here to avoid errors for installations that do
+    not intend to use Docker and therefore did not install the package.
+
+    Returns
+    -------
+    docker.DockerClient
+    """
+    import docker
+    return docker.from_env()
+
+
+class ContainerPool(object):
+    """Pool of warm, long-running containers for a given image. All containers
+    have the same local work directory mounted as a volume.
+
+    Containers are started on demand until the maximum pool size is reached.
+    Containers that have been idle for longer than the idle timeout are stopped
+    and removed by a background thread that runs while the pool has idle
+    containers. Containers are checked for their health before they are handed
+    out again and replaced if they are no longer running.
+
+    Calls to the Docker daemon (starting, probing, and removing containers)
+    are made without holding the pool lock so that a slow daemon does not
+    block other threads that acquire or release containers.
+    """
+    def __init__(
+        self, image: str, workdir: str, size: Optional[int] = DEFAULT_POOL_SIZE,
+        idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+        health_interval: Optional[float] = DEFAULT_HEALTH_INTERVAL,
+        mount: Optional[str] = DEFAULT_MOUNT, client=None
+    ):
+        """Initialize the pool parameters. No containers are started until the
+        first call to ``acquire()``.
+
+        Parameters
+        ----------
+        image: string
+            Identifier of the container image.
+        workdir: string
+            Path to the local work directory that is shared with the containers.
+        size: int, default=1
+            Maximum number of containers in the pool.
+        idle_timeout: float, default=300
+            Number of seconds after which idle containers are removed.
+        health_interval: float, default=30
+            Number of seconds after which an idle container is probed before it
+            is used again.
+        mount: string, default='/work'
+            Path at which the work directory is mounted inside the containers.
+        client: docker.DockerClient, default=None
+            Client for the Docker daemon. By default, a client for the local
+            daemon is created when the first container is started.
+        """
+        self.image = image
+        self.workdir = os.path.abspath(workdir)
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.mount = mount
+        self.client = client
+        # List of (container, last used) pairs for idle containers and the
+        # number of containers that are currently in use.
+        self._idle = list()
+        self._busy = 0
+        self._lock = threading.Condition()
+        # Background thread that removes idle containers and the event that
+        # stops it.
+        self._reaper = None
+
+    def __len__(self) -> int:
+        """Get the number of containers in the pool.
+
+        Returns
+        -------
+        int
+        """
+        with self._lock:
+            return len(self._idle) + self._busy
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Get a running container from the pool.
+
+        Returns an idle container if one is available and healthy. Starts a new
+        container if all containers are in use and the pool is not full.
+        Otherwise, waits until a container is released. Raises a TimeoutError
+        if no container becomes available within the given timeout.
+
+        Parameters
+        ----------
+        timeout: float, default=None
+            Maximum number of seconds to wait for a container.
+
+        Returns
+        -------
+        docker.models.containers.Container
+        """
+        self.reap()
+        while True:
+            # Reserve the slot for an idle container or for a new container.
+            with self._lock:
+                while not self._idle and self._busy >= self.size:
+                    if not self._lock.wait(timeout=timeout):
+                        raise TimeoutError('no container available for {}'.format(self.image))
+                self._busy += 1
+                container, last_used = self._idle.pop() if self._idle else (None, None)
+            if container is not None and self.is_healthy(container, last_used=last_used):
+                return container
+            try:
+                if container is None:
+                    return self._start()
+                self._remove(container)
+            except Exception:
+                self._free()
+                raise
+            # Release the slot of the removed container and try again.
+            self._free()
+
+    def close(self):
+        """Stop the background reaper and remove all idle containers in the
+        pool.
+        """
+        with self._lock:
+            if self._reaper is not None:
+                self._reaper.set()
+                self._reaper = None
+            idle, self._idle = self._idle, list()
+        for container, _ in idle:
+            self._remove(container)
+
+    def is_healthy(self, container, last_used: Optional[float] = None) -> bool:
+        """Check if the given container is running. Containers that have been
+        idle for longer than the health check interval are probed by executing
+        a no-op command inside the container.
+
+        Parameters
+        ----------
+        container: docker.models.containers.Container
+            Container in the pool.
+        last_used: float, default=None
+            Time when the container was last used. Always probe the container
+            if not given.
+
+        Returns
+        -------
+        bool
+        """
+        try:
+            container.reload()
+            if container.status != 'running':
+                return False
+            if last_used is not None and time.time() - last_used < self.health_interval:
+                return True
+            return container.exec_run(['true']).exit_code == 0
+        except Exception as ex:
+            logging.error(ex, exc_info=True)
+            return False
+
+    def path(self, rundir: str) -> str:
+        """Get the path for a local run directory inside the containers.
+
+        Raises a ValueError if the run directory is not inside the shared work
+        directory.
+
+        Parameters
+        ----------
+        rundir: string
+            Path to a local run directory.
+
+        Returns
+        -------
+        string
+        """
+        relpath = os.path.relpath(os.path.abspath(rundir), self.workdir)
+        if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+            raise ValueError("'{}' not in work directory '{}'".format(rundir, self.workdir))
+        return '/'.join([self.mount] + [p for p in relpath.split(os.sep) if p != os.curdir])
+
+    def reap(self):
+        """Stop and remove all containers that have been idle for longer than
+        the idle timeout.
+        """
+        with self._lock:
+            expired = self._expired()
+        for container in expired:
+            self._remove(container)
+
+    def release(self, container, healthy: Optional[bool] = True):
+        """Return a container to the pool. Containers that are marked as not
+        healthy are removed.
+
+        Parameters
+        ----------
+        container: docker.models.containers.Container
+            Container that was acquired from the pool.
+        healthy: bool, default=True
+            Flag indicating whether the container can be reused.
+        """
+        with self._lock:
+            self._busy -= 1
+            if healthy:
+                self._idle.append((container, time.time()))
+            expired = self._expired()
+            if self._idle and self._reaper is None:
+                self._reaper = threading.Event()
+                threading.Thread(target=self._reap_idle, args=(self._reaper,), daemon=True).start()
+            self._lock.notify()
+        if not healthy:
+            expired.append(container)
+        for container in expired:
+            self._remove(container)
+
+    def _expired(self) -> List:
+        """Remove all containers that have been idle for longer than the idle
+        timeout from the list of idle containers. Returns the removed
+        containers, which have to be stopped by the caller. Expects that the
+        caller holds the pool lock.
+
+        Returns
+        -------
+        list of docker.models.containers.Container
+        """
+        now = time.time()
+        expired = [c for c, last_used in self._idle if now - last_used > self.idle_timeout]
+        self._idle = [(c, t) for c, t in self._idle if now - t <= self.idle_timeout]
+        return expired
+
+    def _free(self):
+        """Release the slot of a container that was removed from the pool."""
+        with self._lock:
+            self._busy -= 1
+            self._lock.notify()
+
+    def _reap_idle(self, stop: threading.Event):
+        """Remove idle containers after their timeout until the pool has no
+        idle containers left or the given event is set.
+
+        Parameters
+        ----------
+        stop: threading.Event
+            Event that stops the reaper.
+        """
+        interval = max(self.idle_timeout / 2, MIN_REAP_INTERVAL)
+        while not stop.wait(interval):
+            with self._lock:
+                if stop.is_set():
+                    return
+                expired = self._expired()
+                done = not self._idle
+                if done:
+                    self._reaper = None
+            # Stop the expired containers after releasing the lock.
+            for container in expired:
+                self._remove(container)
+            if done:
+                return
+
+    def _remove(self, container):
+        """Stop and remove the given container. Errors are logged but not
+        raised.
+        """
+        try:
+            container.remove(force=True)
+        except Exception as ex:
+            logging.error(ex, exc_info=True)
+
+    def _start(self):
+        """Start a new long-running container with the shared work directory
+        mounted as a volume.
+
+        Returns
+        -------
+        docker.models.containers.Container
+        """
+        if self.client is None:
+            self.client = docker_client()
+        os.makedirs(self.workdir, exist_ok=True)
+        return self.client.containers.run(
+            image=self.image,
+            command=KEEP_ALIVE,
+            volumes={self.workdir: {'bind': self.mount, 'mode': 'rw'}},
+            detach=True,
+            remove=False
+        )
+
+
+"""Index of container pools. Pools are shared by all workers that use the same
+image, work directory, and pool parameters.
+"""
+_pools = dict()
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    image: str, workdir: str, size: Optional[int] = DEFAULT_POOL_SIZE,
+    idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+    health_interval: Optional[float] = DEFAULT_HEALTH_INTERVAL, client=None
+) -> ContainerPool:
+    """Get the container pool for the given image, work directory, and pool
+    parameters. Creates a new pool if no pool exists yet. Workers that use
+    different pool parameters (size, idle timeout, health check interval) for
+    the same image and work directory get separate pools.
+
+    Parameters
+    ----------
+    image: string
+        Identifier of the container image.
+    workdir: string
+        Path to the local work directory that is shared with the containers.
+    size: int, default=1
+        Maximum number of containers in the pool.
+    idle_timeout: float, default=300
+        Number of seconds after which idle containers are removed.
+    health_interval: float, default=30
+        Number of seconds after which an idle container is probed before it
+        is used again.
+    client: docker.DockerClient, default=None
+        Client for the Docker daemon.
+
+    Returns
+    -------
+    openclean_metanome.worker.docker.ContainerPool
+    """
+    key = (image, os.path.abspath(workdir), size, idle_timeout, health_interval)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ContainerPool(
+                image=image,
+                workdir=workdir,
+                size=size,
+                idle_timeout=idle_timeout,
+                health_interval=health_interval,
+                client=client
+            )
+            _pools[key] = pool
+        return pool
+
+
+@atexit.register
+def close_pools():
+    """Stop all containers in all pools. Called when the interpreter exits."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+class DockerPoolWorker(ContainerWorker):
+    """Container step engine that executes the commands in a workflow step
+    inside warm containers from a container pool.
+
+    The run directory for the executed workflow steps has to be located inside
+    the work directory of the worker.
+    """
+    def __init__(
+        self, workdir: str, size: Optional[int] = DEFAULT_POOL_SIZE,
+        idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+        health_interval: Optional[float] = DEFAULT_HEALTH_INTERVAL,
+        variables: Optional[Dict] = None, env: Optional[Dict] = None,
+        identifier: Optional[str] = None, volume: Optional[str] = None,
+        client=None
+    ):
+        """Initialize the container pool parameters and the optional mapping
+        with default values for placeholders in command template strings.
+
+        Parameters
+        ----------
+        workdir: string
+            Path to the local work directory that is shared with the containers.
+        size: int, default=1
+            Maximum number of containers in the pool.
+        idle_timeout: float, default=300
+            Number of seconds after which idle containers are removed.
+        health_interval: float, default=30
+            Number of seconds after which an idle container is probed before
+            it is used again.
+        variables: dict, default=None
+            Mapping with default values for placeholders in command template
+            strings.
+        env: dict, default=None
+            Default settings for environment variables when executing workflow
+            steps. These settings can get overridden by step-specific settings.
+        identifier: string, default=None
+            Unique worker identifier. If the value is None a new unique identifier
+            will be generated.
+        volume: string, default=None
+            Identifier for the storage volume that the worker has access to.
+        client: docker.DockerClient, default=None
+            Client for the Docker daemon.
+        """
+        super(DockerPoolWorker, self).__init__(
+            variables=variables,
+            env=env,
+            identifier=identifier,
+            volume=volume
+        )
+        self.workdir = workdir
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.client = client
+
+    def run(self, step: ContainerStep, env: Dict, rundir: str) -> ExecResult:
+        """Execute the list of commands from a workflow step in a container from
+        the pool for the step image.
+
+        Stops execution if one of the commands fails. Returns the combined
+        result from all the commands that were executed. If a progress
+        listener is registered, the command output is streamed and passed to
+        the listener as progress events. The container is removed from the
+        pool if the listener raises an exception.
+
+        Parameters
+        ----------
+        step: flowserv.controller.serial.workflow.ContainerStep
+            Step in a serial workflow.
+        env: dict, default=None
+            Default settings for environment variables when executing workflow
+            steps. May be None.
+        rundir: string
+            Path to the working directory of the workflow run.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.result.ExecResult
+        """
+        logging.info('run step with Docker pool worker')
+        result = ExecResult(step=step)
+        pool = get_pool(
+            image=step.image,
+            workdir=self.workdir,
+            size=self.size,
+            idle_timeout=self.idle_timeout,
+            health_interval=self.health_interval,
+            client=self.client
+        )
+        container, healthy = None, True
+        try:
+            workdir = pool.path(rundir)
+            container = pool.acquire()
+            callback = progress.listener()
+            before = stats(container)
+            for cmd in step.commands:
+                logging.info('{}'.format(cmd))
+                if callback is not None:
+                    exit_code = stream(
+                        container=container,
+                        cmd=cmd,
+                        workdir=workdir,
+                        env=env,
+                        callback=callback,
+                        result=result
+                    )
+                else:
+                    r = container.exec_run(
+                        ['sh', '-c', cmd],
+                        workdir=workdir,
+                        environment=env,
+                        demux=True
+                    )
+                    stdout, stderr = r.output if r.output else (None, None)
+                    append(result.stdout, stdout)
+                    append(result.stderr, stderr)
+                    exit_code = r.exit_code
+                if exit_code != 0:
+                    result.returncode = exit_code
+                    break
+            # Record the resource usage of the executed commands in the run
+            # directory.
+            record(os.path.join(rundir, USAGE_FILE), **usage(before, stats(container)))
+        except Exception as ex:
+            logging.error(ex, exc_info=True)
+            strace = '\n'.join(util.stacktrace(ex))
+            logging.debug(strace)
+            result.stderr.append(strace)
+            result.exception = ex
+            result.returncode = 1
+            healthy = False
+        finally:
+            if container is not None:
+                pool.release(container, healthy=healthy)
+        return result
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def append(outstream: List[str], output: bytes):
+    """Append the given output to an output stream if it is not empty."""
+    if output:
+        outstream.append(output.decode('utf-8'))
+
+
+def stats(container) -> Optional[Dict]:
+    """Get the current resource usage statistics for a container. The result
+    is None if the statistics are not available.
+
+    Parameters
+    ----------
+    container: docker.models.containers.Container
+        Container that was acquired from the pool.
+
+    Returns
+    -------
+    dict
+    """
+    try:
+        return container.stats(stream=False)
+    except Exception as ex:  # pragma: no cover
+        logging.warning('container stats not available: {}'.format(ex))
+        return None
+
+
+def stream(
+    container, cmd: str, workdir: str, env: Dict, callback: Callable,
+    result: ExecResult
+) -> int:
+    """Execute a command in the given container and stream the output to the
+    progress listener. The output is added to the given execution result.
+    Returns the exit code of the command.
+
+    Parameters
+    ----------
+    container: docker.models.containers.Container
+        Container that was acquired from the pool.
+    cmd: string
+        Command that is executed.
+    workdir: string
+        Working directory for the command inside the container.
+    env: dict
+        Environment variables for the command.
+    callback: callable
+        Progress listener.
+    result: flowserv.controller.serial.workflow.result.ExecResult
+        Execution result for the workflow step.
+
+    Returns
+    -------
+    int
+    """
+    api = container.client.api
+    exec_id = api.exec_create(
+        container.id,
+        ['sh', '-c', cmd],
+        workdir=workdir,
+        environment=env
+    )['Id']
+    chunks = api.exec_start(exec_id, stream=True, demux=True)
+    output = progress.monitor(streams=progress.demux(chunks), callback=callback)
+    append(result.stdout, output[progress.STDOUT].encode('utf-8'))
+    append(result.stderr, output[progress.STDERR].encode('utf-8'))
+    return api.exec_inspect(exec_id)['ExitCode']
+
+
+def usage(before: Optional[Dict], after: Optional[Dict]) -> Dict:
+    """Get the resource usage values for the commands that were executed
+    between two snapshots of the container statistics. CPU times are given
+    in seconds.
+
+    Parameters
+    ----------
+    before: dict
+        Container statistics before the commands were executed.
+    after: dict
+        Container statistics after the commands were executed.
+
+    Returns
+    -------
+    dict
+    """
+    if not before or not after:
+        return dict()
+
+    def cpu(doc, key):
+        return doc.get('cpu_stats', {}).get('cpu_usage', {}).get(key, 0)
+
+    def blkio(doc, op):
+        entries = doc.get('blkio_stats', {}).get('io_service_bytes_recursive') or []
+        return sum(e.get('value', 0) for e in entries if e.get('op', '').lower() == op)
+
+    memory = after.get('memory_stats', {})
+    return {
+        'peak_rss': memory.get('max_usage', memory.get('usage')),
+        'user_time': (cpu(after, 'usage_in_usermode') - cpu(before, 'usage_in_usermode')) / 1e9,
+        'system_time': (cpu(after, 'usage_in_kernelmode') - cpu(before, 'usage_in_kernelmode')) / 1e9,
+        'read_bytes': blkio(after, 'read') - blkio(before, 'read'),
+        'write_bytes': blkio(after, 'write') - blkio(before, 'write')
+    }
@@ -0,0 +1,324 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Factory for workers that extends the flowserv worker pool with the worker
+types that are defined in this package.
+
+In addition to the worker types that are supported by flowserv, the worker
+specification may have the type ``docker_pool`` for a worker that runs
+container steps in a pool of warm Docker containers. The specification for
+this worker type has the following additional elements:
+
+.. code-block:: yaml
+
+    workdir:
+        description: Local work directory that is shared with the containers.
+        type: string
+    size:
+        description: Maximum number of containers in the pool.
+        type: integer
+    idle_timeout:
+        description: Seconds after which idle containers are removed.
+        type: number
+    health_interval:
+        description: Seconds after which idle containers are probed before reuse.
+        type: number
+
+Worker specifications may also define the capacity of the worker in number
+of ``cores`` and ``memory`` (in MB). The capacity is used by the
+:class:`openclean_metanome.worker.scheduler.Scheduler` to distribute
+algorithm runs across multiple workers.
+"""
+
+from typing import Dict, List, Optional
+
+import os
+import threading
+import tracemalloc
+
+from flowserv.controller.serial.workflow.result import ExecResult
+from flowserv.controller.worker.base import Worker
+from flowserv.controller.worker.code import CodeWorker as FlowservCodeWorker
+from flowserv.controller.worker.manager import WorkerPool as FlowservWorkerPool, WorkerSpec
+from flowserv.controller.worker.subprocess import SUBPROCESS_WORKER
+from flowserv.model.workflow.step import CodeStep, WorkflowStep
+from flowserv.volume.fs import FileSystemStorage
+
+import flowserv.controller.worker.manager as flowserv
+import flowserv.error as err
+import flowserv.util as util
+
+from openclean_metanome.algorithm.base import INPUT_STEP, PARSER_STEP
+from openclean_metanome.resources import record, USAGE_FILE
+from openclean_metanome.worker.docker import DockerPoolWorker, DOCKER_POOL_WORKER
+from openclean_metanome.worker.docker import DEFAULT_HEALTH_INTERVAL, DEFAULT_IDLE_TIMEOUT, DEFAULT_POOL_SIZE
+from openclean_metanome.worker.stream import StreamingSubprocessWorker
+
+
+"""Serialization label for the shared work directory of a worker."""
+WORKDIR = 'workdir'
+
+"""Lock that serializes the execution of code steps. The flowserv code worker
+changes the working directory of the process and redirects the standard
+output streams while a code step is executed. Code steps of workflow runs in
+different threads must therefore not overlap.
+"""
+CODE_LOCK = threading.Lock()
+
+"""Resource usage fields for the peak memory that is allocated by Python while
+executing the code steps of an algorithm workflow.
+"""
+PEAKS = {INPUT_STEP: 'input_peak', PARSER_STEP: 'parse_peak'}
+
+
+class CodeWorker(FlowservCodeWorker):
+    """Code worker that executes code steps while holding a process-wide lock.
+    Allows to run multiple workflows concurrently in different threads.
+
+    If memory tracing is enabled, the peak memory that is allocated while
+    executing the steps that write the algorithm input and parse the
+    algorithm results is measured using :mod:`tracemalloc` and recorded in
+    the usage file of the run. Tracing slows down memory allocations and is
+    therefore disabled by default.
+    """
+    def __init__(
+        self, trace_memory: Optional[bool] = False, identifier: Optional[str] = None,
+        volume: Optional[str] = None
+    ):
+        """Initialize the memory tracing flag, the worker identifier and the
+        accessible storage volume.
+
+        Parameters
+        ----------
+        trace_memory: bool, default=False
+            Measure the peak memory that is allocated by the input and parser
+            steps if True.
+        identifier: string, default=None
+            Unique worker identifier. If the value is None a new unique
+            identifier will be generated.
+        volume: string, default=None
+            Identifier for the storage volume that the worker has access to.
+        """
+        super(CodeWorker, self).__init__(identifier=identifier, volume=volume)
+        self.trace_memory = trace_memory
+
+    def exec(self, step: CodeStep, context: Dict, store: FileSystemStorage) -> ExecResult:
+        """Execute a workflow step of type
+        :class:`flowserv.model.workflow.step.CodeStep` in a given context.
+
+        Parameters
+        ----------
+        step: flowserv.model.workflow.step.CodeStep
+            Code step in a serial workflow.
+        context: dict
+            Context for the executed code.
+        store: flowserv.volume.fs.FileSystemStorage
+            Storage volume that contains the workflow run files.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.result.ExecResult
+        """
+        with CODE_LOCK:
+            field = PEAKS.get(step.identifier) if self.trace_memory else None
+            if field is None:
+                return super(CodeWorker, self).exec(step=step, context=context, store=store)
+            # Measure the peak memory that is allocated while the step is
+            # executed relative to the memory that is allocated before.
+            tracing = tracemalloc.is_tracing()
+            if not tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):  # pragma: no cover
+                # Python 3.9+. The peak of a running trace cannot be reset
+                # in older versions.
+                tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            try:
+                result = super(CodeWorker, self).exec(step=step, context=context, store=store)
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+            finally:
+                if not tracing:
+                    tracemalloc.stop()
+            record(os.path.join(store.basedir, USAGE_FILE), **{field: max(peak, 0)})
+            return result
+
+
+class WorkerPool(FlowservWorkerPool):
+    """Worker pool that is able to create instances of the worker types that
+    are defined in this package.
+
+    The pool maintains its own index of worker specifications and cache of
+    worker instances instead of relying on the internals of the flowserv
+    worker pool.
+    """
+    def __init__(
+        self, workers: Optional[List[Dict]] = None, managers: Optional[Dict] = None,
+        trace_memory: Optional[bool] = False
+    ):
+        """Initialize the specifications for the workers that are managed by
+        this worker pool and the optional mapping of workflow steps to
+        workers.
+
+        Parameters
+        ----------
+        workers: list, default=None
+            List of worker specifications.
+        managers: dict, default=None
+            Mapping from workflow step identifier to worker identifier that
+            defines the worker that is responsible for the execution of the
+            respective workflow step.
+        trace_memory: bool, default=False
+            Measure the peak memory that is allocated by Python in the code
+            steps that write the algorithm input and parse the results.
+        """
+        workers = workers if workers is not None else list()
+        super(WorkerPool, self).__init__(workers=workers, managers=managers)
+        # Index of worker specifications and cache for created workers.
+        self.specs = {doc['name']: doc for doc in workers}
+        self.workers = dict()
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+
+    def get(self, step: WorkflowStep) -> Worker:
+        """Get the instance of the worker that is associated with the given
+        workflow step.
+
+        If no worker is associated with the given step the default worker for
+        the step type is returned. Raises an error if the associated worker
+        is unknown.
+
+        Parameters
+        ----------
+        step: flowserv.model.workflow.step.WorkflowStep
+            Step in a serial workflow.
+
+        Returns
+        -------
+        flowserv.controller.worker.base.Worker
+
+        Raises
+        ------
+        flowserv.error.UnknownObjectError
+        """
+        identifier = self.managers.get(step.name)
+        if identifier is None:
+            return self.get_default_worker(step)
+        with self._lock:
+            worker = self.workers.get(identifier)
+            if worker is None:
+                spec = self.specs.get(identifier)
+                if spec is None:
+                    raise err.UnknownObjectError(obj_id=identifier, type_name='worker')
+                worker = create_worker(spec)
+                self.workers[identifier] = worker
+            return worker
+
+    def get_default_worker(self, step: WorkflowStep) -> Worker:
+        """Return the default worker depending on the type of the given
+        workflow step. Code steps are executed by a code worker that can be
+        used by concurrent workflow runs. Container steps are executed by a
+        subprocess worker that emits progress events.
+
+        Parameters
+        ----------
+        step: flowserv.model.workflow.step.WorkflowStep
+            Step in a serial workflow.
+
+        Returns
+        -------
+        flowserv.controller.worker.base.Worker
+        """
+        if step.is_code_step():
+            return CodeWorker(trace_memory=self.trace_memory)
+        elif step.is_container_step():
+            return StreamingSubprocessWorker()
+        return super(WorkerPool, self).get_default_worker(step)
+
+
+def create_worker(doc: Dict) -> Worker:
+    """Factory pattern for workers. Creates workers of the types that are
+    defined in this package and delegates all other types to flowserv.
+
+    Parameters
+    ----------
+    doc: dict
+        Dictionary serialization for a worker.
+
+    Returns
+    -------
+    flowserv.controller.worker.base.Worker
+    """
+    if doc['type'] == DOCKER_POOL_WORKER:
+        return DockerPoolWorker(
+            workdir=doc[WORKDIR],
+            size=doc.get('size', DEFAULT_POOL_SIZE),
+            idle_timeout=doc.get('idle_timeout', DEFAULT_IDLE_TIMEOUT),
+            health_interval=doc.get('health_interval', DEFAULT_HEALTH_INTERVAL),
+            variables=util.to_dict(doc.get('variables', [])),
+            env=util.to_dict(doc.get('env', [])),
+            identifier=doc['name'],
+            volume=doc.get('volume')
+        )
+    elif doc['type'] == SUBPROCESS_WORKER:
+        return StreamingSubprocessWorker(
+            variables=util.to_dict(doc.get('variables', [])),
+            env=util.to_dict(doc.get('env', [])),
+            identifier=doc['name'],
+            volume=doc.get('volume')
+        )
+    return flowserv.create_worker(doc)
+
+
+def DockerPool(
+    workdir: str, size: Optional[int] = DEFAULT_POOL_SIZE,
+    idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+    health_interval: Optional[float] = DEFAULT_HEALTH_INTERVAL,
+    identifier: Optional[str] = None, variables: Optional[Dict] = None,
+    env: Optional[Dict] = None, volume: Optional[str] = None
+) -> Dict:
+    """Get base configuration for a Docker pool worker with the given optional
+    arguments.
+
+    Parameters
+    ----------
+    workdir: string
+        Local work directory that is shared with the containers.
+    size: int, default=1
+        Maximum number of containers in the pool.
+    idle_timeout: float, default=300
+        Number of seconds after which idle containers are removed.
+    health_interval: float, default=30
+        Number of seconds after which an idle container is probed before it
+        is used again.
+    identifier: string, default=None
+        Unique worker identifier. If no identifier is given, a new unique
+        identifier will be generated.
+    variables: dict, default=None
+        Mapping with default values for placeholders in command template
+        strings.
+    env: dict, default=None
+        Default settings for environment variables when executing workflow
+        steps. These settings can get overridden by step-specific settings.
+    volume: string, default=None
+        Identifier for the storage volume that the worker has access to.
+
+    Returns
+    -------
+    dict
+    """
+    doc = WorkerSpec(
+        worker_type=DOCKER_POOL_WORKER,
+        identifier=identifier,
+        variables=variables,
+        env=env,
+        volume=volume
+    )
+    doc[WORKDIR] = workdir
+    doc['size'] = size
+    doc['idle_timeout'] = idle_timeout
+    doc['health_interval'] = health_interval
+    return doc
@@ -0,0 +1,553 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Scheduler that distributes algorithm runs across multiple workers.
+
+The scheduler maintains a list of workers, e.g., several local subprocess
+workers and Docker workers on different hosts. Each worker specification may
+define the capacity of the worker in number of cores and memory (in MB):
+
+.. code-block:: yaml
+
+    - name: local
+      type: subprocess
+      cores: 4
+      memory: 8192
+    - name: docker1
+      type: docker
+      cores: 16
+      memory: 65536
+      env:
+        - key: DOCKER_HOST
+          value: tcp://docker1:2375
+
+Algorithm runs (jobs) are submitted to the scheduler together with their input.
+The resource demand of a job is estimated from the size of its input unless it
+is given explicitly. Jobs are queued and dispatched in submission order to the
+least loaded worker that has enough free capacity. Jobs that do not fit on a
+worker wait until capacity is released. Smaller jobs may be dispatched ahead
+of a waiting job if they fit on a worker (backfilling).
+
+Jobs that fail because of the worker (e.g., connection errors or a Metanome
+process that ran out of memory) are retried on a different worker (if
+possible). Workers that fail repeatedly are excluded from scheduling for a
+cool-down period. All other errors are raised by the job itself (e.g., for
+invalid arguments) and are passed to the job result without a retry. The scheduler
+keeps per-worker metrics on completed and failed jobs and on utilization.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import logging
+import os
+import threading
+import time
+
+from openclean_metanome.retry import OutOfMemoryError
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.config as config
+
+
+"""Serialization labels for the capacity of a worker."""
+CORES = 'cores'
+MEMORY = 'memory'
+
+"""Default values for scheduler parameters."""
+# Default number of cores for workers and jobs.
+DEFAULT_CORES = 1
+# Default memory (in MB) for workers.
+DEFAULT_MEMORY = 4096
+# Minimum memory demand (in MB) for a job.
+MIN_MEMORY = 256
+# Factor for estimating the memory demand of a job from the input size.
+MEMORY_FACTOR = 10
+# Number of times a failed job is retried.
+RETRIES = 2
+# Number of consecutive failures after which a worker is excluded.
+MAX_FAILURES = 3
+# Number of seconds for which a failing worker is excluded from scheduling.
+COOLDOWN = 60
+
+
+"""Snapshot of the metrics for a worker."""
+WorkerMetrics = namedtuple(
+    'WorkerMetrics',
+    [
+        'name', 'cores', 'memory', 'running', 'completed', 'failed',
+        'cores_in_use', 'memory_in_use', 'busy_time', 'utilization',
+        'available'
+    ]
+)
+
+
+class Scheduler(object):
+    """Scheduler for algorithm runs on a fleet of workers. Each worker has a
+    separate :class:`openclean_metanome.session.MetanomeSession` that is used
+    to run the jobs that are dispatched to the worker.
+
+    Jobs are functions that take the input as their first argument and a
+    keyword argument *session*, e.g., the algorithm functions
+    :func:`openclean_metanome.algorithm.hyfd.hyfd` and
+    :func:`openclean_metanome.algorithm.hyucc.hyucc`.
+
+    The scheduler can be used as a context manager that shuts down the
+    scheduler (and waits for all jobs to finish) on exit.
+    """
+    def __init__(
+        self, workers: Optional[List[Dict]] = None, env: Optional[Dict] = None,
+        retries: Optional[int] = RETRIES, memory_factor: Optional[float] = MEMORY_FACTOR,
+        max_failures: Optional[int] = MAX_FAILURES, cooldown: Optional[float] = COOLDOWN
+    ):
+        """Initialize the workers and the scheduling parameters.
+
+        Parameters
+        ----------
+        workers: list of dict, default=None
+            Worker specifications. By default, the workers that are defined
+            by the *METANOME_WORKER* configuration are used. If no worker is
+            configured a single local subprocess worker is used with one core
+            for each available CPU.
+        env: dict, default=None
+            Optional environment variables that override the system-wide
+            settings, default=None
+        retries: int, default=2
+            Number of times a failed job is retried.
+        memory_factor: float, default=10
+            Factor for estimating the memory demand of a job (in bytes) from
+            the size of its input (in bytes).
+        max_failures: int, default=3
+            Number of consecutive failures after which a worker is excluded
+            from scheduling for the cool-down period.
+        cooldown: float, default=60
+            Number of seconds for which a failing worker is excluded.
+        """
+        workers = workers if workers is not None else config.WORKERS(env=env)
+        if not workers:
+            from flowserv.controller.worker.manager import Subprocess
+            workers = [dict(Subprocess(identifier='local'), cores=os.cpu_count())]
+        # Environment for the worker sessions. Each session uses the global
+        # settings with the worker specification of the respective worker.
+        env = dict(env) if env is not None else dict(os.environ)
+        self.workers = list()
+        for spec in workers:
+            session = MetanomeSession(env=dict(env, **{config.METANOME_WORKER: spec}))
+            self.workers.append(WorkerState(spec=spec, session=session))
+        self.retries = retries
+        self.memory_factor = memory_factor
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._queue = deque()
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=sum([w.cores for w in self.workers]))
+
+    def __enter__(self) -> 'Scheduler':
+        """Enter the runtime context for the scheduler."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Wait for all jobs to finish and shut down the scheduler."""
+        self.shutdown(wait=True)
+
+    def metrics(self) -> Dict[str, WorkerMetrics]:
+        """Get a snapshot of the metrics for all workers.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return {w.name: w.metrics() for w in self.workers}
+
+    @property
+    def queued(self) -> int:
+        """Get the number of jobs that are waiting to be dispatched.
+
+        Returns
+        -------
+        int
+        """
+        with self._lock:
+            return len(self._queue)
+
+    def shutdown(self, wait: Optional[bool] = True):
+        """Shut down the scheduler. If *wait* is True, the method returns after
+        all submitted jobs have finished.
+
+        Parameters
+        ----------
+        wait: bool, default=True
+            Wait for all submitted jobs to finish.
+        """
+        if wait:
+            while True:
+                with self._lock:
+                    if not self._queue and not any([w.running for w in self.workers]):
+                        break
+                time.sleep(0.01)
+        self._executor.shutdown(wait=wait)
+
+    def submit(
+        self, func: Callable, df: Any, cores: Optional[int] = None,
+        memory: Optional[int] = None, **kwargs
+    ) -> Future:
+        """Submit a job to the scheduler. Returns a future for the result of
+        the job.
+
+        The job demand is defined by the number of cores and the memory (in
+        MB) that the job requires. The memory demand is estimated from the
+        input size if not given. The demand is reduced to the capacity of the
+        largest worker if no worker has sufficient capacity.
+
+        Parameters
+        ----------
+        func: callable
+            Function that is called with the input as the first argument and
+            the session of the worker as keyword argument *session*.
+        df: pd.DataFrame, string, openclean.data.stream.base.Document, or dict
+            Input for the job.
+        cores: int, default=None
+            Number of cores that the job requires.
+        memory: int, default=None
+            Memory (in MB) that the job requires.
+        kwargs: dict
+            Additional keyword arguments for the job function.
+
+        Returns
+        -------
+        concurrent.futures.Future
+        """
+        cores = cores if cores else DEFAULT_CORES
+        if not memory:
+            memory = max(MIN_MEMORY, int(input_size(df) * self.memory_factor / (1024 * 1024)))
+        # Reduce the demand to the capacity of the largest worker.
+        largest = max(self.workers, key=lambda w: (w.memory, w.cores))
+        job = Job(
+            func=func,
+            df=df,
+            kwargs=kwargs,
+            cores=min(cores, max([w.cores for w in self.workers])),
+            memory=min(memory, largest.memory)
+        )
+        with self._lock:
+            self._queue.append(job)
+            self._dispatch()
+        return job.future
+
+    def _dispatch(self):
+        """Dispatch queued jobs to workers with sufficient free capacity.
+        Expects that the caller holds the scheduler lock.
+        """
+        now = time.monotonic()
+        waiting = deque()
+        while self._queue:
+            job = self._queue.popleft()
+            worker = self._select(job, now)
+            if worker is None:
+                waiting.append(job)
+                continue
+            worker.acquire(job)
+            self._executor.submit(self._run, job, worker)
+        self._queue = waiting
+
+    def _run(self, job: 'Job', worker: 'WorkerState'):
+        """Run a job on the given worker. Re-queues the job if it fails
+        because of the worker and the maximum number of retries has not been
+        reached. Errors of the job itself are set as the job result.
+
+        Parameters
+        ----------
+        job: openclean_metanome.worker.scheduler.Job
+            Job that is executed.
+        worker: openclean_metanome.worker.scheduler.WorkerState
+            Worker that executes the job.
+        """
+        start = time.monotonic()
+        try:
+            result = job.func(job.df, session=worker.session, **job.kwargs)
+            error = None
+        except Exception as ex:
+            logging.error('job failed on worker {}: {}'.format(worker.name, ex))
+            error = ex
+        retry = error is not None and worker_error(error)
+        with self._lock:
+            worker.release(
+                job,
+                elapsed=time.monotonic() - start,
+                failed=error is not None,
+                worker_failure=retry
+            )
+            if retry:
+                if worker.consecutive_failures >= self.max_failures:
+                    worker.available_at = time.monotonic() + self.cooldown
+                job.failed_workers.add(worker.name)
+                if job.attempts <= self.retries:
+                    # Retry the job before all other queued jobs.
+                    self._queue.appendleft(job)
+                else:
+                    job.future.set_exception(error)
+            elif error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+            self._dispatch()
+        if retry and self._queue:
+            # Workers that are excluded from scheduling become available
+            # again after the cool-down period.
+            timer = threading.Timer(self.cooldown, self._retry_dispatch)
+            timer.daemon = True
+            timer.start()
+
+    def _retry_dispatch(self):
+        """Dispatch queued jobs after a cool-down period."""
+        with self._lock:
+            self._dispatch()
+
+    def _select(self, job: 'Job', now: float) -> Optional['WorkerState']:
+        """Select the worker for a job. Returns None if no worker has
+        sufficient free capacity.
+
+        Workers on which the job failed before are only used if the job does
+        not fit on any other worker. Among the remaining workers the worker
+        with the lowest load after assigning the job is selected.
+
+        Parameters
+        ----------
+        job: openclean_metanome.worker.scheduler.Job
+            Job that is scheduled.
+        now: float
+            Current time.
+
+        Returns
+        -------
+        openclean_metanome.worker.scheduler.WorkerState
+        """
+        candidates = [w for w in self.workers if w.available_at <= now and w.fits(job)]
+        if not candidates:
+            # Use excluded workers if all workers are excluded and idle.
+            if all([w.available_at > now for w in self.workers]):
+                candidates = [w for w in self.workers if not w.running and w.fits(job)]
+        preferred = [w for w in candidates if w.name not in job.failed_workers]
+        candidates = preferred if preferred else candidates
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: w.load(job))
+
+
+# -- Helper classes -----------------------------------------------------------
+
+class Job(object):
+    """Job that is submitted to the scheduler. Maintains the job function and
+    its arguments, the resource demand, and the future for the job result.
+    """
+    def __init__(self, func: Callable, df: Any, kwargs: Dict, cores: int, memory: int):
+        """Initialize the job function, its arguments, and its demand.
+
+        Parameters
+        ----------
+        func: callable
+            Job function.
+        df: pd.DataFrame, string, openclean.data.stream.base.Document, or dict
+            Input for the job.
+        kwargs: dict
+            Additional keyword arguments for the job function.
+        cores: int
+            Number of cores that the job requires.
+        memory: int
+            Memory (in MB) that the job requires.
+        """
+        self.func = func
+        self.df = df
+        self.kwargs = kwargs
+        self.cores = cores
+        self.memory = memory
+        self.future = Future()
+        self.attempts = 0
+        self.failed_workers = set()
+
+
+class WorkerState(object):
+    """State of a worker in the scheduler. Maintains the worker capacity, the
+    currently used resources, and the metrics for the worker.
+    """
+    def __init__(self, spec: Dict, session: MetanomeSession):
+        """Initialize the worker from its specification.
+
+        Parameters
+        ----------
+        spec: dict
+            Worker specification.
+        session: openclean_metanome.session.MetanomeSession
+            Session for running jobs on the worker.
+        """
+        self.spec = spec
+        self.session = session
+        self.name = spec['name']
+        self.cores = int(spec.get(CORES, DEFAULT_CORES))
+        self.memory = int(spec.get(MEMORY, DEFAULT_MEMORY))
+        self.cores_in_use = 0
+        self.memory_in_use = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.consecutive_failures = 0
+        self.available_at = 0
+        # Total of core-seconds that were used by jobs on the worker.
+        self.busy_time = 0.0
+        self.created_at = time.monotonic()
+
+    def acquire(self, job: Job):
+        """Assign the resources for a job to the worker.
+
+        Parameters
+        ----------
+        job: openclean_metanome.worker.scheduler.Job
+            Job that is executed on the worker.
+        """
+        job.attempts += 1
+        self.cores_in_use += job.cores
+        self.memory_in_use += job.memory
+        self.running += 1
+
+    def fits(self, job: Job) -> bool:
+        """Test if the worker has sufficient free capacity for a job.
+
+        Parameters
+        ----------
+        job: openclean_metanome.worker.scheduler.Job
+            Job that is scheduled.
+
+        Returns
+        -------
+        bool
+        """
+        if self.cores_in_use + job.cores > self.cores:
+            return False
+        return self.memory_in_use + job.memory <= self.memory
+
+    def load(self, job: Job) -> float:
+        """Get the load of the worker after assigning the given job. The load
+        is the maximum of the fraction of used cores and used memory.
+
+        Parameters
+        ----------
+        job: openclean_metanome.worker.scheduler.Job
+            Job that is scheduled.
+
+        Returns
+        -------
+        float
+        """
+        return max(
+            (self.cores_in_use + job.cores) / self.cores,
+            (self.memory_in_use + job.memory) / self.memory
+        )
+
+    def metrics(self) -> WorkerMetrics:
+        """Get a snapshot of the worker metrics. The utilization is the
+        fraction of the available core-seconds since the worker was created
+        that were used by jobs.
+
+        Returns
+        -------
+        openclean_metanome.worker.scheduler.WorkerMetrics
+        """
+        elapsed = time.monotonic() - self.created_at
+        return WorkerMetrics(
+            name=self.name,
+            cores=self.cores,
+            memory=self.memory,
+            running=self.running,
+            completed=self.completed,
+            failed=self.failed,
+            cores_in_use=self.cores_in_use,
+            memory_in_use=self.memory_in_use,
+            busy_time=self.busy_time,
+            utilization=self.busy_time / (elapsed * self.cores) if elapsed > 0 else 0.0,
+            available=self.available_at <= time.monotonic()
+        )
+
+    def release(self, job: Job, elapsed: float, failed: bool, worker_failure: bool):
+        """Release the resources of a finished job and update the metrics.
+        Only failures that are caused by the worker count towards the
+        consecutive failures of the worker.
+
+        Parameters
+        ----------
+        job: openclean_metanome.worker.scheduler.Job
+            Job that finished on the worker.
+        elapsed: float
+            Run time of the job in seconds.
+        failed: bool
+            Flag indicating whether the job failed.
+        worker_failure: bool
+            Flag indicating whether the job failed because of the worker.
+        """
+        self.cores_in_use -= job.cores
+        self.memory_in_use -= job.memory
+        self.running -= 1
+        self.busy_time += elapsed * job.cores
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+        if worker_failure:
+            self.consecutive_failures += 1
+        else:
+            self.consecutive_failures = 0
+
+
+def input_size(df: Any) -> int:
+    """Estimate the size of a job input in bytes. The size of data streams is
+    unknown and estimated as zero.
+
+    Parameters
+    ----------
+    df: pd.DataFrame, string, openclean.data.stream.base.Document, or dict
+        Input for the job.
+
+    Returns
+    -------
+    int
+    """
+    if isinstance(df, dict):
+        return sum([input_size(source) for source in df.values()])
+    elif isinstance(df, (str, os.PathLike)):
+        return os.path.getsize(df) if os.path.isfile(df) else 0
+    elif hasattr(df, 'memory_usage'):
+        return int(df.memory_usage(index=False, deep=True).sum())
+    elif hasattr(df, 'nbytes'):
+        # Arrow tables and record batches.
+        return int(df.nbytes)
+    return 0
+
+
+def worker_error(error: Exception) -> bool:
+    """Test if a job failed because of the worker that executed it rather than
+    because of the job itself. Worker errors are operating system and
+    connection errors (e.g., a Docker host that is not reachable or a
+    timeout), errors of the Docker client, and Metanome processes that ran
+    out of memory.
+
+    Parameters
+    ----------
+    error: Exception
+        Error that was raised by the job.
+
+    Returns
+    -------
+    bool
+    """
+    if isinstance(error, (OSError, OutOfMemoryError)):
+        return True
+    try:
+        from docker.errors import DockerException
+    except ImportError:  # pragma: no cover
+        return False
+    return isinstance(error, DockerException)
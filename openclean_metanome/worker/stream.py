@@ -0,0 +1,142 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Subprocess worker that streams the output of the executed commands while
+they are running. The output lines are parsed into progress events that are
+passed to the progress listener of the current context (see
+:mod:`openclean_metanome.progress`).
+
+If no progress listener is registered, the output is not streamed. On POSIX
+systems, commands are executed via :mod:`openclean_metanome.resources` to
+record the resource usage of the Metanome process.
+"""
+
+from typing import Dict
+
+import logging
+import os
+import signal
+import subprocess
+
+from flowserv.controller.serial.workflow.result import ExecResult
+from flowserv.controller.worker.subprocess import SubprocessWorker, append
+from flowserv.model.workflow.step import ContainerStep
+
+import flowserv.util as util
+
+import openclean_metanome.progress as progress
+import openclean_metanome.resources as resources
+
+
+class StreamingSubprocessWorker(SubprocessWorker):
+    """Container step engine that uses the subprocess package to execute the
+    commands in a workflow step and emits progress events for the output of
+    the commands while they are running.
+    """
+    def run(self, step: ContainerStep, env: Dict, rundir: str) -> ExecResult:
+        """Execute a list of shell commands in a workflow step.
+
+        Stops execution if one of the commands fails or if the progress
+        listener raises an exception. In the latter case, the running command
+        is killed. Returns the combined result from all the commands that were
+        executed.
+
+        Parameters
+        ----------
+        step: flowserv.controller.serial.workflow.ContainerStep
+            Step in a serial workflow.
+        env: dict, default=None
+            Default settings for environment variables when executing workflow
+            steps. May be None.
+        rundir: string
+            Path to the working directory of the workflow run.
+
+        Returns
+        -------
+        flowserv.controller.serial.workflow.result.ExecResult
+        """
+        if os.name == 'posix':
+            # Record the resource usage of all commands in the run directory.
+            step = ContainerStep(
+                identifier=step.identifier,
+                image=step.image,
+                commands=[resources.command(cmd) for cmd in step.commands],
+                env=step.env
+            )
+        callback = progress.listener()
+        if callback is None:
+            return super(StreamingSubprocessWorker, self).run(step=step, env=env, rundir=rundir)
+        logging.info('run step with streaming subprocess worker')
+        result = ExecResult(step=step)
+        # Windows-specific fix. Based on https://github.com/appveyor/ci/issues/1995
+        if 'SYSTEMROOT' in os.environ:
+            env = dict(env) if env else dict()
+            env['SYSTEMROOT'] = os.environ.get('SYSTEMROOT')
+        parser = progress.ProgressParser()
+        proc = None
+        try:
+            for cmd in step.commands:
+                logging.info('{}'.format(cmd))
+                proc = subprocess.Popen(
+                    cmd,
+                    cwd=rundir,
+                    shell=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env=env,
+                    start_new_session=os.name == 'posix'
+                )
+                output = progress.monitor(
+                    streams={
+                        progress.STDOUT: iter(proc.stdout.readline, b''),
+                        progress.STDERR: iter(proc.stderr.readline, b'')
+                    },
+                    callback=callback,
+                    parser=parser
+                )
+                returncode = proc.wait()
+                proc = None
+                append(result.stdout, output[progress.STDOUT])
+                append(result.stderr, output[progress.STDERR])
+                if returncode != 0:
+                    # Stop execution if the command failed.
+                    result.returncode = returncode
+                    break
+        except Exception as ex:
+            if proc is not None:
+                # Stop the running command if the progress listener raised an
+                # exception.
+                kill(proc)
+            logging.error(ex, exc_info=True)
+            strace = '\n'.join(util.stacktrace(ex))
+            logging.debug(strace)
+            result.stderr.append(strace)
+            result.exception = ex
+            result.returncode = 1
+        return result
+
+
+# -- Helper Methods -----------------------------------------------------------
+
+def kill(proc: subprocess.Popen):
+    """Kill a process that was started by the worker. On POSIX systems the
+    process is the leader of a new process group. The whole group is killed
+    to also stop the processes that were started by the shell.
+
+    Parameters
+    ----------
+    proc: subprocess.Popen
+        Running process.
+    """
+    if os.name == 'posix':
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:  # pragma: no cover
+            pass
+    else:  # pragma: no cover
+        proc.kill()
+    proc.wait()
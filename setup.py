@@ -15,12 +15,19 @@ from setuptools import setup, find_packages
 
 install_requires = [
     'appdirs>=1.4.4',
+    'click',
     'flowserv-core>=0.9.0',
     'refdata>=0.2.0',
+    'requests',
     'openclean-core>=0.4.1'
 ]
 
 
+arrow_require = [
+    'pyarrow>=4.0'
+]
+
+
 tests_require = [
     'coverage>=4.0',
     'pytest',
@@ -30,6 +37,11 @@ tests_require = [
 ]
 
 
+jvm_require = [
+    'JPype1>=1.2'
+]
+
+
 docs_require = [
     'Sphinx',
     'sphinx-rtd-theme',
@@ -38,7 +50,9 @@ docs_require = [
 
 
 extras_require = {
+    'arrow': arrow_require,
     'docs': docs_require,
+    'jvm': jvm_require,
     'tests': tests_require,
     'dev': tests_require + docs_require
 }
@@ -77,6 +91,11 @@ setup(
     extras_require=extras_require,
     tests_require=tests_require,
     install_requires=install_requires,
+    entry_points={
+        'console_scripts': [
+            'openclean-metanome = openclean_metanome.cli:cli'
+        ]
+    },
     classifiers=[
         'License :: OSI Approved :: BSD License',
         'Operating System :: OS Independent',
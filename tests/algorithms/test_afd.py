@@ -0,0 +1,86 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the approximate functional dependency discovery."""
+
+import pandas as pd
+import pytest
+
+from openclean_metanome.algorithm.afd import afd
+from openclean_metanome.converter import RowStream
+
+
+@pytest.fixture
+def zipcodes():
+    """Data frame where the zip code determines the city except for a single
+    dirty row.
+    """
+    return pd.DataFrame(
+        data=[
+            ['10001', 'New York', 'NY', 1],
+            ['10001', 'New York', 'NY', 2],
+            ['10001', 'NYC', 'NY', 3],
+            ['10001', 'New York', 'NY', 4],
+            ['60601', 'Chicago', 'IL', 5],
+            ['60601', 'Chicago', 'IL', 6],
+            ['60601', 'Chicago', 'IL', 7],
+            ['94105', 'San Francisco', 'CA', 8],
+            ['94105', 'San Francisco', 'CA', 9],
+            ['94105', 'San Francisco', 'CA', 10]
+        ],
+        columns=['zip', 'city', 'state', 'id']
+    )
+
+
+def fdset(fds):
+    """Convert a list of functional dependencies into a set of tuples."""
+    return set([(tuple(fd.lhs), fd.rhs[0]) for fd in fds])
+
+
+def test_approximate_fds(zipcodes):
+    """Test discovering approximate FDs with different thresholds."""
+    exact = fdset(afd(zipcodes, max_error=0))
+    assert (('zip',), 'city') not in exact
+    assert (('zip',), 'state') in exact
+    assert (('city',), 'zip') in exact
+    fds = afd(zipcodes, max_error=0.1, threads=2)
+    assert (('zip',), 'city') in fdset(fds)
+    errors = {(tuple(fd.lhs), fd.rhs[0]): fd.error for fd in fds}
+    assert errors[(('zip',), 'city')] == 0.1
+    assert errors[(('zip',), 'state')] == 0
+    # Minimality: no FD has the id column together with another column on
+    # the left-hand-side.
+    assert all([len(fd.lhs) == 1 for fd in fds if 'id' in fd.lhs])
+
+
+def test_approximate_fds_empty_lhs():
+    """Test discovering (nearly) constant columns."""
+    df = pd.DataFrame(data=[['a', 1], ['a', 2], ['a', 3], ['b', 4]], columns=['A', 'B'])
+    fds = afd(df, max_error=0.25)
+    assert ((), 'A') in fdset(fds)
+    assert fdset(afd(df, max_error=0)) == {(('B',), 'A')}
+
+
+def test_approximate_fds_max_lhs_size(zipcodes):
+    """Test limiting the size of the left-hand-side."""
+    fds = afd(zipcodes, max_error=0, max_lhs_size=0)
+    assert fds == []
+    assert all([len(fd.lhs) <= 1 for fd in afd(zipcodes, max_error=0, max_lhs_size=1)])
+
+
+def test_approximate_fds_nulls():
+    """Test the interpretation of missing values."""
+    rows = [['a', None], ['b', None], ['c', 'x']]
+    stream = RowStream(columns=['A', 'B'], rows=rows)
+    assert (('B',), 'A') not in fdset(afd(stream, max_error=0))
+    assert (('B',), 'A') in fdset(afd(stream, max_error=0, null_equals_null=False))
+
+
+def test_invalid_threshold(zipcodes):
+    """Test error for invalid error thresholds."""
+    with pytest.raises(ValueError):
+        afd(zipcodes, max_error=1)
@@ -0,0 +1,77 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the approximate unique column combination discovery."""
+
+import pandas as pd
+import pytest
+import random
+
+from openclean.profiling.constraints.ucc import UniqueColumnCombinationFinder
+from openclean_metanome.algorithm.aucc import aucc, AUCC
+from openclean_metanome.algorithm.groupby import find_uccs
+from openclean_metanome.converter import RowStream
+from openclean_metanome.partition import encode
+
+
+@pytest.fixture
+def orders():
+    """Data frame where the order id is a key except for a single duplicate
+    row.
+    """
+    return pd.DataFrame(
+        data=[
+            [1, 'A', 10],
+            [2, 'B', 10],
+            [3, 'A', 20],
+            [4, 'C', 20],
+            [5, 'B', 30],
+            [6, 'A', 30],
+            [7, 'C', 10],
+            [8, 'B', 20],
+            [9, 'A', 40],
+            [9, 'A', 40]
+        ],
+        columns=['id', 'customer', 'amount']
+    )
+
+
+def test_approximate_uccs(orders):
+    """Test discovering near-keys with different thresholds."""
+    assert aucc(orders, max_duplicates=0) == []
+    uccs = aucc(orders, max_duplicates=0.1, threads=2)
+    assert uccs == [['id'], ['customer', 'amount']]
+    assert uccs[0].uniqueness == 0.9
+    assert uccs[0].duplicates == pytest.approx(0.1)
+    uccs = aucc(orders, max_duplicates=0.6)
+    assert [ucc for ucc in uccs if len(ucc) == 1] == [['id'], ['amount']]
+    assert {tuple(ucc): ucc.uniqueness for ucc in uccs}[('amount',)] == 0.4
+    assert aucc(orders, max_duplicates=0.1, max_ucc_size=1) == [['id']]
+    assert aucc(orders, max_duplicates=0.1, max_ucc_size=0) == []
+    assert aucc(orders, max_duplicates=0.1, max_ucc_size=-2) == [['id'], ['customer', 'amount']]
+    with pytest.raises(ValueError):
+        aucc(orders, max_duplicates=1)
+    assert isinstance(AUCC(), UniqueColumnCombinationFinder)
+
+
+def test_approximate_uccs_exact():
+    """Test that near-keys without duplicates are the exact unique column
+    combinations.
+    """
+    random.seed(11)
+    rows = [[random.randint(0, 3) for _ in range(5)] for _ in range(40)]
+    df = pd.DataFrame(data=rows, columns=['A', 'B', 'C', 'D', 'E'])
+    uccs = aucc(df, max_duplicates=0)
+    assert uccs == find_uccs(*encode(df))
+    assert all([ucc.uniqueness == 1 for ucc in uccs])
+
+
+def test_approximate_uccs_nulls():
+    """Test the interpretation of missing values."""
+    stream = RowStream(columns=['A', 'B'], rows=[['a', None], ['a', None], ['b', 'x']])
+    assert aucc(stream, max_duplicates=0) == []
+    assert aucc(stream, max_duplicates=0, null_equals_null=False) == [['B']]
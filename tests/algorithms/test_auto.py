@@ -0,0 +1,155 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the automatic algorithm selection."""
+
+from collections import namedtuple
+
+import json
+import os
+import pandas as pd
+import pytest
+import subprocess
+
+from openclean_metanome.algorithm.auto import (
+    discover_fds, discover_uccs, table_shape, CostModel, TableShape,
+    FD_WRAPPERS, UCC_WRAPPERS, fd_algorithms, ucc_algorithms
+)
+from openclean_metanome.converter import RowStream
+from openclean_metanome.tests import input_output
+
+import openclean_metanome.config as config
+
+
+# -- Patching for subprocess step execution -----------------------------------
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """Run container step for the algorithms. Returns the list of executed
+    commands.
+    """
+    executed = list()
+
+    def mock_run(*args, **kwargs):
+        rundir = kwargs['cwd']
+        executed.append(args[0])
+        _, outputfile = input_output(rundir, args[0])
+        doc = {
+            'functionalDependencies': [
+                {'lhs': ['COL0'], 'rhs': 'COL2'},
+                {'lhs': ['COL0', 'COL1'], 'rhs': 'COL2'}
+            ],
+            'columnCombinations': [['COL1'], ['COL0', 'COL2']]
+        }
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        return Proc(returncode=0, stdout=b'success', stderr=b'')
+
+    monkeypatch.setattr(subprocess, "run", mock_run)
+    return executed
+
+
+# -- Unit tests ---------------------------------------------------------------
+
+def test_cost_model_calibration(tmpdir):
+    """Test recording algorithm runs and calibrating the cost model."""
+    filename = os.path.join(tmpdir, 'runs.jsonl')
+    shape = TableShape(rows=1000000, columns=5, cardinality=0.5)
+    model = CostModel(filename=filename)
+    selected = model.select(list(FD_WRAPPERS), shape)
+    assert selected in ('dfd', 'tane')
+    # Record a number of slow runs for the selected algorithm.
+    for _ in range(10):
+        model.record(selected, shape, 10000)
+    assert model.select(list(FD_WRAPPERS), shape) != selected
+    # The calibration is restored from the recorded runs.
+    assert CostModel(filename=filename).select(list(FD_WRAPPERS), shape) != selected
+    assert CostModel().select(list(FD_WRAPPERS), shape) == selected
+
+
+def test_cost_model_selection():
+    """Test algorithm selection for different table shapes with the default
+    cost model.
+    """
+    model = CostModel()
+    fds, uccs = list(FD_WRAPPERS), list(UCC_WRAPPERS)
+    # Long and narrow tables.
+    shape = TableShape(rows=1000000, columns=5, cardinality=0.5)
+    assert model.select(fds, shape) in ('dfd', 'tane')
+    assert model.select(uccs, shape) == 'ducc'
+    # Short and wide tables.
+    assert model.select(fds, TableShape(rows=200, columns=60, cardinality=0.5)) == 'fdep'
+    # Long and wide tables.
+    shape = TableShape(rows=1000000, columns=30, cardinality=0.5)
+    assert model.select(fds, shape) == 'hyfd'
+    assert model.select(uccs, shape) == 'hyucc'
+
+
+def test_algorithms_for_jar():
+    """Test that only the algorithms that are provided by the configured
+    Metanome.jar file are available.
+    """
+    assert list(fd_algorithms(env={})) == ['hyfd']
+    assert list(ucc_algorithms(env={})) == ['hyucc']
+    env = {config.METANOME_COMMANDS: 'tane,ducc'}
+    assert sorted(fd_algorithms(env=env)) == ['hyfd', 'tane']
+    assert sorted(ucc_algorithms(env=env)) == ['ducc', 'hyucc']
+
+
+def test_discover_fds(commands, dataset, tmpdir):
+    """Test running the automatically selected FD discovery algorithm."""
+    filename = os.path.join(tmpdir, 'runs.jsonl')
+    env = {config.METANOME_COSTMODEL: filename}
+    fds = discover_fds(dataset, env=env, verbose=False)
+    assert len(fds) == 2
+    fds = discover_fds(dataset, algorithm='hyfd', max_lhs_size=1, env=env, verbose=False)
+    assert len(fds) == 1
+    assert ' hyfd ' in commands[1]
+    with open(filename) as f:
+        assert len(f.readlines()) == 2
+    with pytest.raises(ValueError):
+        discover_fds(dataset, algorithm='unknown', env=env)
+    # TANE is not provided by the default Metanome.jar.
+    with pytest.raises(ValueError):
+        discover_fds(dataset, algorithm='tane', env=env)
+
+
+def test_discover_uccs_for_stream(commands):
+    """Test running the automatically selected UCC discovery algorithm on a
+    data stream.
+    """
+    stream = RowStream(columns=['A', 'B', 'C'], rows=[[1, 2, 3], [4, 5, 6]])
+    env = {config.METANOME_COMMANDS: 'ducc'}
+    keys = discover_uccs(stream, algorithm='ducc', max_ucc_size=1, env=env, model=CostModel(), verbose=False)
+    assert keys == [['B']]
+
+
+def test_table_shape(tmpdir):
+    """Test getting the shape of data frames and CSV files."""
+    df = pd.DataFrame(data=[[1, 'a'], [2, 'a'], [3, 'b'], [4, 'b']], columns=['A', 'B'])
+    assert table_shape(df) == TableShape(rows=4, columns=2, cardinality=0.75)
+    filename = os.path.join(tmpdir, 'data.csv')
+    df.to_csv(filename, index=False)
+    assert table_shape(filename) == TableShape(rows=4, columns=2, cardinality=0.75)
+    assert table_shape(filename, sample_size=2) == TableShape(rows=4, columns=2, cardinality=0.75)
+
+
+@pytest.mark.parametrize('suffix', ['csv', 'csv.gz'])
+def test_table_shape_estimate(suffix, tmpdir):
+    """Test estimating the number of rows in CSV files that are larger than
+    the sample.
+    """
+    df = pd.DataFrame(data=[[i, i % 10] for i in range(1000, 2000)], columns=['A', 'B'])
+    filename = os.path.join(tmpdir, 'data.{}'.format(suffix))
+    df.to_csv(filename, index=False)
+    assert table_shape(filename) == TableShape(rows=1000, columns=2, cardinality=0.505)
+    shape = table_shape(filename, sample_size=100)
+    assert shape.rows == 1000
+    assert shape.cardinality == 0.55
@@ -0,0 +1,105 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the BINDER algorithm wrapper."""
+
+from collections import namedtuple
+
+import csv
+import json
+import os
+import pandas as pd
+import pytest
+import subprocess
+
+from openclean_metanome.algorithm.binder import binder
+from openclean_metanome.converter import RowStream
+
+import openclean_metanome.config as config
+
+
+"""Environment for a Metanome.jar file that provides the BINDER algorithm."""
+ENV = {config.METANOME_COMMANDS: 'binder'}
+
+
+# -- Patching for subprocess step execution -----------------------------------
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+@pytest.fixture
+def mock_subprocess(monkeypatch):
+    """Run container step for the BINDER algorithm. Computes all unary
+    inclusion dependencies from the materialized input files.
+    """
+    def mock_run(*args, **kwargs):
+        rundir, cmd = kwargs['cwd'], args[0]
+        pos = cmd.find('--input-dir "') + 13
+        inputdir = os.path.join(rundir, cmd[pos: cmd.find('"', pos)])
+        pos = cmd.find('--output "') + 10
+        outputfile = os.path.join(rundir, cmd[pos: cmd.find('"', pos)])
+        values = dict()
+        for filename in sorted(os.listdir(inputdir)):
+            with open(os.path.join(inputdir, filename), newline='') as f:
+                rows = list(csv.reader(f))
+            for colidx, colname in enumerate(rows[0]):
+                key = (filename, colname)
+                values[key] = set([r[colidx] for r in rows[1:] if r[colidx]])
+        inds = list()
+        for dep, dep_values in values.items():
+            for ref, ref_values in values.items():
+                if dep != ref and dep_values <= ref_values:
+                    inds.append({
+                        'dependant': {'table': dep[0], 'columns': [dep[1]]},
+                        'referenced': {'table': ref[0], 'columns': [ref[1]]}
+                    })
+        with open(outputfile, 'w') as f:
+            json.dump({'inclusionDependencies': inds}, f)
+        return Proc(returncode=0, stdout=b'success', stderr=b'')
+
+    monkeypatch.setattr(subprocess, "run", mock_run)
+
+
+def test_binder_multiple_tables(mock_subprocess, tmpdir):
+    """Test discovering inclusion dependencies between a data frame, a CSV
+    file, and a data stream.
+    """
+    orders = pd.DataFrame(
+        data=[[1, 'A'], [2, 'B'], [3, 'A']],
+        columns=['order', 'customer']
+    )
+    customers = os.path.join(tmpdir, 'customers.csv')
+    with open(customers, 'w') as f:
+        f.write('id,name\nA,Alice\nB,Bob\nC,Claire\n')
+    items = RowStream(columns=['order', 'qty'], rows=[[1, 10], [3, None]])
+    inds = binder(
+        tables={'orders': orders, 'customers': customers, 'items': items},
+        env=ENV,
+        verbose=False
+    )
+    result = set(
+        (ind.dependant_table, ind.dependant[0], ind.referenced_table, ind.referenced[0])
+        for ind in inds
+    )
+    assert result == {
+        ('orders', 'customer', 'customers', 'id'),
+        ('items', 'order', 'orders', 'order')
+    }
+
+
+def test_binder_table_list(mock_subprocess):
+    """Test identifying tables by their position in a list of inputs."""
+    df1 = pd.DataFrame(data=[['x'], ['y']], columns=['A'])
+    df2 = pd.DataFrame(data=[['x']], columns=['B'])
+    inds = binder(tables=[df1, df2], env=ENV, verbose=False)
+    assert [str(ind) for ind in inds] == ['1[B] <= 0[A]']
+
+
+def test_binder_not_in_jar():
+    """Test error when the configured Metanome.jar does not provide BINDER."""
+    with pytest.raises(ValueError):
+        binder(tables=[pd.DataFrame(data=[['x']], columns=['A'])], env={}, verbose=False)
@@ -0,0 +1,143 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the conditional (per-group) dependency discovery."""
+
+from collections import namedtuple
+from itertools import combinations
+
+import json
+import pandas as pd
+import pytest
+import random
+import subprocess
+
+from openclean_metanome.algorithm.groupby import common_sets, fds_by_group, find_uccs, uccs_by_group
+from openclean_metanome.partition import encode
+from openclean_metanome.tests import input_output
+
+
+@pytest.fixture
+def tenants():
+    """Data frame where the zip code determines the city for tenant 1 but
+    not for tenant 2. The id is a key within each tenant.
+    """
+    return pd.DataFrame(
+        data=[
+            ['t1', '10001', 'New York', 1],
+            ['t1', '10001', 'New York', 2],
+            ['t1', '60601', 'Chicago', 3],
+            ['t2', '10001', 'New York', 1],
+            ['t2', '10001', 'NYC', 2],
+            ['t2', '94105', 'San Francisco', 3],
+            ['t2', '94105', 'San Francisco', 4]
+        ],
+        columns=['tenant', 'zip', 'city', 'id']
+    )
+
+
+def fdset(fds):
+    """Convert a list of functional dependencies into a set of tuples."""
+    return set([(tuple(fd.lhs), fd.rhs[0]) for fd in fds])
+
+
+def test_common_sets():
+    """Test computing the minimal sets that contain a set of each group."""
+    a, b, c, d = [frozenset([x]) for x in 'abcd']
+    assert common_sets([[a, b], [a, c]]) == [a, b | c]
+    assert common_sets([[a, b], [c], [d]]) == [a | c | d, b | c | d]
+    assert common_sets([[a, b], [c], [d]], max_size=2) == []
+    assert common_sets([[a], []]) == []
+    assert common_sets([]) == []
+
+
+def test_fds_by_group(tenants):
+    """Test discovering FDs for each tenant using the in-process engine."""
+    result = fds_by_group(tenants, group_by='tenant', threads=2)
+    assert list(result.groups) == ['t1', 't2']
+    t1, t2 = fdset(result.groups['t1']), fdset(result.groups['t2'])
+    assert (('zip',), 'city') in t1
+    assert (('zip',), 'city') not in t2
+    assert (('city',), 'zip') in t2
+    assert (('id',), 'city') in t2
+    common = fdset(result.common)
+    assert (('city',), 'zip') in common
+    assert (('id',), 'zip') in common
+    assert (('zip',), 'city') not in common
+    assert all(['tenant' not in lhs and rhs != 'tenant' for lhs, rhs in common])
+    # Each common FD holds in every group.
+    for lhs, rhs in common:
+        for _, df in tenants.groupby('tenant'):
+            assert df.groupby(list(lhs))[rhs].nunique().max() == 1
+    with pytest.raises(ValueError):
+        fds_by_group(tenants, group_by='unknown')
+
+
+def test_fds_by_group_random():
+    """Test that common FDs are the minimal FDs that hold in all groups."""
+    random.seed(7)
+    rows = [[random.randint(0, 2)] + [random.randint(0, 2) for _ in range(4)] for _ in range(60)]
+    df = pd.DataFrame(data=rows, columns=['G', 'A', 'B', 'C', 'D'])
+    result = fds_by_group(df, group_by='G')
+    groups = [g for _, g in df.groupby('G')]
+    holds = set()
+    for k in range(4):
+        for lhs in combinations('ABCD', k):
+            for rhs in 'ABCD':
+                if rhs in lhs:
+                    continue
+                if all([(g.groupby(list(lhs))[rhs].nunique().max() if lhs else g[rhs].nunique()) <= 1 for g in groups]):
+                    holds.add((lhs, rhs))
+    minimal = set([(lhs, rhs) for lhs, rhs in holds if not any((x, rhs) in holds for x in combinations(lhs, len(lhs) - 1))])
+    assert fdset(result.common) == minimal
+
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+def test_fds_by_group_with_metanome(tenants, monkeypatch):
+    """Test running HyFD for groups that exceed the small group size."""
+    commands = list()
+
+    def mock_run(*args, **kwargs):
+        commands.append(args[0])
+        _, outputfile = input_output(kwargs['cwd'], args[0])
+        doc = {'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL1'}]}
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        return Proc(returncode=0, stdout=b'', stderr=b'')
+
+    monkeypatch.setattr(subprocess, 'run', mock_run)
+    result = fds_by_group(tenants, group_by=['tenant'], small_group=3, env={})
+    # Only the second tenant has more than three rows.
+    assert len(commands) == 1
+    assert fdset(result.groups['t2']) == {(('zip',), 'city')}
+    assert (('zip',), 'city') in fdset(result.groups['t1'])
+    assert fdset(result.common) == {(('zip',), 'city')}
+
+
+def test_find_uccs():
+    """Test the in-process discovery of unique column combinations."""
+    df = pd.DataFrame(
+        data=[[1, 1, 1, 1], [1, 2, 2, 1], [2, 1, 3, 1], [2, 2, 3, 1]],
+        columns=['A', 'B', 'C', 'D']
+    )
+    columns, partitions = encode(df)
+    assert find_uccs(columns, partitions) == [['A', 'B'], ['B', 'C']]
+    assert find_uccs(columns, partitions, max_size=1) == []
+
+
+def test_uccs_by_group(tenants):
+    """Test discovering keys for each tenant."""
+    result = uccs_by_group(tenants, group_by='tenant')
+    assert result.groups['t1'] == [['id']]
+    assert result.groups['t2'] == [['id']]
+    assert result.common == [['id']]
+    # Groups for multiple grouping columns are identified by tuples.
+    result = uccs_by_group(tenants, group_by=['tenant', 'zip'])
+    assert ('t2', '94105') in result.groups
+    assert result.common == [['id']]
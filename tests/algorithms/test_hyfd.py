@@ -11,10 +11,13 @@ from collections import namedtuple
 
 import json
 import os
+import pandas as pd
 import pytest
 import subprocess
 
-from openclean_metanome.algorithm.hyfd import hyfd
+from openclean_metanome.algorithm.hyfd import hyfd, HyFD
+from openclean_metanome.converter import RowStream
+from openclean_metanome.session import MetanomeSession
 from openclean_metanome.tests import input_output
 
 
@@ -55,3 +58,71 @@ def test_hyfd_algorithm_success(mock_subprocess, dataset):
         results.append([lhs, rhs])
     assert [{1, 2}, {3}] in results
     assert [{2}, {1}] in results
+
+
+def test_hyfd_for_csv_file(mock_subprocess, tmpdir):
+    """Test running the HyFD wrapper on a CSV file."""
+    filename = os.path.join(tmpdir, 'data.csv')
+    with open(filename, 'w') as f:
+        f.write('A,B,A\n1,2,3\n')
+    fds = hyfd(df=filename, verbose=False)
+    results = [[fd.lhs, fd.rhs] for fd in fds]
+    assert [['A', 'B'], ['A']] in results
+    assert [['B'], ['A']] in results
+
+
+def test_hyfd_for_arrow_table(mock_subprocess):
+    """Test running the HyFD wrapper on an Arrow table."""
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'A': pa.array(['x', 'y']).dictionary_encode(), 'B': [1, 2], 'C': [3, 4]})
+    fds = hyfd(df=table, verbose=False)
+    results = [[fd.lhs, fd.rhs] for fd in fds]
+    assert [['A', 'B'], ['C']] in results
+    assert [['B'], ['A']] in results
+
+
+def test_hyfd_with_session(mock_subprocess, dataset):
+    """Test running the HyFD wrapper repeatedly within the same session."""
+    session = MetanomeSession(env={})
+    algo = HyFD(verbose=False, session=session)
+    for _ in range(2):
+        assert len(algo.run(dataset)) == 2
+    assert len(session._workflows) == 1
+
+
+def test_hyfd_canonical_cover(mock_subprocess, dataset):
+    """Test returning the canonical cover of the discovered FDs."""
+    fds = hyfd(df=dataset, canonical_cover=True, verbose=False)
+    results = [([c.colid for c in fd.lhs], [c.colid for c in fd.rhs]) for fd in fds]
+    assert results == [([2], [1]), ([1, 2], [3])]
+
+
+def test_hyfd_derive_uccs(mock_subprocess, dataset):
+    """Test deriving the unique column combinations from the discovered FDs."""
+    algo = HyFD(derive_uccs=True, verbose=False)
+    assert algo.args['memory_guardian'] == ''
+    assert len(algo.run(dataset)) == 2
+    assert [[c.colid for c in ucc] for ucc in algo.uccs] == [[2]]
+    # Tables with duplicate rows have no unique column combinations.
+    algo.run(pd.concat([dataset, dataset]))
+    assert algo.uccs == []
+    # Row iterators can only be read once.
+    with pytest.raises(ValueError):
+        algo.run(RowStream(columns=['A', 'B', 'C'], rows=iter([[1, 2, 3]])))
+    with pytest.raises(ValueError):
+        HyFD(derive_uccs=True, max_lhs_size=2)
+    # The memory guardian may prune left-hand-sides.
+    with pytest.raises(ValueError):
+        HyFD(derive_uccs=True, memory_guardian=True)
+    assert HyFD(derive_uccs=True, memory_guardian=False).args['memory_guardian'] == ''
+    assert HyFD(verbose=False).uccs is None
+    assert HyFD(verbose=False).args['memory_guardian'] == '--memory-guardian'
+
+
+def test_hyfd_function_derive_uccs(mock_subprocess, dataset):
+    """Test deriving the unique column combinations using the module-level
+    function.
+    """
+    fds, uccs = hyfd(df=dataset, derive_uccs=True, verbose=False)
+    assert len(fds) == 2
+    assert [[c.colid for c in ucc] for ucc in uccs] == [[2]]
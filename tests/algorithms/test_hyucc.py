@@ -14,6 +14,7 @@ import os
 import pytest
 import subprocess
 
+from openclean.pipeline import stream
 from openclean_metanome.algorithm.hyucc import hyucc
 from openclean_metanome.tests import input_output
 
@@ -51,3 +52,10 @@ def test_hyucc_algorithm_success(mock_subprocess, dataset):
         results.append(set([c.colid for c in ucc]))
     assert {2} in results
     assert {1, 3} in results
+
+
+def test_hyucc_for_data_stream(mock_subprocess, dataset):
+    """Test running the HyUCC wrapper on an openclean data stream."""
+    keys = hyucc(df=stream(dataset).select(['A', 'B', 'C']), verbose=False)
+    assert ['B'] in keys
+    assert ['A', 'C'] in keys
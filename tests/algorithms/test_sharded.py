@@ -0,0 +1,145 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the sharded dependency discovery."""
+
+from collections import namedtuple
+
+import json
+import os
+import pandas as pd
+import pytest
+import random
+import subprocess
+
+from openclean.data.load import dataset
+from openclean_metanome.algorithm.afd import AFD
+from openclean_metanome.algorithm.groupby import find_uccs
+from openclean_metanome.algorithm.sharded import fds_sharded, read_shards, uccs_sharded
+from openclean_metanome.partition import encode
+from openclean_metanome.tests import input_output
+
+
+@pytest.fixture
+def employees():
+    """Data frame where the dependencies on the first three rows differ from
+    the dependencies on the whole table.
+    """
+    return pd.DataFrame(
+        data=[
+            [1, 'Alice', 'NYC', 'NY'],
+            [2, 'Bob', 'Buffalo', 'NY'],
+            [3, 'Claire', 'Chicago', 'IL'],
+            [4, 'Alice', 'Chicago', 'IL'],
+            [5, 'Dave', 'NYC', 'NY'],
+            [6, 'Bob', 'Buffalo', 'NY']
+        ],
+        columns=['id', 'name', 'city', 'state']
+    )
+
+
+def fdset(fds):
+    """Convert a list of functional dependencies into a set of tuples."""
+    return set([(tuple(fd.lhs), fd.rhs[0]) for fd in fds])
+
+
+def full_fds(df, max_lhs_size=-1, null_equals_null=True):
+    """Discover FDs on the full data frame using the in-process engine."""
+    columns, partitions = encode(df, null_equals_null=null_equals_null)
+    algo = AFD(max_error=0, max_lhs_size=max_lhs_size, null_equals_null=null_equals_null)
+    return fdset(algo.find(columns, partitions))
+
+
+def full_uccs(df, max_ucc_size=-1, null_equals_null=True):
+    """Discover UCCs on the full data frame using the in-process engine."""
+    columns, partitions = encode(df, null_equals_null=null_equals_null)
+    return find_uccs(columns, partitions, max_size=max_ucc_size)
+
+
+def test_fds_sharded(employees, tmpdir):
+    """Test validating FDs that hold on every shard across shards."""
+    fds = fdset(fds_sharded(employees, shard_size=3, threads=2, tmpdir=str(tmpdir)))
+    # City determines state on each shard and on the whole table. Name
+    # determines the city on the first shard only.
+    assert (('city',), 'state') in fds
+    assert (('name',), 'city') not in fds
+    assert fds == full_fds(employees)
+    # Temporary files are removed.
+    assert os.listdir(tmpdir) == []
+
+
+@pytest.mark.parametrize('null_equals_null', [True, False])
+@pytest.mark.parametrize('shard_size', [1, 7, 25, 100])
+def test_fds_sharded_random(shard_size, null_equals_null):
+    """Test that the sharded discovery returns the same FDs as a discovery on
+    the full table.
+    """
+    random.seed(shard_size)
+    values = [None, 0, 1, 2]
+    rows = [[random.choice(values[1:]) for _ in range(3)] + [random.choice(values) for _ in range(2)] for _ in range(60)]
+    df = pd.DataFrame(data=rows, columns=['A', 'B', 'C', 'D', 'E'])
+    result = fds_sharded(df, shard_size=shard_size, null_equals_null=null_equals_null)
+    assert fdset(result) == full_fds(df, null_equals_null=null_equals_null)
+    result = fds_sharded(df, shard_size=shard_size, max_lhs_size=1, null_equals_null=null_equals_null)
+    assert fdset(result) == full_fds(df, max_lhs_size=1, null_equals_null=null_equals_null)
+
+
+def test_fds_sharded_for_file(employees, tmpdir):
+    """Test reading shards from a CSV file and from a data stream that is
+    spilled to disk.
+    """
+    filename = os.path.join(tmpdir, 'employees.csv')
+    employees.to_csv(filename, index=False)
+    assert [len(s.index) for s in read_shards(filename, shard_size=4)] == [4, 2]
+    expected = full_fds(pd.read_csv(filename, dtype=str))
+    assert fdset(fds_sharded(filename, shard_size=2)) == expected
+    assert fdset(fds_sharded(dataset(filename), shard_size=2)) == expected
+
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+def test_fds_sharded_with_metanome(employees, monkeypatch):
+    """Test running HyFD for shards that exceed the small shard size."""
+    commands = list()
+
+    def mock_run(*args, **kwargs):
+        commands.append(args[0])
+        _, outputfile = input_output(kwargs['cwd'], args[0])
+        # Result of HyFD on the first three rows of the table.
+        doc = {'functionalDependencies': [{'lhs': ['COL1'], 'rhs': 'COL2'}, {'lhs': ['COL2'], 'rhs': 'COL3'}]}
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        return Proc(returncode=0, stdout=b'', stderr=b'')
+
+    monkeypatch.setattr(subprocess, 'run', mock_run)
+    result = fds_sharded(employees, shard_size=3, small_shard=2, env={})
+    assert len(commands) == 2
+    # The candidate name -> city is violated across shards and extended.
+    assert fdset(result) == {(('city',), 'state'), (('id', 'name'), 'city'), (('name', 'state'), 'city')}
+
+
+def test_uccs_sharded(employees):
+    """Test validating UCCs that hold on every shard across shards."""
+    # Name is unique on each shard but not on the whole table.
+    assert uccs_sharded(employees, shard_size=3) == [['id']]
+    employees.iloc[5, 2] = 'Albany'
+    assert uccs_sharded(employees, shard_size=3) == [['id'], ['name', 'city']]
+    assert uccs_sharded(employees, shard_size=3, max_ucc_size=1) == [['id']]
+    assert uccs_sharded(employees.iloc[:1], shard_size=3) == full_uccs(employees.iloc[:1])
+
+
+@pytest.mark.parametrize('shard_size', [1, 10, 50])
+def test_uccs_sharded_random(shard_size):
+    """Test that the sharded discovery returns the same UCCs as a discovery
+    on the full table.
+    """
+    random.seed(shard_size)
+    rows = [[random.randint(0, 4) for _ in range(5)] for _ in range(50)]
+    df = pd.DataFrame(data=rows, columns=['A', 'B', 'C', 'D', 'E'])
+    assert uccs_sharded(df, shard_size=shard_size, threads=2) == full_uccs(df)
+    assert uccs_sharded(df, shard_size=shard_size, max_ucc_size=2) == full_uccs(df, max_ucc_size=2)
@@ -0,0 +1,88 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the discovery of functional dependencies on clusters of
+correlated columns.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import random
+
+from openclean_metanome.algorithm.afd import afd
+from openclean_metanome.algorithm.wide import cluster_columns, dependency_strength, fds_wide
+from openclean_metanome.partition import encode
+
+
+def fd_set(fds):
+    """Get a set of pairs of left-hand-side and dependant columns."""
+    return set([(tuple(sorted(fd.lhs)), fd.rhs[0]) for fd in fds])
+
+
+@pytest.fixture
+def wide():
+    """Data frame with three groups of columns. The columns in each group are
+    derived from a common base column.
+    """
+    random.seed(3)
+    data = dict()
+    for group in ['A', 'B', 'C']:
+        base = [random.randint(0, 9) for _ in range(60)]
+        data['{}0'.format(group)] = base
+        data['{}1'.format(group)] = [v % 3 for v in base]
+        data['{}2'.format(group)] = [v // 4 for v in base]
+        data['{}3'.format(group)] = [random.randint(0, 2) for _ in base]
+    return pd.DataFrame(data)
+
+
+def test_cluster_correlated_columns(wide):
+    """Test that the columns that depend on a common base column are grouped
+    together.
+    """
+    _, partitions = encode(wide)
+    strength, holds = dependency_strength(partitions, threads=2)
+    assert holds[0, 1] and not holds[1, 0]
+    assert strength[0, 1] == 1
+    assert np.allclose(strength, strength.T)
+    clusters = cluster_columns(strength, max_size=4, overlap=1)
+    cores = [set(c) for c in clusters]
+    for group in range(3):
+        base = 4 * group
+        assert any([{base, base + 1, base + 2} <= c for c in cores])
+    assert set().union(*cores) == set(range(12))
+    assert cluster_columns(strength, max_size=12, overlap=1) == [list(range(12))]
+
+
+def test_wide_table_completeness(wide):
+    """Test that the result contains exactly the minimal dependencies of the
+    table that are within the guaranteed search space.
+    """
+    expected = fd_set(afd(wide, max_error=0))
+    result = fds_wide(wide, max_cluster_size=5, overlap=1, sample_size=20, seed=1, threads=2)
+    assert not result.complete
+    assert fd_set(result) == set([fd for fd in expected if result.covers(list(fd[0]), fd[1])])
+    assert fd_set(result) <= expected
+    assert len(result.clusters) > 1
+    # All dependencies are found if the left-hand-sides across clusters are
+    # not limited.
+    result = fds_wide(wide, max_cluster_size=5, overlap=1, cross_lhs_size=12, sample_size=20, seed=1)
+    assert fd_set(result) == expected
+    result = fds_wide(wide, max_cluster_size=5, overlap=1, cross_lhs_size=2, max_lhs_size=2)
+    assert result.complete
+    assert fd_set(result) == set([fd for fd in expected if len(fd[0]) <= 2])
+
+
+def test_wide_table_single_cluster(wide):
+    """Test that narrow tables are processed as a single cluster."""
+    result = fds_wide(wide.iloc[:, :4], cross_lhs_size=0)
+    assert result.complete
+    assert fd_set(result) == fd_set(afd(wide.iloc[:, :4], max_error=0))
+    with pytest.raises(ValueError):
+        fds_wide(wide, max_cluster_size=4, overlap=4)
+    with pytest.raises(ValueError):
+        fds_wide(wide, cross_lhs_size=-1)
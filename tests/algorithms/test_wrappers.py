@@ -0,0 +1,92 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the TANE, FDep, DFD, and DUCC algorithm wrappers."""
+
+from collections import namedtuple
+
+import json
+import os
+import pytest
+import subprocess
+
+from openclean_metanome.algorithm.dfd import dfd
+from openclean_metanome.algorithm.ducc import ducc
+from openclean_metanome.algorithm.fdep import fdep
+from openclean_metanome.algorithm.tane import tane
+from openclean_metanome.tests import input_output
+
+import openclean_metanome.config as config
+
+
+"""Environment for a Metanome.jar file that provides all algorithms."""
+ENV = {config.METANOME_COMMANDS: 'tane,fdep,dfd,ducc'}
+
+
+# -- Patching for subprocess step execution -----------------------------------
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """Run container step for the algorithms. Returns the list of executed
+    commands.
+    """
+    executed = list()
+
+    def mock_run(*args, **kwargs):
+        rundir = kwargs['cwd']
+        executed.append(args[0])
+        inputfile, outputfile = input_output(rundir, args[0])
+        if not os.path.isfile(inputfile):
+            raise ValueError('file {} not found'.format(inputfile))
+        doc = {
+            'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL2'}],
+            'columnCombinations': [['COL1']]
+        }
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        return Proc(returncode=0, stdout=b'success', stderr=b'')
+
+    monkeypatch.setattr(subprocess, "run", mock_run)
+    return executed
+
+
+@pytest.mark.parametrize('func,name', [(tane, 'tane'), (fdep, 'fdep'), (dfd, 'dfd')])
+def test_fd_wrapper(func, name, commands, dataset):
+    """Test running the functional dependency discovery wrappers."""
+    fds = func(df=dataset, env=ENV, verbose=False)
+    assert len(fds) == 1
+    assert fds[0].lhs[0].colid == 1
+    assert fds[0].rhs[0].colid == 3
+    assert ' {} '.format(name) in commands[0]
+
+
+def test_tane_parameters(commands, dataset):
+    """Test passing the maximum left-hand-side size to TANE."""
+    tane(df=dataset, max_lhs_size=2, null_equals_null=False, env=ENV, verbose=False)
+    assert '--max-lhs-size 2' in commands[0]
+    assert '--null-equals-null' not in commands[0]
+
+
+def test_ducc_wrapper(commands, dataset):
+    """Test running the DUCC unique column combination wrapper."""
+    keys = ducc(df=dataset, env=ENV, verbose=False)
+    assert [[c.colid for c in ucc] for ucc in keys] == [[2]]
+    assert ' ducc ' in commands[0]
+    assert '--null-equals-null' in commands[0]
+
+
+@pytest.mark.parametrize('func', [tane, fdep, dfd, ducc])
+def test_wrapper_not_in_jar(func, commands, dataset):
+    """Test error when running an algorithm that is not provided by the
+    configured Metanome.jar file.
+    """
+    with pytest.raises(ValueError):
+        func(df=dataset, env={}, verbose=False)
+    assert commands == []
@@ -0,0 +1,160 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the command-line interface."""
+
+from click.testing import CliRunner
+
+import json
+import os
+import pytest
+import sys
+
+from openclean_metanome.cli import cli, expand
+
+import openclean_metanome.config as config
+import openclean_metanome.progress as progress
+
+
+"""Script that replaces the Java process. Writes the result file for the
+algorithm and the input and output files in the command line arguments. Each run is
+logged in the file that is given in the environment. The script sleeps before
+writing the result if a delay is given in the environment.
+"""
+SCRIPT = '''
+import json
+import os
+import sys
+import time
+
+with open(os.environ['RUNLOG'], 'a') as f:
+    f.write(sys.argv[sys.argv.index('-jar') + 2] + '\\n')
+print('Validating', flush=True)
+time.sleep(float(os.environ.get('DELAY', '0')))
+with open(sys.argv[sys.argv.index('--input') + 1]) as f:
+    columns = f.readline().strip().split(',')
+outputfile = sys.argv[sys.argv.index('--output') + 1]
+if 'hyfd' in sys.argv:
+    doc = {'functionalDependencies': [{'lhs': [columns[0]], 'rhs': columns[1]}]}
+else:
+    doc = {'columnCombinations': [[columns[0]]]}
+with open(outputfile, 'w') as f:
+    json.dump(doc, f)
+'''
+
+
+@pytest.fixture
+def files(tmpdir, monkeypatch):
+    """Create data files and configure a worker that runs the script instead
+    of Java. Returns the path to the data directory.
+    """
+    script = os.path.join(tmpdir, 'metanome.py')
+    with open(script, 'w') as f:
+        f.write(SCRIPT)
+    java = '"{}" "{}"'.format(sys.executable, script)
+    worker = {'name': 'local', 'type': 'subprocess', 'variables': [{'key': 'java', 'value': java}]}
+    workerfile = os.path.join(tmpdir, 'worker.json')
+    with open(workerfile, 'w') as f:
+        json.dump(worker, f)
+    monkeypatch.setenv(config.METANOME_WORKER, workerfile)
+    monkeypatch.setenv('RUNLOG', os.path.join(tmpdir, 'runs.log'))
+    datadir = os.path.join(tmpdir, 'data')
+    os.makedirs(os.path.join(datadir, 'sub'))
+    for filename in ['a.csv', os.path.join('sub', 'b.csv')]:
+        with open(os.path.join(datadir, filename), 'w') as f:
+            f.write('A,B\n1,2\n3,4\n')
+    with open(os.path.join(datadir, 'notes.txt'), 'w') as f:
+        f.write('not a data file')
+    return datadir
+
+
+def read_output(filename):
+    """Read the result objects from an output file."""
+    with open(filename, 'r') as f:
+        return {doc['file']: doc for doc in [json.loads(line) for line in f]}
+
+
+def runs(datadir):
+    """Get the number of algorithm runs from the run log."""
+    with open(os.path.join(os.path.dirname(datadir), 'runs.log'), 'r') as f:
+        return len(f.readlines())
+
+
+def test_cli_cache(files, tmpdir):
+    """Test reusing cached algorithm results."""
+    cache = os.path.join(tmpdir, 'cache')
+    output = os.path.join(tmpdir, 'results.jsonl')
+    args = ['-a', 'hyfd', '-c', cache, '-o', output, os.path.join(files, 'a.csv')]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0
+    assert runs(files) == 1
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0
+    assert runs(files) == 1
+    doc = read_output(output)[os.path.join(files, 'a.csv')]
+    assert doc['results']['hyfd']['cached']
+    assert doc['results']['hyfd']['fds'] == [{'lhs': ['A'], 'rhs': ['B']}]
+
+
+def test_cli_profile_files(files, tmpdir):
+    """Test profiling all data files in a directory."""
+    output = os.path.join(tmpdir, 'results.jsonl')
+    result = CliRunner().invoke(cli, ['-j', '2', '-o', output, files])
+    assert result.exit_code == 0
+    docs = read_output(output)
+    assert sorted(docs) == [os.path.join(files, 'a.csv'), os.path.join(files, 'sub', 'b.csv')]
+    for doc in docs.values():
+        assert doc['status'] == 'ok'
+        assert doc['seconds'] > 0
+        hyfd, hyucc = doc['results']['hyfd'], doc['results']['hyucc']
+        assert hyfd['fds'] == [{'lhs': ['A'], 'rhs': ['B']}]
+        assert hyucc['uccs'] == [['A']]
+        assert not hyfd['cached']
+        assert hyfd['seconds'] > 0
+        assert 'peak_rss' in hyfd['usage']
+    assert runs(files) == 4
+
+
+def test_cli_resume(files, tmpdir):
+    """Test resuming an interrupted batch."""
+    output = os.path.join(tmpdir, 'results.jsonl')
+    doc = {'file': os.path.join(files, 'a.csv'), 'status': 'ok', 'results': dict()}
+    with open(output, 'w') as f:
+        f.write(json.dumps(doc) + '\n')
+        f.write('{"file": "')
+    result = CliRunner().invoke(cli, ['-a', 'hyucc', '--resume', '-o', output, os.path.join(files, '**', '*.csv')])
+    assert result.exit_code == 0
+    assert runs(files) == 1
+    # The incomplete line is terminated before the new result is appended.
+    with open(output, 'r') as f:
+        lines = f.readlines()
+    assert len(lines) == 3
+    assert json.loads(lines[2])['file'] == os.path.join(files, 'sub', 'b.csv')
+    # Resume requires an output file.
+    result = CliRunner().invoke(cli, ['--resume', files])
+    assert result.exit_code == 2
+
+
+def test_cli_timeout(files, tmpdir, monkeypatch):
+    """Test stopping algorithm runs that exceed the timeout."""
+    monkeypatch.setattr(progress, 'HEARTBEAT', 0.1)
+    monkeypatch.setenv('DELAY', '30')
+    output = os.path.join(tmpdir, 'results.jsonl')
+    result = CliRunner().invoke(cli, ['-a', 'hyfd', '-t', '0.5', '-o', output, os.path.join(files, 'a.csv')])
+    assert result.exit_code == 1
+    doc = read_output(output)[os.path.join(files, 'a.csv')]
+    assert doc['status'] == 'timeout'
+    assert doc['seconds'] < 30
+
+
+def test_expand_patterns(files):
+    """Test expanding file paths, directories, and glob patterns."""
+    a, b = os.path.join(files, 'a.csv'), os.path.join(files, 'sub', 'b.csv')
+    assert expand([files]) == [a, b]
+    assert expand([os.path.join(files, '*.csv'), a]) == [a]
+    with pytest.raises(Exception):
+        expand([os.path.join(files, 'unknown.csv')])
@@ -14,6 +14,15 @@ import os
 import openclean_metanome.config as config
 
 
+def test_env_commands():
+    """Test getting values for the METANOME_COMMANDS variable."""
+    assert config.COMMANDS() == ['hyfd', 'hyucc']
+    os.environ[config.METANOME_COMMANDS] = 'tane, DUCC,hyfd'
+    assert config.COMMANDS() == ['hyfd', 'hyucc', 'tane', 'ducc']
+    assert config.COMMANDS(env={config.METANOME_COMMANDS: 'fdep'}) == ['hyfd', 'hyucc', 'fdep']
+    del os.environ[config.METANOME_COMMANDS]
+
+
 def test_env_container():
     """Test getting values for the METANOME_CONTAINER variable."""
     os.environ[config.METANOME_CONTAINER] = 'mycontainer'
@@ -23,6 +32,15 @@ def test_env_container():
     assert config.CONTAINER() == 'heikomueller/openclean-metanome:0.1.0'
 
 
+def test_env_csv_processes():
+    """Test getting values for the METANOME_CSV_PROCESSES variable."""
+    assert config.CSV_PROCESSES() == 1
+    os.environ[config.METANOME_CSV_PROCESSES] = '0'
+    assert config.CSV_PROCESSES() == os.cpu_count()
+    assert config.CSV_PROCESSES(env={config.METANOME_CSV_PROCESSES: 3}) == 3
+    del os.environ[config.METANOME_CSV_PROCESSES]
+
+
 def test_env_jarpath():
     """Test getting values for the METANOME_JARPATH variable."""
     os.environ[config.METANOME_JARPATH] = 'my.jar'
@@ -32,6 +50,33 @@ def test_env_jarpath():
     assert config.JARFILE().endswith('Metanome.jar')
 
 
+def test_env_jarmirror():
+    """Test getting values for the METANOME_JARMIRROR variable."""
+    assert config.JARMIRROR() is None
+    os.environ[config.METANOME_JARMIRROR] = '/mirror'
+    assert config.JARMIRROR() == '/mirror'
+    assert config.JARMIRROR(env={config.METANOME_JARMIRROR: 'x'}) == 'x'
+    del os.environ[config.METANOME_JARMIRROR]
+
+
+def test_env_retry(tmpdir):
+    """Test getting values for the METANOME_RETRY variable."""
+    filename = os.path.join(tmpdir, 'retry.json')
+    write_object(obj={'heap': [8192]}, filename=filename)
+    assert config.RETRY(env={config.METANOME_RETRY: filename}) == {'heap': [8192]}
+    assert config.RETRY(env={config.METANOME_RETRY: {'heap': []}}) == {'heap': []}
+    assert config.RETRY(env={}) is None
+
+
+def test_env_tracememory():
+    """Test getting values for the METANOME_TRACEMEMORY variable."""
+    assert not config.TRACEMEMORY()
+    os.environ[config.METANOME_TRACEMEMORY] = 'True'
+    assert config.TRACEMEMORY()
+    assert not config.TRACEMEMORY(env={config.METANOME_TRACEMEMORY: 'no'})
+    del os.environ[config.METANOME_TRACEMEMORY]
+
+
 def test_env_volume(tmpdir):
     """Test getting values for the METANOME_VOLUME variable."""
     # -- Setup ----------------------------------------------------------------
@@ -56,3 +101,14 @@ def test_env_worker(tmpdir):
     del os.environ[config.METANOME_WORKER]
     assert config.WORKER() is None
     assert config.WORKER(env={config.METANOME_WORKER: {'y': 2}}) == {'y': 2}
+
+
+def test_env_worker_list(tmpdir):
+    """Test getting a list of worker specifications."""
+    filename = os.path.join(tmpdir, 'workers.json')
+    write_object(obj=[{'x': 1}, {'y': 2}], filename=filename)
+    env = {config.METANOME_WORKER: filename}
+    assert config.WORKERS(env=env) == [{'x': 1}, {'y': 2}]
+    assert config.WORKER(env=env) == {'x': 1}
+    assert config.WORKERS(env={config.METANOME_WORKER: {'y': 2}}) == [{'y': 2}]
+    assert config.WORKERS(env={}) == []
@@ -7,13 +7,22 @@
 
 """Unit tests for the converter library."""
 
+import gzip
 import json
 import os
 import pandas as pd
 import pytest
+import subprocess
+import sys
 
 from openclean.data.types import Column
-from openclean_metanome.converter import read_json, write_dataframe
+from openclean.pipeline import stream
+from openclean_metanome.converter import (
+    has_datetimes, read_json, write_dataframe, write_input, write_stream, write_tables, RowStream
+)
+
+import openclean_metanome.config as config
+import openclean_metanome.converter as converter
 
 
 def test_create_input_file(tmpdir):
@@ -37,6 +46,54 @@ def test_create_input_file(tmpdir):
     os.chdir(cwd)
 
 
+@pytest.mark.parametrize('chunksize', [1, 2, 5])
+def test_write_dataframe_in_parallel(chunksize, tmpdir):
+    """Test that formatting ranges of rows in parallel creates the same file
+    as formatting the whole data frame at once.
+    """
+    df = pd.DataFrame(
+        data=[
+            [1, None, 'a', 0.1, pd.NA],
+            [2, '3', 'b,c', float('nan'), 1],
+            [3, 'x"y', 'd\ne', 1e20, 2],
+            [4, 'z', '', -0.0, pd.NA]
+        ],
+        columns=[Column(colid=1, name='A'), 'B', 'A', 'C', 'D']
+    )
+    df['D'] = df['D'].astype('Int64')
+    serialfile = os.path.join(tmpdir, 'serial.csv')
+    parallelfile = os.path.join(tmpdir, 'parallel.csv')
+    write_dataframe(df=df, filename=serialfile, processes=1)
+    mapping = write_dataframe(df=df, filename=parallelfile, processes=2, chunksize=chunksize)
+    assert mapping['COL0'].colid == 1
+    with open(serialfile, 'rb') as f:
+        expected = f.read()
+    with open(parallelfile, 'rb') as f:
+        assert f.read() == expected
+    # Data frames with date and time values are written by a single process.
+    df = pd.DataFrame(data=[[pd.Timestamp(2021, 1, 1)], [pd.Timestamp(2021, 1, 1, 10)]], columns=['A'])
+    assert has_datetimes(df)
+    assert not has_datetimes(df.astype(str))
+    write_dataframe(df=df, filename=parallelfile, processes=2, chunksize=1)
+    with open(parallelfile, 'r') as f:
+        assert f.read().splitlines() == ['COL0', '2021-01-01 00:00:00', '2021-01-01 10:00:00']
+
+
+def test_write_dataframe_processes(monkeypatch, tmpdir):
+    """Test that data frames are formatted by a single process unless
+    parallel formatting is enabled in the environment.
+    """
+    ranges = list()
+    monkeypatch.setattr(converter, 'write_ranges', lambda **kwargs: ranges.append(kwargs['processes']))
+    df = pd.DataFrame(data=[[1], [2], [3]], columns=['A'])
+    filename = os.path.join(tmpdir, 'table.csv')
+    write_dataframe(df=df, filename=filename, chunksize=1)
+    assert ranges == []
+    monkeypatch.setenv(config.METANOME_CSV_PROCESSES, '2')
+    write_dataframe(df=df, filename=filename, chunksize=1)
+    assert ranges == [2]
+
+
 @pytest.mark.parametrize('doc', [{'A': 1}, [1, 2, 3, 'D']])
 def test_read_output(doc, tmpdir):
     """Simple test to ensure that JSON objects are read correctly by the
@@ -46,3 +103,192 @@ def test_read_output(doc, tmpdir):
     with open(filename, 'w') as f:
         json.dump(doc, f)
     assert read_json(filename) == doc
+
+
+"""Script that writes input files with non-ASCII values from a rewritten CSV
+file, a row stream, a Parquet file, and a SQL query in a fresh interpreter.
+"""
+ENCODING_SCRIPT = """
+import os, sqlite3, sys
+from openclean_metanome.converter import write_input, RowStream
+from openclean_metanome.sql import SQLSource
+dirname = sys.argv[1]
+value = 'Z\\u00fcrich'
+write_input(df=os.path.join(dirname, 'source.csv'), filename=os.path.join(dirname, 'csv.csv'))
+stream = RowStream(columns=['A', 'A'], rows=[[value, value]])
+write_input(df=stream, filename=os.path.join(dirname, 'stream.csv'))
+con = sqlite3.connect(':memory:')
+con.execute('CREATE TABLE T (A TEXT, B TEXT)')
+con.execute('INSERT INTO T VALUES (?, ?)', (value, value))
+write_input(df=SQLSource(con, table='T'), filename=os.path.join(dirname, 'sql.csv'))
+try:
+    import pandas as pd
+    pd.DataFrame(data=[[value, value]], columns=['A', 'B']).to_parquet(os.path.join(dirname, 'source.parquet'))
+    write_input(df=os.path.join(dirname, 'source.parquet'), filename=os.path.join(dirname, 'parquet.csv'))
+except ImportError:
+    pass
+"""
+
+
+def test_create_input_file_encoding(tmpdir):
+    """Test that input files are written in UTF-8 independently of the
+    encoding of the locale.
+    """
+    with open(os.path.join(tmpdir, 'source.csv'), 'w', encoding='utf-8') as f:
+        f.write('A,A\nZ\u00fcrich,Z\u00fcrich\n')
+    env = dict(os.environ, LC_ALL='C', PYTHONCOERCECLOCALE='0', PYTHONUTF8='0')
+    subprocess.run([sys.executable, '-c', ENCODING_SCRIPT, str(tmpdir)], env=env, check=True)
+    for name in ['csv', 'stream', 'sql', 'parquet']:
+        filename = os.path.join(tmpdir, '{}.csv'.format(name))
+        if name == 'parquet' and not os.path.isfile(filename):
+            continue
+        with open(filename, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+        assert lines[1] == 'Z\u00fcrich,Z\u00fcrich'
+
+
+@pytest.mark.parametrize('buffersize', [1, 10])
+def test_create_input_file_from_stream(buffersize, tmpdir):
+    """Test creating an input CSV file from a data stream. Ensures that the
+    output is the same as for the data frame.
+    """
+    df = pd.DataFrame(
+        data=[[1, None, 'a'], [2, '3', 'b,c'], [3, float('nan'), 'd']],
+        columns=['A', 'B', 'A']
+    )
+    dffile = os.path.join(tmpdir, 'df.csv')
+    write_dataframe(df=df, filename=dffile)
+    # openclean data pipeline.
+    pipefile = os.path.join(tmpdir, 'pipe.csv')
+    mapping = write_input(df=stream(df), filename=pipefile)
+    assert mapping == {'COL0': 'A', 'COL1': 'B', 'COL2': 'A'}
+    # Generic row stream.
+    rows = (row for row in df.values.tolist())
+    rowfile = os.path.join(tmpdir, 'rows.csv')
+    write_stream(stream=RowStream(columns=df.columns, rows=rows), filename=rowfile, buffersize=buffersize)
+    with open(dffile, 'rb') as f:
+        expected = f.read()
+    for filename in [pipefile, rowfile]:
+        with open(filename, 'rb') as f:
+            assert f.read() == expected
+
+
+def test_link_csv_file(tmpdir):
+    """Test preparing the input file from a CSV file with a valid header."""
+    source = os.path.join(tmpdir, 'source.csv')
+    with open(source, 'w') as f:
+        f.write('A,B\n1,2\n')
+    filename = os.path.join(tmpdir, 'data', 'table.csv')
+    mapping = write_input(df=source, filename=filename)
+    assert mapping == {'A': 'A', 'B': 'B'}
+    assert os.path.samefile(source, filename)
+
+
+@pytest.mark.parametrize('compressed', [True, False])
+def test_rewrite_csv_file(compressed, tmpdir):
+    """Test preparing the input file from CSV files that need to be rewritten
+    because of duplicate column names or compression.
+    """
+    source = os.path.join(tmpdir, 'source.csv')
+    text = 'A,B,A\n1,2,"3,4"\n'
+    if compressed:
+        source += '.gz'
+        with gzip.open(source, 'wt') as f:
+            f.write(text)
+    else:
+        with open(source, 'w') as f:
+            f.write(text)
+    filename = os.path.join(tmpdir, 'data', 'table.csv')
+    mapping = write_input(df=source, filename=filename)
+    assert mapping == {'COL0': 'A', 'COL1': 'B', 'COL2': 'A'}
+    with open(filename, 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0,COL1,COL2', '1,2,"3,4"']
+
+
+def test_transcode_parquet_file(tmpdir):
+    """Test preparing the input file from a Parquet file."""
+    pytest.importorskip('pyarrow')
+    source = os.path.join(tmpdir, 'source.parquet')
+    df = pd.DataFrame(data=[[1, None], [2, 'b,c'], [3, 'd']], columns=['A', 'B'])
+    df.to_parquet(source, row_group_size=2)
+    filename = os.path.join(tmpdir, 'table.csv')
+    mapping = write_input(df=source, filename=filename)
+    assert mapping == {'COL0': 'A', 'COL1': 'B'}
+    with open(filename, 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0,COL1', '1,', '2,"b,c"', '3,d']
+
+
+def test_transcode_parquet_file_line_terminator(monkeypatch, tmpdir):
+    """Test that the header and the rows of a transcoded Parquet file use the
+    same line terminator.
+    """
+    pytest.importorskip('pyarrow')
+    source = os.path.join(tmpdir, 'source.parquet')
+    pd.DataFrame(data=[[1, 'a'], [2, 'b']], columns=['A', 'B']).to_parquet(source)
+    monkeypatch.setattr(os, 'linesep', '\r\n')
+    filename = os.path.join(tmpdir, 'table.csv')
+    write_input(df=source, filename=filename)
+    with open(filename, 'rb') as f:
+        lines = f.read().split(b'\r\n')
+    assert lines[1:] == [b'1,a', b'2,b', b'']
+    assert b'\n' not in lines[0]
+
+
+def test_write_arrow_input(tmpdir):
+    """Test writing Arrow record batches without converting them into a data
+    frame. Dictionary-encoded columns are written as consistent codes.
+    """
+    pa = pytest.importorskip('pyarrow')
+    schema = pa.schema([('A', pa.dictionary(pa.int32(), pa.string())), ('B', pa.string()), ('A', pa.int64())])
+    batches = [
+        pa.record_batch(
+            [pa.array(['x', 'y', 'x']).dictionary_encode(), pa.array(['a', None, 'b,c']), pa.array([1, 2, 3])],
+            schema=schema
+        ),
+        pa.record_batch(
+            [pa.array(['z', None, 'x']).dictionary_encode(), pa.array(['d', 'e', 'f']), pa.array([None, 5, 6])],
+            schema=schema
+        )
+    ]
+    filename = os.path.join(tmpdir, 'table.csv')
+    mapping = write_input(df=pa.Table.from_batches(batches), filename=filename)
+    assert mapping == {'COL0': 'A', 'COL1': 'B', 'COL2': 'A'}
+    with open(filename, 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0,COL1,COL2', '0,"a",1', '1,,2', '0,"b,c",3', '2,"d",', ',"e",5', '0,"f",6']
+    # Record batch readers are written in the same way.
+    reader = pa.RecordBatchReader.from_batches(schema, batches)
+    write_input(df=reader, filename=filename)
+    with open(filename, 'r') as f:
+        assert [line.strip() for line in f] == lines
+
+
+def test_write_encoded_arrow_tables(tmpdir):
+    """Test writing Arrow tables with a shared dictionary encoding."""
+    pa = pytest.importorskip('pyarrow')
+    df = pd.DataFrame(data=[['a', 1], ['b', None], ['a', 2]], columns=['A', 'B'])
+    table = pa.table({'C': pa.array(['b', None, 'c']).dictionary_encode(), 'D': pa.array([2, 2, 1])})
+    mapping = write_tables(tables={'T1': df, 'T2': table}, dirname=str(tmpdir))
+    assert mapping['table1'] == ('T2', {'COL0': 'C', 'COL1': 'D'})
+    with open(os.path.join(tmpdir, 'table0.csv'), 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0,COL1', '0,2', '1,', '0,3']
+    with open(os.path.join(tmpdir, 'table1.csv'), 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0,COL1', '"1","5"', '"","5"', '"4","6"']
+
+
+def test_write_encoded_tables(tmpdir):
+    """Test writing multiple tables with a shared dictionary encoding."""
+    df = pd.DataFrame(data=[['a', 1], ['b', None], ['a', 2]], columns=['A', 'B'])
+    rows = RowStream(columns=['C'], rows=[['b'], [''], ['c']])
+    mapping = write_tables(tables={'T1': df, 'T2': rows}, dirname=str(tmpdir), buffersize=2)
+    assert mapping == {'table0': ('T1', {'COL0': 'A', 'COL1': 'B'}), 'table1': ('T2', {'COL0': 'C'})}
+    with open(os.path.join(tmpdir, 'table0.csv'), 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0,COL1', '0,2', '1,', '0,3']
+    with open(os.path.join(tmpdir, 'table1.csv'), 'r') as f:
+        lines = [line.strip() for line in f]
+    assert lines == ['COL0', '1', '""', '4']
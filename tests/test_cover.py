@@ -0,0 +1,175 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the canonical cover of functional dependencies."""
+
+from itertools import combinations
+
+import pandas as pd
+import random
+import pytest
+
+from openclean.data.types import Column
+from openclean.profiling.constraints.fd import FunctionalDependency
+from openclean_metanome.algorithm.afd import afd
+from openclean_metanome.algorithm.groupby import find_uccs
+from openclean_metanome.cover import canonical_cover, minimal_keys, proper_subsets
+from openclean_metanome.partition import encode, has_duplicates
+
+import openclean_metanome.cover as cover
+
+
+def closure(columns, fds):
+    """Compute the closure of a set of columns for a list of pairs of
+    left-hand-side and right-hand-side column sets.
+    """
+    result = set(columns)
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in fds:
+            if set(lhs) <= result and not set(rhs) <= result:
+                result |= set(rhs)
+                changed = True
+    return result
+
+
+def test_canonical_cover_example():
+    """Test computing the canonical cover for a small example."""
+    fds = [
+        FunctionalDependency(lhs=['A'], rhs=['B']),
+        FunctionalDependency(lhs=['B'], rhs=['C']),
+        FunctionalDependency(lhs=['A'], rhs=['C']),
+        FunctionalDependency(lhs=['A', 'B'], rhs=['C']),
+        FunctionalDependency(lhs=['A', 'D'], rhs=['E']),
+        FunctionalDependency(lhs=['A', 'D'], rhs=['A']),
+        FunctionalDependency(lhs=['D'], rhs=['F']),
+        FunctionalDependency(lhs=['D'], rhs=['G'])
+    ]
+    result = [(fd.lhs, fd.rhs) for fd in canonical_cover(fds)]
+    assert result == [(['A'], ['B']), (['B'], ['C']), (['D'], ['F', 'G']), (['A', 'D'], ['E'])]
+    # Skip left-reduction.
+    fds = [FunctionalDependency(lhs=['A'], rhs=['B']), FunctionalDependency(lhs=['A', 'C'], rhs=['B'])]
+    assert [(fd.lhs, fd.rhs) for fd in canonical_cover(fds)] == [(['A'], ['B'])]
+    result = [(fd.lhs, fd.rhs) for fd in canonical_cover(fds, minimal=True)]
+    assert result == [(['A'], ['B'])]
+    assert canonical_cover([]) == []
+
+
+def test_canonical_cover_constant_column():
+    """Test that dependencies for constant columns are reduced to an empty
+    left-hand-side and are kept by the canonical cover and the derived keys.
+    """
+    df = pd.DataFrame(data=[[1, 1, 'x'], [2, 1, 'x'], [3, 2, 'x']], columns=['A', 'B', 'C'])
+    fds = afd(df, max_error=0)
+    assert ([], ['C']) in [(fd.lhs, fd.rhs) for fd in fds]
+    result = [(fd.lhs, fd.rhs) for fd in canonical_cover(fds, minimal=True)]
+    assert result == [([], ['C']), (['A'], ['B'])]
+    columns, partitions = encode(df)
+    assert minimal_keys(fds, columns) == find_uccs(columns, partitions) == [['A']]
+    # Left-reduce dependencies for a column that is determined by the
+    # constant column.
+    fds = [
+        FunctionalDependency(lhs=[], rhs=['C']),
+        FunctionalDependency(lhs=['C'], rhs=['D']),
+        FunctionalDependency(lhs=['A', 'B'], rhs=['D'])
+    ]
+    assert cover.left_reduce(0b0011, 3, cover.DependencySet([(0, 2), (0b0100, 3), (0b0011, 3)], 4)) == 0
+    result = [(fd.lhs, fd.rhs) for fd in canonical_cover(fds)]
+    assert result == [([], ['C', 'D'])]
+
+
+def test_canonical_cover_for_columns():
+    """Test that columns with the same name but different identifier are
+    distinguished.
+    """
+    a1, a2, b = Column(colid=1, name='A'), Column(colid=2, name='A'), Column(colid=3, name='B')
+    fds = [
+        FunctionalDependency(lhs=[a1], rhs=[b]),
+        FunctionalDependency(lhs=[b], rhs=[a2]),
+        FunctionalDependency(lhs=[a1], rhs=[a2])
+    ]
+    result = canonical_cover(fds)
+    assert [([c.colid for c in fd.lhs], [c.colid for c in fd.rhs]) for fd in result] == [([1], [3]), ([3], [2])]
+
+
+@pytest.mark.parametrize('words', [1, 2])
+def test_canonical_cover_random(words, monkeypatch):
+    """Test that the canonical cover for random sets of dependencies is
+    equivalent to the original set, left-reduced, and non-redundant.
+    """
+    # Use few subsets for redundancy tests to exercise the closure
+    # computation.
+    monkeypatch.setattr(cover, 'MAX_SUBSETS', 1)
+    random.seed(42)
+    for _ in range(100):
+        columns = ['C{}'.format(i) for i in range(random.randint(2, 7))]
+        if words > 1:
+            # Pad the column list to exceed the size of a single word.
+            columns += ['P{}'.format(i) for i in range(64)]
+        fds = list()
+        for _ in range(random.randint(1, 12)):
+            lhs = random.sample(columns[:7], random.randint(1, min(3, len(columns[:7]) - 1)))
+            rhs = random.choice([c for c in columns[:7] if c not in lhs])
+            fds.append((lhs, [rhs]))
+        if words > 1:
+            fds.append((['P0'], ['P63']))
+        result = [(fd.lhs, fd.rhs) for fd in canonical_cover([FunctionalDependency(*fd) for fd in fds])]
+        used = sorted(set([c for lhs, rhs in fds for c in lhs + rhs]))
+        for k in range(len(used) + 1):
+            for cols in combinations(used, k):
+                assert closure(cols, fds) == closure(cols, result)
+        single = [(lhs, a) for lhs, rhs in result for a in rhs]
+        for i, (lhs, a) in enumerate(single):
+            others = [(x, [b]) for j, (x, b) in enumerate(single) if j != i]
+            assert a not in closure(lhs, others)
+            for c in lhs:
+                assert a not in closure([x for x in lhs if x != c], result)
+
+
+def test_proper_subsets():
+    """Test enumerating the proper subsets of a bitset."""
+    assert sorted(proper_subsets(0b1011)) == [0b1, 0b10, 0b11, 0b1000, 0b1001, 0b1010]
+    assert list(proper_subsets(0b100)) == []
+
+
+def test_minimal_keys_example():
+    """Test deriving the minimal keys for a small set of dependencies."""
+    fds = [
+        FunctionalDependency(lhs=['A'], rhs=['B']),
+        FunctionalDependency(lhs=['B', 'C'], rhs=['A']),
+        FunctionalDependency(lhs=['A', 'C'], rhs=['D'])
+    ]
+    assert minimal_keys(fds, ['A', 'B', 'C', 'D']) == [['A', 'C'], ['B', 'C']]
+    assert minimal_keys(fds, ['A', 'B', 'C', 'D', 'E']) == [['A', 'C', 'E'], ['B', 'C', 'E']]
+    assert minimal_keys(fds, ['A', 'B', 'C', 'D'], max_size=1) == []
+    # Without dependencies the set of all columns is the only key.
+    assert minimal_keys([], ['A', 'B']) == [['A', 'B']]
+    # Each column is a key if the empty set determines all columns.
+    fds = [FunctionalDependency(lhs=[], rhs=['A']), FunctionalDependency(lhs=[], rhs=['B'])]
+    assert minimal_keys(fds, ['A', 'B']) == [['A'], ['B']]
+
+
+@pytest.mark.parametrize('null_equals_null', [True, False])
+def test_minimal_keys_random(null_equals_null):
+    """Test that the keys that are derived from all minimal functional
+    dependencies are the minimal unique column combinations.
+    """
+    random.seed(7)
+    for _ in range(20):
+        ncols = random.randint(2, 5)
+        rows = [
+            [random.choice([0, 1, 2, None]) for _ in range(ncols)]
+            for _ in range(random.randint(2, 20))
+        ]
+        df = pd.DataFrame(data=rows, columns=['C{}'.format(i) for i in range(ncols)])
+        columns, partitions = encode(df, null_equals_null=null_equals_null)
+        if has_duplicates(partitions):
+            assert find_uccs(columns, partitions) == []
+            continue
+        fds = afd(df, max_error=0, null_equals_null=null_equals_null)
+        assert minimal_keys(fds, columns) == find_uccs(columns, partitions)
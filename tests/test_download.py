@@ -7,28 +7,197 @@
 
 """Unit tests for the jar-file download."""
 
-from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from refdata.base import DatasetDescriptor
 
+import hashlib
 import os
 import pytest
+import requests
+import threading
+import time
 
 import openclean_metanome.download as download
 
 
+# -- Local HTTP server --------------------------------------------------------
+
+CONTENT = bytes(range(256)) * 64
+CHECKSUM = hashlib.sha256(CONTENT).hexdigest()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Request handler that serves the test content. Supports range requests
+    unless disabled. Closes the connection after half of the content if the
+    server is configured to fail. Waits before responding if the server is
+    configured to stall.
+    """
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('Range'))
+        if server.stall:
+            server.stall -= 1
+            time.sleep(1)
+        offset = 0
+        if server.ranges and self.headers.get('Range'):
+            offset = int(self.headers['Range'][6:-1])
+            if offset >= len(CONTENT):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        body = CONTENT[offset:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.fail:
+            server.fail -= 1
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.connection.close()
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
 @pytest.fixture
-def mock_download(monkeypatch):
-    """Mock file download."""
-    def mock_download_file(*args, **kwargs):
-        Path(kwargs['dst']).touch()
+def server():
+    """Run a local HTTP server in a separate thread."""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests = list()
+    httpd.ranges = True
+    httpd.fail = 0
+    httpd.stall = 0
+    httpd.url = 'http://127.0.0.1:{}/Metanome.jar'.format(httpd.server_address[1])
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
 
-    monkeypatch.setattr(download, "download_file", mock_download_file)
+def read(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
 
 
+# -- Unit tests ---------------------------------------------------------------
+
 @pytest.mark.parametrize('verbose', [True, False])
-def test_download_jar(mock_download, tmpdir, verbose):
-    """Test downloading the jar-file to a given destination folder. Mocks the
-    actual download.
+def test_download_jar(server, monkeypatch, tmpdir, verbose):
+    """Test downloading the jar-file to a given destination folder. The file
+    is downloaded only once.
     """
+    jarfile = DatasetDescriptor({'id': 'Metanome.jar', 'url': server.url, 'checksum': CHECKSUM})
+    monkeypatch.setattr(download, 'JARFILE', jarfile)
     dstfile = os.path.join(tmpdir, 'file.txt')
     download.download_jar(dst=dstfile, verbose=verbose)
     download.download_jar(dst=dstfile, verbose=verbose)
+    assert read(dstfile) == CONTENT
+    assert len(server.requests) == 1
+    assert os.listdir(tmpdir) == ['file.txt']
+
+
+def test_download_jar_from_mirror(server, monkeypatch, tmpdir):
+    """Test downloading the jar-file via a shared mirror directory."""
+    jarfile = DatasetDescriptor({'id': 'Metanome.jar', 'url': server.url, 'checksum': CHECKSUM})
+    monkeypatch.setattr(download, 'JARFILE', jarfile)
+    mirror = os.path.join(tmpdir, 'mirror')
+    for node in ['node1', 'node2']:
+        dstfile = os.path.join(tmpdir, node, 'Metanome.jar')
+        download.download_jar(dst=dstfile, mirror=mirror, verbose=False)
+        assert read(dstfile) == CONTENT
+    assert read(os.path.join(mirror, 'Metanome.jar')) == CONTENT
+    assert len(server.requests) == 1
+    # Copies of a corrupted mirror file are not kept.
+    with open(os.path.join(mirror, 'Metanome.jar'), 'wb') as f:
+        f.write(CONTENT[:100])
+    dstfile = os.path.join(tmpdir, 'node3', 'Metanome.jar')
+    with pytest.raises(ValueError):
+        download.download_jar(dst=dstfile, mirror=mirror, verbose=False)
+    assert os.listdir(os.path.join(tmpdir, 'node3')) == []
+
+
+def test_fetch_invalid_checksum(server, tmpdir):
+    """Test that files with an invalid checksum are not kept."""
+    dstfile = os.path.join(tmpdir, 'file.txt')
+    with pytest.raises(ValueError):
+        download.fetch_file(url=server.url, dst=dstfile, checksum='0')
+    assert os.listdir(tmpdir) == []
+
+
+def test_fetch_resume_interrupted_download(server, tmpdir):
+    """Test resuming an interrupted download using range requests."""
+    dstfile = os.path.join(tmpdir, 'file.txt')
+    server.fail = 1
+    with pytest.raises(requests.exceptions.RequestException):
+        download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM, chunk_size=1024, retries=0)
+    assert not os.path.exists(dstfile)
+    partfile = dstfile + '.part'
+    assert 0 < os.path.getsize(partfile) < len(CONTENT)
+    download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM)
+    assert read(dstfile) == CONTENT
+    assert server.requests[-1] == 'bytes={}-'.format(len(CONTENT) // 2)
+    assert not os.path.exists(partfile)
+    # Retry automatically within the same call.
+    os.remove(dstfile)
+    server.fail = 2
+    download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM, retries=2, backoff=0)
+    assert read(dstfile) == CONTENT
+
+
+def test_fetch_stalled_download(server, tmpdir):
+    """Test retrying a request that times out because the server stalls."""
+    dstfile = os.path.join(tmpdir, 'file.txt')
+    server.stall = 2
+    with pytest.raises(requests.exceptions.RequestException):
+        download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM, retries=0, timeout=(1, 0.1))
+    assert not os.path.exists(dstfile)
+    download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM, timeout=(1, 0.1), backoff=0)
+    assert read(dstfile) == CONTENT
+    assert len(server.requests) == 3
+
+
+@pytest.mark.parametrize('ranges', [True, False])
+def test_fetch_with_existing_part(ranges, server, tmpdir):
+    """Test downloading with an existing partial file for servers with and
+    without support for range requests.
+    """
+    server.ranges = ranges
+    dstfile = os.path.join(tmpdir, 'file.txt')
+    with open(dstfile + '.part', 'wb') as f:
+        f.write(CONTENT[:100])
+    download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM)
+    assert read(dstfile) == CONTENT
+    # Complete partial file.
+    os.remove(dstfile)
+    with open(dstfile + '.part', 'wb') as f:
+        f.write(CONTENT)
+    download.fetch_file(url=server.url, dst=dstfile, checksum=CHECKSUM)
+    assert read(dstfile) == CONTENT
+
+
+def test_file_lock(tmpdir):
+    """Test removing stale lock files."""
+    filename = os.path.join(tmpdir, 'file.lock')
+    with download.FileLock(filename=filename, timeout=10):
+        assert os.path.exists(filename)
+    assert not os.path.exists(filename)
+    open(filename, 'w').close()
+    with download.FileLock(filename=filename, timeout=-1):
+        pass
+    assert not os.path.exists(filename)
+
+
+def test_file_lock_refresh(tmpdir):
+    """Test that a lock that is held longer than the timeout is not
+    considered stale.
+    """
+    filename = os.path.join(tmpdir, 'file.lock')
+    with download.FileLock(filename=filename, timeout=0.4):
+        time.sleep(1)
+        assert time.time() - os.path.getmtime(filename) < 0.4
+    assert not os.path.exists(filename)
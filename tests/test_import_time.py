@@ -0,0 +1,69 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Import-time benchmark for the package modules. Each module is imported in a
+fresh interpreter. The test fails if the import takes longer than the time
+budget or if it pulls in heavy dependencies that should be imported lazily.
+
+The algorithm modules have to import the openclean base classes for profiling
+operators, which pulls in pandas. The import of these modules is measured
+in full. Their budget is the time for importing the openclean base classes on
+their own (measured in a separate fresh interpreter) plus the regular budget
+for the package modules.
+"""
+
+import json
+import os
+import pytest
+import subprocess
+import sys
+
+
+"""Time budget (in seconds) for importing a single module. The budget can be
+changed using the METANOME_IMPORT_BUDGET environment variable.
+"""
+BUDGET = float(os.environ.get('METANOME_IMPORT_BUDGET', '0.25'))
+
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def import_module(module: str) -> dict:
+    """Import a module in a fresh interpreter. Returns the import time and
+    the list of loaded modules.
+    """
+    script = SCRIPT.format(module=module)
+    proc = subprocess.run([sys.executable, '-c', script], capture_output=True, check=True)
+    return json.loads(proc.stdout.decode('utf-8').strip().split('\n')[-1])
+
+
+@pytest.mark.parametrize(
+    'module,baseline,excluded',
+    [
+        ('openclean_metanome.config', None, ['flowserv', 'openclean', 'pandas']),
+        ('openclean_metanome.converter', None, ['flowserv', 'openclean', 'pandas']),
+        ('openclean_metanome.download', None, ['flowserv', 'requests']),
+        ('openclean_metanome.algorithm.base', None, ['flowserv', 'openclean', 'pandas']),
+        ('openclean_metanome.algorithm.hyfd', 'openclean.profiling.constraints.fd', ['flowserv']),
+        ('openclean_metanome.algorithm.hyucc', 'openclean.profiling.constraints.ucc', ['flowserv'])
+    ]
+)
+def test_import_time(module, baseline, excluded):
+    """Test import time and lazily imported dependencies for package modules."""
+    budget = BUDGET
+    if baseline:
+        budget += import_module(baseline)['elapsed']
+    result = import_module(module)
+    assert result['elapsed'] < budget
+    for pkg in excluded:
+        assert not any(m == pkg or m.startswith(pkg + '.') for m in result['modules'])
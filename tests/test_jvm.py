@@ -0,0 +1,44 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the in-process JVM engine."""
+
+import numpy as np
+import os
+import pandas as pd
+import pytest
+
+from openclean_metanome.converter import RowStream
+from openclean_metanome.jvm import encode_codes, JVMEngine
+
+import openclean_metanome.config as config
+
+
+def test_encode_codes():
+    """Test dictionary-encoding a table into a matrix of codes."""
+    stream = RowStream(columns=['A', 'B'], rows=[['a', None], ['b', 1], ['a', 1]])
+    columns, codes = encode_codes(stream)
+    assert columns == ['A', 'B']
+    assert codes.tolist() == [[0, -1], [1, 0], [0, 0]]
+    columns, codes = encode_codes(pd.DataFrame(columns=['A']))
+    assert codes.shape == (0, 1)
+    assert codes.dtype == np.int64
+
+
+def test_jvm_engine():
+    """Test running HyFD and HyUCC in the embedded JVM. Requires JPype, a Java
+    runtime, and the Metanome.jar file.
+    """
+    pytest.importorskip('jpype')
+    if not os.path.isfile(config.JARFILE()):
+        pytest.skip('Metanome.jar not available')
+    df = pd.DataFrame(data=[['a', 1, 'x'], ['b', 2, 'x'], ['a', 3, None]], columns=['A', 'B', 'C'])
+    engine = JVMEngine()
+    fds = [(fd.lhs, fd.rhs) for fd in engine.hyfd(df)]
+    assert (['B'], ['A']) in fds
+    assert (['B'], ['C']) in fds
+    assert engine.hyucc(df) == [['B']]
@@ -0,0 +1,107 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for dictionary-encoded column partitions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from openclean_metanome.partition import duplicate_rows, encode, factorize, has_duplicates
+
+import openclean_metanome.partition as partition
+
+
+@pytest.mark.parametrize('dense', [True, False])
+def test_partition_refine_and_error(dense, monkeypatch):
+    """Test combining partitions and computing the g3 error using dense
+    arrays and hash tables.
+    """
+    if not dense:
+        monkeypatch.setattr(partition, 'DENSE_MIN', 0)
+        monkeypatch.setattr(partition, 'DENSE_FACTOR', 0)
+    a = factorize(np.array([1, 1, 1, 2, 2, 3]))
+    b = factorize(np.array(['x', 'x', 'y', 'z', 'z', 'z']))
+    ab = a.refine(b)
+    assert ab.size == 4
+    assert len(set(zip(ab.codes, a.codes, b.codes))) == 4
+    assert a.error(b) == 1
+    assert b.error(a) == 1
+    assert ab.error(a) == 0
+    assert not ab.is_unique()
+    rows, codes, size = a.stripped()
+    assert rows.tolist() == [0, 1, 2, 3, 4]
+    assert size == 2
+
+
+def test_encode_nulls():
+    """Test encoding columns with missing values."""
+    df = pd.DataFrame(data=[[None, 1], [None, 2], ['a', 3]], columns=['A', 'B'])
+    columns, partitions = encode(df)
+    assert columns == ['A', 'B']
+    assert partitions[0].size == 2
+    assert partitions[1].is_unique()
+    _, partitions = encode(df, null_equals_null=False)
+    assert partitions[0].is_unique()
+
+
+def test_has_duplicates():
+    """Test checking tables for duplicate rows."""
+    df = pd.DataFrame(data=[[1, 'a', None], [1, 'b', None], [1, 'a', None]], columns=['A', 'B', 'C'])
+    assert has_duplicates(encode(df)[1])
+    assert not has_duplicates(encode(df, null_equals_null=False)[1])
+    assert not has_duplicates(encode(df.iloc[:2])[1])
+    assert not has_duplicates([])
+
+
+@pytest.mark.parametrize('null_equals_null', [True, False])
+def test_encode_arrow(null_equals_null):
+    """Test encoding Arrow record batches with different dictionaries for the
+    same column.
+    """
+    pa = pytest.importorskip('pyarrow')
+    schema = pa.schema([('A', pa.dictionary(pa.int32(), pa.string())), ('B', pa.int64())])
+    batches = [
+        pa.record_batch([pa.array(['x', 'y', None]).dictionary_encode(), pa.array([1, 2, None])], schema=schema),
+        pa.record_batch([pa.array(['y', 'z', None]).dictionary_encode(), pa.array([1, 3, None])], schema=schema)
+    ]
+    reader = pa.RecordBatchReader.from_batches(schema, batches)
+    columns, partitions = encode(reader, null_equals_null=null_equals_null)
+    df = pd.DataFrame(
+        data=[['x', 1], ['y', 2], [None, None], ['y', 1], ['z', 3], [None, None]],
+        columns=['A', 'B']
+    )
+    _, expected = encode(df, null_equals_null=null_equals_null)
+    assert columns == ['A', 'B']
+    for p, q in zip(partitions, expected):
+        assert p.size == q.size
+        assert len(set(zip(p.codes, q.codes))) == q.size
+
+
+def test_factorize_nulls():
+    """Test assigning missing values to a single class or to the sentinel."""
+    values = np.array(['a', None, 'b', None, 'a'], dtype=object)
+    p = factorize(values)
+    assert p.size == 2
+    assert p.codes.tolist() == [0, -1, 1, -1, 0]
+    p = factorize(values, na_sentinel=False)
+    assert p.size == 3
+    assert p.codes.tolist() == [0, 2, 1, 2, 0]
+
+
+def test_duplicate_rows(tmpdir):
+    """Test checking data frames and files for duplicate rows without
+    encoding the columns.
+    """
+    df = pd.DataFrame(data=[[1, 'a', None], [1, 'b', None], [1, 'a', None]], columns=['A', 'B', 'C'])
+    assert duplicate_rows(df) == (['A', 'B', 'C'], True)
+    assert duplicate_rows(df, null_equals_null=False) == (['A', 'B', 'C'], False)
+    assert not duplicate_rows(df.iloc[:2])[1]
+    filename = str(tmpdir.join('data.csv'))
+    df.to_csv(filename, index=False)
+    assert duplicate_rows(filename) == (['A', 'B', 'C'], True)
+    assert not duplicate_rows(filename, null_equals_null=False)[1]
@@ -0,0 +1,129 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for progress events of running Metanome processes."""
+
+import os
+import pandas as pd
+import pytest
+import sys
+import time
+
+from openclean_metanome.algorithm.hyfd import hyfd
+from openclean_metanome.progress import listen, monitor, ProgressParser, ProgressRun, RunCancelled
+
+import openclean_metanome.config as config
+import openclean_metanome.progress as progress
+
+
+"""Script that replaces the Java process. Prints HyFD log messages and writes
+the result file for the output file in the command line arguments. The script
+pauses after the validation message if a delay is given in the environment.
+"""
+SCRIPT = '''
+import json
+import os
+import sys
+import time
+
+print('Initializing ...', flush=True)
+print('Sampling: level 1 comparisons: 12', flush=True)
+print('Validating 3 / 8 candidates', flush=True)
+time.sleep(float(os.environ.get('DELAY', '0')))
+sys.stderr.write('warning\\n')
+outputfile = sys.argv[sys.argv.index('--output') + 1]
+doc = {'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL1'}]}
+with open(outputfile, 'w') as f:
+    json.dump(doc, f)
+print('Writing results', flush=True)
+'''
+
+
+@pytest.fixture
+def worker(tmpdir):
+    """Worker specification that runs the script instead of Java."""
+    script = os.path.join(tmpdir, 'metanome.py')
+    with open(script, 'w') as f:
+        f.write(SCRIPT)
+    java = '"{}" "{}"'.format(sys.executable, script)
+    return {'name': 'local', 'type': 'subprocess', 'variables': [{'key': 'java', 'value': java}]}
+
+
+def test_hyfd_progress_events(worker):
+    """Test receiving progress events from a running HyFD process."""
+    df = pd.DataFrame(data=[['a', 1], ['b', 2]], columns=['A', 'B'])
+    events = list()
+    with listen(events.append):
+        fds = hyfd(df, env={config.METANOME_WORKER: worker}, verbose=False)
+    assert [[fd.lhs, fd.rhs] for fd in fds] == [[['A'], ['B']]]
+    lines = {e.line: e for e in events if e.line is not None}
+    assert lines['Initializing ...'].phase == 'reading'
+    assert lines['Sampling: level 1 comparisons: 12'].counters == {'level': 1, 'comparisons': 12}
+    assert lines['Validating 3 / 8 candidates'].counters == {'done': 3, 'total': 8}
+    assert lines['warning'].stream == 'stderr'
+    assert lines['Writing results'].phase == 'output'
+    # No events without a listener.
+    events = list()
+    hyfd(df, env={config.METANOME_WORKER: worker}, verbose=False)
+    assert events == []
+
+
+def test_monitor_heartbeat():
+    """Test heartbeat events for streams that produce no output."""
+    def slow():
+        yield b'Validating candid'
+        time.sleep(0.3)
+        yield b'ates\nsecond line'
+
+    events = list()
+    output = monitor({'stdout': slow()}, callback=events.append, heartbeat=0.05)
+    assert output == {'stdout': 'Validating candidates\nsecond line'}
+    assert [e.line for e in events if e.line is not None] == ['Validating candidates', 'second line']
+    heartbeats = [e for e in events if e.line is None]
+    assert len(heartbeats) > 1
+    assert all(e.phase == 'start' for e in heartbeats)
+
+
+def test_parse_progress_lines():
+    """Test parsing phases and counters from output lines."""
+    parser = ProgressParser()
+    assert parser.parse('Starting', elapsed=0).phase == 'start'
+    event = parser.parse('Reading data and calculating plis ...\n', elapsed=1)
+    assert event.phase == 'reading'
+    assert event.line == 'Reading data and calculating plis ...'
+    assert parser.parse('Sorting plis by number of clusters', elapsed=1).phase == 'preprocessing'
+    assert parser.parse('Validating FDs using plis ...', elapsed=1).phase == 'validation'
+    event = parser.parse('(V) level: 3 candidates: 120 invalid = 7', elapsed=2)
+    assert event.phase == 'validation'
+    assert event.counters == {'level': 3, 'candidates': 120, 'invalid': 7}
+    assert parser.heartbeat(elapsed=3) == (('validation', None, {}, 3, None))
+    # Custom phases.
+    parser = ProgressParser(phases=[('A', 'alpha')])
+    assert parser.parse('Validating', elapsed=0).phase == 'start'
+    assert parser.parse('ALPHA', elapsed=0).phase == 'A'
+
+
+def test_progress_run(worker, monkeypatch):
+    """Test iterating over progress events and cancelling a run."""
+    df = pd.DataFrame(data=[['a', 1], ['b', 2]], columns=['A', 'B'])
+    env = {config.METANOME_WORKER: worker}
+    run = ProgressRun(hyfd, df, env=env, verbose=False)
+    phases = [e.phase for e in run]
+    assert phases[-1] == 'output'
+    assert len(run.result()) == 1
+    # Cancel the run during validation. The delay keeps the process running
+    # until it is killed with the next heartbeat.
+    monkeypatch.setattr(progress, 'HEARTBEAT', 0.1)
+    monkeypatch.setenv('DELAY', '30')
+    start = time.monotonic()
+    run = ProgressRun(hyfd, df, env=env, verbose=False)
+    for event in run:
+        if event.phase == 'validation':
+            run.cancel()
+    with pytest.raises(RunCancelled):
+        run.result()
+    assert time.monotonic() - start < 10
@@ -0,0 +1,118 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the resource accounting of algorithm runs."""
+
+import os
+import pandas as pd
+import pytest
+import shlex
+import subprocess
+import sys
+
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.resources import command, main, read_usage, record, USAGE_FILE
+
+import openclean_metanome.config as config
+
+
+"""Script that replaces the Java process. Allocates memory, writes a file and
+the result file for the output file in the command line arguments.
+"""
+SCRIPT = '''
+import json
+import sys
+
+data = bytearray(50 * 1024 * 1024)
+with open('blob.bin', 'wb') as f:
+    f.write(bytes(1024 * 1024))
+outputfile = sys.argv[sys.argv.index('--output') + 1]
+doc = {'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL1'}]}
+with open(outputfile, 'w') as f:
+    json.dump(doc, f)
+'''
+
+
+posix = pytest.mark.skipif(os.name != 'posix', reason='requires POSIX')
+
+
+def test_hyfd_resource_usage(tmpdir):
+    """Test recording the resource usage of a HyFD run."""
+    script = os.path.join(tmpdir, 'metanome.py')
+    with open(script, 'w') as f:
+        f.write(SCRIPT)
+    java = '"{}" "{}"'.format(sys.executable, script)
+    worker = {'name': 'local', 'type': 'subprocess', 'variables': [{'key': 'java', 'value': java}]}
+    df = pd.DataFrame(data=[['a', 1], ['b', 2]], columns=['A', 'B'])
+    algo = HyFD(env={config.METANOME_WORKER: worker}, verbose=False)
+    assert algo.usage is None
+    fds = algo.run(df)
+    assert len(fds) == 1
+    # Python memory is only traced if enabled.
+    assert algo.usage.input_peak is None
+    assert algo.usage.parse_peak is None
+    env = {config.METANOME_WORKER: worker, config.METANOME_TRACEMEMORY: 'true'}
+    algo = HyFD(env=env, verbose=False)
+    algo.run(df)
+    assert algo.usage.input_peak > 0
+    assert algo.usage.parse_peak > 0
+    if os.name == 'posix':
+        assert algo.usage.peak_rss >= 50 * 1024 * 1024
+        assert algo.usage.user_time >= 0
+        assert algo.usage.write_bytes >= 1024 * 1024
+
+
+def test_read_and_record_usage(tmpdir):
+    """Test combining resource usage values in a usage file."""
+    usage = read_usage(str(tmpdir))
+    assert usage.peak_rss is None
+    assert usage.parse_peak is None
+    filename = os.path.join(tmpdir, USAGE_FILE)
+    record(filename, peak_rss=10, user_time=1.5, read_bytes=None)
+    record(filename, peak_rss=5, user_time=0.5, read_bytes=100)
+    record(filename, input_peak=7)
+    usage = read_usage(str(tmpdir))
+    assert usage.peak_rss == 10
+    assert usage.user_time == 2
+    assert usage.read_bytes == 100
+    assert usage.write_bytes is None
+    assert usage.input_peak == 7
+
+
+@posix
+@pytest.mark.parametrize('exit_code', [0, 3])
+def test_run_command(exit_code, tmpdir):
+    """Test running a command and recording its resource usage."""
+    filename = os.path.join(tmpdir, USAGE_FILE)
+    code = "open(r'{}', 'w').write('x' * 100000); exit({})".format(
+        os.path.join(tmpdir, 'out.txt'),
+        exit_code
+    )
+    cmd = '"{}" -c {}'.format(sys.executable, shlex.quote(code))
+    with pytest.raises(SystemExit) as ex:
+        main([filename, cmd])
+    assert ex.value.code == exit_code
+    usage = read_usage(str(tmpdir))
+    assert usage.peak_rss > 0
+    assert usage.user_time + usage.system_time > 0
+    if os.path.isdir('/proc'):
+        assert usage.write_bytes >= 100000
+
+
+@posix
+@pytest.mark.parametrize(
+    'code,returncode',
+    [('exit(5)', 5), ('import os, signal; os.kill(os.getpid(), signal.SIGTERM)', 128 + 15)]
+)
+def test_run_wrapper(code, returncode, tmpdir):
+    """Test running the resource accounting wrapper in a subprocess for
+    commands that exit normally and that are terminated by a signal.
+    """
+    cmd = command('"{}" -c {}'.format(sys.executable, shlex.quote(code)))
+    proc = subprocess.run(cmd, shell=True, cwd=str(tmpdir))
+    assert proc.returncode == returncode
+    assert read_usage(str(tmpdir)).peak_rss > 0
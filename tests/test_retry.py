@@ -0,0 +1,165 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for adaptive retries of runs that run out of memory."""
+
+from collections import namedtuple
+
+import json
+import pandas as pd
+import pytest
+import subprocess
+
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.algorithm.hyucc import HyUCC
+from openclean_metanome.converter import RowStream
+from openclean_metanome.retry import Degradation, OutOfMemoryError, RetryPolicy, out_of_memory, reusable
+from openclean_metanome.session import MetanomeSession
+from openclean_metanome.tests import input_output
+
+import openclean_metanome.config as config
+
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+class MockRun(object):
+    """Mock subprocess run that fails with an out of memory error unless the
+    command satisfies a given condition.
+    """
+    def __init__(self, succeed=lambda cmd: False, returncode=1, stderr=b'java.lang.OutOfMemoryError: Java heap space'):
+        self.succeed = succeed
+        self.returncode = returncode
+        self.stderr = stderr
+        self.commands = list()
+
+    def __call__(self, *args, **kwargs):
+        cmd = args[0]
+        self.commands.append(cmd)
+        if not self.succeed(cmd):
+            return Proc(returncode=self.returncode, stdout=b'', stderr=self.stderr)
+        _, outputfile = input_output(kwargs['cwd'], cmd)
+        doc = {
+            'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL1'}],
+            'columnCombinations': [['COL0']]
+        }
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        return Proc(returncode=0, stdout=b'', stderr=b'')
+
+
+@pytest.fixture
+def dataset():
+    return pd.DataFrame(data=[['a', 1], ['b', 2]], columns=['A', 'B'])
+
+
+def test_no_retry_without_policy(dataset, monkeypatch):
+    """Test that runs are not retried if no policy is configured."""
+    run = MockRun()
+    monkeypatch.setattr(subprocess, 'run', run)
+    with pytest.raises(OutOfMemoryError):
+        HyFD(env={}, verbose=False).run(dataset)
+    assert len(run.commands) == 1
+    # Runs that fail for other reasons are not retried.
+    run = MockRun(stderr=b'invalid input')
+    monkeypatch.setattr(subprocess, 'run', run)
+    policy = RetryPolicy(heap=[1024])
+    with pytest.raises(Exception) as ex:
+        HyFD(session=MetanomeSession(env={}, retry=policy), verbose=False).run(dataset)
+    assert not isinstance(ex.value, OutOfMemoryError)
+    assert len(run.commands) == 1
+
+
+def test_out_of_memory():
+    """Test detecting out of memory errors in the process output."""
+    assert out_of_memory(1, ['Exception in thread "main" java.lang.OutOfMemoryError: GC overhead limit exceeded'])
+    assert out_of_memory(1, ['Memory Guardian: cannot free enough memory'])
+    assert out_of_memory(137, [])
+    assert not out_of_memory(1, ['java.io.FileNotFoundException'])
+
+
+def test_retry_plan():
+    """Test the sequence of degraded arguments for an algorithm run."""
+    policy = RetryPolicy(heap=[8192, 4096], max_size=[2, 3], input_row_limit=[1000])
+    plan = list(policy.plan({'max_lhs_size': -1, 'input_row_limit': 500, 'other': 1}))
+    assert [d for _, d in plan] == [
+        Degradation('heap', 4096),
+        Degradation('heap', 8192),
+        Degradation('max_lhs_size', 3),
+        Degradation('max_lhs_size', 2)
+    ]
+    args = plan[-1][0]
+    assert args == {'max_lhs_size': 2, 'input_row_limit': 500, 'other': 1, 'jvm_options': '-Xmx8192m'}
+    # Heap sizes are limited by the worker memory. Parameters that are not
+    # used by an algorithm are not degraded.
+    plan = list(policy.plan({'max_ucc_size': 3, 'input_row_limit': -1}, memory=6000))
+    assert [d for _, d in plan] == [
+        Degradation('heap', 4096),
+        Degradation('max_ucc_size', 2),
+        Degradation('input_row_limit', 1000)
+    ]
+    assert list(RetryPolicy(heap=[], max_size=[], input_row_limit=[]).plan({'max_lhs_size': -1})) == []
+
+
+def test_retry_with_degradation(dataset, monkeypatch):
+    """Test retrying a HyFD run with a larger heap and a lower lhs size."""
+    run = MockRun(succeed=lambda cmd: '--max-lhs-size 2' in cmd)
+    monkeypatch.setattr(subprocess, 'run', run)
+    policy = RetryPolicy(heap=[1024, 2048], max_size=[3, 2])
+    algo = HyFD(session=MetanomeSession(env={}, retry=policy), verbose=False)
+    fds = algo.run(dataset)
+    assert [[fd.lhs, fd.rhs] for fd in fds] == [[['A'], ['B']]]
+    assert algo.degradations == [
+        Degradation('heap', 1024),
+        Degradation('heap', 2048),
+        Degradation('max_lhs_size', 3),
+        Degradation('max_lhs_size', 2)
+    ]
+    assert '-Xmx' not in run.commands[0]
+    assert '-Xmx2048m' in run.commands[-1]
+    # The run fails if all degradations were applied (including the default
+    # row limits).
+    run = MockRun(returncode=137, stderr=b'')
+    monkeypatch.setattr(subprocess, 'run', run)
+    with pytest.raises(OutOfMemoryError):
+        algo.run(dataset)
+    assert len(run.commands) == 7
+    # Successful runs reset the degradations.
+    monkeypatch.setattr(subprocess, 'run', MockRun(succeed=lambda cmd: True))
+    algo.run(dataset)
+    assert algo.degradations == []
+
+
+def test_retry_policy_from_config(dataset, monkeypatch):
+    """Test reading the retry policy from the environment."""
+    run = MockRun(succeed=lambda cmd: '--input-row-limit 10 ' in cmd)
+    monkeypatch.setattr(subprocess, 'run', run)
+    env = {config.METANOME_RETRY: {'heap': [], 'max_size': [], 'input_row_limit': [10]}}
+    algo = HyUCC(env=env, verbose=False)
+    uccs = algo.run(dataset)
+    assert uccs == [['A']]
+    assert algo.degradations == [Degradation('input_row_limit', 10)]
+    # Inputs that can only be read once are not retried.
+    run = MockRun()
+    monkeypatch.setattr(subprocess, 'run', run)
+    with pytest.raises(OutOfMemoryError):
+        algo.run(RowStream(columns=['A', 'B'], rows=iter([['a', 1]])))
+    assert len(run.commands) == 1
+
+
+def test_reusable_inputs(dataset):
+    """Test identifying inputs that can be read more than once."""
+    assert reusable(dataset)
+    assert reusable('data.csv')
+    assert reusable({'a': dataset, 'b': 'data.csv'})
+    assert reusable(RowStream(columns=['A'], rows=[['a']]))
+    assert not reusable(RowStream(columns=['A'], rows=iter([['a']])))
+    assert not reusable({'a': dataset, 'b': RowStream(columns=['A'], rows=(r for r in []))})
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'A': ['a']})
+    assert reusable(table)
+    assert not reusable(pa.RecordBatchReader.from_batches(table.schema, table.to_batches()))
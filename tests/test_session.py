@@ -0,0 +1,57 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the Metanome session object."""
+
+from flowserv.controller.worker.manager import Subprocess
+from flowserv.util import write_object
+
+import os
+
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.session import MetanomeSession
+
+import openclean_metanome.config as config
+
+
+def test_session_config_reload(monkeypatch, tmpdir):
+    """Test caching and reloading configuration files."""
+    # -- Setup ----------------------------------------------------------------
+    filename = os.path.join(tmpdir, 'worker.json')
+    write_object(obj=Subprocess(identifier='w1'), filename=filename)
+    reads = list()
+    read_config_obj = config.read_config_obj
+
+    def counting_read(var, env):
+        reads.append(var)
+        return read_config_obj(var=var, env=env)
+
+    monkeypatch.setattr(config, 'read_config_obj', counting_read)
+    session = MetanomeSession(env={config.METANOME_WORKER: filename})
+    # -- Unit tests -----------------------------------------------------------
+    assert session.worker()['name'] == 'w1'
+    workers = session.workers()
+    assert session.worker()['name'] == 'w1'
+    assert session.workers() is workers
+    assert reads.count(config.METANOME_WORKER) == 1
+    # Modify the configuration file.
+    write_object(obj=Subprocess(identifier='w2'), filename=filename)
+    mtime = os.stat(filename).st_mtime + 10
+    os.utime(filename, (mtime, mtime))
+    assert session.worker()['name'] == 'w2'
+    assert session.workers() is not workers
+    assert reads.count(config.METANOME_WORKER) == 2
+    # Volume is not configured.
+    assert session.volume() is None
+
+
+def test_session_workflow_cache():
+    """Test that workflows are created only once."""
+    session = MetanomeSession(env={config.METANOME_CONTAINER: 'myimage'})
+    workflow = session.workflow('hyfd', HyFD().create_workflow)
+    assert session.workflow('hyfd', HyFD().create_workflow) is workflow
+    assert workflow.steps[1].image == 'myimage'
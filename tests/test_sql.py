@@ -0,0 +1,153 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for database sources."""
+
+import os
+import pandas as pd
+import pytest
+import sqlite3
+import sys
+import types
+
+from openclean_metanome.algorithm.afd import afd
+from openclean_metanome.converter import write_input
+from openclean_metanome.partition import read_frame
+from openclean_metanome.sql import server_cursor, SQLSource
+
+
+"""Rows in the test database table."""
+ROWS = [
+    (1, '10001', 'New York', 'NY'),
+    (2, '10001', 'New York', None),
+    (3, '60601', 'Chicago', 'IL'),
+    (4, '94105', 'San Francisco', 'CA'),
+    (5, '94105', 'San Francisco', 'CA')
+]
+
+
+@pytest.fixture
+def database(tmpdir):
+    """Create a SQLite database with a single table. Returns the path to the
+    database file.
+    """
+    filename = os.path.join(tmpdir, 'test.db')
+    con = sqlite3.connect(filename)
+    con.execute('CREATE TABLE "zip codes" (id INTEGER, zip TEXT, city TEXT, state TEXT)')
+    con.executemany('INSERT INTO "zip codes" VALUES (?, ?, ?, ?)', ROWS)
+    con.commit()
+    con.close()
+    return filename
+
+
+def read_file(filename):
+    """Read the lines of a file."""
+    with open(filename, 'r') as f:
+        return f.read().splitlines()
+
+
+def test_sql_query_source(database, tmpdir):
+    """Test writing the result of a query with parameters and projection."""
+    con = sqlite3.connect(database)
+    query = 'SELECT * FROM "zip codes" WHERE id > ?'
+    source = SQLSource(con, query=query, params=(2,), columns=['city', 'id'], batch_size=2)
+    filename = os.path.join(tmpdir, 'input.csv')
+    colmap = write_input(source, filename=filename)
+    assert colmap == {'COL0': 'city', 'COL1': 'id'}
+    assert read_file(filename) == ['COL0,COL1', 'Chicago,3', 'San Francisco,4', 'San Francisco,5']
+    assert [row for _, row in source.iterrows()] == [('Chicago', 3), ('San Francisco', 4), ('San Francisco', 5)]
+    # The connection is not closed by the source.
+    assert con.execute('SELECT COUNT(*) FROM "zip codes"').fetchone() == (5,)
+    with pytest.raises(ValueError):
+        SQLSource(con)
+    with pytest.raises(ValueError):
+        SQLSource(con, table='A', query='SELECT 1')
+    with pytest.raises(ValueError):
+        SQLSource(con, table='A', sample=2)
+
+
+def test_sql_sampling(database):
+    """Test pushing sampling and limits down into the query."""
+    con = sqlite3.connect(database)
+    assert len(read_frame(SQLSource(con, table='zip codes', sample=0))) == 0
+    assert len(read_frame(SQLSource(con, table='zip codes', sample=1))) == 5
+    source = SQLSource(con, table='zip codes', sample=0.5, limit=2)
+    assert 'RANDOM()' in source.sql()
+    assert len(read_frame(source)) <= 2
+    source = SQLSource(con, table='zip codes', sample=0.5)
+    source.dialect = 'unknown'
+    with pytest.raises(ValueError):
+        source.sql()
+
+
+def test_sql_table_source(database):
+    """Test discovering dependencies for a database table."""
+    source = SQLSource(sqlite3.connect(database), table='zip codes')
+    assert source.columns == ['id', 'zip', 'city', 'state']
+    df = pd.DataFrame(data=ROWS, columns=['id', 'zip', 'city', 'state'])
+    fds = afd(source, max_error=0)
+    assert [(fd.lhs, fd.rhs) for fd in fds] == [(fd.lhs, fd.rhs) for fd in afd(df, max_error=0)]
+    assert read_frame(source).isna().sum().tolist() == [0, 0, 0, 1]
+
+
+def test_sqlalchemy_engine(database, tmpdir):
+    """Test reusing pooled connections of a SQLAlchemy engine."""
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+    engine = sqlalchemy.create_engine('sqlite:///{}'.format(database))
+    connects = list()
+    sqlalchemy.event.listen(engine, 'connect', lambda *args: connects.append(1))
+    source = SQLSource(engine, table='zip codes', columns=['zip', 'state'], batch_size=2)
+    assert '"zip codes"' in source.sql()
+    filename = os.path.join(tmpdir, 'input.csv')
+    for _ in range(3):
+        write_input(source, filename=filename)
+        assert engine.pool.checkedout() == 0
+    assert len(connects) == 1
+    assert read_file(filename)[:3] == ['COL0,COL1', '10001,NY', '10001,']
+    assert SQLSource(engine, query='SELECT id, city FROM "zip codes"').columns == ['id', 'city']
+    with engine.connect() as con:
+        assert len(read_frame(SQLSource(con, table='zip codes', limit=3))) == 3
+
+
+def test_sql_cursor_factory(database):
+    """Test creating cursors for DB-API connections with a given factory."""
+    con = sqlite3.connect(database)
+    cursors = list()
+
+    def factory(con):
+        cursors.append(con.cursor())
+        return cursors[-1]
+
+    source = SQLSource(con, table='zip codes', batch_size=2, cursor_factory=factory)
+    assert len(read_frame(source)) == 5
+    assert source.columns == ['id', 'zip', 'city', 'state']
+    assert len(cursors) == 1
+    assert SQLSource(con, query='SELECT * FROM "zip codes" WHERE id > 5').columns == ['id', 'zip', 'city', 'state']
+
+
+def test_sql_server_side_cursor(monkeypatch):
+    """Test creating server-side cursors for drivers whose default cursors
+    fetch the complete query result.
+    """
+    class Connection(object):
+        def __init__(self, module, autocommit=False):
+            self.autocommit = autocommit
+            Connection.__module__ = module
+
+        def cursor(self, *args, **kwargs):
+            return args, kwargs
+
+    args, kwargs = server_cursor(Connection('psycopg2.extensions'))
+    assert kwargs['name'].startswith('openclean_metanome_')
+    assert not kwargs['withhold']
+    _, kwargs = server_cursor(Connection('psycopg.connection', autocommit=True))
+    assert kwargs['withhold']
+    cursors = types.ModuleType('pymysql.cursors')
+    cursors.SSCursor = object()
+    monkeypatch.setitem(sys.modules, 'pymysql.cursors', cursors)
+    assert server_cursor(Connection('pymysql.connections')) == ((cursors.SSCursor,), {})
+    assert server_cursor(Connection('sqlite3')) == ((), {})
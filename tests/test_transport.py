@@ -0,0 +1,92 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the shared-memory transport of data frames."""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import os
+import pandas as pd
+import pytest
+import sys
+
+from openclean_metanome.algorithm.afd import afd
+from openclean_metanome.algorithm.aucc import aucc
+from openclean_metanome.converter import write_input
+from openclean_metanome.partition import read_frame
+from openclean_metanome.transport import FrameStore, MMAP, SHM
+
+
+"""Shared memory blocks require Python 3.8 or later."""
+BACKENDS = [
+    pytest.param(SHM, marks=pytest.mark.skipif(sys.version_info < (3, 8), reason='requires Python 3.8')),
+    MMAP
+]
+
+
+@pytest.fixture
+def frames():
+    """List of data frames with missing values and duplicate column names."""
+    return [
+        pd.DataFrame(data=[['a', 1, 'x'], ['b', 2, None], ['a', 1, 'y']], columns=['A', 'B', 'C']),
+        pd.DataFrame(data=[[1.5, 'x'], [None, 'x'], [2.5, 'z'], [1.5, 'z']], columns=['A', 'A'])
+    ]
+
+
+def fdset(fds):
+    """Convert a list of functional dependencies into a set of tuples."""
+    return set([(tuple(fd.lhs), fd.rhs[0], fd.error) for fd in fds])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_discover_in_process_pool(backend, frames, tmpdir):
+    """Test running algorithms on shared frames in a pool of processes."""
+    with FrameStore(backend=backend, dirname=str(tmpdir)) as store:
+        shared = [store.share(df) for df in frames]
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(afd, shared))
+        # Segments are not removed when the worker processes terminate.
+        assert [fdset(fds) for fds in results] == [fdset(afd(df)) for df in frames]
+        assert [fdset(afd(frame)) for frame in shared] == [fdset(afd(df)) for df in frames]
+        assert aucc(shared[0], max_duplicates=0) == aucc(frames[0], max_duplicates=0)
+    with pytest.raises(FileNotFoundError):
+        with shared[0].attach():
+            pass
+    assert os.listdir(tmpdir) == []
+
+
+def test_release_frame(frames):
+    """Test removing the segment for a single frame."""
+    with FrameStore() as store:
+        a, b = [store.share(df) for df in frames]
+        store.release(a)
+        with pytest.raises(FileNotFoundError):
+            with a.attach():
+                pass
+        with b.attach() as codes:
+            assert codes.shape == (2, 4)
+            del codes
+    with pytest.raises(ValueError):
+        FrameStore(backend='unknown')
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_write_shared_input(backend, frames, tmpdir):
+    """Test materializing the Metanome input from a shared frame."""
+    filename = os.path.join(tmpdir, 'input.csv')
+    with FrameStore(backend=backend) as store:
+        frame = store.share(frames[1])
+        assert len(frame) == 4
+        assert frame.nbytes == 32
+        colmap = write_input(frame, filename=filename)
+        df = read_frame(frame)
+        empty = store.share(frames[1].iloc[:0])
+        assert read_frame(empty).shape == (0, 2)
+    assert colmap == {'COL0': 'A', 'COL1': 'A'}
+    with open(filename, 'r') as f:
+        assert f.read() == 'COL0,COL1\n0,0\n,0\n1,1\n0,1\n'
+    assert df.isna().sum().tolist() == [1, 0]
@@ -0,0 +1,303 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the Docker container pool worker."""
+
+from collections import namedtuple
+
+import json
+import os
+import pandas as pd
+import pytest
+import threading
+import time
+
+from flowserv.model.workflow.step import ContainerStep
+from openclean_metanome.algorithm.hyfd import HyFD
+from openclean_metanome.progress import listen
+from openclean_metanome.tests import input_output
+from openclean_metanome.worker.docker import ContainerPool
+from openclean_metanome.worker.manager import DockerPool, WorkerPool, create_worker
+
+import flowserv.error as err
+import openclean_metanome.config as config
+import openclean_metanome.worker.docker as docker
+
+
+# -- Local stand-in for the Docker client -------------------------------------
+
+ExecResult = namedtuple('ExecResult', ['exit_code', 'output'])
+
+
+class Container(object):
+    """Container stand-in that writes a HyFD result file for every executed
+    command.
+    """
+    def __init__(self, volumes):
+        self.volumes = {v['bind']: k for k, v in volumes.items()}
+        self.status = 'running'
+        self.commands = list()
+        self.removed = False
+        # Number of executed commands. Resource usage statistics increase
+        # with every command.
+        self.count = 0
+
+    def exec_run(self, cmd, workdir=None, environment=None, demux=False):
+        self.commands.append(cmd)
+        if cmd == ['true']:
+            return ExecResult(exit_code=0, output=None)
+        mount, relpath = workdir[:5], workdir[6:]
+        rundir = os.path.join(self.volumes[mount], relpath)
+        _, outputfile = input_output(rundir, cmd[-1])
+        doc = {'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL1'}]}
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        self.count += 1
+        return ExecResult(exit_code=0, output=(b'done', None))
+
+    def reload(self):
+        pass
+
+    def remove(self, force=False):
+        self.removed = True
+
+    def stats(self, stream=True):
+        n = self.count
+        return {
+            'cpu_stats': {
+                'cpu_usage': {
+                    'usage_in_usermode': n * 2 * 10 ** 9,
+                    'usage_in_kernelmode': n * 10 ** 9
+                }
+            },
+            'blkio_stats': {
+                'io_service_bytes_recursive': [
+                    {'major': 8, 'minor': 0, 'op': 'Read', 'value': n * 100},
+                    {'major': 8, 'minor': 0, 'op': 'Write', 'value': n * 10}
+                ]
+            },
+            'memory_stats': {'max_usage': 1024, 'usage': 512}
+        }
+
+
+class API(object):
+    """Stand-in for the low-level API that is used to stream the output of
+    executed commands.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.execs = dict()
+
+    def exec_create(self, container, cmd, workdir=None, environment=None):
+        exec_id = str(len(self.execs))
+        self.execs[exec_id] = (container, cmd, workdir)
+        return {'Id': exec_id}
+
+    def exec_inspect(self, exec_id):
+        return {'ExitCode': 0}
+
+    def exec_start(self, exec_id, stream=False, demux=False):
+        container_id, cmd, workdir = self.execs[exec_id]
+        container = self.client.containers.started[int(container_id)]
+        container.exec_run(cmd, workdir=workdir)
+        yield b'Validating 1 / 2\n', None
+        yield None, b'warning\n'
+        yield b'Writing results\n', None
+
+
+class Containers(object):
+    def __init__(self, client):
+        self.client = client
+        self.started = list()
+
+    def run(self, image, command, volumes, detach, remove):
+        container = Container(volumes)
+        container.id = str(len(self.started))
+        container.client = self.client
+        self.started.append(container)
+        return container
+
+
+class Client(object):
+    def __init__(self):
+        self.api = API(self)
+        self.containers = Containers(self)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Replace the Docker client with a local stand-in."""
+    client = Client()
+    monkeypatch.setattr(docker, 'docker_client', lambda: client)
+    yield client
+    docker.close_pools()
+
+
+# -- Unit tests ---------------------------------------------------------------
+
+def test_container_pool_health_check(client, tmpdir):
+    """Test replacing containers that are no longer running."""
+    pool = ContainerPool(image='test', workdir=str(tmpdir), client=client)
+    container = pool.acquire()
+    pool.release(container)
+    container.status = 'exited'
+    assert pool.acquire() != container
+    assert container.removed
+    assert len(client.containers.started) == 2
+
+
+def test_container_pool_idle_timeout(client, tmpdir):
+    """Test removing idle containers after the timeout."""
+    pool = ContainerPool(image='test', workdir=str(tmpdir), idle_timeout=0, client=client)
+    container = pool.acquire()
+    pool.release(container)
+    assert container.removed
+    assert len(pool) == 0
+
+
+def test_container_pool_reaper(client, tmpdir):
+    """Test removing idle containers in the background without further
+    requests to the pool.
+    """
+    pool = ContainerPool(image='test', workdir=str(tmpdir), idle_timeout=0.2, client=client)
+    container = pool.acquire()
+    pool.release(container)
+    assert not container.removed
+    for _ in range(50):
+        if container.removed:
+            break
+        time.sleep(0.1)
+    assert container.removed
+    assert len(pool) == 0
+    # The reaper is restarted when containers become idle again.
+    container = pool.acquire()
+    pool.release(container)
+    pool.close()
+    assert container.removed
+
+
+def test_container_pool_remove_without_lock(client, tmpdir):
+    """Test that containers are removed without holding the pool lock."""
+    pool = ContainerPool(image='test', workdir=str(tmpdir), idle_timeout=0.2, client=client)
+    blocked = list()
+
+    def remove(container):
+        # Access the pool from a different thread while the container is
+        # removed.
+        thread = threading.Thread(target=len, args=(pool,), daemon=True)
+        thread.start()
+        thread.join(timeout=1)
+        blocked.append(thread.is_alive())
+        container.removed = True
+
+    # Unhealthy container on release.
+    container = pool.acquire()
+    container.remove = lambda force=False: remove(container)
+    pool.release(container, healthy=False)
+    # Expired container in the background reaper.
+    container = pool.acquire()
+    container.remove = lambda force=False: remove(container)
+    pool.release(container)
+    for _ in range(50):
+        if container.removed:
+            break
+        time.sleep(0.1)
+    assert container.removed
+    assert blocked == [False, False]
+
+
+def test_get_pool(client, tmpdir):
+    """Test that workers with different pool parameters get separate pools."""
+    pool = docker.get_pool(image='test', workdir=str(tmpdir), size=1)
+    assert docker.get_pool(image='test', workdir=str(tmpdir), size=1) is pool
+    other = docker.get_pool(image='test', workdir=str(tmpdir), size=2)
+    assert other is not pool
+    assert other.size == 2
+    assert docker.get_pool(image='test', workdir=str(tmpdir), size=1, idle_timeout=10) is not pool
+
+
+def test_container_pool_path(tmpdir):
+    """Test mapping local run directories to paths inside the containers."""
+    pool = ContainerPool(image='test', workdir=str(tmpdir))
+    assert pool.path(os.path.join(tmpdir, 'run', 'data')) == '/work/run/data'
+    with pytest.raises(ValueError):
+        pool.path(os.path.dirname(tmpdir))
+
+
+def test_container_pool_reuse(client, tmpdir):
+    """Test reusing warm containers and waiting for a container if the pool
+    is full.
+    """
+    pool = ContainerPool(image='test', workdir=str(tmpdir), size=1, client=client)
+    container = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    pool.release(container)
+    assert pool.acquire() == container
+    assert len(client.containers.started) == 1
+
+
+def test_hyfd_with_docker_pool(client, tmpdir):
+    """Test running HyFD in warm containers from a container pool."""
+    dataset = pd.DataFrame(data=[[1, 2]], columns=['A', 'B'])
+    worker = DockerPool(workdir=str(tmpdir), identifier='pool')
+    algo = HyFD(env={config.METANOME_WORKER: worker, config.METANOME_TRACEMEMORY: True}, verbose=False)
+    for _ in range(3):
+        fds = algo.run(dataset)
+        assert len(fds) == 1
+    assert len(client.containers.started) == 1
+    # Resource usage is the difference of the container statistics for the
+    # last run.
+    assert algo.usage.peak_rss == 1024
+    assert algo.usage.user_time == 2
+    assert algo.usage.system_time == 1
+    assert algo.usage.read_bytes == 100
+    assert algo.usage.write_bytes == 10
+    assert algo.usage.input_peak > 0
+    assert algo.usage.parse_peak > 0
+    # Run directories are removed after each run.
+    assert os.listdir(tmpdir) == []
+
+
+def test_hyfd_with_docker_pool_progress(client, tmpdir):
+    """Test streaming progress events from commands that are executed in a
+    pooled container.
+    """
+    dataset = pd.DataFrame(data=[[1, 2]], columns=['A', 'B'])
+    worker = DockerPool(workdir=str(tmpdir), identifier='pool')
+    algo = HyFD(env={config.METANOME_WORKER: worker}, verbose=False)
+    events = list()
+    with listen(events.append):
+        fds = algo.run(dataset)
+    assert len(fds) == 1
+    lines = {e.line: e for e in events if e.line is not None}
+    assert sorted(lines) == ['Validating 1 / 2', 'Writing results', 'warning']
+    assert lines['Validating 1 / 2'].phase == 'validation'
+    assert lines['Validating 1 / 2'].counters == {'done': 1, 'total': 2}
+    assert lines['Writing results'].phase == 'output'
+    assert lines['warning'].stream == 'stderr'
+
+
+def test_docker_pool_spec(tmpdir):
+    """Test creating a Docker pool worker from its specification."""
+    doc = DockerPool(workdir=str(tmpdir), idle_timeout=10, health_interval=5, identifier='pool')
+    worker = create_worker(doc)
+    assert worker.idle_timeout == 10
+    assert worker.health_interval == 5
+    worker = create_worker({'type': doc['type'], 'name': 'pool', 'workdir': str(tmpdir)})
+    assert worker.health_interval == docker.DEFAULT_HEALTH_INTERVAL
+
+
+def test_worker_pool_cache(tmpdir):
+    """Test creating and caching workers for workflow steps."""
+    doc = DockerPool(workdir=str(tmpdir), identifier='pool')
+    workers = WorkerPool(workers=[doc], managers={'s1': 'pool', 's2': 'unknown'})
+    worker = workers.get(ContainerStep(identifier='s1', image='test'))
+    assert isinstance(worker, docker.DockerPoolWorker)
+    assert workers.get(ContainerStep(identifier='s1', image='test')) is worker
+    with pytest.raises(err.UnknownObjectError):
+        workers.get(ContainerStep(identifier='s2', image='test'))
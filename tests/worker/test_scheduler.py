@@ -0,0 +1,177 @@
+# This file is part of the Data Cleaning Library (openclean).
+#
+# Copyright (C) 2018-2021 New York University.
+#
+# openclean is released under the Revised BSD License. See file LICENSE for
+# full license details.
+
+"""Unit tests for the scheduler that distributes jobs across workers."""
+
+from collections import namedtuple
+
+import json
+import os
+import pandas as pd
+import pytest
+import subprocess
+import threading
+import time
+
+from openclean_metanome.algorithm.hyfd import hyfd
+from openclean_metanome.retry import OutOfMemoryError
+from openclean_metanome.tests import input_output
+from openclean_metanome.worker.scheduler import input_size, Scheduler
+
+import openclean_metanome.config as config
+
+
+WORKERS = [
+    {'name': 'small', 'type': 'subprocess', 'cores': 1, 'memory': 512},
+    {'name': 'large', 'type': 'subprocess', 'cores': 2, 'memory': 4096}
+]
+
+
+class Recorder(object):
+    """Job function that records the worker that a job was executed on and
+    the maximum number of concurrent jobs per worker. Raises the given error
+    on the worker *fail_on*.
+    """
+    def __init__(self, fail_on=None, delay=0.05, error=ConnectionError):
+        self.fail_on = fail_on
+        self.error = error
+        self.delay = delay
+        self.running = dict()
+        self.max_running = dict()
+        self.calls = list()
+        self.lock = threading.Lock()
+
+    def __call__(self, df, session, **kwargs):
+        name = session.worker()['name']
+        with self.lock:
+            self.calls.append(name)
+            self.running[name] = self.running.get(name, 0) + 1
+            self.max_running[name] = max(self.max_running.get(name, 0), self.running[name])
+        time.sleep(self.delay)
+        with self.lock:
+            self.running[name] -= 1
+        if name == self.fail_on:
+            raise self.error('worker {} failed'.format(name))
+        return name, kwargs
+
+
+def test_input_size(tmpdir):
+    """Test estimating the size of job inputs."""
+    filename = os.path.join(tmpdir, 'data.csv')
+    with open(filename, 'w') as f:
+        f.write('A,B\n1,2\n')
+    df = pd.DataFrame(data=[['a', 1]], columns=['A', 'B'])
+    assert input_size(filename) == 8
+    assert input_size(os.path.join(tmpdir, 'unknown.csv')) == 0
+    assert input_size(df) > 0
+    assert input_size({'a': filename, 'b': filename}) == 16
+
+
+def test_schedule_within_capacity():
+    """Test that jobs are only dispatched to workers with sufficient free
+    capacity.
+    """
+    func = Recorder()
+    with Scheduler(workers=WORKERS, env={}) as scheduler:
+        futures = [scheduler.submit(func, None, memory=512, arg=i) for i in range(6)]
+        results = [f.result() for f in futures]
+    assert [kwargs['arg'] for _, kwargs in results] == list(range(6))
+    assert func.max_running['small'] <= 1
+    assert func.max_running['large'] <= 2
+    # Jobs that require more memory than the small worker provides are only
+    # executed on the large worker.
+    func = Recorder()
+    with Scheduler(workers=WORKERS, env={}) as scheduler:
+        futures = [scheduler.submit(func, None, memory=1024) for i in range(3)]
+        assert set([f.result()[0] for f in futures]) == {'large'}
+    # Jobs that exceed the capacity of all workers run on the largest worker.
+    with Scheduler(workers=WORKERS, env={}) as scheduler:
+        name, _ = scheduler.submit(func, None, cores=8, memory=65536).result()
+        assert name == 'large'
+        metrics = scheduler.metrics()
+    assert metrics['large'].completed == 1
+    assert metrics['large'].running == 0
+    assert metrics['large'].cores_in_use == 0
+    assert metrics['large'].busy_time > 0
+    assert 0 < metrics['large'].utilization <= 1
+    assert metrics['small'].completed == 0
+
+
+def test_schedule_retry_on_failure():
+    """Test retrying failed jobs on a different worker."""
+    func = Recorder(fail_on='small')
+    with Scheduler(workers=WORKERS, env={}, cooldown=0.01) as scheduler:
+        futures = [scheduler.submit(func, None, memory=256) for i in range(4)]
+        assert [f.result()[0] for f in futures] == ['large'] * 4
+        metrics = scheduler.metrics()
+    assert metrics['large'].completed == 4
+    assert metrics['small'].failed >= 1
+    # Jobs fail after the maximum number of retries.
+    func = Recorder(fail_on='small')
+    workers = [WORKERS[0]]
+    with Scheduler(workers=workers, env={}, retries=1, cooldown=0.01) as scheduler:
+        future = scheduler.submit(func, None)
+        with pytest.raises(ConnectionError):
+            future.result()
+    assert func.calls == ['small', 'small']
+
+
+@pytest.mark.parametrize(
+    'error,retried',
+    [(OutOfMemoryError, True), (TimeoutError, True), (RuntimeError, False), (ValueError, False)]
+)
+def test_schedule_retry_worker_errors(error, retried):
+    """Test that only jobs that fail because of the worker are retried."""
+    func = Recorder(fail_on='small', error=error)
+    with Scheduler(workers=[WORKERS[0]], env={}, retries=1, cooldown=0.01) as scheduler:
+        future = scheduler.submit(func, None)
+        with pytest.raises(error):
+            future.result()
+        metrics = scheduler.metrics()
+    assert func.calls == ['small', 'small'] if retried else ['small']
+    assert metrics['small'].failed == len(func.calls)
+    assert scheduler.workers[0].consecutive_failures == (2 if retried else 0)
+
+
+def test_scheduler_default_workers():
+    """Test initializing the scheduler workers from the configuration."""
+    scheduler = Scheduler(env={config.METANOME_WORKER: WORKERS})
+    assert [w.name for w in scheduler.workers] == ['small', 'large']
+    scheduler.shutdown()
+    scheduler = Scheduler(env={})
+    assert [w.name for w in scheduler.workers] == ['local']
+    assert scheduler.workers[0].cores == os.cpu_count()
+    scheduler.shutdown()
+
+
+# -- Run algorithm wrappers on scheduled workers ------------------------------
+
+Proc = namedtuple('Proc', ['returncode', 'stdout', 'stderr'])
+
+
+@pytest.fixture
+def mock_subprocess(monkeypatch):
+    """Run container step for hyfd algorithm."""
+    def mock_run(*args, **kwargs):
+        _, outputfile = input_output(kwargs['cwd'], args[0])
+        doc = {'functionalDependencies': [{'lhs': ['COL0'], 'rhs': 'COL1'}]}
+        with open(outputfile, 'w') as f:
+            json.dump(doc, f)
+        return Proc(returncode=0, stdout=b'', stderr=b'')
+
+    monkeypatch.setattr(subprocess, "run", mock_run)
+
+
+def test_schedule_hyfd(mock_subprocess, tmpdir):
+    """Test running the HyFD wrapper concurrently on multiple workers."""
+    workers = [dict(w, workdir=os.path.join(tmpdir, w['name'])) for w in WORKERS]
+    df = pd.DataFrame(data=[['a', 1], ['b', 2]], columns=['A', 'B'])
+    with Scheduler(workers=workers, env={}) as scheduler:
+        futures = [scheduler.submit(hyfd, df, verbose=False) for _ in range(4)]
+        for f in futures:
+            fds = f.result()
+            assert [[fd.lhs, fd.rhs] for fd in fds] == [[['A'], ['B']]]